@@ -0,0 +1,78 @@
+"""Compare fetching single records from a JSONL output by scan and by index.
+
+Run with ``PYTHONPATH=src python benchmarks/bench_index.py``. Exports a
+synthetic ChatGPT export (``--count`` conversations, about 5 KB each) with the
+JSONL exporter, with and without ``index: true``, unless ``--path`` points at
+an existing JSONL file (indexed with ``build_index`` first). It then prints
+the average time to fetch ``--lookups`` random ids with ``JsonlIndex`` and by
+scanning the file line by line, the only way without an index.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from rokpyl.core.jsonl_index import JsonlIndex, build_index, index_path
+from rokpyl.exporters.jsonl import JsonlExporter
+from rokpyl.importers.chatgpt import ChatGptImporter
+from rokpyl.tools.synth import write_export
+
+
+def _timed(func: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def _scan(path: Path, key: str) -> dict:
+    with path.open("rb") as handle:
+        for line in handle:
+            data = json.loads(line)
+            if data.get("id") == key:
+                return data
+    raise KeyError(key)
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=20000, help="Conversations to generate")
+    parser.add_argument("--path", help="Benchmark this JSONL file instead of a synthetic one")
+    parser.add_argument("--lookups", type=int, default=200, help="Random ids to fetch")
+    parser.add_argument("--scans", type=int, default=5, help="Ids to fetch by scanning")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if args.path:
+            path = Path(args.path)
+            print(f"index: {_timed(lambda: build_index(path)):.2f} s")
+        else:
+            source = write_export(Path(tmpdir) / "chatgpt.json", "chatgpt", args.count)
+            records = ChatGptImporter().parse(source)
+            path = Path(tmpdir) / "out.jsonl"
+            exporter = JsonlExporter()
+            plain = _timed(lambda: exporter.write(records, {"path": str(path)}))
+            indexed = _timed(lambda: exporter.write(records, {"path": str(path), "index": True}))
+            print(f"export: {plain:.2f} s, with index {indexed:.2f} s")
+        size_mb = path.stat().st_size / 2**20
+        index_mb = index_path(path).stat().st_size / 2**20
+        print(f"{path.name}: {size_mb:.1f} MB, index {index_mb:.1f} MB")
+
+        with path.open("rb") as handle:
+            ids = [json.loads(line)["id"] for line in handle]
+        keys = random.Random(1).sample(ids, min(args.lookups, len(ids)))
+        with JsonlIndex.open(path) as index:
+            seconds = _timed(lambda: [index.get(key) for key in keys])
+        print(f"index: {seconds / len(keys) * 1000:.3f} ms per record")
+        scanned = keys[: args.scans]
+        seconds = _timed(lambda: [_scan(path, key) for key in scanned])
+        print(f"scan: {seconds / len(scanned) * 1000:.1f} ms per record")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,90 @@
+"""Compare the in-place schema accumulator against the tree-per-item approach.
+
+Run with ``PYTHONPATH=src python benchmarks/bench_schema_accumulator.py``.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import Any, Dict, List
+
+from rokpyl.core.schema import (
+    _add_example,
+    _empty_schema,
+    _type_name,
+    infer_from_iter,
+    merge_schema,
+)
+
+
+def _legacy_infer_schema(value: Any, *, max_examples: int = 5) -> Dict[str, Any]:
+    # Previous implementation: a full schema tree per value, merged afterwards.
+    schema = _empty_schema()
+    schema["type_counts"][_type_name(value)] = 1
+    _add_example(schema, value, max_examples)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            schema["properties"][key] = _legacy_infer_schema(item, max_examples=max_examples)
+    elif isinstance(value, list):
+        items_schema = _empty_schema()
+        for item in value:
+            merge_schema(items_schema, _legacy_infer_schema(item, max_examples=max_examples))
+        schema["items"] = items_schema
+    return schema
+
+
+def _legacy_infer_from_iter(values: List[Any], *, max_examples: int) -> Dict[str, Any]:
+    schema = _empty_schema()
+    for value in values:
+        merge_schema(schema, _legacy_infer_schema(value, max_examples=max_examples))
+    return schema
+
+
+def _conversation(rng: random.Random, idx: int, messages: int) -> Dict[str, Any]:
+    return {
+        "uuid": f"c{idx}",
+        "name": f"Conversation {idx}",
+        "created_at": "2024-01-01T00:00:00Z",
+        "chat_messages": [
+            {
+                "uuid": f"c{idx}-m{pos}",
+                "sender": "human" if pos % 2 == 0 else "assistant",
+                "text": "x" * rng.randint(10, 200),
+                "content": [
+                    {"type": "text", "text": "hello", "citations": []},
+                    {"type": "tool_use", "name": "search", "input": {"query": "q", "n": pos}},
+                ],
+            }
+            for pos in range(messages)
+        ],
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    values = [_conversation(rng, idx, args.messages) for idx in range(args.items)]
+
+    started = time.perf_counter()
+    legacy = _legacy_infer_from_iter(values, max_examples=5)
+    legacy_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    current = infer_from_iter(values, max_items=len(values), max_examples=5)
+    current_s = time.perf_counter() - started
+
+    if legacy != current:
+        raise SystemExit("accumulator output differs from legacy implementation")
+    print(f"legacy      {legacy_s:.3f}s")
+    print(f"accumulator {current_s:.3f}s ({legacy_s / current_s:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,91 @@
+"""Compare per-job overhead of cold CLI invocations and ``rokpyl serve`` jobs.
+
+Run with ``PYTHONPATH=src python benchmarks/bench_service.py``.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import secrets
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import List
+
+from rokpyl.service import close_server, create_server, submit_job
+
+FIXTURE = Path(__file__).resolve().parents[1] / "tests" / "fixtures" / "claude_minimal.json"
+
+
+def _summary(label: str, samples: List[float]) -> None:
+    print(
+        f"{label:8} median {statistics.median(samples) * 1000:8.1f} ms"
+        f"  min {min(samples) * 1000:8.1f} ms  ({len(samples)} jobs)"
+    )
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--executor", choices=["process", "thread"], default="process")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    src = str(Path(__file__).resolve().parents[1] / "src")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [src, env.get("PYTHONPATH")]))
+    with TemporaryDirectory() as tmpdir:
+        out = Path(tmpdir) / "out.jsonl"
+        cold = []
+        for _ in range(args.jobs):
+            started = time.perf_counter()
+            subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "rokpyl.cli",
+                    "--export-path",
+                    str(FIXTURE),
+                    "--parser",
+                    "claude",
+                    "--out-jsonl",
+                    str(out),
+                ],
+                check=True,
+                stdout=subprocess.DEVNULL,
+                env=env,
+            )
+            cold.append(time.perf_counter() - started)
+
+        token = secrets.token_urlsafe(16)
+        server = create_server(port=0, workers=1, executor=args.executor, token=token)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        config = {
+            "inputs": [{"path": str(FIXTURE), "mode": "explicit", "parser": "claude"}],
+            "outputs": [{"type": "jsonl", "path": str(out)}],
+        }
+        warm = []
+        try:
+            for _ in range(args.jobs):
+                started = time.perf_counter()
+                events = list(submit_job(config, port=server.server_address[1], token=token))
+                warm.append(time.perf_counter() - started)
+                if events[-1]["status"] != "done":
+                    raise SystemExit(f"Job failed: {events[-1]}")
+        finally:
+            server.shutdown()
+            thread.join()
+            close_server(server)
+
+    _summary("cold CLI", cold)
+    _summary("service", warm)
+    print(f"speedup  {statistics.median(cold) / statistics.median(warm):.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
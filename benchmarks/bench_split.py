@@ -0,0 +1,145 @@
+"""Compare a sequential parse of one large JSON array with a split parse.
+
+Run with ``PYTHONPATH=src python benchmarks/bench_split.py``. Writes a
+synthetic export (``--count`` conversations; about 5 KB each, so 200000 make
+a 1 GB file) unless ``--path`` points at an existing one, then prints the
+best wall time of a sequential parse and of ``rokpyl.core.split.parse_split``
+for each ``--workers`` value, with the speedup. Splitting only pays off with
+spare cores: workers build records in parallel, but the parent still
+unpickles every record they return.
+
+It also times the parts of a split parse one by one in this process: pool
+startup, finding the cuts, the work done by the workers (decoding, building
+and pickling records) and the parent's unpickling. From those it projects the
+wall time on a host with one free core per worker, ``serial + parallel / N``,
+and the source size at which splitting starts to pay off. On a host with
+fewer cores than workers the measured split times only show overhead, so the
+projection is the number to look at there.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import pickle
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from rokpyl.core.split import _map, _parse_range, element_ranges, parse_split, usable_cpus
+from rokpyl.importers.chatgpt import ChatGptImporter
+from rokpyl.importers.claude import ClaudeImporter
+from rokpyl.tools.synth import write_export
+
+IMPORTERS = {"chatgpt": ChatGptImporter, "claude": ClaudeImporter}
+
+
+def _best_of(repeat: int, func: Callable[[], Optional[list]]) -> float:
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        if func() is None:
+            raise SystemExit("source could not be split")
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _timed(func: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def _noop() -> None:
+    return None
+
+
+def breakdown(importer: object, path: Path, workers: int) -> Dict[str, float]:
+    """Seconds spent in each part of a split parse, measured one at a time."""
+    with path.open("rb") as handle, _map(handle) as data:
+        started = time.perf_counter()
+        ranges = element_ranges(data, workers)
+        cuts = time.perf_counter() - started
+    if ranges is None:
+        raise SystemExit("source could not be split")
+
+    def start_pool() -> None:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(_noop) for _ in range(workers)]:
+                future.result()
+
+    pool = _timed(start_pool)
+    work = pickling = unpickling = 0.0
+    for start, end in ranges:
+        started = time.perf_counter()
+        part = _parse_range(type(importer), path, start, end, {})
+        work += time.perf_counter() - started
+        started = time.perf_counter()
+        payload = pickle.dumps(part, protocol=pickle.HIGHEST_PROTOCOL)
+        pickling += time.perf_counter() - started
+        del part
+        unpickling += _timed(lambda: pickle.loads(payload))
+        del payload
+    return {
+        "pool": pool,
+        "cuts": cuts,
+        "parallel": work + pickling,
+        "serial": pool + cuts + unpickling,
+        "unpickle": unpickling,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--platform", choices=sorted(IMPORTERS), default="chatgpt")
+    parser.add_argument("--count", type=int, default=20000, help="Conversations to generate")
+    parser.add_argument("--path", help="Benchmark this export instead of a synthetic one")
+    parser.add_argument("--workers", default=f"2,{os.cpu_count() or 1}")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case (best is kept)")
+    args = parser.parse_args(argv)
+
+    importer = IMPORTERS[args.platform]()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if args.path:
+            path = Path(args.path)
+        else:
+            path = write_export(Path(tmpdir) / f"{args.platform}.json", args.platform, args.count)
+        size_mb = path.stat().st_size / 2**20
+        cpus = usable_cpus()
+        print(f"{path.name}: {size_mb:.1f} MB, {cpus} usable CPUs")
+        sequential = _best_of(args.repeat, lambda: importer.parse(path, {}))
+        print(f"sequential: {sequential:.2f} s ({size_mb / sequential:.1f} MB/s)")
+        for workers in sorted({int(value) for value in args.workers.split(",") if value}):
+            if workers < 2:
+                continue
+            seconds = _best_of(
+                args.repeat, lambda: parse_split(importer, path, {}, workers, min_bytes=0)
+            )
+            note = "" if workers <= cpus else f" (oversubscribed: {cpus} CPUs)"
+            print(
+                f"split x{workers}: {seconds:.2f} s ({size_mb / seconds:.1f} MB/s), "
+                f"speedup {sequential / seconds:.2f}x{note}"
+            )
+            parts = breakdown(importer, path, workers)
+            print(
+                "  parts: "
+                + ", ".join(f"{name} {value:.2f} s" for name, value in parts.items())
+            )
+            projected = parts["serial"] + parts["parallel"] / workers
+            # Pool startup is the only fixed cost; everything else grows with size.
+            per_mb = (projected - parts["pool"]) / size_mb
+            saved_per_mb = sequential / size_mb - per_mb
+            if saved_per_mb > 0:
+                pays_off = f"pays off above {parts['pool'] / saved_per_mb:.1f} MB"
+            else:
+                pays_off = "never pays off"
+            print(
+                f"  projected with {workers} free cores: {projected:.2f} s, "
+                f"speedup {sequential / projected:.2f}x, {pays_off}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,105 @@
+"""Measure ``import rokpyl.cli`` cost with ``python -X importtime``.
+
+Run with ``PYTHONPATH=src python benchmarks/bench_startup.py``. Prints the
+median cumulative import time and the slowest modules of the last sample, and
+exits non-zero when the median exceeds the budget (``--max-ms``, else
+``max_ms`` from ``startup_baseline.json``) or when ``import rokpyl.cli`` loads
+a rokpyl module the baseline does not list, so startup regressions gate CI.
+``--update-baseline`` records the current median, a budget with headroom for
+timing noise, and the rokpyl modules loaded.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+MODULE = "rokpyl.cli"
+BASELINE_PATH = Path(__file__).with_name("startup_baseline.json")
+# Budget written by --update-baseline, relative to the measured median.
+HEADROOM = 1.5
+
+
+def import_times(module: str = MODULE) -> Dict[str, int]:
+    """Cumulative import time in microseconds per module, from a fresh interpreter."""
+    env = dict(os.environ)
+    src = str(Path(__file__).resolve().parents[1] / "src")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [src, env.get("PYTHONPATH")]))
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        check=True,
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    times: Dict[str, int] = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        try:
+            times[name.strip()] = int(cumulative.strip())
+        except ValueError:
+            continue  # header line
+    return times
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to list")
+    parser.add_argument("--max-ms", type=float, help="Fail when the median exceeds this")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    samples: List[float] = []
+    times: Dict[str, int] = {}
+    for _ in range(max(1, args.repeat)):
+        times = import_times()
+        samples.append(times[MODULE] / 1000)
+    median = statistics.median(samples)
+    print(f"import {MODULE}: median {median:.1f} ms  min {min(samples):.1f} ms")
+    slowest: List[Tuple[str, int]] = sorted(
+        ((name, value) for name, value in times.items() if name != MODULE),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    for name, value in slowest[: args.top]:
+        print(f"  {value / 1000:8.1f} ms  {name}")
+
+    modules = sorted(name for name in times if name.split(".")[0] == "rokpyl")
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        payload = {
+            "python": platform.python_version(),
+            "median_ms": round(median, 1),
+            "max_ms": round(median * HEADROOM),
+            "modules": modules,
+        }
+        baseline_path.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+        return 0
+    baseline = (
+        json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else {}
+    )
+    failed = False
+    max_ms = args.max_ms if args.max_ms is not None else baseline.get("max_ms")
+    if max_ms is not None and median > max_ms:
+        print(f"startup budget exceeded: {median:.1f} ms > {max_ms:.1f} ms")
+        failed = True
+    if "modules" in baseline:
+        extra = sorted(set(modules) - set(baseline["modules"]))
+        if extra:
+            print(f"{MODULE} now imports: {', '.join(extra)}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,216 @@
+"""Throughput benchmarks with regression gates.
+
+Generates seeded synthetic exports, then times each importer (and the
+ChatGPT one on a gzipped copy),
+``normalize_records``, the pipeline (plain, checkpointed, with a selective
+``filter``/``fields`` query and with ``lazy_messages`` and no outputs, i.e.
+a metadata-only run), each exporter and the schema tool. Results are
+compared against ``baseline.json``; a case fails when its throughput drops
+more than ``--threshold`` below the baseline.
+
+    PYTHONPATH=src python benchmarks/run_benchmarks.py --size 1000
+    PYTHONPATH=src python benchmarks/run_benchmarks.py --size 1000 --update-baseline
+
+Baselines are machine-specific; refresh them when the benchmark host changes.
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import gzip
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from rokpyl.core.normalize import normalize_records
+from rokpyl.core.pipeline import Pipeline
+from rokpyl.core.registry import ExporterRegistry, ImporterRegistry
+from rokpyl.exporters.columnar import ColumnarExporter
+from rokpyl.exporters.jsonl import JsonlExporter
+from rokpyl.exporters.markdown import MarkdownExporter
+from rokpyl.exporters.neo4j_csv import Neo4jCsvExporter
+from rokpyl.importers.chatgpt import ChatGptImporter
+from rokpyl.importers.claude import ClaudeImporter
+from rokpyl.models.canonical import ConversationRecord
+from rokpyl.tools.json_schema import extract_schema
+from rokpyl.tools.synth import write_export
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+
+def _best_of(
+    repeat: int, func: Callable[..., int], prepare: Optional[Callable[[], Any]] = None
+) -> Tuple[float, int]:
+    """Best time of ``repeat`` calls; ``prepare()`` builds each call's input, untimed."""
+    best = float("inf")
+    items = 0
+    for _ in range(repeat):
+        args = () if prepare is None else (prepare(),)
+        started = time.perf_counter()
+        items = func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, items
+
+
+def run_cases(size: int, seed: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    with TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        chatgpt_path = write_export(root / "conversations.json", "chatgpt", size, seed=seed)
+        claude_path = write_export(root / "claude.json", "claude", size, seed=seed)
+        claude_html = write_export(root / "claude.html", "claude", size, seed=seed)
+        claude_csv = write_export(root / "claude.csv", "claude", size, seed=seed)
+        chatgpt_gz = root / "conversations.json.gz"
+        chatgpt_gz.write_bytes(gzip.compress(chatgpt_path.read_bytes(), compresslevel=6))
+        records = ClaudeImporter().parse(claude_path) + ChatGptImporter().parse(chatgpt_path)
+
+        def parse_chatgpt(path: Path = chatgpt_path) -> int:
+            return len(ChatGptImporter().parse(path))
+
+        def parse_claude(path: Path = claude_path) -> int:
+            return len(ClaudeImporter().parse(path))
+
+        # normalize_records mutates its input: each run gets a fresh copy, made
+        # outside the timed region.
+        def normalize(fresh: List[ConversationRecord]) -> int:
+            return len(normalize_records(fresh))
+
+        def schema() -> int:
+            extract_schema(chatgpt_path, max_items=size, max_examples=5)
+            return size
+
+        def pipeline(checkpoint: bool, query: bool = False, lazy: bool = False) -> int:
+            importers = ImporterRegistry()
+            importers.register(ClaudeImporter)
+            importers.register(ChatGptImporter)
+            options = {"lazy_messages": True} if lazy else {}
+            config: Dict[str, Any] = {
+                "inputs": [
+                    {
+                        "path": str(chatgpt_path),
+                        "mode": "explicit",
+                        "parser": "chatgpt",
+                        "options": options,
+                    },
+                    {
+                        "path": str(claude_path),
+                        "mode": "explicit",
+                        "parser": "claude",
+                        "options": options,
+                    },
+                ],
+            }
+            if checkpoint:
+                config["runtime"] = {"checkpoint_dir": str(root / "checkpoint")}
+            if query:
+                # One day of synthetic conversations (one per hour), no messages;
+                # throughput counts every conversation scanned.
+                config["filter"] = {"since": "2024-01-02", "until": "2024-01-03"}
+                config["fields"] = ["date"]
+                Pipeline(importers, ExporterRegistry()).run(config)
+                return 2 * size
+            return len(Pipeline(importers, ExporterRegistry()).run(config))
+
+        cases: List[Tuple[str, Callable[..., int]]] = [
+            ("importer:chatgpt", parse_chatgpt),
+            ("importer:chatgpt-gz", lambda: parse_chatgpt(chatgpt_gz)),
+            ("importer:claude", parse_claude),
+            ("importer:claude-html", lambda: parse_claude(claude_html)),
+            ("importer:claude-csv", lambda: parse_claude(claude_csv)),
+            ("normalize", normalize),
+            ("json_schema", schema),
+            ("pipeline", lambda: pipeline(False)),
+            ("pipeline:checkpoint", lambda: pipeline(True)),
+            ("pipeline:query", lambda: pipeline(False, query=True)),
+            ("pipeline:lazy", lambda: pipeline(False, lazy=True)),
+        ]
+        for exporter, options in [
+            (JsonlExporter(), {"path": str(root / "out.jsonl")}),
+            (MarkdownExporter(), {"dir": str(root / "md")}),
+            (ColumnarExporter(), {"dir": str(root / "columnar")}),
+            (Neo4jCsvExporter(), {"dir": str(root / "graph")}),
+        ]:
+            def export(exporter=exporter, options=options) -> int:
+                exporter.write(records, options)
+                return len(records)
+
+            cases.append((f"exporter:{exporter.name}", export))
+
+        prepare = {"normalize": lambda: copy.deepcopy(records)}
+        for name, func in cases:
+            seconds, items = _best_of(repeat, func, prepare.get(name))
+            results[name] = {
+                "seconds": round(seconds, 6),
+                "items": items,
+                "items_per_s": round(items / seconds, 2) if seconds else 0.0,
+            }
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float,
+) -> List[str]:
+    """Return a message for every case slower than baseline by more than ``threshold``."""
+    regressions = []
+    for name, result in sorted(results.items()):
+        expected = baseline.get(name, {}).get("items_per_s")
+        if not expected:
+            continue
+        ratio = result["items_per_s"] / expected
+        if ratio < 1.0 - threshold:
+            regressions.append(
+                f"{name}: {result['items_per_s']:.0f}/s vs baseline {expected:.0f}/s "
+                f"({ratio:.0%})"
+            )
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run rokpyl throughput benchmarks")
+    parser.add_argument("--size", type=int, default=1000, help="Conversations per export")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case (best is kept)")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed throughput drop")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--out", help="Write results JSON to this path")
+    args = parser.parse_args(argv)
+
+    results = run_cases(args.size, args.seed, args.repeat)
+    for name, result in sorted(results.items()):
+        print(f"{name:20} {result['items_per_s']:>12.0f} items/s  ({result['seconds']:.3f}s)")
+
+    payload: Dict[str, Any] = {
+        "size": args.size,
+        "python": platform.python_version(),
+        "results": results,
+    }
+    if args.out:
+        Path(args.out).write_text(json.dumps(payload, indent=2), encoding="utf-8")
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline_path.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+        return 0
+    if not baseline_path.exists():
+        print(f"No baseline at {baseline_path}; run with --update-baseline", file=sys.stderr)
+        return 0
+
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    if baseline.get("size") != args.size:
+        print("Baseline size differs; comparison skipped", file=sys.stderr)
+        return 0
+    regressions = compare(results, baseline.get("results", {}), args.threshold)
+    for message in regressions:
+        print(f"REGRESSION {message}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,22 +2,39 @@
 from __future__ import annotations
 
 import argparse
-from typing import Any, Dict, List, Tuple
+import json
+import os
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
 
 from rokpyl.core.config import (
     ConfigError,
     apply_env_overrides,
     apply_set_overrides,
+    as_size,
     load_config,
     merge_dicts,
 )
-from rokpyl.core.pipeline import Pipeline
+from rokpyl.core.plugins import register_plugins, resolve_plugins_dir
 from rokpyl.core.registry import ExporterRegistry, ImporterRegistry
-from rokpyl.exporters.jsonl import JsonlExporter
-from rokpyl.exporters.markdown import MarkdownExporter
-from rokpyl.exporters.notion import NotionExporter
-from rokpyl.importers.claude import ClaudeImporter
-from rokpyl.importers.chatgpt import ChatGptImporter
+
+if TYPE_CHECKING:
+    from rokpyl.core.pipeline import Pipeline
+
+# Built-ins are registered lazily so a run only imports what it uses; keep
+# the order, it is the auto-detection tie-break order.
+BUILTIN_IMPORTERS = (
+    ("claude", "rokpyl.importers.claude:ClaudeImporter"),
+    ("chatgpt", "rokpyl.importers.chatgpt:ChatGptImporter"),
+)
+BUILTIN_EXPORTERS = (
+    ("jsonl", "rokpyl.exporters.jsonl:JsonlExporter"),
+    ("markdown", "rokpyl.exporters.markdown:MarkdownExporter"),
+    ("notion", "rokpyl.exporters.notion:NotionExporter"),
+    ("columnar", "rokpyl.exporters.columnar:ColumnarExporter"),
+    ("neo4j", "rokpyl.exporters.neo4j_csv:Neo4jCsvExporter"),
+)
 
 
 def parse_inputs(args: argparse.Namespace) -> List[Dict[str, Any]]:
@@ -42,23 +59,62 @@ def build_config(args: argparse.Namespace) -> Dict[str, Any]:
         config = merge_dicts(config, {"project": args.project})
     if args.platform:
         config = merge_dicts(config, {"platform": args.platform})
+    if args.plugins_dir:
+        config = merge_dicts(config, {"plugins_dir": args.plugins_dir})
+    if args.attachments_dir:
+        config = merge_dicts(config, {"attachments": {"dir": args.attachments_dir}})
+    filters = {
+        key: value
+        for key, value in (
+            ("since", args.since),
+            ("until", args.until),
+            ("platform", args.filter_platform),
+            ("title_match", args.title_match),
+        )
+        if value
+    }
+    if filters:
+        config = merge_dicts(config, {"filter": filters})
+    if args.fields:
+        config = merge_dicts(config, {"fields": args.fields})
+
+    if args.engine:
+        config = merge_dicts(config, {"runtime": {"engine": args.engine}})
+    if args.trace_memory:
+        config = merge_dicts(config, {"runtime": {"trace_memory": True}})
+    if args.max_memory:
+        config = merge_dicts(config, {"runtime": {"max_memory": args.max_memory}})
+    if args.checkpoint_dir:
+        config = merge_dicts(config, {"runtime": {"checkpoint_dir": args.checkpoint_dir}})
+    if args.resume:
+        config = merge_dicts(config, {"runtime": {"resume": True}})
+    if args.shard:
+        config = merge_dicts(config, {"runtime": {"shard": args.shard}})
+    if args.profile:
+        profile: Dict[str, Any] = {"stages": args.profile, "mode": args.profile_mode}
+        if args.profile_dir:
+            profile["dir"] = args.profile_dir
+        config = merge_dicts(config, {"runtime": {"profile": profile}})
 
     if args.inputs:
         config = merge_dicts(config, {"inputs": parse_inputs(args)})
 
     outputs: List[Dict[str, Any]] = []
+    indexed = bool(args.jsonl_index and args.out_jsonl)
     if args.out_jsonl:
-        outputs.append({"type": "jsonl", "path": args.out_jsonl})
+        output = {"type": "jsonl", "path": args.out_jsonl}
+        outputs.append({**output, "index": True} if indexed else output)
     if args.out_md_dir:
-        outputs.append({"type": "markdown", "dir": args.out_md_dir})
+        output = {"type": "markdown", "dir": args.out_md_dir}
+        outputs.append({**output, "raw_jsonl": args.out_jsonl} if indexed else output)
     if outputs:
         config = merge_dicts(config, {"outputs": outputs})
 
     return config
 
 
-def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
-    parser = argparse.ArgumentParser(description="rokpyl CLI")
+def build_parser(**kwargs: Any) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(**{"description": "rokpyl CLI", **kwargs})
     parser.add_argument("--config", help="Path to config file")
     parser.add_argument("--set", dest="set_values", action="append")
 
@@ -69,11 +125,55 @@ def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
 
     parser.add_argument("--out-jsonl")
     parser.add_argument("--out-md-dir")
+    parser.add_argument(
+        "--jsonl-index",
+        action="store_true",
+        help="Index --out-jsonl by id and url; Markdown files link to it instead of embedding",
+    )
+    parser.add_argument(
+        "--attachments-dir", help="Store attachment files here, deduplicated by SHA-256"
+    )
     parser.add_argument("--platform")
     parser.add_argument("--project")
+    parser.add_argument("--since", help="Keep conversations dated on or after this ISO date")
+    parser.add_argument("--until", help="Keep conversations dated before this ISO date")
+    parser.add_argument(
+        "--filter-platform", help="Keep conversations from this platform (e.g. ChatGPT)"
+    )
+    parser.add_argument("--title-match", help="Keep conversations whose title matches this regex")
+    parser.add_argument(
+        "--fields", help="Comma-separated record fields to keep (id, platform, title always kept)"
+    )
+    parser.add_argument("--engine", choices=["sequential", "async"])
+    parser.add_argument(
+        "--plugins-dir", help="Load local_importers/ and local_exporters/ from here"
+    )
+    parser.add_argument("--report", help="Write a JSON run report to this path")
+    parser.add_argument(
+        "--trace-memory", action="store_true", help="Track per-stage peak memory"
+    )
+    parser.add_argument(
+        "--max-memory", help="Spill records to disk past this size (e.g. 2GB)"
+    )
+    parser.add_argument(
+        "--profile", action="append", help="Profile a stage (e.g. parse, export:jsonl)"
+    )
+    parser.add_argument("--profile-mode", choices=["cprofile", "sample"], default="cprofile")
+    parser.add_argument("--profile-dir", help="Directory for profiler output")
+    parser.add_argument(
+        "--checkpoint-dir", help="Checkpoint progress to this directory during the run"
+    )
+    parser.add_argument(
+        "--resume", action="store_true", help="Continue from the last checkpoint"
+    )
+    parser.add_argument(
+        "--shard", help="Process only shard i of N (e.g. 2/4); outputs get a shard suffix"
+    )
+
+    return parser
 
-    args = parser.parse_args(argv)
 
+def _collect_inputs(args: argparse.Namespace) -> argparse.Namespace:
     paths = (args.export_path or []) + (args.input_path or [])
     parsers = args.parser_name or []
 
@@ -85,34 +185,249 @@ def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
     return args
 
 
-def build_registry() -> ImporterRegistry:
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    return _collect_inputs(build_parser().parse_args(argv))
+
+
+def build_registry(plugins_dir: str | Path | None = None) -> ImporterRegistry:
     registry = ImporterRegistry()
-    registry.register(ClaudeImporter)
-    registry.register(ChatGptImporter)
+    for name, target in BUILTIN_IMPORTERS:
+        registry.register_lazy(name, target)
+    if plugins_dir:
+        register_plugins(plugins_dir, importers=registry)
     return registry
 
-def build_exporter_registry() -> ExporterRegistry:
+def build_exporter_registry(plugins_dir: str | Path | None = None) -> ExporterRegistry:
     registry = ExporterRegistry()
-    registry.register(JsonlExporter)
-    registry.register(MarkdownExporter)
-    registry.register(NotionExporter)
+    for name, target in BUILTIN_EXPORTERS:
+        registry.register_lazy(name, target)
+    if plugins_dir:
+        register_plugins(plugins_dir, exporters=registry)
     return registry
 
 
+def build_pipeline(config: Dict[str, Any]) -> Pipeline:
+    engine = (config.get("runtime") or {}).get("engine") or "sequential"
+    if engine not in {"sequential", "async"}:
+        raise SystemExit(f"Unknown engine: {engine}")
+    # Imported here so that subcommands without a pipeline start fast.
+    if engine == "async":
+        from rokpyl.core.async_pipeline import AsyncPipeline
+
+        pipeline_cls = AsyncPipeline
+    else:
+        from rokpyl.core.pipeline import Pipeline
+
+        pipeline_cls = Pipeline
+    plugins_dir = resolve_plugins_dir(config)
+    try:
+        return pipeline_cls(build_registry(plugins_dir), build_exporter_registry(plugins_dir))
+    except (OSError, SyntaxError, ValueError) as exc:
+        raise SystemExit(f"Invalid plugin in {plugins_dir}: {exc}")
+
+
+def merge_main(argv: List[str]) -> int:
+    from rokpyl.core.merge import ORDERS, PRECEDENCE, merge_jsonl
+    from rokpyl.core.shard import merge_shards
+
+    parser = argparse.ArgumentParser(
+        prog="rokpyl merge", description="Merge JSONL outputs with dedup, using bounded memory"
+    )
+    parser.add_argument("inputs", nargs="+", help="JSONL files written by the jsonl exporter")
+    parser.add_argument("--out", required=True, help="Merged JSONL output path")
+    parser.add_argument(
+        "--shards",
+        action="store_true",
+        help="Inputs are --shard outputs; restore the single-node order and dedup exactly",
+    )
+    parser.add_argument("--order", choices=ORDERS, default="date", help="Output order")
+    parser.add_argument(
+        "--prefer", choices=PRECEDENCE, default="first", help="Which duplicate is kept"
+    )
+    parser.add_argument("--memory-mb", type=int, default=256, help="Sort memory budget")
+    parser.add_argument("--tmp-dir", help="Directory for sort runs (default: system temp)")
+    args = parser.parse_args(argv)
+    try:
+        if args.shards:
+            written = merge_shards(args.inputs, args.out)
+        else:
+            written = merge_jsonl(
+                args.inputs,
+                args.out,
+                order=args.order,
+                prefer=args.prefer,
+                memory_bytes=max(1, args.memory_mb) * 1024 * 1024,
+                tmp_dir=args.tmp_dir,
+            ).written
+    except (OSError, ValueError) as exc:
+        raise SystemExit(str(exc))
+    print(f"Merge complete: inputs={len(args.inputs)} records={written}")
+    return 0
+
+
+def get_main(argv: List[str]) -> int:
+    from rokpyl.core.jsonl_index import JsonlIndex, build_index
+
+    parser = argparse.ArgumentParser(
+        prog="rokpyl get", description="Print one record of an indexed JSONL output"
+    )
+    parser.add_argument("key", help="Conversation id (or url)")
+    parser.add_argument("--jsonl", required=True, help="JSONL output written with index: true")
+    parser.add_argument(
+        "--reindex", action="store_true", help="Build the index from the file first"
+    )
+    parser.add_argument("--pretty", action="store_true", help="Indent the record")
+    args = parser.parse_args(argv)
+    try:
+        if args.reindex:
+            build_index(args.jsonl)
+        with JsonlIndex.open(args.jsonl) as index:
+            line = index.raw(args.key)
+    except (OSError, ValueError) as exc:
+        raise SystemExit(str(exc))
+    if line is None:
+        raise SystemExit(f"No record with id or url {args.key!r} in {args.jsonl}")
+    text = line.decode("utf-8")
+    print(json.dumps(json.loads(text), indent=2, ensure_ascii=True) if args.pretty else text)
+    return 0
+
+
+def watch_main(argv: List[str]) -> int:
+    from rokpyl.core.detection import UnknownFormatError
+    from rokpyl.core.watch import watch
+
+    parser = build_parser(
+        prog="rokpyl watch", description="Ingest new or changed exports as they land"
+    )
+    parser.add_argument("--interval", type=float, default=5.0, help="Seconds between polls")
+    parser.add_argument(
+        "--settle", type=float, default=2.0, help="Seconds a file must stay unchanged"
+    )
+    parser.add_argument("--state", help="Remember processed files here across restarts")
+    parser.add_argument("--max-batches", type=int, help="Exit after this many batches")
+    args = _collect_inputs(parser.parse_args(argv))
+    try:
+        config = build_config(args)
+    except ConfigError as exc:
+        raise SystemExit(str(exc))
+    if not config.get("inputs"):
+        raise SystemExit("No inputs provided; use --export-path or --input")
+
+    pipeline = build_pipeline(config)
+
+    def report(batch: int, sources: Dict[Path, Any], records: int) -> None:
+        print(f"Batch {batch}: sources={len(sources)} records={records}", flush=True)
+
+    def report_error(source: Path, error: str) -> None:
+        print(f"Source failed: {source}: {error}", file=sys.stderr, flush=True)
+
+    try:
+        watch(
+            pipeline,
+            config,
+            interval_s=args.interval,
+            settle_s=args.settle,
+            state_path=Path(args.state) if args.state else None,
+            max_batches=args.max_batches,
+            on_batch=report,
+            on_error=report_error,
+        )
+    except KeyboardInterrupt:
+        pass
+    except (UnknownFormatError, ConfigError) as exc:
+        raise SystemExit(str(exc))
+    finally:
+        pipeline.close()
+    return 0
+
+
+def serve_main(argv: List[str]) -> int:
+    import secrets
+
+    from rokpyl.service import EXECUTORS, close_server, create_server
+
+    parser = argparse.ArgumentParser(
+        prog="rokpyl serve", description="Run conversion jobs on a warm local worker pool"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--executor", choices=EXECUTORS, default="process")
+    parser.add_argument(
+        "--plugins-dir", help="Load local_importers/ and local_exporters/ from here"
+    )
+    parser.add_argument(
+        "--token",
+        default=os.environ.get("ROKPYL_SERVICE_TOKEN"),
+        help="Bearer token clients must send (default: $ROKPYL_SERVICE_TOKEN; "
+        "generated for TCP when unset)",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args(argv)
+
+    token = args.token
+    if not args.socket and not token:
+        token = secrets.token_urlsafe(32)
+    try:
+        server = create_server(
+            host=args.host,
+            port=args.port,
+            socket_path=args.socket,
+            workers=max(1, args.workers),
+            executor=args.executor,
+            plugins_dir=args.plugins_dir,
+            token=token,
+            verbose=args.verbose,
+        )
+    except ConfigError as exc:
+        raise SystemExit(str(exc))
+    where = args.socket or f"http://{args.host}:{server.server_address[1]}"
+    print(f"Serving on {where} with {args.workers} {args.executor} workers", flush=True)
+    if token and token != args.token:
+        print(f"Token: {token}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close_server(server)
+    return 0
+
+
 def main(argv: List[str] | None = None) -> int:
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] == "merge":
+        return merge_main(argv[1:])
+    if argv and argv[0] == "get":
+        return get_main(argv[1:])
+    if argv and argv[0] == "watch":
+        return watch_main(argv[1:])
+    if argv and argv[0] == "serve":
+        return serve_main(argv[1:])
+
+    from rokpyl.core.detection import UnknownFormatError
+    from rokpyl.core.query import Query
+    from rokpyl.core.shard import parse_shard
+
     args = parse_args(argv)
     try:
         config = build_config(args)
+        parse_shard((config.get("runtime") or {}).get("shard"))
+        as_size((config.get("runtime") or {}).get("max_memory"))
+        Query.from_config(config)
     except ConfigError as exc:
         raise SystemExit(str(exc))
 
     if not config.get("inputs"):
         raise SystemExit("No inputs provided; use --export-path or --input")
 
-    registry = build_registry()
-    exporter_registry = build_exporter_registry()
-    pipeline = Pipeline(registry, exporter_registry)
-    records = pipeline.run(config)
+    pipeline = build_pipeline(config)
+    try:
+        records = pipeline.run(config)
+    except (UnknownFormatError, ConfigError) as exc:
+        raise SystemExit(str(exc))
 
     print(
         "Run complete: inputs={inputs} records={records}".format(
@@ -120,8 +435,17 @@ def main(argv: List[str] | None = None) -> int:
             records=len(records),
         )
     )
+    if args.report:
+        report_path = Path(args.report)
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        report = pipeline.report()
+        report["inputs"] = len(config.get("inputs", []))
+        report_path.write_text(json.dumps(report, indent=2, ensure_ascii=True), encoding="utf-8")
+    for failure in pipeline.export_failures:
+        print(f"Exporter failed: {failure.name}: {failure.error}", file=sys.stderr)
+    pipeline.close()
 
-    return 0
+    return 1 if pipeline.export_failures else 0
 
 
 if __name__ == "__main__":
@@ -0,0 +1,57 @@
+"""Conversation files inside export archives.
+
+ChatGPT and Claude deliver their exports as a zip whose ``conversations.json``
+holds every conversation. Importers and format detection read such a zip as it
+was downloaded: ``iter_members`` opens each conversation member as text in
+place and ``iter_payloads`` decodes them, without extracting the archive.
+Other members (attachments, ``users.json``, ``chat.html``) are ignored here;
+attachments are resolved by ``rokpyl.core.attachments``.
+"""
+from __future__ import annotations
+
+import io
+import json
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Any, Iterator, TextIO, Tuple
+
+MEMBER_NAMES = {"conversations.json", "conversations.jsonl"}
+
+
+def _is_conversations(info: zipfile.ZipInfo) -> bool:
+    member = PurePosixPath(info.filename)
+    return (
+        not info.is_dir()
+        and member.name.lower() in MEMBER_NAMES
+        and "__MACOSX" not in member.parts
+    )
+
+
+def iter_members(path: Path) -> Iterator[Tuple[str, TextIO]]:
+    """``(name, text handle)`` for each conversation member, in archive order.
+
+    Each handle is closed when the iteration moves past it. Raises
+    ``ValueError`` when ``path`` is not a zip archive.
+    """
+    try:
+        archive = zipfile.ZipFile(path)
+    except zipfile.BadZipFile as exc:
+        raise ValueError(f"{path}: not a zip archive: {exc}") from exc
+    with archive:
+        for info in archive.infolist():
+            if not _is_conversations(info):
+                continue
+            with io.TextIOWrapper(archive.open(info), encoding="utf-8") as handle:
+                yield info.filename, handle
+
+
+def iter_payloads(path: Path) -> Iterator[Any]:
+    """Decoded conversation members: one value per ``.json``, one per ``.jsonl`` line."""
+    for name, handle in iter_members(path):
+        if name.lower().endswith(".jsonl"):
+            for line in handle:
+                stripped = line.strip()
+                if stripped and not stripped.startswith("#"):
+                    yield json.loads(stripped)
+        else:
+            yield json.load(handle)
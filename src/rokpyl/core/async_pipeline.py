@@ -0,0 +1,318 @@
+"""Asyncio staged pipeline.
+
+Stages are linked by bounded queues so disk reads, parsing, normalization,
+summarization and exporting overlap; throughput is set by the slowest stage::
+
+    discover -> parse (executor) -> normalize -> summarize (executor) -> export
+
+Each queue holds at most ``queue_depth`` items. Parse and summarize results
+are queued as futures in discovery order, so records are normalized and
+exported in the same order (and with the same dedup outcome) as
+``Pipeline.run``. Kept records are summarized ``SUMMARIZE_BATCH`` at a time,
+as the sequential engine does under ``max_memory``; checkpoint reads and
+writes run on the I/O pool, off the event loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from rokpyl.core.config import ConfigError, as_int
+from rokpyl.core.fanout import fan_out
+from rokpyl.core.instrument import Instrumentation, StageStats
+from rokpyl.core.pipeline import (
+    SUMMARIZE_BATCH,
+    Pipeline,
+    SourceTask,
+    parse_source,
+    record_source_stats,
+)
+from rokpyl.core.spill import RecordStore
+from rokpyl.exporters.base import Exporter
+from rokpyl.models.canonical import ConversationRecord, messages_decoded
+
+_DONE = object()
+Collected = Union[List[ConversationRecord], RecordStore]
+
+
+def _make_executor(kind: str, workers: int) -> Executor:
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rokpyl-parse")
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    raise ConfigError(f"Unknown parse_executor: {kind}")
+
+
+def parse_source_timed(task: SourceTask) -> Tuple[List[ConversationRecord], float, float]:
+    wall = time.perf_counter()
+    cpu = time.thread_time()
+    records = parse_source(task)
+    return records, time.perf_counter() - wall, time.thread_time() - cpu
+
+
+def _next_timed(tasks: Iterator[SourceTask], stats: StageStats) -> Optional[SourceTask]:
+    wall = time.perf_counter()
+    cpu = time.thread_time()
+    try:
+        task = next(tasks, None)
+    finally:
+        stats.wall_s += time.perf_counter() - wall
+        stats.cpu_s += time.thread_time() - cpu
+    if task is not None:
+        stats.sources += 1
+    return task
+
+
+class AsyncPipeline(Pipeline):
+    """Stage timings are summed per stage; stages overlap, so they can exceed
+    the run's wall time. For the same reason per-stage profiling and memory
+    tracing are refused: run those with the sequential engine."""
+
+    engine = "async"
+
+    def run(self, config: Dict[str, Any]) -> Sequence[ConversationRecord]:
+        instrumentation = self.instrumentation = Instrumentation.from_config(
+            config.get("runtime")
+        )
+        if instrumentation.per_stage:
+            raise ConfigError(
+                "profiling and trace_memory need the sequential engine; "
+                "stages overlap with engine: async"
+            )
+        instrumentation.start()
+        try:
+            outputs = self._prepare(config)
+            records = asyncio.run(self.run_async(config, outputs))
+            self._finish_run(records, outputs)
+        finally:
+            self._flush_checkpoint()
+            self._close_attachments()
+            instrumentation.stop()
+        self.record_count = len(records)
+        return records
+
+    async def run_async(
+        self, config: Dict[str, Any], outputs: Optional[List[Dict[str, Any]]] = None
+    ) -> Collected:
+        if outputs is None:
+            outputs = config.get("outputs", [])
+        runtime = config.get("runtime") or {}
+        depth = max(1, as_int(runtime.get("queue_depth"), 64))
+        parse_workers = max(1, as_int(runtime.get("parse_concurrency"), os.cpu_count() or 1))
+        summarize_workers = max(1, as_int(runtime.get("summarize_concurrency"), 1))
+        queue_size = as_int(runtime.get("export_queue_size"), 256)
+        jobs = self._exporter_jobs(outputs)
+
+        loop = asyncio.get_running_loop()
+        parsed: "asyncio.Queue[Any]" = asyncio.Queue(depth)
+        summarized: "asyncio.Queue[Any]" = asyncio.Queue(depth)
+        ready: "asyncio.Queue[Any]" = asyncio.Queue(depth)
+        # Returned records; kept under ``runtime.max_memory`` by spilling to disk.
+        store = self.spill = RecordStore.from_config(runtime)
+        collected: Collected = store if store is not None else []
+
+        parse_pool = _make_executor(runtime.get("parse_executor") or "thread", parse_workers)
+        summarize_pool = ThreadPoolExecutor(
+            max_workers=summarize_workers, thread_name_prefix="rokpyl-summarize"
+        )
+        io_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rokpyl-io")
+        try:
+            export = loop.run_in_executor(
+                io_pool,
+                self._export_stream,
+                self._iter_ready(ready, loop, collected),
+                jobs,
+                queue_size,
+                runtime.get("spill_dir"),
+            )
+            stages = [
+                asyncio.ensure_future(self._discover(config, parsed, parse_pool, io_pool)),
+            ]
+            if self.summarizer is not None:
+                summarize_options = config.get("summarize") or {}
+                stages.append(
+                    asyncio.ensure_future(
+                        self._normalize(
+                            parsed, summarized, io_pool, summarize_pool, summarize_options
+                        )
+                    )
+                )
+                stages.append(asyncio.ensure_future(self._resolve(summarized, ready)))
+            else:
+                stages.append(
+                    asyncio.ensure_future(self._normalize(parsed, ready, io_pool, None, {}))
+                )
+
+            try:
+                await asyncio.gather(*stages)
+            except BaseException:
+                for stage in stages:
+                    stage.cancel()
+                await ready.put(_DONE)
+                await asyncio.gather(export, return_exceptions=True)
+                raise
+            await export
+        finally:
+            io_pool.shutdown(wait=True)
+            summarize_pool.shutdown(wait=True)
+            parse_pool.shutdown(wait=True)
+        return collected
+
+    async def _discover(
+        self,
+        config: Dict[str, Any],
+        parsed: "asyncio.Queue[Any]",
+        parse_pool: Executor,
+        io_pool: Executor,
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        tasks = self.iter_tasks(config)
+        stats = self.instrumentation.stats("discover")
+        while True:
+            # Detection reads file headers, so keep it off the event loop.
+            task = await loop.run_in_executor(io_pool, _next_timed, tasks, stats)
+            if task is None:
+                break
+            restored = None
+            if self.checkpoint is not None:
+                restored = await loop.run_in_executor(io_pool, self._restore_source, task)
+            if restored is None:
+                future = loop.run_in_executor(parse_pool, parse_source_timed, task)
+            else:
+                future = loop.create_future()
+                future.set_result((restored, None, None))
+            await parsed.put((task, future))
+        stats.calls += 1
+        await parsed.put(_DONE)
+
+    async def _normalize(
+        self,
+        parsed: "asyncio.Queue[Any]",
+        out: "asyncio.Queue[Any]",
+        io_pool: Executor,
+        summarize_pool: Executor | None,
+        summarize_options: Dict[str, Any],
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        normalizer = self._normalizer()
+        batch: List[ConversationRecord] = []
+
+        async def summarize_batch() -> None:
+            await out.put(
+                loop.run_in_executor(
+                    summarize_pool, self._summarize_batch, batch[:], summarize_options
+                )
+            )
+            batch.clear()
+
+        parse_total = self.instrumentation.stats("parse")
+        stats = self.instrumentation.stats("normalize")
+        while True:
+            item = await parsed.get()
+            if item is _DONE:
+                break
+            task, future = item
+            records, wall_s, cpu_s = await future
+            if wall_s is not None:
+                importer_stats = self.instrumentation.stats(f"parse:{task.importer_cls.name}")
+                for parse_stats in (parse_total, importer_stats):
+                    parse_stats.calls += 1
+                    parse_stats.wall_s += wall_s
+                    parse_stats.cpu_s += cpu_s
+                    record_source_stats(parse_stats, task, records)
+                if self.checkpoint is not None:
+                    await loop.run_in_executor(io_pool, self._save_source, task, records)
+            records = self._select(records)
+            if self.attachment_store is not None:
+                await loop.run_in_executor(None, self._store_attachments, task, records)
+            for record in records:
+                wall = time.perf_counter()
+                cpu = time.thread_time()
+                kept = normalizer.process(record)
+                stats.wall_s += time.perf_counter() - wall
+                stats.cpu_s += time.thread_time() - cpu
+                if kept is None:
+                    continue
+                stats.records += 1
+                if messages_decoded(kept):
+                    stats.messages += len(kept.messages)
+                self._remember_positions(task, [kept])
+                if summarize_pool is None:
+                    await out.put(kept)
+                    continue
+                batch.append(kept)
+                if len(batch) >= SUMMARIZE_BATCH:
+                    await summarize_batch()
+        if batch:
+            await summarize_batch()
+        stats.calls += 1
+        if self.checkpoint is not None:
+            await loop.run_in_executor(io_pool, self._flush_checkpoint)
+        await out.put(_DONE)
+
+    def _summarize_batch(
+        self, batch: List[ConversationRecord], options: Dict[str, Any]
+    ) -> List[ConversationRecord]:
+        assert self.summarizer is not None
+        stats = self.instrumentation.stats("summarize")
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        records = self.summarizer.summarize(batch, options)
+        with self.instrumentation.lock:
+            stats.calls += 1
+            stats.wall_s += time.perf_counter() - wall
+            stats.cpu_s += time.thread_time() - cpu
+            stats.count_records(records)
+        return records
+
+    async def _resolve(self, summarized: "asyncio.Queue[Any]", ready: "asyncio.Queue[Any]") -> None:
+        while True:
+            item = await summarized.get()
+            if item is _DONE:
+                break
+            for record in await item:
+                await ready.put(record)
+        await ready.put(_DONE)
+
+    def _iter_ready(
+        self,
+        ready: "asyncio.Queue[Any]",
+        loop: asyncio.AbstractEventLoop,
+        collected: Collected,
+    ) -> Iterator[ConversationRecord]:
+        while True:
+            record = asyncio.run_coroutine_threadsafe(ready.get(), loop).result()
+            if record is _DONE:
+                return
+            if self.query is not None and self.query.fields is not None:
+                record = self.query.project(record)
+            if self.record_sink is not None:
+                self.record_sink(record)
+            collected.append(record)
+            yield record
+
+    def _export_stream(
+        self,
+        records: Iterator[ConversationRecord],
+        jobs: List[Tuple[Exporter, Dict[str, Any]]],
+        queue_size: int,
+        spill_dir: Optional[str] = None,
+    ) -> None:
+        stats = self.instrumentation.stats("export")
+        self._snapshot_outputs(jobs)
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            self.export_results = fan_out(
+                records, jobs, queue_size=queue_size, spill_dir=spill_dir
+            )
+        finally:
+            stats.calls += 1
+            stats.wall_s += time.perf_counter() - wall
+            stats.cpu_s += time.thread_time() - cpu
+            # Keep draining so upstream stages never block on a full queue.
+            for _ in records:
+                pass
@@ -0,0 +1,319 @@
+"""Content-addressed attachment store.
+
+Importers describe attachments (name, size, type and the ids the export uses
+for the file); this stage finds the bytes next to the parsed source, either
+as plain files or as members of zip archives in that directory, and stores
+each distinct content once under ``<dir>/sha256/<ab>/<hash>``. Subdirectories
+are searched only when the source came from a configured input directory, so
+a single file given from e.g. ``~/Downloads`` does not index all of it. The record
+then references the blob by hash (``attachment.extra["sha256"]``) and
+exporters point at the blob instead of embedding or copying the file.
+
+Files are hashed while streaming and then cloned into the store: a reflink
+where the filesystem supports it (copy-on-write, Linux ``FICLONE``), else a
+hard link, else a copy. With ``link: copy`` blobs are always independent
+copies; use it when export folders may be edited in place, because a hard
+link shares the source file's inode. Zip members are decompressed straight
+into the store, reading from archives that stay open for the run. Text that
+Claude extracted from an upload (``extra["extracted_content"]``) is stored
+as a blob when no file matches the attachment's id; a match on the file name
+alone is only used for attachments without such text.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Optional, Tuple, Union
+
+from rokpyl.core.compression import plain_suffix
+from rokpyl.core.config import ConfigError
+from rokpyl.models.canonical import Attachment, ConversationRecord
+
+LINK_MODES = ("auto", "copy")
+CHUNK_SIZE = 1 << 20
+# Linux _IOW(0x94, 9, int): clone a whole file (btrfs, XFS, overlayfs, ...).
+_FICLONE = 0x40049409
+
+# A plain file, or (archive, member name) inside a zip.
+Location = Union[Path, Tuple[Path, str]]
+
+
+def blob_path(digest: str) -> str:
+    """Path of a blob relative to the store directory."""
+    return f"sha256/{digest[:2]}/{digest}"
+
+
+def _reflink(source: Path, target: Path) -> bool:
+    try:
+        import fcntl
+    except ImportError:  # not available on Windows
+        return False
+    try:
+        with source.open("rb") as src, target.open("wb") as dst:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        return True
+    except OSError:
+        try:
+            target.unlink()
+        except FileNotFoundError:
+            pass
+        return False
+
+
+class SourceIndex:
+    """Files of one export directory (and its zip archives), by name and id prefix.
+
+    Export files are named after the attachment id, e.g. ChatGPT's
+    ``file-AbC123-photo.png`` for id ``file-AbC123``, so every prefix of a
+    name that ends before a ``-`` is indexed as a possible id. With
+    ``recursive`` false only the files directly in ``root`` are indexed.
+    Archives stay open until ``close``.
+    """
+
+    def __init__(self, root: Path, recursive: bool = True) -> None:
+        self.root = root
+        self._by_name: Dict[str, Location] = {}
+        self._by_prefix: Dict[str, Location] = {}
+        self._archives: Dict[Path, zipfile.ZipFile] = {}
+        if root.is_dir():
+            for path in sorted(root.rglob("*") if recursive else root.iterdir()):
+                if not path.is_file():
+                    continue
+                if path.suffix.lower() == ".zip":
+                    self._add_archive(path)
+                elif plain_suffix(path) not in {".json", ".jsonl", ".html", ".htm", ".csv"}:
+                    self._add(path.name, path)
+
+    def _add_archive(self, archive: Path) -> None:
+        try:
+            handle = zipfile.ZipFile(archive)
+        except (OSError, zipfile.BadZipFile):
+            return
+        self._archives[archive] = handle
+        for info in handle.infolist():
+            if not info.is_dir():
+                self._add(info.filename.rsplit("/", 1)[-1], (archive, info.filename))
+
+    def open_member(self, archive: Path, member: str) -> IO[bytes]:
+        return self._archives[archive].open(member)
+
+    def close(self) -> None:
+        for handle in self._archives.values():
+            handle.close()
+        self._archives.clear()
+
+    def _add(self, name: str, location: Location) -> None:
+        if not name or name.startswith("."):
+            return
+        self._by_name.setdefault(name, location)
+        for index, char in enumerate(name):
+            if char == "-" and index:
+                self._by_prefix.setdefault(name[:index], location)
+        stem = name.rsplit(".", 1)[0]
+        self._by_prefix.setdefault(stem, location)
+
+    def find(self, attachment: Attachment, by_name: bool = True) -> Optional[Location]:
+        """The file whose name starts with an id of ``attachment``, else (with
+        ``by_name``) the first file of the same name."""
+        for key in ("id", "file_uuid", "file_id"):
+            value = attachment.extra.get(key)
+            if value and str(value) in self._by_prefix:
+                return self._by_prefix[str(value)]
+        if by_name and attachment.name:
+            return self._by_name.get(attachment.name)
+        return None
+
+
+@dataclass
+class StoreStats:
+    stored: int = 0
+    deduplicated: int = 0
+    linked: int = 0
+    missing: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+@dataclass
+class AttachmentStore:
+    directory: Path
+    link: str = "auto"
+    stats: StoreStats = field(default_factory=StoreStats)
+    _indexes: Dict[Tuple[Path, bool], SourceIndex] = field(default_factory=dict, repr=False)
+    # A file or zip member shared by many conversations is hashed once per
+    # run: (path, size, mtime_ns) -> digest and (archive, member) -> (digest, size).
+    _hashed: Dict[Tuple[str, int, int], str] = field(default_factory=dict, repr=False)
+    _members: Dict[Tuple[str, str], Tuple[str, int]] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.link not in LINK_MODES:
+            raise ConfigError(f"Unknown attachments.link mode: {self.link}")
+        self.directory = Path(self.directory)
+
+    @classmethod
+    def from_config(cls, options: Any) -> Optional["AttachmentStore"]:
+        """The store configured by ``attachments``, or ``None`` when disabled."""
+        if not options:
+            return None
+        if isinstance(options, str):
+            options = {"dir": options}
+        if not isinstance(options, dict) or not options.get("dir"):
+            raise ConfigError("attachments needs a dir")
+        return cls(Path(options["dir"]), link=options.get("link") or "auto")
+
+    def path(self, digest: str) -> Path:
+        return self.directory / blob_path(digest)
+
+    # Ingest ------------------------------------------------------------------
+
+    def ingest(
+        self, records: Iterable[ConversationRecord], source_dir: Path, recursive: bool = True
+    ) -> None:
+        """Store the attachments of ``records`` and annotate them with their hash.
+
+        Files are looked up in ``source_dir``, and in its subdirectories when
+        ``recursive``.
+        """
+        index: Optional[SourceIndex] = None
+        for record in records:
+            for message in record.messages:
+                for attachment in message.attachments:
+                    if attachment.extra.get("sha256"):
+                        continue
+                    if index is None:
+                        index = self._index(source_dir, recursive)
+                    self._ingest_one(attachment, index)
+
+    def _index(self, source_dir: Path, recursive: bool) -> SourceIndex:
+        key = (source_dir, recursive)
+        index = self._indexes.get(key)
+        if index is None:
+            index = self._indexes[key] = SourceIndex(source_dir, recursive)
+        return index
+
+    def close(self) -> None:
+        """Close the archives opened while ingesting; call once the run is over."""
+        for index in self._indexes.values():
+            index.close()
+        self._indexes.clear()
+
+    def _ingest_one(self, attachment: Attachment, index: SourceIndex) -> None:
+        text = attachment.extra.get("extracted_content")
+        has_text = isinstance(text, str) and bool(text)
+        # The record's own text beats another file that merely shares its name.
+        location = index.find(attachment, by_name=not has_text)
+        if isinstance(location, Path):
+            digest, size = self.put_file(location)
+        elif location is not None:
+            archive, member = location
+            key = (str(archive), member)
+            if key in self._members:
+                digest, size = self._members[key]
+                self.stats.deduplicated += 1
+            else:
+                with index.open_member(archive, member) as stream:
+                    digest, size = self._members[key] = self.put_stream(stream)
+        else:
+            if not has_text:
+                self.stats.missing += 1
+                return
+            digest, size = self.put_bytes(text.encode("utf-8"))
+            del attachment.extra["extracted_content"]
+        attachment.extra["sha256"] = digest
+        if attachment.size_bytes is None:
+            attachment.size_bytes = size
+
+    def put_file(self, source: Path) -> Tuple[str, int]:
+        """Store a file by hashing it, then cloning it into place; returns (digest, size)."""
+        stat = source.stat()
+        key = (str(source), stat.st_size, stat.st_mtime_ns)
+        digest = self._hashed.get(key)
+        if digest is None:
+            hasher = hashlib.sha256()
+            with source.open("rb") as handle:
+                for chunk in iter(lambda: handle.read(CHUNK_SIZE), b""):
+                    hasher.update(chunk)
+            self.stats.bytes_read += stat.st_size
+            digest = self._hashed[key] = hasher.hexdigest()
+        target = self.path(digest)
+        if target.exists():
+            self.stats.deduplicated += 1
+            return digest, stat.st_size
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._tmp_path(target)
+        if self.link == "auto" and _reflink(source, tmp):
+            os.replace(tmp, target)
+            self.stats.linked += 1
+        elif self.link == "auto" and self._hardlink(source, target):
+            self.stats.linked += 1
+        else:
+            shutil.copyfile(source, tmp)
+            os.replace(tmp, target)
+            self.stats.bytes_written += stat.st_size
+        self.stats.stored += 1
+        return digest, stat.st_size
+
+    @staticmethod
+    def _hardlink(source: Path, target: Path) -> bool:
+        try:
+            os.link(source, target)
+            return True
+        except FileExistsError:
+            return True  # stored concurrently; same content by construction
+        except OSError:
+            return False  # other device, no link support, permissions
+
+    def put_stream(self, stream: IO[bytes]) -> Tuple[str, int]:
+        """Store bytes read from ``stream`` (e.g. a zip member); returns (digest, size)."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        hasher = hashlib.sha256()
+        size = 0
+        fd, name = tempfile.mkstemp(prefix=".incoming-", dir=self.directory)
+        tmp = Path(name)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                    hasher.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            self.stats.bytes_read += size
+            digest = hasher.hexdigest()
+            target = self.path(digest)
+            if target.exists():
+                self.stats.deduplicated += 1
+                return digest, size
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp, target)
+            self.stats.stored += 1
+            self.stats.bytes_written += size
+            return digest, size
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    def put_bytes(self, data: bytes) -> Tuple[str, int]:
+        digest = hashlib.sha256(data).hexdigest()
+        target = self.path(digest)
+        if target.exists():
+            self.stats.deduplicated += 1
+            return digest, len(data)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._tmp_path(target)
+        tmp.write_bytes(data)
+        os.replace(tmp, target)
+        self.stats.stored += 1
+        self.stats.bytes_written += len(data)
+        return digest, len(data)
+
+    @staticmethod
+    def _tmp_path(target: Path) -> Path:
+        return target.with_name(f".{target.name}.{os.getpid()}.tmp")
+
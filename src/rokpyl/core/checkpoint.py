@@ -0,0 +1,200 @@
+"""Checkpoints for resumable runs.
+
+Parsed records are written to the checkpoint directory as soon as a source
+finishes (one pickle per source, before normalization), and a manifest
+listing completed sources and finished outputs is flushed every
+``interval_s`` seconds and at the end of each stage. A resumed run loads the
+completed sources instead of parsing them again and skips outputs that were
+already written, then normalizes the full record stream as usual, so dedup
+and output are identical to an uninterrupted run.
+
+Sources finished after the last manifest flush are parsed again on resume.
+A source whose size or modification time changed is always parsed again.
+Checkpoint files are private to one machine and user; pickle keeps the
+per-source overhead well below the cost of parsing.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from rokpyl.core.config import ConfigError
+from rokpyl.models.canonical import ConversationRecord
+
+if TYPE_CHECKING:
+    from rokpyl.core.pipeline import SourceTask
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+DEFAULT_CHECKPOINT_DIR = ".rokpyl-checkpoint"
+
+# Keys that change what a run produces; runtime tuning does not.
+_FINGERPRINT_KEYS = (
+    "inputs", "outputs", "platform", "project", "summarize", "filter", "fields",
+)
+
+
+def config_fingerprint(config: Dict[str, Any]) -> str:
+    relevant = {key: config.get(key) for key in _FINGERPRINT_KEYS}
+    payload = json.dumps(relevant, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _write_atomic(path: Path, data: bytes, *, sync: bool = False) -> int:
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as handle:
+        handle.write(data)
+        if sync:
+            handle.flush()
+            os.fsync(handle.fileno())
+    os.replace(tmp, path)
+    return len(data)
+
+
+def _output_key(index: int, output: Dict[str, Any]) -> str:
+    return f"{index}:{json.dumps(output, sort_keys=True, default=str)}"
+
+
+class Checkpoint:
+    def __init__(self, directory: str | Path, fingerprint: str, *, interval_s: float = 30.0):
+        self.directory = Path(directory)
+        self.fingerprint = fingerprint
+        self.interval_s = interval_s
+        self.sources: Dict[str, Dict[str, Any]] = {}
+        self.exports: List[str] = []
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self._dirty = False
+        self._last_flush = time.monotonic()
+
+    @classmethod
+    def open(
+        cls,
+        directory: str | Path,
+        config: Dict[str, Any],
+        *,
+        resume: bool = False,
+        interval_s: float = 30.0,
+    ) -> "Checkpoint":
+        """Load an existing checkpoint when resuming, otherwise start afresh."""
+        checkpoint = cls(directory, config_fingerprint(config), interval_s=interval_s)
+        manifest_path = checkpoint.directory / MANIFEST_NAME
+        if not resume:
+            checkpoint.clear()
+        elif manifest_path.exists():
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            if manifest.get("version") != MANIFEST_VERSION:
+                raise ConfigError(f"Unsupported checkpoint version in {manifest_path}")
+            if manifest.get("fingerprint") != checkpoint.fingerprint:
+                raise ConfigError(
+                    f"Checkpoint in {checkpoint.directory} was written for a different "
+                    "configuration; rerun without --resume"
+                )
+            checkpoint.sources = manifest.get("sources") or {}
+            checkpoint.exports = manifest.get("exports") or []
+        checkpoint.directory.mkdir(parents=True, exist_ok=True)
+        return checkpoint
+
+    @staticmethod
+    def source_key(task: "SourceTask") -> str:
+        options = json.dumps(task.options, sort_keys=True, default=str)
+        return f"{task.importer_cls.name}|{task.source}|{options}"
+
+    @staticmethod
+    def _signature(task: "SourceTask") -> Dict[str, int]:
+        stat = task.source.stat()
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def load_source(self, task: "SourceTask") -> Optional[List[ConversationRecord]]:
+        """Records saved for ``task``, or ``None`` when it must be parsed."""
+        entry = self.sources.get(self.source_key(task))
+        if entry is None:
+            return None
+        try:
+            signature = self._signature(task)
+        except OSError:
+            return None
+        if any(entry.get(key) != value for key, value in signature.items()):
+            return None
+        path = self.directory / entry["file"]
+        if not path.exists():
+            return None
+        data = path.read_bytes()
+        self.bytes_read += len(data)
+        try:
+            return pickle.loads(data)
+        except (pickle.UnpicklingError, EOFError):
+            # Only the manifest is fsynced; a torn source file is parsed again.
+            return None
+
+    def save_source(self, task: "SourceTask", records: List[ConversationRecord]) -> None:
+        key = self.source_key(task)
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()[:20] + ".pickle"
+        data = pickle.dumps(records, protocol=pickle.HIGHEST_PROTOCOL)
+        self.bytes_written += _write_atomic(self.directory / name, data)
+        entry: Dict[str, Any] = {"file": name, "records": len(records)}
+        try:
+            entry.update(self._signature(task))
+        except OSError:
+            pass
+        self.sources[key] = entry
+        self._dirty = True
+        if time.monotonic() - self._last_flush >= self.interval_s:
+            self.flush()
+
+    def export_done(self, index: int, output: Dict[str, Any]) -> bool:
+        return _output_key(index, output) in self.exports
+
+    def mark_exported(self, index: int, output: Dict[str, Any]) -> None:
+        key = _output_key(index, output)
+        if key not in self.exports:
+            self.exports.append(key)
+            self._dirty = True
+
+    def flush(self) -> None:
+        if not self._dirty:
+            return
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "fingerprint": self.fingerprint,
+            "sources": self.sources,
+            "exports": self.exports,
+        }
+        text = json.dumps(manifest, indent=2, ensure_ascii=True)
+        self.bytes_written += _write_atomic(
+            self.directory / MANIFEST_NAME, text.encode("utf-8"), sync=True
+        )
+        self._dirty = False
+        self._last_flush = time.monotonic()
+
+    def clear(self) -> None:
+        """Remove checkpoint files; called when a run finishes cleanly.
+
+        Only the manifest and the files it lists are deleted, so pointing
+        ``checkpoint_dir`` at a shared directory is safe.
+        """
+        manifest_path = self.directory / MANIFEST_NAME
+        names = [entry["file"] for entry in self.sources.values()]
+        if manifest_path.exists():
+            try:
+                manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+                names.extend(entry["file"] for entry in (manifest.get("sources") or {}).values())
+            except (ValueError, KeyError, TypeError):
+                pass
+        for name in set(names) | {MANIFEST_NAME}:
+            try:
+                (self.directory / name).unlink()
+            except FileNotFoundError:
+                pass
+        try:
+            self.directory.rmdir()
+        except OSError:
+            pass
+        self.sources = {}
+        self.exports = []
+        self._dirty = False
@@ -0,0 +1,190 @@
+"""Transparent reading of gzip and zstd compressed sources.
+
+Archived exports are often kept as ``conversations.json.gz`` or
+``claude.jsonl.zst``. Readers open sources through ``open_text``/
+``open_binary``/``read_text`` and dispatch on ``plain_suffix`` (the suffix
+under the compression suffix), so every importer, format detection and the
+schema tool accept them without a decompressed copy on disk. The codec comes
+from the suffix, or from the magic bytes for files whose name does not say
+(a gzipped ``conversations.json``).
+
+Decompression runs in a background thread a few chunks ahead of the reader;
+zlib and zstandard release the GIL, so it overlaps JSON decoding and record
+building instead of adding to it. Reading ``.zst`` needs the ``zstandard``
+package (or Python 3.14's ``compression.zstd``).
+"""
+from __future__ import annotations
+
+import io
+import queue
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterator, Optional, TextIO
+
+SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+_MAGIC = ((b"\x1f\x8b", "gzip"), (b"\x28\xb5\x2f\xfd", "zstd"))
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+# Compressed bytes per read; JSON inflates about tenfold.
+READ_SIZE = 256 * 1024
+# Decompressed chunks buffered ahead of the reader.
+READ_AHEAD = 4
+_EOF = object()
+
+
+def compression(path: Path) -> Optional[str]:
+    """``"gzip"``, ``"zstd"`` or ``None``, from the suffix or the magic bytes."""
+    codec = SUFFIXES.get(path.suffix.lower())
+    if codec is not None:
+        return codec
+    try:
+        with path.open("rb") as handle:
+            head = handle.read(4)
+    except OSError:
+        return None
+    for magic, name in _MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def plain_suffix(path: Path) -> str:
+    """Lower-cased suffix of the content: ``.json`` for ``a.json.gz``."""
+    suffix = path.suffix.lower()
+    if suffix in SUFFIXES:
+        return Path(path.stem).suffix.lower()
+    return suffix
+
+
+def _gzip_chunks(path: Path) -> Iterator[bytes]:
+    # zlib directly: faster than GzipFile and handles concatenated members.
+    with path.open("rb") as raw:
+        decoder = zlib.decompressobj(_GZIP_WBITS)
+        started = False
+        for data in iter(lambda: raw.read(READ_SIZE), b""):
+            while data:
+                started = True
+                out = decoder.decompress(data)
+                if out:
+                    yield out
+                if not decoder.eof:
+                    break
+                data = decoder.unused_data
+                decoder = zlib.decompressobj(_GZIP_WBITS)
+                started = False
+        if started:
+            raise EOFError(f"{path}: compressed file ended before the end-of-stream marker")
+
+
+def _zstd_reader() -> Callable[[BinaryIO], Any]:
+    try:
+        from compression import zstd  # type: ignore  # Python 3.14+
+
+        return zstd.ZstdFile
+    except ImportError:
+        pass
+    try:
+        import zstandard  # type: ignore
+    except ImportError as exc:
+        raise ValueError("reading .zst sources requires the zstandard package") from exc
+    return lambda raw: zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+
+
+def _zstd_chunks(path: Path, reader: Callable[[BinaryIO], Any]) -> Iterator[bytes]:
+    with path.open("rb") as raw, reader(raw) as stream:
+        yield from iter(lambda: stream.read(READ_SIZE * 4), b"")
+
+
+class _ReadAhead(io.RawIOBase):
+    """Raw stream over chunks produced by a background thread."""
+
+    def __init__(self, chunks: Iterator[bytes]) -> None:
+        super().__init__()
+        self._queue: "queue.Queue[Any]" = queue.Queue(READ_AHEAD)
+        self._stop = threading.Event()
+        self._chunk = b""
+        self._offset = 0
+        self._done = False
+        self._thread = threading.Thread(
+            target=self._fill, args=(chunks,), name="rokpyl-decompress", daemon=True
+        )
+        self._thread.start()
+
+    def _put(self, item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fill(self, chunks: Iterator[bytes]) -> None:
+        try:
+            for chunk in chunks:
+                if not self._put(chunk):
+                    return
+            self._put(_EOF)
+        except BaseException as exc:  # re-raised in the reading thread
+            self._put(exc)
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        if self._offset >= len(self._chunk):
+            if self._done:
+                return 0
+            item = self._queue.get()
+            if item is _EOF:
+                self._done = True
+                return 0
+            if isinstance(item, BaseException):
+                self._done = True
+                raise item
+            self._chunk, self._offset = item, 0
+        size = min(len(buffer), len(self._chunk) - self._offset)
+        buffer[:size] = self._chunk[self._offset : self._offset + size]
+        self._offset += size
+        return size
+
+    def close(self) -> None:
+        self._stop.set()
+        super().close()
+
+
+def open_binary(path: Path) -> BinaryIO:
+    """A binary stream of the (decompressed) content of ``path``."""
+    codec = compression(path)
+    if codec is None:
+        return path.open("rb")
+    if codec == "gzip":
+        chunks = _gzip_chunks(path)
+    else:
+        chunks = _zstd_chunks(path, _zstd_reader())
+    reader = io.BufferedReader(_ReadAhead(chunks), buffer_size=READ_SIZE)
+    return reader  # type: ignore[return-value]
+
+
+def open_text(
+    path: Path,
+    *,
+    encoding: str = "utf-8",
+    errors: Optional[str] = None,
+    newline: Optional[str] = None,
+) -> TextIO:
+    """Like ``path.open("r")``, decompressing gzip and zstd sources."""
+    if compression(path) is None:
+        return path.open("r", encoding=encoding, errors=errors, newline=newline)
+    return io.TextIOWrapper(open_binary(path), encoding=encoding, errors=errors, newline=newline)
+
+
+def read_text(path: Path, *, encoding: str = "utf-8") -> str:
+    if compression(path) is None:
+        return path.read_text(encoding=encoding)
+    with open_text(path, encoding=encoding) as handle:
+        return handle.read()
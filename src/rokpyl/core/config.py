@@ -4,7 +4,7 @@ from __future__ import annotations
 import json
 import os
 from pathlib import Path
-from typing import Any, Dict, Iterable, Tuple
+from typing import Any, Dict, Iterable, Optional, Tuple
 
 
 class ConfigError(RuntimeError):
@@ -33,6 +33,51 @@ def load_config(path: str | None) -> Dict[str, Any]:
     raise ConfigError("Unsupported config format; use .json or .yaml")
 
 
+def as_bool(value: Any, default: bool = False) -> bool:
+    """Coerce config values (which may arrive as strings from env/--set)."""
+    if value is None:
+        return default
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in {"1", "true", "yes", "on"}:
+            return True
+        if lowered in {"0", "false", "no", "off", ""}:
+            return False
+        raise ConfigError(f"Invalid boolean value: {value}")
+    return bool(value)
+
+
+def as_int(value: Any, default: int) -> int:
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError) as exc:
+        raise ConfigError(f"Invalid integer value: {value}") from exc
+
+
+_SIZE_UNITS = {"": 1, "b": 1, "k": 2**10, "m": 2**20, "g": 2**30, "t": 2**40}
+
+
+def as_size(value: Any, default: Optional[int] = None) -> Optional[int]:
+    """Bytes for an integer or a size such as ``512MB`` or ``2 GiB`` (powers of 1024)."""
+    if value is None or value == "":
+        return default
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    text = str(value).strip().lower().replace(" ", "")
+    number = text.rstrip("abcdefghijklmnopqrstuvwxyz")
+    unit = text[len(number) :]
+    if unit.endswith("ib"):
+        unit = unit[:-2]
+    elif unit.endswith("b") and len(unit) == 2:
+        unit = unit[:-1]
+    try:
+        return int(float(number) * _SIZE_UNITS[unit])
+    except (KeyError, ValueError) as exc:
+        raise ConfigError(f"Invalid size value: {value}") from exc
+
+
 def merge_dicts(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
     result: Dict[str, Any] = dict(base)
     for key, value in override.items():
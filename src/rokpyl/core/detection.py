@@ -1,10 +1,16 @@
 """Detection helpers for importer selection."""
 from __future__ import annotations
 
+import json
+from itertools import islice
 from pathlib import Path
-from typing import Iterable, List, Tuple, Type
+from typing import Any, Dict, FrozenSet, Iterable, List, Set, TextIO, Tuple, Type
 
-from rokpyl.importers.base import Importer
+from rokpyl.core.archive import iter_members
+from rokpyl.core.compression import open_text, plain_suffix
+from rokpyl.core.jsonstream import JsonStreamReader
+from rokpyl.core.schema import infer_from_iter
+from rokpyl.importers.base import Fingerprint, Importer
 
 
 def score_importer(importer_cls: Type[Importer], source_path: Path) -> float:
@@ -39,3 +45,170 @@ def select_importers(
         if max_score - score <= tie_delta
     ]
     return selected
+
+
+CONTAINER_KEYS = ("conversations", "items")
+SNIFF_SUFFIXES = {".json", ".jsonl", ".zip"}
+
+
+class UnknownFormatError(ValueError):
+    def __init__(self, source_path: Path, closest: List[Tuple[str, str, float]]) -> None:
+        self.source_path = source_path
+        self.closest = closest
+        hints = ", ".join(
+            f"{importer}/{fingerprint} ({score:.0%})" for importer, fingerprint, score in closest
+        )
+        super().__init__(
+            f"Unknown format: {source_path}; closest matches: {hints or 'none'}"
+        )
+
+
+def _unwrap(payload: Any) -> List[Any]:
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict):
+        for key in CONTAINER_KEYS:
+            if isinstance(payload.get(key), list):
+                return payload[key]
+    return [payload]
+
+
+def sample_records(source_path: Path, *, limit: int = 5) -> List[Any]:
+    """Decode at most ``limit`` conversation-level records from a JSON/JSONL file
+    (compressed or not) or from the conversation members of an export zip."""
+    if plain_suffix(source_path) == ".zip":
+        records: List[Any] = []
+        for name, handle in iter_members(source_path):
+            remaining = limit - len(records)
+            records.extend(_sample_handle(handle, name.lower().endswith(".jsonl"), remaining))
+            if len(records) >= limit:
+                break
+        return records
+    with open_text(source_path) as handle:
+        return _sample_handle(handle, plain_suffix(source_path) == ".jsonl", limit)
+
+
+def _sample_handle(handle: TextIO, jsonl: bool, limit: int) -> List[Any]:
+    records: List[Any] = []
+    if jsonl:
+        for line in handle:
+            stripped = line.strip()
+            if not stripped or stripped.startswith("#"):
+                continue
+            records.extend(_unwrap(json.loads(stripped)))
+            if len(records) >= limit:
+                break
+        return records[:limit]
+
+    reader = JsonStreamReader(handle)
+    if reader.peek() == "[":
+        return list(islice(reader.iter_array(), limit))
+    if reader.peek() != "{":
+        return [reader.decode_value()]
+    payload: Dict[str, Any] = {}
+    for key in reader.iter_members():
+        if key in CONTAINER_KEYS and reader.peek() == "[":
+            return list(islice(reader.iter_array(), limit))
+        payload[key] = reader.decode_value()
+    return [payload]
+
+
+def schema_tokens(schema: Dict[str, Any], *, max_depth: int = 3) -> Set[str]:
+    """Flatten a schema into ``path`` and ``path:type`` tokens."""
+    tokens: Set[str] = set()
+
+    def walk(node: Dict[str, Any], path: str, depth: int) -> None:
+        if path:
+            tokens.add(path)
+            for type_name in node["type_counts"]:
+                tokens.add(f"{path}:{type_name}")
+        if depth >= max_depth:
+            return
+        for key, child in node["properties"].items():
+            walk(child, f"{path}.{key}" if path else key, depth + 1)
+        if node["items"] is not None:
+            walk(node["items"], f"{path}[]", depth)
+
+    walk(schema, "", 0)
+    return tokens
+
+
+class FingerprintIndex:
+    """Inverted index from required tokens to importer fingerprints."""
+
+    def __init__(self, importers: Iterable[Type[Importer]]) -> None:
+        self._entries: List[Tuple[Type[Importer], Fingerprint, FrozenSet[str]]] = []
+        self._by_token: Dict[str, List[int]] = {}
+        for importer_cls in importers:
+            for fingerprint in getattr(importer_cls, "fingerprints", ()) or ():
+                required = frozenset(fingerprint.required)
+                position = len(self._entries)
+                self._entries.append((importer_cls, fingerprint, required))
+                for token in required:
+                    self._by_token.setdefault(token, []).append(position)
+
+    def __bool__(self) -> bool:
+        return bool(self._entries)
+
+    def match(self, tokens: Set[str]) -> List[Tuple[Type[Importer], Fingerprint, float]]:
+        """Return fingerprints ranked by the share of required tokens present."""
+        hits: Dict[int, int] = {}
+        for token in tokens:
+            for position in self._by_token.get(token, ()):
+                hits[position] = hits.get(position, 0) + 1
+        ranked = [
+            (importer_cls, fingerprint, hits.get(position, 0) / len(required))
+            for position, (importer_cls, fingerprint, required) in enumerate(self._entries)
+            if required
+        ]
+        ranked.sort(key=lambda item: item[2], reverse=True)
+        return ranked
+
+
+def detect_importers(
+    importers: Iterable[Type[Importer]],
+    source_path: Path,
+    *,
+    index: FingerprintIndex | None = None,
+    sample_size: int = 5,
+) -> List[Type[Importer]]:
+    """Pick importers for one file by structural fingerprint.
+
+    Files that cannot be sniffed (html/csv) and importers without
+    fingerprints fall back to ``select_importers`` scoring. Raises
+    ``UnknownFormatError`` when a JSON/JSONL file or export zip matches nothing.
+    """
+    importers = list(importers)
+    index = index if index is not None else FingerprintIndex(importers)
+    unfingerprinted = [cls for cls in importers if not getattr(cls, "fingerprints", ())]
+
+    if not index or plain_suffix(source_path) not in SNIFF_SUFFIXES:
+        return select_importers(importers, source_path)
+
+    try:
+        records = sample_records(source_path, limit=sample_size)
+    except (OSError, ValueError):
+        records = []
+    tokens: Set[str] = set()
+    if records:
+        schema = infer_from_iter(records, max_items=sample_size, max_examples=0)
+        tokens = schema_tokens(schema)
+
+    ranked = index.match(tokens)
+    selected: List[Type[Importer]] = []
+    for importer_cls, _, score in ranked:
+        if score >= 1.0 and importer_cls not in selected:
+            selected.append(importer_cls)
+    if selected:
+        return selected
+
+    if unfingerprinted:
+        selected = select_importers(unfingerprinted, source_path)
+        if selected:
+            return selected
+
+    closest = [
+        (importer_cls.name, fingerprint.name, score)
+        for importer_cls, fingerprint, score in ranked[:3]
+    ]
+    raise UnknownFormatError(source_path, closest)
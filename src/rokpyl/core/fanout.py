@@ -0,0 +1,285 @@
+"""Concurrent exporter fan-out.
+
+One producer feeds every exporter from a shared record stream through a
+bounded queue per exporter. A full queue blocks the producer (backpressure),
+which would let one slow sink hold up all the others. Remote exporters
+(``Exporter.remote``, e.g. Notion) and outputs with ``spill: true``
+therefore get a spill-backed queue instead: past ``queue_size`` records it
+pickles what the sink has not read yet to a temporary file and never makes
+the producer wait, trading disk for the decoupling. Exporter failures are
+captured per exporter and never stop the remaining ones.
+"""
+from __future__ import annotations
+
+import pickle
+import queue
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from dataclasses import dataclass
+from itertools import islice
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    ContextManager,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from rokpyl.core.config import as_bool
+from rokpyl.exporters.base import Exporter
+from rokpyl.models.canonical import ConversationRecord, messages_decoded
+
+_DONE = object()
+
+
+@dataclass
+class ExportResult:
+    output: Dict[str, Any]
+    error: Optional[BaseException] = None
+    records: int = 0
+    messages: int = 0
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    # Records that went through the spill file of a spill-backed queue.
+    spilled: int = 0
+
+    @property
+    def name(self) -> str:
+        return str(self.output.get("type"))
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class _Feed:
+    def __init__(self, maxsize: int) -> None:
+        self.queue: "queue.Queue[Any]" = queue.Queue(maxsize)
+        self.closed = threading.Event()
+        self.consumed = 0
+        self.messages = 0
+
+    def put(self, item: Any) -> None:
+        while not self.closed.is_set():
+            try:
+                self.queue.put(item, timeout=0.05)
+                return
+            except queue.Full:
+                continue
+
+    def get(self) -> Any:
+        return self.queue.get()
+
+    def __iter__(self) -> Iterator[ConversationRecord]:
+        while True:
+            item = self.get()
+            if item is _DONE:
+                return
+            self.consumed += 1
+            yield item
+            # Counted once the exporter is done with the item: lazy records
+            # only have messages if the exporter read them.
+            if messages_decoded(item):
+                self.messages += len(item.messages)
+
+    def close(self) -> None:
+        self.closed.set()
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+
+class _SpillFeed(_Feed):
+    """A feed whose producer never waits: records beyond ``maxsize`` are
+    pickled to a temporary file and read back in order."""
+
+    def __init__(self, maxsize: int, spill_dir: Optional[str] = None) -> None:
+        super().__init__(0)
+        self.maxsize = max(1, maxsize)
+        self.spill_dir = spill_dir
+        self.spilled = 0
+        self._items: Deque[Any] = deque()
+        self._condition = threading.Condition()
+        self._done = False
+        self._file: Optional[BinaryIO] = None
+        # Records in the file not read yet; they are all newer than ``_items``.
+        self._pending = 0
+        self._read_at = 0
+        self._write_at = 0
+
+    def put(self, item: Any) -> None:
+        with self._condition:
+            if self.closed.is_set():
+                return
+            if item is _DONE:
+                self._done = True
+            elif self._pending or len(self._items) >= self.maxsize:
+                if self._file is None:
+                    self._file = tempfile.TemporaryFile(
+                        prefix="rokpyl-export-", dir=self.spill_dir
+                    )
+                self._file.seek(self._write_at)
+                pickle.dump(item, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+                self._write_at = self._file.tell()
+                self._pending += 1
+                self.spilled += 1
+            else:
+                self._items.append(item)
+            self._condition.notify()
+
+    def get(self) -> Any:
+        with self._condition:
+            while not (self._items or self._pending or self._done):
+                self._condition.wait()
+            if self._items:
+                return self._items.popleft()
+            if not self._pending:
+                return _DONE
+            assert self._file is not None
+            self._file.seek(self._read_at)
+            item = pickle.load(self._file)
+            self._read_at = self._file.tell()
+            self._pending -= 1
+            if not self._pending:
+                # Drained: reuse the file from the start.
+                self._read_at = self._write_at = 0
+                self._file.truncate(0)
+            return item
+
+    def close(self) -> None:
+        with self._condition:
+            self.closed.set()
+            self._items.clear()
+            self._pending = 0
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _consume(exporter: Exporter, feed: _Feed, result: ExportResult) -> None:
+    wall = time.perf_counter()
+    cpu = time.thread_time()
+    try:
+        exporter.write(iter(feed), result.output)
+    except Exception as exc:  # reported through ExportResult
+        result.error = exc
+    finally:
+        result.wall_s = time.perf_counter() - wall
+        result.cpu_s = time.thread_time() - cpu
+        result.records = feed.consumed
+        result.messages = feed.messages
+        result.spilled = getattr(feed, "spilled", 0)
+        feed.close()
+
+
+def fan_out(
+    records: Iterable[ConversationRecord],
+    jobs: List[Tuple[Exporter, Dict[str, Any]]],
+    *,
+    queue_size: int = 256,
+    spill_dir: Optional[str] = None,
+) -> List[ExportResult]:
+    """Stream ``records`` to every exporter concurrently; one result per job."""
+    results: List[ExportResult] = []
+    feeds: List[_Feed] = []
+    threads: List[threading.Thread] = []
+
+    for exporter, output in jobs:
+        result = ExportResult(output=output)
+        size = int(output.get("queue_size") or queue_size)
+        if as_bool(output.get("spill"), getattr(exporter, "remote", False)):
+            feed: _Feed = _SpillFeed(size, spill_dir)
+        else:
+            feed = _Feed(size)
+        thread = threading.Thread(
+            target=_consume,
+            args=(exporter, feed, result),
+            name=f"rokpyl-export-{result.name}",
+        )
+        results.append(result)
+        feeds.append(feed)
+        threads.append(thread)
+        thread.start()
+
+    try:
+        for record in records:
+            open_feeds = [feed for feed in feeds if not feed.closed.is_set()]
+            if not open_feeds:
+                break
+            for feed in open_feeds:
+                feed.put(record)
+    finally:
+        for feed in feeds:
+            feed.put(_DONE)
+        for thread in threads:
+            thread.join()
+
+    return results
+
+
+def run_sequential(
+    records: Iterable[ConversationRecord],
+    jobs: List[Tuple[Exporter, Dict[str, Any]]],
+    *,
+    profile: Optional[Callable[[str], ContextManager[Any]]] = None,
+) -> List[ExportResult]:
+    """Run exporters one after another with the same per-exporter isolation.
+
+    ``profile`` (``Instrumentation.profile``) wraps each ``write`` as
+    ``export:<type>``.
+    """
+    # Re-read for each exporter; a spilling ``RecordStore`` is not loaded whole.
+    materialized = records if isinstance(records, Sequence) else list(records)
+    results: List[ExportResult] = []
+    for exporter, output in jobs:
+        result = ExportResult(output=output)
+        counted = _Counted(materialized)
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            with nullcontext() if profile is None else profile(f"export:{result.name}"):
+                exporter.write(counted, output)
+        except Exception as exc:
+            result.error = exc
+        result.wall_s = time.perf_counter() - wall
+        result.cpu_s = time.thread_time() - cpu
+        # Like ``fan_out``: only what the exporter read before finishing or failing.
+        result.records = counted.read
+        result.messages = sum(
+            len(record.messages)
+            for record in islice(materialized, counted.read)
+            if messages_decoded(record)
+        )
+        results.append(result)
+    return results
+
+
+class _Counted(Sequence[ConversationRecord]):
+    """``records`` as handed to one exporter, counting how far it read."""
+
+    def __init__(self, records: Sequence[ConversationRecord]) -> None:
+        self.records = records
+        self.read = 0
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, index: Any) -> Any:
+        return self.records[index]
+
+    def __iter__(self) -> Iterator[ConversationRecord]:
+        for count, record in enumerate(self.records, 1):
+            self.read = max(self.read, count)
+            yield record
@@ -0,0 +1,340 @@
+"""Per-stage instrumentation and run reports.
+
+Every stage records wall time, CPU time of the thread that ran it, counts of
+sources/records/messages and bytes read or written. Peak memory is tracked
+with ``tracemalloc`` when ``trace_memory`` is enabled (per top-level stage
+on Python 3.9+, cumulative otherwise) and with the process max RSS where the
+platform reports it.
+
+Stages listed in ``profile_stages`` are profiled with ``cProfile``
+(``<stage>.prof``) or with a stdlib sampling profiler that writes collapsed
+stacks (``<stage>.folded``) for flame-graph tools. Each stage keeps one
+profile across all its calls, written when the run stops. Only one
+``cProfile`` can be active at a time, so a profiled stage nested in another
+(``parse:claude`` inside ``parse``) is only covered by the outer profile.
+"""
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+from rokpyl.core.config import ConfigError, as_bool, as_int
+from rokpyl.models.canonical import ConversationRecord, messages_decoded
+
+if TYPE_CHECKING:
+    import cProfile
+
+# cProfile and tracemalloc are imported when a run profiles or traces memory.
+
+PROFILE_MODES = ("cprofile", "sample")
+
+
+@dataclass
+class StageStats:
+    name: str
+    calls: int = 0
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    sources: int = 0
+    records: int = 0
+    messages: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0
+    peak_memory_bytes: Optional[int] = None
+
+    def count_records(self, records: Iterable[ConversationRecord]) -> None:
+        for record in records:
+            self.records += 1
+            if messages_decoded(record):  # counting must not decode lazy records
+                self.messages += len(record.messages)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "wall_s": round(self.wall_s, 6),
+            "cpu_s": round(self.cpu_s, 6),
+            "sources": self.sources,
+            "records": self.records,
+            "messages": self.messages,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "peak_memory_bytes": self.peak_memory_bytes,
+        }
+
+
+def file_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+# ``(size, mtime_ns)`` of every file at an output location.
+OutputSnapshot = Dict[Path, Tuple[int, int]]
+
+
+def output_snapshot(output: Dict[str, Any]) -> OutputSnapshot:
+    """Files at an exporter's output location (a ``path`` file or ``dir`` tree)."""
+    if output.get("path"):
+        paths: Iterable[Path] = [Path(output["path"])]
+    elif output.get("dir") and Path(output["dir"]).is_dir():
+        paths = Path(output["dir"]).rglob("*")
+    else:
+        return {}
+    snapshot: OutputSnapshot = {}
+    for path in paths:
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        if not path.is_dir():
+            snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+    return snapshot
+
+
+def output_bytes(output: Dict[str, Any], before: Optional[OutputSnapshot] = None) -> int:
+    """Bytes an exporter wrote, given a snapshot of its output taken before.
+
+    New and rewritten files count in full and appended files by their growth;
+    files that were already there and did not change count for nothing.
+    """
+    before = before or {}
+    written = 0
+    for path, signature in output_snapshot(output).items():
+        previous = before.get(path)
+        if previous == signature:
+            continue
+        if previous is not None and output.get("append") and signature[0] >= previous[0]:
+            written += signature[0] - previous[0]
+        else:
+            written += signature[0]
+    return written
+
+
+def peak_rss_bytes() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return int(peak) if sys.platform == "darwin" else int(peak) * 1024
+
+
+def _file_name(stage: str) -> str:
+    return stage.replace(":", "_")
+
+
+class _SamplingProfiler:
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self._thread_id = thread_id
+        self._interval = interval
+        self._stop = threading.Event()
+        self.stacks: Counter = Counter()
+        self._thread = threading.Thread(target=self._run, name="rokpyl-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+
+class Instrumentation:
+    def __init__(
+        self,
+        *,
+        trace_memory: bool = False,
+        profile_stages: Sequence[str] = (),
+        profile_mode: str = "cprofile",
+        profile_dir: str | Path | None = None,
+        sample_interval_ms: int = 5,
+    ) -> None:
+        if profile_mode not in PROFILE_MODES:
+            raise ConfigError(f"Unknown profile mode: {profile_mode}")
+        self.trace_memory = trace_memory
+        self.profile_stages = set(profile_stages)
+        self.profile_mode = profile_mode
+        self.profile_dir = Path(profile_dir or ".")
+        self.sample_interval = max(1, sample_interval_ms) / 1000.0
+        self.stages: Dict[str, StageStats] = {}
+        self.lock = threading.Lock()
+        # One profile per stage, kept across calls and written by ``stop``.
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._samples: Dict[str, Counter] = {}
+        self._profiling: Optional[str] = None
+        self._depth = 0
+        self._owns_tracing = False
+        self._started_at: Optional[datetime] = None
+        self._wall_start = 0.0
+        self._cpu_start = 0.0
+        self._wall_s = 0.0
+        self._cpu_s = 0.0
+
+    @classmethod
+    def from_config(cls, runtime: Dict[str, Any] | None) -> "Instrumentation":
+        runtime = runtime or {}
+        profile = runtime.get("profile") or {}
+        stages = profile.get("stages") or []
+        if isinstance(stages, str):
+            stages = [part for part in stages.split(",") if part]
+        return cls(
+            trace_memory=as_bool(runtime.get("trace_memory"), False),
+            profile_stages=stages,
+            profile_mode=profile.get("mode") or "cprofile",
+            profile_dir=profile.get("dir"),
+            sample_interval_ms=as_int(profile.get("interval_ms"), 5),
+        )
+
+    def start(self) -> None:
+        self._started_at = datetime.now(timezone.utc)
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        if self.trace_memory:
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._owns_tracing = True
+
+    def stop(self) -> None:
+        self._wall_s = time.perf_counter() - self._wall_start
+        self._cpu_s = time.process_time() - self._cpu_start
+        if self._owns_tracing:
+            import tracemalloc
+
+            tracemalloc.stop()
+            self._owns_tracing = False
+        self._write_profiles()
+
+    def stats(self, name: str) -> StageStats:
+        with self.lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = StageStats(name)
+            return stats
+
+    @property
+    def per_stage(self) -> bool:
+        """Whether profiling or memory tracing needs stages that do not overlap."""
+        return self.trace_memory or bool(self.profile_stages)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageStats]:
+        """Time a stage; safe to use from several threads at once."""
+        stats = self.stats(name)
+        tracing = False
+        if self.trace_memory:
+            import tracemalloc
+
+            tracing = tracemalloc.is_tracing()
+        with self.lock:
+            outermost = self._depth == 0
+            self._depth += 1
+        if tracing and outermost and hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        profiler = self._start_profiler(name)
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield stats
+        finally:
+            wall_s = time.perf_counter() - wall
+            cpu_s = time.thread_time() - cpu
+            with self.lock:
+                stats.calls += 1
+                stats.wall_s += wall_s
+                stats.cpu_s += cpu_s
+                self._depth -= 1
+                if tracing:
+                    peak = tracemalloc.get_traced_memory()[1]
+                    stats.peak_memory_bytes = max(stats.peak_memory_bytes or 0, peak)
+            self._stop_profiler(name, profiler)
+
+    @contextmanager
+    def profile(self, name: str) -> Iterator[None]:
+        """Profile ``name`` if it is in ``profile_stages``, without timing a stage."""
+        profiler = self._start_profiler(name)
+        try:
+            yield
+        finally:
+            self._stop_profiler(name, profiler)
+
+    def _start_profiler(self, name: str) -> Any:
+        if name not in self.profile_stages:
+            return None
+        if self.profile_mode == "sample":
+            sampler = _SamplingProfiler(threading.get_ident(), self.sample_interval)
+            sampler.start()
+            return sampler
+        import cProfile
+
+        with self.lock:
+            if self._profiling is not None:
+                return None  # nested in (or concurrent with) another profiled stage
+            profiler = self._profiles.get(name)
+            if profiler is None:
+                profiler = self._profiles[name] = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:  # Python 3.12+: a profiler outside rokpyl is active
+                return None
+            self._profiling = name
+        return profiler
+
+    def _stop_profiler(self, name: str, profiler: Any) -> None:
+        if profiler is None:
+            return
+        if not isinstance(profiler, _SamplingProfiler):
+            profiler.disable()
+            with self.lock:
+                self._profiling = None
+            return
+        stacks = profiler.stop()
+        with self.lock:
+            self._samples.setdefault(name, Counter()).update(stacks)
+
+    def _write_profiles(self) -> None:
+        if not self._profiles and not self._samples:
+            return
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        for name, profiler in self._profiles.items():
+            profiler.dump_stats(str(self.profile_dir / f"{_file_name(name)}.prof"))
+        for name, stacks in self._samples.items():
+            lines = [f"{stack} {count}" for stack, count in sorted(stacks.items())]
+            path = self.profile_dir / f"{_file_name(name)}.folded"
+            path.write_text("\n".join(lines), encoding="utf-8")
+
+    def report(self, **extra: Any) -> Dict[str, Any]:
+        report: Dict[str, Any] = {
+            "started_at": self._started_at.isoformat().replace("+00:00", "Z")
+            if self._started_at
+            else None,
+            "wall_s": round(self._wall_s, 6),
+            "cpu_s": round(self._cpu_s, 6),
+            "peak_rss_bytes": peak_rss_bytes(),
+        }
+        report.update(extra)
+        report["stages"] = [stats.to_dict() for stats in self.stages.values()]
+        return report
@@ -0,0 +1,248 @@
+"""Sidecar index for random access into JSONL outputs.
+
+With ``index: true`` the JSONL exporter writes ``<path>.idx`` next to its
+output, in the same pass: an open-addressing hash table on disk mapping the
+``id`` and ``url`` of every line to its byte offset and length. ``JsonlIndex``
+maps the index and the JSONL file and reads one record with a single probe
+sequence and a slice, whatever the size of the file; ``rokpyl get`` is the
+command-line front end.
+
+The table holds 64-bit key hashes only. A probe that hits a hash decodes the
+line and compares its ``id``/``url`` with the key, so collisions cost an extra
+decode, never a wrong answer. When a key appears on several lines (watch
+mode appends the updated copy of a changed conversation) the last line wins:
+slots are filled from the end of the file, so later lines are probed first.
+The header records the JSONL size the index was built for; an index that no
+longer matches its file is refused rather than trusted.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from rokpyl.models.canonical import ConversationRecord, record_from_dict
+
+INDEX_SUFFIX = ".idx"
+_MAGIC = b"RKPYLIX1"
+# Magic, slot count, entry count, size of the indexed JSONL file.
+_HEADER = struct.Struct("<8sQQQ")
+# Key hash (0 marks an empty slot), line offset, line length.
+_SLOT = struct.Struct("<QQQ")
+_MIN_SLOTS = 8
+
+
+def index_path(path: str | Path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+def key_hash(key: str) -> int:
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+def _keys(data: Dict[str, Any]) -> Iterator[str]:
+    for field in ("id", "url"):
+        value = data.get(field)
+        if isinstance(value, str) and value:
+            yield value
+
+
+class IndexBuilder:
+    """Collects ``(key, offset, length)`` entries in line order, then writes the table."""
+
+    def __init__(self) -> None:
+        self._hashes = array("Q")
+        self._offsets = array("Q")
+        self._lengths = array("Q")
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def add(self, data: Dict[str, Any], offset: int, length: int) -> None:
+        """Index the line at ``offset`` holding the record dict ``data``."""
+        for key in _keys(data):
+            self._add(key_hash(key), offset, length)
+
+    def _add(self, hashed: int, offset: int, length: int) -> None:
+        self._hashes.append(hashed)
+        self._offsets.append(offset)
+        self._lengths.append(length)
+
+    @classmethod
+    def resume(cls, path: str | Path) -> "IndexBuilder":
+        """Entries for the lines already in ``path``, before appending to it.
+
+        Reuses the existing index when it matches the file, else scans the file.
+        """
+        path = Path(path)
+        builder = cls()
+        try:
+            with JsonlIndex.open(path) as existing:
+                entries = sorted(existing.entries(), key=lambda entry: entry[1])
+        except (OSError, ValueError):
+            return scan(path)
+        for hashed, offset, length in entries:
+            builder._add(hashed, offset, length)
+        return builder
+
+    def write(self, path: str | Path, data_size: int) -> Path:
+        """Write the index for a JSONL file of ``data_size`` bytes at ``path``."""
+        slots = _MIN_SLOTS
+        while slots < 2 * len(self):
+            slots *= 2
+        mask = slots - 1
+        table = array("Q", bytes(_SLOT.size * slots))
+        entries = zip(self._hashes, self._offsets, self._lengths)
+        for hashed, offset, length in reversed(list(entries)):
+            slot = hashed & mask
+            while table[3 * slot]:
+                slot = (slot + 1) & mask
+            table[3 * slot : 3 * slot + 3] = array("Q", (hashed, offset, length))
+        if sys.byteorder == "big":
+            table.byteswap()
+        target = index_path(path)
+        partial = target.with_name(target.name + ".tmp")
+        with partial.open("wb") as handle:
+            handle.write(_HEADER.pack(_MAGIC, slots, len(self), data_size))
+            table.tofile(handle)
+        partial.replace(target)
+        return target
+
+
+def scan(path: str | Path) -> IndexBuilder:
+    """Entries for every line of an existing JSONL file."""
+    builder = IndexBuilder()
+    offset = 0
+    with Path(path).open("rb") as handle:
+        for line in handle:
+            length = len(line.rstrip(b"\r\n"))
+            if line.strip():
+                try:
+                    data = json.loads(line)
+                except ValueError as exc:
+                    raise ValueError(f"{path}: invalid JSON at byte {offset}: {exc}") from exc
+                if isinstance(data, dict):
+                    builder.add(data, offset, length)
+            offset += len(line)
+    return builder
+
+
+def build_index(path: str | Path) -> Path:
+    """Index an existing JSONL file (e.g. a ``rokpyl merge`` output)."""
+    path = Path(path)
+    return scan(path).write(path, path.stat().st_size)
+
+
+def _map(path: Path) -> Optional[mmap.mmap]:
+    with path.open("rb") as handle:
+        if not path.stat().st_size:
+            return None
+        return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class JsonlIndex:
+    """Random access to the records of an indexed JSONL file."""
+
+    def __init__(self, path: Path, index: mmap.mmap, data: Optional[mmap.mmap]) -> None:
+        self.path = path
+        self._index = index
+        self._data = data
+        _, self.slots, self.entry_count, self.data_size = _HEADER.unpack_from(index, 0)
+        self._mask = self.slots - 1
+
+    @classmethod
+    def open(cls, path: str | Path) -> "JsonlIndex":
+        path = Path(path)
+        sidecar = index_path(path)
+        if not sidecar.exists():
+            raise ValueError(f"{path} has no index ({sidecar.name}); build one first")
+        index = _map(sidecar)
+        if index is None or len(index) < _HEADER.size or index[:8] != _MAGIC:
+            if index is not None:
+                index.close()
+            raise ValueError(f"{sidecar} is not a rokpyl JSONL index")
+        _, slots, _, data_size = _HEADER.unpack_from(index, 0)
+        if path.stat().st_size != data_size or len(index) != _HEADER.size + _SLOT.size * slots:
+            index.close()
+            raise ValueError(f"{sidecar} does not match {path}; rebuild the index")
+        return cls(path, index, _map(path))
+
+    def __enter__(self) -> "JsonlIndex":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._index.close()
+        if self._data is not None:
+            self._data.close()
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self.get(key) is not None
+
+    def entries(self) -> Iterator[Tuple[int, int, int]]:
+        """Every ``(key hash, offset, length)`` entry, in slot order."""
+        table = array("Q")
+        table.frombytes(self._index[_HEADER.size :])
+        if sys.byteorder == "big":
+            table.byteswap()
+        for position in range(0, len(table), 3):
+            if table[position]:
+                yield table[position], table[position + 1], table[position + 2]
+
+    def _candidates(self, key: str) -> Iterator[Tuple[int, int]]:
+        hashed = key_hash(key)
+        slot = hashed & self._mask
+        for _ in range(self.slots):
+            found, offset, length = _SLOT.unpack_from(
+                self._index, _HEADER.size + _SLOT.size * slot
+            )
+            if not found:
+                return
+            if found == hashed:
+                yield offset, length
+            slot = (slot + 1) & self._mask
+
+    def locate(self, key: str) -> Optional[Tuple[int, int]]:
+        """``(offset, length)`` of the last line whose ``id`` or ``url`` is ``key``."""
+        for offset, length in self._candidates(key):
+            if key in _keys(self._decode(offset, length)):
+                return offset, length
+        return None
+
+    def raw(self, key: str) -> Optional[bytes]:
+        """The JSONL line for ``key``, undecoded."""
+        location = self.locate(key)
+        if location is None:
+            return None
+        offset, length = location
+        assert self._data is not None
+        return self._data[offset : offset + length]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The record dict whose ``id`` or ``url`` is ``key``, or ``None``."""
+        for offset, length in self._candidates(key):
+            data = self._decode(offset, length)
+            if key in _keys(data):
+                return data
+        return None
+
+    def record(self, key: str) -> Optional[ConversationRecord]:
+        data = self.get(key)
+        return None if data is None else record_from_dict(data)
+
+    def _decode(self, offset: int, length: int) -> Dict[str, Any]:
+        if self._data is None or offset + length > len(self._data):
+            raise ValueError(f"{self.path}: index entry past the end of the file")
+        data = json.loads(self._data[offset : offset + length])
+        if not isinstance(data, dict):
+            raise ValueError(f"{self.path}: index entry at byte {offset} is not a record")
+        return data
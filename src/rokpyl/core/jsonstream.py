@@ -0,0 +1,250 @@
+"""Incremental reading of large JSON documents.
+
+Only the part of the document that is actually consumed is read from disk:
+values are decoded one at a time with ``json.JSONDecoder.raw_decode`` over a
+sliding buffer, and unwanted values are skipped with a structural scan that
+never builds Python objects. ``raw_value`` returns the text of a value, so
+callers can keep it and decode it later.
+"""
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Collection, Dict, Iterator, Optional, Sequence, TextIO, Tuple
+
+_WHITESPACE = " \t\n\r"
+_STRUCTURAL = re.compile(r'["\[\]{}]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+class JsonStreamError(ValueError):
+    pass
+
+
+def parse_json_path(value: str | None) -> Sequence[str]:
+    """Split a dotted key path such as ``data.conversations``."""
+    if not value:
+        return ()
+    return tuple(part for part in value.split(".") if part)
+
+
+class JsonStreamReader:
+    def __init__(self, handle: TextIO, *, chunk_size: int = 1 << 16) -> None:
+        self._handle = handle
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+        # Start of a value being captured by raw_value; kept across refills.
+        self._mark: Optional[int] = None
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        # Grow reads with the pending value so retries stay amortized linear.
+        size = max(self._chunk_size, len(self._buffer) - self._pos)
+        chunk = self._handle.read(size)
+        if not chunk:
+            self._eof = True
+            return False
+        cut = self._pos if self._mark is None else min(self._pos, self._mark)
+        if cut >= self._chunk_size:
+            self._buffer = self._buffer[cut:]
+            self._pos -= cut
+            if self._mark is not None:
+                self._mark -= cut
+        self._buffer += chunk
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character, or ``""`` at EOF."""
+        while True:
+            buffer = self._buffer
+            pos = self._pos
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            self._pos = pos
+            if pos < len(buffer):
+                return buffer[pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise JsonStreamError(f"Expected {char!r}, found {found or 'end of input'!r}")
+        self._pos += 1
+
+    def decode_value(self) -> Any:
+        if not self.peek():
+            raise JsonStreamError("Unexpected end of JSON input")
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number cut at the buffer edge ("12" or "1." of "12.5e3") may continue.
+            if (
+                end >= len(self._buffer) - 2
+                and self._buffer[end : end + 1] in ("", ".", "e", "E", "+", "-")
+                and self._fill()
+            ):
+                continue
+            self._pos = end
+            return value
+
+    def skip_value(self) -> None:
+        char = self.peek()
+        if char not in '[{"':
+            self.decode_value()
+            return
+
+        depth = 0
+        in_string = False
+        while True:
+            buffer = self._buffer
+            pos = self._pos
+            while True:
+                pattern = _STRING_SPECIAL if in_string else _STRUCTURAL
+                match = pattern.search(buffer, pos)
+                if match is None:
+                    pos = len(buffer)
+                    break
+                found = match.group()
+                pos = match.end()
+                if in_string:
+                    if found == "\\":
+                        if pos >= len(buffer):
+                            # Escape split across chunks; rescan it after refill.
+                            pos -= 1
+                            break
+                        pos += 1
+                        continue
+                    in_string = False
+                    if depth == 0:
+                        self._pos = pos
+                        return
+                elif found == '"':
+                    in_string = True
+                elif found in "[{":
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        self._pos = pos
+                        return
+            self._pos = pos
+            if not self._fill():
+                raise JsonStreamError("Unexpected end of JSON input")
+
+    def raw_value(self) -> str:
+        """Consume the next value and return its JSON text.
+
+        The value is decoded to find its end (C speed, unlike the structural
+        scan of ``skip_value``) and the decoded object is dropped at once.
+        """
+        self.peek()
+        self._mark = self._pos
+        try:
+            self.decode_value()
+            return self._buffer[self._mark : self._pos]
+        finally:
+            self._mark = None
+
+    def decode_object(
+        self, raw_keys: Collection[str] = ()
+    ) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """Decode an object, keeping the values under ``raw_keys`` as JSON text."""
+        decoded: Dict[str, Any] = {}
+        raw: Dict[str, str] = {}
+        for key in self.iter_members():
+            if key in raw_keys:
+                raw[key] = self.raw_value()
+            else:
+                decoded[key] = self.decode_value()
+        return decoded, raw
+
+    def iter_members(self) -> Iterator[str]:
+        """Yield object keys; each value must be consumed before resuming."""
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.decode_value()
+            self.expect(":")
+            yield key
+            char = self.peek()
+            self._pos += 1
+            if char == ",":
+                continue
+            if char == "}":
+                return
+            raise JsonStreamError(f"Expected ',' or '}}', found {char or 'end of input'!r}")
+
+    def descend(self, path: Sequence[str]) -> None:
+        """Position the reader at the value stored under ``path``."""
+        for segment in path:
+            for key in self.iter_members():
+                if key == segment:
+                    break
+                self.skip_value()
+            else:
+                raise JsonStreamError(f"Key not found: {segment}")
+
+    def iter_array(self) -> Iterator[Any]:
+        for _ in self.iter_elements():
+            yield self.decode_value()
+
+    def iter_elements(self) -> Iterator[None]:
+        """Step through an array; each element must be consumed before resuming."""
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield None
+            char = self.peek()
+            self._pos += 1
+            if char == ",":
+                continue
+            if char == "]":
+                return
+            raise JsonStreamError(f"Expected ',' or ']', found {char or 'end of input'!r}")
+
+
+def iter_array_items(
+    handle: TextIO, path: Sequence[str] = (), *, chunk_size: int = 1 << 16
+) -> Iterator[Any]:
+    """Yield items of the array at ``path`` without reading past the last one consumed."""
+    reader = JsonStreamReader(handle, chunk_size=chunk_size)
+    reader.descend(path)
+    if reader.peek() != "[":
+        raise JsonStreamError("Value at path is not an array")
+    yield from reader.iter_array()
+
+
+def iter_objects(
+    handle: TextIO, raw_keys: Collection[str] = (), *, chunk_size: int = 1 << 16
+) -> Iterator[Tuple[Any, Dict[str, str]]]:
+    """Yield ``(value, raw)`` for each item of a top-level array, or for the
+    top-level value itself.
+
+    Objects are decoded except for the values under ``raw_keys``, which are
+    returned as JSON text in ``raw``; other items are decoded whole.
+    """
+    reader = JsonStreamReader(handle, chunk_size=chunk_size)
+    if reader.peek() != "[":
+        yield _decode_item(reader, raw_keys)
+        return
+    for _ in reader.iter_elements():
+        yield _decode_item(reader, raw_keys)
+
+
+def _decode_item(reader: JsonStreamReader, raw_keys: Collection[str]) -> Tuple[Any, Dict[str, str]]:
+    if reader.peek() == "{":
+        return reader.decode_object(raw_keys)
+    return reader.decode_value(), {}
@@ -0,0 +1,256 @@
+"""Merge JSONL outputs with an external sort.
+
+``merge_jsonl`` combines files written by ``JsonlExporter`` (per user, per
+month, per shard, ...) without loading them into memory. Lines are sorted in
+runs of at most ``memory_bytes`` that spill to temporary files and are then
+k-way merged. Three sorts are chained:
+
+1. by ``(id, precedence)``: the first record of each id wins;
+2. by ``(url, precedence)``: of the survivors, the first record of each url
+   wins (records without a url are kept; skipped when no input has urls);
+3. by the requested output order.
+
+Precedence is ``first`` (earlier input file, then earlier line) or
+``newest`` (latest ``date``; later inputs win ties). Memory stays bounded by
+the budget plus one buffered line per open run.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import os
+import sys
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+ORDERS = ("date", "id", "input")
+PRECEDENCE = ("first", "newest")
+DEFAULT_MEMORY_BYTES = 256 * 1024 * 1024
+MAX_FAN_IN = 64
+
+Item = Tuple[Any, str]
+# Rough per-item cost beyond the line itself: tuple, key list and its fields.
+_ITEM_OVERHEAD = 400
+
+
+@dataclass
+class MergeResult:
+    records_in: int = 0
+    written: int = 0
+    runs: int = 0
+
+    @property
+    def duplicates(self) -> int:
+        return self.records_in - self.written
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str) or not value.strip():
+        return None
+    text = value.strip()
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class _Runs:
+    """Sorted run files in a private temporary directory."""
+
+    def __init__(self, tmp_dir: str | Path | None) -> None:
+        self.directory = Path(tempfile.mkdtemp(prefix="rokpyl-merge-", dir=tmp_dir))
+        self.created = 0
+
+    def write(self, items: Iterable[Item]) -> Path:
+        # Two lines per item: the JSON key, then the payload verbatim.
+        path = self.directory / f"run-{self.created:06d}"
+        self.created += 1
+        with path.open("w", encoding="utf-8") as handle:
+            for key, payload in items:
+                handle.write(json.dumps(key, ensure_ascii=True))
+                handle.write("\n")
+                handle.write(payload)
+                handle.write("\n")
+        return path
+
+    @staticmethod
+    def read(path: Path) -> Iterator[Item]:
+        with path.open("r", encoding="utf-8") as handle:
+            for key in handle:
+                yield json.loads(key), handle.readline()[:-1]
+
+    def merge(self, paths: Sequence[Path]) -> Iterator[Item]:
+        return heapq.merge(*(self.read(path) for path in paths), key=itemgetter(0))
+
+    def cleanup(self) -> None:
+        for path in self.directory.iterdir():
+            path.unlink()
+        self.directory.rmdir()
+
+
+def _default_size(item: Item) -> int:
+    return _ITEM_OVERHEAD + sys.getsizeof(item[1])
+
+
+def external_sort(
+    items: Iterable[Item],
+    *,
+    memory_bytes: int = DEFAULT_MEMORY_BYTES,
+    tmp_dir: str | Path | None = None,
+    fan_in: int = MAX_FAN_IN,
+    size: Callable[[Item], int] = _default_size,
+    on_run: Callable[[], None] | None = None,
+) -> Iterator[Item]:
+    """Yield ``(key, payload)`` items in key order using about ``memory_bytes``.
+
+    Keys must round-trip through JSON as lists and never contain ``None``;
+    payloads are single-line strings. Input that fits the budget is sorted in
+    memory.
+    """
+    buffer: List[Item] = []
+    used = 0
+    runs: Optional[_Runs] = None
+    paths: List[Path] = []
+
+    def spill() -> None:
+        buffer.sort(key=itemgetter(0))
+        paths.append(runs.write(buffer))
+        if on_run is not None:
+            on_run()
+
+    try:
+        for item in items:
+            buffer.append(item)
+            used += size(item)
+            if used >= memory_bytes:
+                if runs is None:
+                    runs = _Runs(tmp_dir)
+                spill()
+                buffer = []
+                used = 0
+        if runs is None:
+            buffer.sort(key=itemgetter(0))
+            yield from buffer
+            return
+        if buffer:
+            spill()
+            buffer = []
+        # Bound open files by merging runs in groups first.
+        while len(paths) > fan_in:
+            groups = [paths[i : i + fan_in] for i in range(0, len(paths), fan_in)]
+            merged = [runs.write(runs.merge(group)) for group in groups]
+            for path in paths:
+                path.unlink()
+            paths = merged
+        yield from runs.merge(paths)
+    finally:
+        if runs is not None:
+            runs.cleanup()
+
+
+def _first_per_key(items: Iterable[Item]) -> Iterator[Item]:
+    """Keep the first item per ``key[0]``; empty values are never duplicates."""
+    previous: Any = None
+    for key, line in items:
+        if key[0] and key[0] == previous:
+            continue
+        previous = key[0]
+        yield key, line
+
+
+def merge_jsonl(
+    paths: Sequence[str | Path],
+    out: str | Path,
+    *,
+    order: str = "date",
+    prefer: str = "first",
+    memory_bytes: int = DEFAULT_MEMORY_BYTES,
+    tmp_dir: str | Path | None = None,
+) -> MergeResult:
+    """Merge JSONL files into ``out``, deduplicated and ordered (see module doc)."""
+    if order not in ORDERS:
+        raise ValueError(f"Unknown merge order: {order}")
+    if prefer not in PRECEDENCE:
+        raise ValueError(f"Unknown merge precedence: {prefer}")
+    result = MergeResult()
+    has_urls = False
+
+    def count_run() -> None:
+        result.runs += 1
+
+    def sort(items: Iterable[Item]) -> Iterator[Item]:
+        return external_sort(
+            items, memory_bytes=memory_bytes, tmp_dir=tmp_dir, on_run=count_run
+        )
+
+    def read() -> Iterator[Item]:
+        nonlocal has_urls
+        # Keys end with meta = [id, url, precedence, order_key]; precedence and
+        # order keys are unique, so meta itself is never compared.
+        for input_index, path in enumerate(paths):
+            with Path(path).open("r", encoding="utf-8") as handle:
+                for line_index, line in enumerate(handle):
+                    line = line.rstrip("\n")
+                    if not line.strip():
+                        continue
+                    payload = json.loads(line)
+                    record_id = str(payload.get("id") or "")
+                    url = str(payload.get("url") or "")
+                    has_urls = has_urls or bool(url)
+                    timestamp = _timestamp(payload.get("date"))
+                    position = [input_index, line_index]
+                    if prefer == "first":
+                        precedence = position
+                    elif timestamp is None:
+                        precedence = [1, 0.0, -input_index, -line_index]
+                    else:
+                        precedence = [0, -timestamp, -input_index, -line_index]
+                    if order == "date":
+                        order_key = [timestamp is None, timestamp or 0.0, *position]
+                    elif order == "id":
+                        order_key = [record_id, *position]
+                    else:
+                        order_key = position
+                    result.records_in += 1
+                    meta = [record_id, url, precedence, order_key]
+                    yield [record_id, precedence, meta], line
+
+    def dedupe_urls(items: Iterator[Item]) -> Iterator[Item]:
+        # The id sort has consumed every input before yielding its first item.
+        first = next(items, None)
+        if first is None:
+            return
+        rest = itertools.chain([first], items)
+        if not has_urls:
+            yield from rest
+            return
+        by_url = sort(([key[2][1], key[2][2], key[2]], line) for key, line in rest)
+        yield from _first_per_key(by_url)
+
+    by_id = _first_per_key(sort(read()))
+    ordered = sort(([key[2][3], key[2]], line) for key, line in dedupe_urls(by_id))
+
+    out_path = Path(out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as handle:
+        for _, line in ordered:
+            # Match JsonlExporter: newline-separated, no trailing newline.
+            if result.written:
+                handle.write("\n")
+            handle.write(line)
+            result.written += 1
+    os.replace(tmp, out_path)
+    return result
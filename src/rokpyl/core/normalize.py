@@ -2,9 +2,9 @@
 from __future__ import annotations
 
 import hashlib
-from typing import List
+from typing import List, Optional, Set
 
-from rokpyl.models.canonical import ConversationRecord, Message
+from rokpyl.models.canonical import ConversationRecord, Message, messages_decoded
 
 
 def _build_transcript(messages: List[Message]) -> str:
@@ -29,26 +29,42 @@ def _stable_fallback_id(record: ConversationRecord) -> str:
     return f"auto_{digest[:16]}"
 
 
-def normalize_records(records: List[ConversationRecord]) -> List[ConversationRecord]:
-    for record in records:
-        if not record.transcript and record.messages:
+class Normalizer:
+    """Streaming form of ``normalize_records``: fills defaults, then dedupes."""
+
+    def __init__(self) -> None:
+        self.seen_ids: Set[str] = set()
+        self.seen_urls: Set[str] = set()
+
+    def process(self, record: ConversationRecord) -> Optional[ConversationRecord]:
+        # Lazy records build their transcript when they are decoded.
+        if messages_decoded(record) and not record.transcript and record.messages:
             record.transcript = _build_transcript(record.messages)
         if not record.id:
             record.id = _stable_fallback_id(record)
+        return record if self.admit(record) else None
 
-    seen_ids = set()
-    seen_urls = set()
-    deduped: List[ConversationRecord] = []
-
-    for record in records:
-        if record.id and record.id in seen_ids:
-            continue
-        if record.url and record.url in seen_urls:
-            continue
+    def admit(self, record: ConversationRecord) -> bool:
+        """Whether ``record`` is new; remembers its id and url if so."""
+        if record.id and record.id in self.seen_ids:
+            return False
+        if record.url and record.url in self.seen_urls:
+            return False
         if record.id:
-            seen_ids.add(record.id)
+            self.seen_ids.add(record.id)
         if record.url:
-            seen_urls.add(record.url)
-        deduped.append(record)
+            self.seen_urls.add(record.url)
+        return True
+
 
+def normalize_records(
+    records: List[ConversationRecord], normalizer: Optional[Normalizer] = None
+) -> List[ConversationRecord]:
+    """Fill defaults and dedupe; pass ``normalizer`` to dedupe across calls."""
+    normalizer = normalizer or Normalizer()
+    deduped: List[ConversationRecord] = []
+    for record in records:
+        kept = normalizer.process(record)
+        if kept is not None:
+            deduped.append(kept)
     return deduped
@@ -1,62 +1,576 @@
-"""Pipeline orchestration."""
+"""Pipeline orchestration.
+
+Optional stages (checkpoints, attachments, spilling, split parsing, export
+fan-out, format detection) are imported where a run first needs them, so
+importing the pipeline, and the CLI with it, stays cheap.
+"""
 from __future__ import annotations
 
+from collections import deque
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Type
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
 
-from rokpyl.core.detection import select_importers
-from rokpyl.core.normalize import normalize_records
+from rokpyl.core.config import as_bool, as_int
+from rokpyl.core.instrument import (
+    Instrumentation,
+    StageStats,
+    file_size,
+    OutputSnapshot,
+    output_bytes,
+    output_snapshot,
+)
+from rokpyl.core.normalize import Normalizer, normalize_records
+from rokpyl.core.query import Query
+from rokpyl.core.shard import (
+    Position,
+    ShardNormalizer,
+    parse_shard,
+    shard_key,
+    shard_of,
+    shard_outputs,
+    write_order,
+)
 from rokpyl.core.registry import ExporterRegistry, ImporterRegistry
+from rokpyl.exporters.base import Exporter
 from rokpyl.importers.base import Importer
 from rokpyl.models.canonical import ConversationRecord
+from rokpyl.summarizers.base import Summarizer
+
+if TYPE_CHECKING:
+    from rokpyl.core.attachments import AttachmentStore
+    from rokpyl.core.checkpoint import Checkpoint
+    from rokpyl.core.detection import FingerprintIndex
+    from rokpyl.core.fanout import ExportResult
+    from rokpyl.core.spill import RecordStore
+
+# Records handed to the summarizer at a time when a memory budget is set.
+SUMMARIZE_BATCH = 256
+
+
+@dataclass(frozen=True)
+class SourceTask:
+    """One source file and the importer that will parse it."""
+
+    importer_cls: Type[Importer]
+    source: Path
+    options: Dict[str, Any] = field(default_factory=dict, compare=False)
+    # Position of the source in the unsharded source order; keeps shard merges
+    # in run order. Every importer of one source shares it.
+    ordinal: int = field(default=0, compare=False)
+    # Filters and projection, handed to the importer as ``options["query"]``.
+    query: Optional[Query] = field(default=None, compare=False)
+    # ``runtime.split_workers``/``split_min_mb``: parse one large array in parallel.
+    # ``None``: ``rokpyl.core.split.DEFAULT_MIN_BYTES``.
+    split_workers: int = field(default=0, compare=False)
+    split_min_bytes: Optional[int] = field(default=None, compare=False)
+    # Whether the source came from a configured input directory (rather than
+    # a file input); attachment lookups may then search its subdirectories.
+    from_directory: bool = field(default=False, compare=False)
+
+
+def parse_source(task: SourceTask) -> List[ConversationRecord]:
+    options = task.options if task.query is None else {**task.options, "query": task.query}
+    importer = task.importer_cls()
+    if task.split_workers > 1:
+        from rokpyl.core import split
+
+        if split.can_split():
+            min_bytes = task.split_min_bytes
+            records = split.parse_split(
+                importer,
+                task.source,
+                options,
+                task.split_workers,
+                min_bytes=split.DEFAULT_MIN_BYTES if min_bytes is None else min_bytes,
+            )
+            if records is not None:
+                return records
+    return importer.parse(task.source, options)
+
+
+def record_source_stats(
+    stats: StageStats, task: SourceTask, records: List[ConversationRecord]
+) -> None:
+    stats.sources += 1
+    stats.bytes_read += file_size(task.source)
+    stats.count_records(records)
 
 
 class Pipeline:
+    engine = "sequential"
+
     def __init__(
-        self, importer_registry: ImporterRegistry, exporter_registry: ExporterRegistry
+        self,
+        importer_registry: ImporterRegistry,
+        exporter_registry: ExporterRegistry,
+        *,
+        summarizer: Summarizer | None = None,
     ) -> None:
         self.importer_registry = importer_registry
         self.exporter_registry = exporter_registry
+        self.summarizer = summarizer
+        self.skipped: List[Tuple[Path, str]] = []
+        self.export_results: List[ExportResult] = []
+        # Output files before this run's export, keyed by ``id(output)``.
+        self.output_snapshots: Dict[int, OutputSnapshot] = {}
+        self.instrumentation = Instrumentation()
+        self.record_count = 0
+        self.checkpoint: Checkpoint | None = None
+        self.attachment_store: AttachmentStore | None = None
+        # Records of the last run when ``runtime.max_memory`` is set; its
+        # spill file stays open until ``close`` or the next run.
+        self.spill: RecordStore | None = None
+        self.query: Query | None = None
+        self.shard: Tuple[int, int] | None = None
+        # Sharded runs: positions of the records written for each id, in order.
+        self.positions: Dict[str, Deque[Position]] = {}
+        self._position_base: Tuple[int, int] = (-1, 0)
+        # Long-running callers (watch mode) keep dedup state across runs and
+        # restrict runs to some sources.
+        self.normalizer: Normalizer | None = None
+        self.source_filter: Callable[[Path], bool] | None = None
+        # Called with each record as it is handed to the exporters (service mode).
+        self.record_sink: Callable[[ConversationRecord], None] | None = None
+        self._fingerprint_index: FingerprintIndex | None = None
+
+    def run(self, config: Dict[str, Any]) -> Sequence[ConversationRecord]:
+        runtime = config.get("runtime") or {}
+        instrumentation = self.instrumentation = Instrumentation.from_config(runtime)
+        instrumentation.start()
+        try:
+            outputs = self._prepare(config)
+            with instrumentation.stage("discover") as stats:
+                tasks = list(self.iter_tasks(config))
+                stats.sources = len(tasks)
+
+            collected: List[ConversationRecord] = []
+            positioned: List[Tuple[SourceTask, int]] = []
+            # With a memory budget each source is normalized as it is parsed
+            # (same dedup state, so the same result) and kept in the store.
+            store = self.spill = self._record_store(runtime)
+            normalizer = self._normalizer()
+            total = instrumentation.stats("parse")
+            for task in tasks:
+                parsed = self._restore_source(task)
+                if parsed is None:
+                    # Only the parsing itself: checkpoints, attachments and
+                    # normalization are timed by their own stages.
+                    name = f"parse:{task.importer_cls.name}"
+                    with instrumentation.stage("parse"), instrumentation.stage(name) as stats:
+                        parsed = parse_source(task)
+                        record_source_stats(stats, task, parsed)
+                    record_source_stats(total, task, parsed)
+                    self._save_source(task, parsed)
+                parsed = self._select(parsed)
+                self._store_attachments(task, parsed)
+                if store is None:
+                    collected.extend(parsed)
+                    positioned.append((task, len(parsed)))
+                    continue
+                with instrumentation.stage("normalize") as stats:
+                    kept = normalize_records(parsed, normalizer)
+                    stats.count_records(kept)
+                self._remember_positions(task, kept)
+                store.extend(kept)
+            self._flush_checkpoint()
+
+            records: Sequence[ConversationRecord]
+            if store is not None:
+                records = store
+            else:
+                with instrumentation.stage("normalize") as stats:
+                    records = normalize_records(collected, normalizer)
+                    stats.count_records(records)
+                if self.shard is not None:
+                    # Shard runs keep every record, so they line up with their tasks.
+                    start = 0
+                    for task, count in positioned:
+                        self._remember_positions(task, records[start : start + count])
+                        start += count
 
-    def run(self, config: Dict[str, Any]) -> List[ConversationRecord]:
-        inputs = config.get("inputs", [])
-        records: List[ConversationRecord] = []
+            if self.summarizer is not None:
+                with instrumentation.stage("summarize") as stats:
+                    records = self._summarize(records, config.get("summarize") or {}, runtime)
+                    stats.count_records(records)
 
-        for entry in inputs:
+            records = self._project(records)
+            with instrumentation.stage("export") as stats:
+                self._run_exporters(records, outputs, runtime)
+                stats.count_records(records)
+            self._finish_run(records, outputs)
+        finally:
+            self._flush_checkpoint()
+            self._close_attachments()
+            instrumentation.stop()
+        self.record_count = len(records)
+        return records
+
+    def report(self) -> Dict[str, Any]:
+        """Machine-readable summary of the last run."""
+        extra: Dict[str, Any] = {}
+        if self.attachment_store is not None:
+            extra["attachments"] = self.attachment_store.stats.to_dict()
+        if self.spill is not None:
+            extra["spill"] = self.spill.stats()
+        return self.instrumentation.report(
+            engine=self.engine,
+            records=self.record_count,
+            skipped=[{"path": str(path), "reason": reason} for path, reason in self.skipped],
+            export_failures=[
+                {"type": result.name, "error": str(result.error)}
+                for result in self.export_failures
+            ],
+            **extra,
+        )
+
+    def close(self) -> None:
+        """Delete the spill file of the last run, whose records it returned."""
+        if self.spill is not None:
+            self.spill.close()
+
+    def _prepare(self, config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Reset per-run state; returns the outputs this run writes."""
+        runtime = config.get("runtime") or {}
+        self.close()
+        self.skipped = []
+        self.shard = parse_shard(runtime.get("shard"))
+        self.positions = {}
+        self._position_base = (-1, 0)
+        self.checkpoint = self._open_checkpoint(config)
+        self.attachment_store = None
+        if config.get("attachments"):
+            from rokpyl.core.attachments import AttachmentStore
+
+            self.attachment_store = AttachmentStore.from_config(config["attachments"])
+        self.query = Query.from_config(config)
+        return shard_outputs(config.get("outputs", []), self.shard)
+
+    def _finish_run(self, records: List[ConversationRecord], outputs: List[Dict[str, Any]]) -> None:
+        self._record_export_stats()
+        if self.shard is not None:
+            for result in self.export_results:
+                if result.ok and result.name == "jsonl":
+                    positions = {key: deque(value) for key, value in self.positions.items()}
+                    ordered = [positions[record.id].popleft() for record in records]
+                    write_order(result.output["path"], ordered)
+        self._finish_checkpoint(outputs)
+
+    def _normalizer(self) -> Normalizer:
+        """The run's normalizer; shard runs leave dedup to ``merge_shards``."""
+        if self.normalizer is not None:
+            return self.normalizer
+        return ShardNormalizer() if self.shard is not None else Normalizer()
+
+    def _remember_positions(
+        self, task: SourceTask, records: Iterable[ConversationRecord]
+    ) -> None:
+        """Record the positions of ``task``'s records (sharded runs only).
+
+        Indexes continue across the importers of one source, which run in turn.
+        """
+        if self.shard is None:
+            return
+        ordinal, base = self._position_base
+        if ordinal != task.ordinal:
+            base = 0
+        for record in records:
+            self.positions.setdefault(record.id, deque()).append((task.ordinal, base))
+            base += 1
+        self._position_base = (task.ordinal, base)
+
+    def _open_checkpoint(self, config: Dict[str, Any]) -> Optional[Checkpoint]:
+        runtime = config.get("runtime") or {}
+        resume = as_bool(runtime.get("resume"), False)
+        directory = runtime.get("checkpoint_dir")
+        if not directory and not resume:
+            return None
+        from rokpyl.core.checkpoint import DEFAULT_CHECKPOINT_DIR, Checkpoint
+
+        with self.instrumentation.stage("checkpoint"):
+            return Checkpoint.open(
+                directory or DEFAULT_CHECKPOINT_DIR,
+                config,
+                resume=resume,
+                interval_s=float(runtime.get("checkpoint_interval") or 30.0),
+            )
+
+    def _restore_source(self, task: SourceTask) -> Optional[List[ConversationRecord]]:
+        if self.checkpoint is None:
+            return None
+        with self.instrumentation.stage("checkpoint") as stats:
+            before = self.checkpoint.bytes_read
+            records = self.checkpoint.load_source(task)
+            if records is not None:
+                stats.sources += 1
+                stats.bytes_read += self.checkpoint.bytes_read - before
+                stats.count_records(records)
+        return records
+
+    def _save_source(self, task: SourceTask, records: List[ConversationRecord]) -> None:
+        if self.checkpoint is None:
+            return
+        with self.instrumentation.stage("checkpoint") as stats:
+            before = self.checkpoint.bytes_written
+            self.checkpoint.save_source(task, records)
+            stats.bytes_written += self.checkpoint.bytes_written - before
+
+    def _select(self, records: List[ConversationRecord]) -> List[ConversationRecord]:
+        """Apply the filters again, for importers that do not push them down."""
+        if self.query is None:
+            return records
+        return self.query.select(records)
+
+    def _project(self, records: Sequence[ConversationRecord]) -> Sequence[ConversationRecord]:
+        if self.query is None or self.query.fields is None:
+            return records
+        if records is self.spill:
+            assert self.spill is not None
+            return self.spill.mapped(self.query.project)
+        return [self.query.project(record) for record in records]
+
+    def _summarize(
+        self,
+        records: Sequence[ConversationRecord],
+        options: Dict[str, Any],
+        runtime: Dict[str, Any],
+    ) -> Sequence[ConversationRecord]:
+        assert self.summarizer is not None
+        store = self.spill
+        if store is None or records is not store:
+            return self.summarizer.summarize(list(records), options)
+        from rokpyl.core.spill import iter_batches
+
+        # Summarize a batch at a time so the budget still holds.
+        summarized = self.spill = self._record_store(runtime)
+        assert summarized is not None
+        for batch in iter_batches(store, SUMMARIZE_BATCH):
+            summarized.extend(self.summarizer.summarize(batch, options))
+        store.close()
+        return summarized
+
+    def _record_store(self, runtime: Dict[str, Any]) -> Optional[RecordStore]:
+        """A spilling store when ``runtime.max_memory`` is set."""
+        if runtime.get("max_memory") is None:
+            return None
+        from rokpyl.core.spill import RecordStore
+
+        return RecordStore.from_config(runtime)
+
+    def _store_attachments(self, task: SourceTask, records: List[ConversationRecord]) -> None:
+        """Move attachment bytes next to ``task.source`` into the attachment store."""
+        store = self.attachment_store
+        if store is None:
+            return
+        with self.instrumentation.stage("attachments") as stats:
+            read, written = store.stats.bytes_read, store.stats.bytes_written
+            store.ingest(records, task.source.parent, recursive=task.from_directory)
+            stats.sources += 1
+            stats.bytes_read += store.stats.bytes_read - read
+            stats.bytes_written += store.stats.bytes_written - written
+
+    def _close_attachments(self) -> None:
+        if self.attachment_store is not None:
+            self.attachment_store.close()
+
+    def _flush_checkpoint(self) -> None:
+        if self.checkpoint is None:
+            return
+        with self.instrumentation.stage("checkpoint") as stats:
+            before = self.checkpoint.bytes_written
+            self.checkpoint.flush()
+            stats.bytes_written += self.checkpoint.bytes_written - before
+
+    def _finish_checkpoint(self, outputs: List[Dict[str, Any]]) -> None:
+        """Record finished outputs; drop the checkpoint once everything succeeded."""
+        if self.checkpoint is None:
+            return
+        for result in self.export_results:
+            if not result.ok:
+                continue
+            for index, output in enumerate(outputs):
+                if output is result.output:
+                    self.checkpoint.mark_exported(index, output)
+        if not self.export_failures:
+            with self.instrumentation.stage("checkpoint"):
+                self.checkpoint.clear()
+
+    def _record_export_stats(self) -> None:
+        export_total = self.instrumentation.stats("export")
+        for result in self.export_results:
+            stats = self.instrumentation.stats(f"export:{result.name}")
+            stats.calls += 1
+            stats.wall_s += result.wall_s
+            stats.cpu_s += result.cpu_s
+            stats.records += result.records
+            stats.messages += result.messages
+            written = output_bytes(result.output, self.output_snapshots.get(id(result.output)))
+            stats.bytes_written += written
+            export_total.bytes_written += written
+
+    def _snapshot_outputs(self, jobs: List[Tuple[Exporter, Dict[str, Any]]]) -> None:
+        """Remember what is already at each output, so only new bytes are counted."""
+        self.output_snapshots = {id(output): output_snapshot(output) for _, output in jobs}
+
+    def iter_tasks(self, config: Dict[str, Any]) -> Iterator[SourceTask]:
+        """Resolve configured inputs into per-source parse tasks, in order.
+
+        With ``runtime.shard`` set, only this shard's sources are detected and
+        yielded; their ordinals still count every source.
+        """
+        runtime = config.get("runtime") or {}
+        shard = parse_shard(runtime.get("shard"))
+        query = Query.from_config(config)
+        if query is not None and self.summarizer is not None:
+            # Summaries are built from transcripts, even when ``fields`` drops them.
+            query = replace(query, needs_transcript=True)
+        split_workers = as_int(runtime.get("split_workers"), 0)
+        if split_workers > 1:
+            from rokpyl.core.split import usable_cpus
+
+            # More workers than cores only adds overhead; on one core splitting is off.
+            split_workers = min(split_workers, usable_cpus())
+        split_min_mb = runtime.get("split_min_mb")
+        split_min_bytes = None if split_min_mb is None else as_int(split_min_mb, 0) * 2**20
+        ordinal = 0
+        for input_index, entry in enumerate(config.get("inputs", [])):
             path = Path(entry["path"])
-            mode = entry.get("mode", "auto")
-            parser_name = entry.get("parser")
             options = entry.get("options") or {}
+            from_directory = path.is_dir()
+            for source in self._entry_sources(entry, path):
+                source_ordinal = ordinal
+                ordinal += 1
+                # Before detection, so each node only sniffs its own sources.
+                if shard is not None:
+                    index, count = shard
+                    if shard_of(shard_key(input_index, path, source), count) != index:
+                        continue
+                for importer_cls in self._entry_importers(entry, path, source):
+                    yield SourceTask(
+                        importer_cls,
+                        source,
+                        options,
+                        source_ordinal,
+                        query,
+                        split_workers,
+                        split_min_bytes,
+                        from_directory,
+                    )
 
-            if mode == "explicit" and parser_name:
-                importer_cls = self.importer_registry.get(parser_name)
-                records.extend(self._parse_with(importer_cls, path, options))
-                continue
+    def _entry_sources(self, entry: Dict[str, Any], path: Path) -> List[Path]:
+        """Candidate source files of one input, in order, before detection."""
+        parser_name = entry.get("parser")
+        if entry.get("mode", "auto") == "explicit" and parser_name:
+            importer_cls = self.importer_registry.get(parser_name)
+            sources: Iterable[Path] = importer_cls().discover_sources(path)
+        elif not path.exists():
+            sources = []
+        elif not path.is_dir():
+            sources = [path]
+        else:
+            found = set()
+            for importer_cls in self.importer_registry.all():
+                found.update(importer_cls().discover_sources(path))
+            sources = sorted(found)
+        return [
+            source
+            for source in sources
+            if self.source_filter is None or self.source_filter(source)
+        ]
 
-            for importer_cls in self._select_importers(path):
-                records.extend(self._parse_with(importer_cls, path, options))
+    def _entry_importers(
+        self, entry: Dict[str, Any], path: Path, source: Path
+    ) -> List[Type[Importer]]:
+        """Importers for one source.
 
-        records = normalize_records(records)
-        self._run_exporters(records, config.get("outputs", []))
-        return records
+        A file given directly must be recognized; unrecognized files found
+        while scanning a directory are recorded in ``skipped``.
+        """
+        parser_name = entry.get("parser")
+        if entry.get("mode", "auto") == "explicit" and parser_name:
+            return [self.importer_registry.get(parser_name)]
+        if source == path:
+            return list(self._select_importers(source))
+        from rokpyl.core.detection import UnknownFormatError
+
+        try:
+            return list(self._select_importers(source))
+        except UnknownFormatError as exc:
+            self.skipped.append((source, str(exc)))
+            return []
+
+    @property
+    def export_failures(self) -> List[ExportResult]:
+        return [result for result in self.export_results if not result.ok]
 
     def _select_importers(self, path: Path) -> Iterable[Type[Importer]]:
-        return select_importers(self.importer_registry._importers.values(), path)
-
-    def _parse_with(
-        self, importer_cls: Type[Importer], path: Path, options: Dict[str, Any]
-    ) -> List[ConversationRecord]:
-        importer = importer_cls()
-        records: List[ConversationRecord] = []
-        for source in importer.discover_sources(path):
-            records.extend(importer.parse(source, options))
-        return records
+        from rokpyl.core.detection import FingerprintIndex, detect_importers
+
+        importers = self.importer_registry.all()
+        if self._fingerprint_index is None:
+            self._fingerprint_index = FingerprintIndex(importers)
+        return detect_importers(importers, path, index=self._fingerprint_index)
 
-    def _run_exporters(self, records: List[ConversationRecord], outputs: List[Dict[str, Any]]) -> None:
-        for output in outputs:
+    def _exporter_jobs(
+        self, outputs: List[Dict[str, Any]]
+    ) -> List[Tuple[Exporter, Dict[str, Any]]]:
+        jobs = []
+        for index, output in enumerate(outputs):
             exporter_type = output.get("type")
             if not exporter_type:
                 continue
+            if self.checkpoint is not None and self.checkpoint.export_done(index, output):
+                continue
             exporter_cls = self.exporter_registry.get(exporter_type)
-            exporter = exporter_cls()
-            exporter.write(records, output)
+            jobs.append((exporter_cls(), output))
+        return jobs
+
+    def _run_exporters(
+        self,
+        records: Iterable[ConversationRecord],
+        outputs: List[Dict[str, Any]],
+        runtime: Dict[str, Any] | None = None,
+    ) -> None:
+        from rokpyl.core.fanout import fan_out, run_sequential
+
+        runtime = runtime or {}
+        jobs = self._exporter_jobs(outputs)
+        self._snapshot_outputs(jobs)
+        # Profiles and memory peaks need exporters that run one at a time.
+        concurrent = as_bool(runtime.get("concurrent_exports"), True)
+        if len(jobs) > 1 and concurrent and not self.instrumentation.per_stage:
+            queue_size = as_int(runtime.get("export_queue_size"), 256)
+            self.export_results = fan_out(
+                self._tap(records),
+                jobs,
+                queue_size=queue_size,
+                spill_dir=runtime.get("spill_dir"),
+            )
+        else:
+            if self.record_sink is not None:
+                for record in records:
+                    self.record_sink(record)
+            self.export_results = run_sequential(
+                records, jobs, profile=self.instrumentation.profile
+            )
+
+    def _tap(self, records: Iterable[ConversationRecord]) -> Iterator[ConversationRecord]:
+        """``records``, each also handed to ``record_sink`` as it is exported."""
+        sink = self.record_sink
+        for record in records:
+            if sink is not None:
+                sink(record)
+            yield record
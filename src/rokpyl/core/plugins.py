@@ -0,0 +1,127 @@
+"""Local plugin discovery.
+
+Custom importers and exporters live as ``*.py`` files under
+``<plugins_dir>/local_importers`` and ``<plugins_dir>/local_exporters``.
+Discovery must not import them (that would defeat lazy loading), so each file
+is scanned once for classes with a literal ``name = "..."`` attribute and the
+result is cached in ``<plugins_dir>/.manifest.json`` keyed by file size and
+modification time. Later runs only re-scan files that changed.
+"""
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from rokpyl.core.registry import ExporterRegistry, ImporterRegistry
+
+MANIFEST_NAME = ".manifest.json"
+MANIFEST_VERSION = 1
+KINDS = ("local_importers", "local_exporters")
+DEFAULT_PLUGINS_DIR = "plugins"
+
+# [name, class] pairs found in one plugin file.
+Entries = List[List[str]]
+
+
+def _scan_file(path: Path) -> Entries:
+    """Top-level classes of ``path`` that assign a string literal to ``name``."""
+    import ast  # only needed when a plugin file is new or changed
+
+    tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+    found: Entries = []
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        for statement in node.body:
+            if isinstance(statement, ast.Assign):
+                targets = statement.targets
+            elif isinstance(statement, ast.AnnAssign) and statement.value is not None:
+                targets = [statement.target]
+            else:
+                continue
+            value = statement.value
+            if (
+                any(isinstance(target, ast.Name) and target.id == "name" for target in targets)
+                and isinstance(value, ast.Constant)
+                and isinstance(value.value, str)
+                and value.value
+            ):
+                found.append([value.value, node.name])
+                break
+    return found
+
+
+def _load_manifest(path: Path) -> Dict[str, Any]:
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("files") or {}
+
+
+def discover(plugins_dir: str | Path) -> Dict[str, List[Tuple[str, str]]]:
+    """Map each kind to ``(name, "file.py:Class")`` targets, refreshing the manifest."""
+    root = Path(plugins_dir)
+    manifest_path = root / MANIFEST_NAME
+    cached = _load_manifest(manifest_path)
+    files: Dict[str, Any] = {}
+    result: Dict[str, List[Tuple[str, str]]] = {kind: [] for kind in KINDS}
+    for kind in KINDS:
+        directory = root / kind
+        if not directory.is_dir():
+            continue
+        for path in sorted(directory.glob("*.py")):
+            if path.name.startswith("_"):
+                continue
+            stat = path.stat()
+            key = f"{kind}/{path.name}"
+            entry = cached.get(key)
+            if not (
+                entry
+                and entry.get("size") == stat.st_size
+                and entry.get("mtime_ns") == stat.st_mtime_ns
+            ):
+                entry = {
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "classes": _scan_file(path),
+                }
+            files[key] = entry
+            result[kind].extend((name, f"{path}:{cls}") for name, cls in entry["classes"])
+    if files != cached:
+        payload = json.dumps({"version": MANIFEST_VERSION, "files": files}, indent=2)
+        tmp = manifest_path.with_name(MANIFEST_NAME + ".tmp")
+        try:
+            tmp.write_text(payload, encoding="utf-8")
+            os.replace(tmp, manifest_path)
+        except OSError:
+            pass  # read-only plugin directories still work, just without the cache
+    return result
+
+
+def resolve_plugins_dir(config: Optional[Dict[str, Any]] = None) -> Optional[Path]:
+    """``plugins_dir`` from config (or ``ROKPYL__PLUGINS_DIR``), else ``./plugins`` if present."""
+    value = (config or {}).get("plugins_dir")
+    if value:
+        return Path(value)
+    default = Path(DEFAULT_PLUGINS_DIR)
+    return default if default.is_dir() else None
+
+
+def register_plugins(
+    plugins_dir: str | Path,
+    importers: Optional[ImporterRegistry] = None,
+    exporters: Optional[ExporterRegistry] = None,
+) -> None:
+    """Register discovered plugins lazily; names may not shadow built-ins."""
+    found = discover(plugins_dir)
+    if importers is not None:
+        for name, target in found["local_importers"]:
+            importers.register_lazy(name, target)
+    if exporters is not None:
+        for name, target in found["local_exporters"]:
+            exporters.register_lazy(name, target)
@@ -0,0 +1,174 @@
+"""Record filters and field projection, pushed down into importers.
+
+``filter`` selects conversations by date window, platform and title;
+``fields`` keeps only some record fields. The pipeline hands the ``Query``
+to importers as ``options["query"]`` so they can reject a conversation from
+its header (title, date, platform) before decoding any message, and skip
+building ``Message`` objects and transcripts that the projection drops.
+Importers that ignore the query stay correct: the pipeline filters parsed
+records again and applies the projection after normalization.
+
+Config::
+
+    filter:
+      since: 2024-01-01        # date >= since (ISO date or datetime)
+      until: 2024-07-01        # date < until
+      platform: ChatGPT        # case-insensitive
+      title_match: "^Research" # case-insensitive regular expression
+    fields: [date, summary]    # id, platform and title are always kept
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, fields as dataclass_fields
+from datetime import datetime, timezone
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Pattern
+
+from rokpyl.core.config import ConfigError
+from rokpyl.models.canonical import ConversationRecord
+
+RECORD_FIELDS = tuple(item.name for item in dataclass_fields(ConversationRecord))
+ALWAYS_KEPT = frozenset({"id", "platform", "title"})
+_DEFAULTS = {"transcript": "", "messages": list, "metadata": dict}
+
+
+def parse_timestamp(value: Any) -> Optional[float]:
+    """Seconds since the epoch for an ISO date/datetime or a number; naive is UTC."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str) and value.strip():
+        text = value.strip()
+        if text.endswith("Z"):
+            text = text[:-1] + "+00:00"
+        try:
+            parsed = datetime.fromisoformat(text)
+        except ValueError:
+            return None
+    else:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _bound(filters: Dict[str, Any], key: str) -> Optional[float]:
+    value = filters.get(key)
+    if value is None or value == "":
+        return None
+    if hasattr(value, "isoformat") and not isinstance(value, datetime):
+        value = value.isoformat()  # YAML dates
+    timestamp = parse_timestamp(value)
+    if timestamp is None:
+        raise ConfigError(f"Invalid filter.{key} date: {value}")
+    return timestamp
+
+
+@dataclass(frozen=True)
+class Query:
+    since: Optional[float] = None
+    until: Optional[float] = None
+    platform: Optional[str] = None
+    title_match: Optional[Pattern[str]] = None
+    fields: Optional[FrozenSet[str]] = None
+    # Set by the pipeline when a stage after import (the summarizer) reads
+    # transcripts, whatever the projection keeps.
+    needs_transcript: bool = False
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["Query"]:
+        """The query for ``filter``/``fields``, or ``None`` when neither is set."""
+        filters = config.get("filter") or {}
+        if not isinstance(filters, dict):
+            raise ConfigError("filter must be a mapping")
+        unknown = set(filters) - {"since", "until", "platform", "title_match"}
+        if unknown:
+            raise ConfigError(f"Unknown filter keys: {', '.join(sorted(unknown))}")
+        title = filters.get("title_match")
+        try:
+            pattern = re.compile(str(title), re.IGNORECASE) if title else None
+        except re.error as exc:
+            raise ConfigError(f"Invalid filter.title_match: {exc}") from exc
+        query = cls(
+            since=_bound(filters, "since"),
+            until=_bound(filters, "until"),
+            platform=str(filters["platform"]).casefold() if filters.get("platform") else None,
+            title_match=pattern,
+            fields=_parse_fields(config.get("fields")),
+        )
+        return None if query == cls() else query
+
+    @property
+    def filters_dates(self) -> bool:
+        return self.since is not None or self.until is not None
+
+    def accepts_platform(self, platform: Optional[str]) -> bool:
+        return self.platform is None or (platform or "").casefold() == self.platform
+
+    def accepts(self, *, title: Optional[str], date: Any, platform: Optional[str] = None) -> bool:
+        """Header-level check; ``platform`` is skipped when not given."""
+        if platform is not None and not self.accepts_platform(platform):
+            return False
+        if self.title_match is not None and not self.title_match.search(title or ""):
+            return False
+        if self.filters_dates:
+            timestamp = parse_timestamp(date)
+            if timestamp is None:
+                return False
+            if self.since is not None and timestamp < self.since:
+                return False
+            if self.until is not None and timestamp >= self.until:
+                return False
+        return True
+
+    def accepts_record(self, record: ConversationRecord) -> bool:
+        return self.accepts(title=record.title, date=record.date, platform=record.platform)
+
+    def wants(self, name: str) -> bool:
+        return self.fields is None or name in self.fields
+
+    def needs_messages(self, *, has_id: bool = True) -> bool:
+        """Whether an importer must decode messages for a conversation.
+
+        Without a platform id the fallback id hashes the transcript, so
+        messages are still needed to keep ids stable across projections; a
+        summarizer needs them to build its summaries.
+        """
+        return (
+            not has_id
+            or self.needs_transcript
+            or self.wants("messages")
+            or self.wants("transcript")
+        )
+
+    def project(self, record: ConversationRecord) -> ConversationRecord:
+        """Reset fields outside the projection to their defaults, in place."""
+        if self.fields is None:
+            return record
+        for name in RECORD_FIELDS:
+            if name in self.fields:
+                continue
+            default = _DEFAULTS.get(name)
+            setattr(record, name, default() if callable(default) else default)
+        return record
+
+    def select(self, records: Iterable[ConversationRecord]) -> List[ConversationRecord]:
+        """Records that pass the filters (for importers that ignore the query)."""
+        return [record for record in records if self.accepts_record(record)]
+
+
+def _parse_fields(value: Any) -> Optional[FrozenSet[str]]:
+    if value is None or value == "" or value == []:
+        return None
+    if isinstance(value, str):
+        value = [item.strip() for item in value.split(",")]
+    if not isinstance(value, (list, tuple)):
+        raise ConfigError("fields must be a list or a comma-separated string")
+    names = frozenset(str(item) for item in value if item)
+    unknown = names - set(RECORD_FIELDS)
+    if unknown:
+        raise ConfigError(
+            f"Unknown fields: {', '.join(sorted(unknown))}; choose from {', '.join(RECORD_FIELDS)}"
+        )
+    return names | ALWAYS_KEPT
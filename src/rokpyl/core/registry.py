@@ -1,51 +1,101 @@
-"""Importer registry."""
+"""Importer and exporter registries.
+
+Classes can be registered directly or lazily as ``"module:Class"`` (or
+``"path/to/file.py:Class"`` for local plugins); lazy entries are imported on
+first use, so a run only pays for the importers and exporters it touches.
+"""
 from __future__ import annotations
 
-from typing import Dict, List, Type
+import importlib
+import importlib.util
+import sys
+from pathlib import Path
+from typing import Any, Dict, Generic, List, Type, TypeVar
 
 from rokpyl.importers.base import Importer
 from rokpyl.exporters.base import Exporter
 
+T = TypeVar("T")
 
-class ImporterRegistry:
-    def __init__(self) -> None:
-        self._importers: Dict[str, Type[Importer]] = {}
 
-    def register(self, importer_cls: Type[Importer]) -> None:
-        name = getattr(importer_cls, "name", None)
-        if not name:
-            raise ValueError("Importer must define a non-empty name")
-        if name in self._importers:
-            raise ValueError(f"Importer already registered: {name}")
-        self._importers[name] = importer_cls
+def load_object(target: str) -> Any:
+    """Import ``module:attr`` or ``file.py:attr``."""
+    module_name, sep, attr = target.rpartition(":")
+    if not sep or not module_name or not attr:
+        raise ValueError(f"Invalid plugin target: {target}")
+    if module_name.endswith(".py"):
+        path = Path(module_name)
+        name = f"rokpyl_plugins.{path.parent.name}.{path.stem}"
+        module = sys.modules.get(name)
+        if module is None:
+            spec = importlib.util.spec_from_file_location(name, path)
+            if spec is None or spec.loader is None:
+                raise ImportError(f"Cannot load plugin: {path}")
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[name] = module
+            try:
+                spec.loader.exec_module(module)
+            except BaseException:
+                del sys.modules[name]
+                raise
+    else:
+        module = importlib.import_module(module_name)
+    return getattr(module, attr)
 
-    def get(self, name: str) -> Type[Importer]:
-        try:
-            return self._importers[name]
-        except KeyError as exc:
-            raise KeyError(f"Unknown importer: {name}") from exc
 
-    def list_names(self) -> List[str]:
-        return sorted(self._importers.keys())
+class _Registry(Generic[T]):
+    kind = "Plugin"
 
-
-class ExporterRegistry:
     def __init__(self) -> None:
-        self._exporters: Dict[str, Type[Exporter]] = {}
+        self._classes: Dict[str, Type[T]] = {}
+        self._lazy: Dict[str, str] = {}
+        self._order: List[str] = []
+
+    def register(self, cls: Type[T]) -> None:
+        name = getattr(cls, "name", None)
+        if not name:
+            raise ValueError(f"{self.kind} must define a non-empty name")
+        self._check_new(name)
+        self._classes[name] = cls
+        self._order.append(name)
 
-    def register(self, exporter_cls: Type[Exporter]) -> None:
-        name = getattr(exporter_cls, "name", None)
+    def register_lazy(self, name: str, target: str) -> None:
+        """Register ``target`` (``module:Class``) under ``name`` without importing it."""
         if not name:
-            raise ValueError("Exporter must define a non-empty name")
-        if name in self._exporters:
-            raise ValueError(f"Exporter already registered: {name}")
-        self._exporters[name] = exporter_cls
+            raise ValueError(f"{self.kind} must define a non-empty name")
+        self._check_new(name)
+        self._lazy[name] = target
+        self._order.append(name)
 
-    def get(self, name: str) -> Type[Exporter]:
-        try:
-            return self._exporters[name]
-        except KeyError as exc:
-            raise KeyError(f"Unknown exporter: {name}") from exc
+    def _check_new(self, name: str) -> None:
+        if name in self._classes or name in self._lazy:
+            raise ValueError(f"{self.kind} already registered: {name}")
+
+    def get(self, name: str) -> Type[T]:
+        cls = self._classes.get(name)
+        if cls is not None:
+            return cls
+        target = self._lazy.get(name)
+        if target is None:
+            raise KeyError(f"Unknown {self.kind.lower()}: {name}")
+        cls = load_object(target)
+        if getattr(cls, "name", None) != name:
+            raise ValueError(f"{target} does not define {self.kind.lower()} {name!r}")
+        self._classes[name] = cls
+        del self._lazy[name]
+        return cls
+
+    def all(self) -> List[Type[T]]:
+        """Every registered class in registration order (imports lazy entries)."""
+        return [self.get(name) for name in self._order]
 
     def list_names(self) -> List[str]:
-        return sorted(self._exporters.keys())
+        return sorted(self._order)
+
+
+class ImporterRegistry(_Registry[Importer]):
+    kind = "Importer"
+
+
+class ExporterRegistry(_Registry[Exporter]):
+    kind = "Exporter"
@@ -0,0 +1,136 @@
+"""Lightweight schema inference for decoded JSON values.
+
+A schema node counts the types seen at one position, with child nodes for
+object properties and array items and a few scalar examples. Nodes are built
+in a single pass by ``SchemaAccumulator`` and partial results merge, so
+samples can be inferred in parallel. Shared by format detection and the
+schema tool in ``rokpyl.tools.json_schema``.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable
+
+
+def _type_name(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int) and not isinstance(value, bool):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, list):
+        return "array"
+    if isinstance(value, dict):
+        return "object"
+    return "unknown"
+
+
+def _empty_schema() -> Dict[str, Any]:
+    return {
+        "type_counts": {},
+        "properties": {},
+        "items": None,
+        "examples": [],
+    }
+
+
+def _add_example(schema: Dict[str, Any], value: Any, max_examples: int) -> None:
+    if len(schema["examples"]) >= max_examples:
+        return
+    if isinstance(value, (dict, list)):
+        return
+    schema["examples"].append(value)
+
+
+def merge_schema(
+    target: Dict[str, Any], source: Dict[str, Any], *, max_examples: int = 5
+) -> Dict[str, Any]:
+    for name, count in source["type_counts"].items():
+        target["type_counts"][name] = target["type_counts"].get(name, 0) + count
+
+    for key, child in source["properties"].items():
+        if key not in target["properties"]:
+            target["properties"][key] = _empty_schema()
+        merge_schema(target["properties"][key], child, max_examples=max_examples)
+
+    if source["items"] is not None:
+        if target["items"] is None:
+            target["items"] = _empty_schema()
+        merge_schema(target["items"], source["items"], max_examples=max_examples)
+
+    for example in source["examples"]:
+        _add_example(target, example, max_examples=max_examples)
+
+    return target
+
+
+def _accumulate(schema: Dict[str, Any], value: Any, max_examples: int) -> None:
+    type_counts = schema["type_counts"]
+    type_name = _type_name(value)
+    type_counts[type_name] = type_counts.get(type_name, 0) + 1
+
+    if isinstance(value, dict):
+        properties = schema["properties"]
+        for key, item in value.items():
+            child = properties.get(key)
+            if child is None:
+                child = properties[key] = _empty_schema()
+            _accumulate(child, item, max_examples)
+    elif isinstance(value, list):
+        items = schema["items"]
+        if items is None:
+            items = schema["items"] = _empty_schema()
+        for item in value:
+            _accumulate(items, item, max_examples)
+    elif len(schema["examples"]) < max_examples:
+        schema["examples"].append(value)
+
+
+class SchemaAccumulator:
+    """Single-pass schema builder; partial results merge with ``merge``."""
+
+    def __init__(self, *, max_examples: int = 5) -> None:
+        self.max_examples = max_examples
+        self.schema = _empty_schema()
+
+    def add(self, value: Any) -> None:
+        _accumulate(self.schema, value, self.max_examples)
+
+    def merge(self, other: "SchemaAccumulator | Dict[str, Any]") -> "SchemaAccumulator":
+        source = other.schema if isinstance(other, SchemaAccumulator) else other
+        merge_schema(self.schema, source, max_examples=self.max_examples)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self.schema
+
+
+def infer_schema(value: Any, *, max_examples: int = 5) -> Dict[str, Any]:
+    accumulator = SchemaAccumulator(max_examples=max_examples)
+    accumulator.add(value)
+    return accumulator.to_dict()
+
+
+def infer_from_iter(values: Iterable[Any], *, max_items: int, max_examples: int) -> Dict[str, Any]:
+    accumulator = SchemaAccumulator(max_examples=max_examples)
+    for idx, value in enumerate(values, start=1):
+        accumulator.add(value)
+        if idx >= max_items:
+            break
+    return accumulator.to_dict()
+
+
+def annotate_presence(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Add a ``presence`` rate to every property: occurrences / parent objects."""
+    objects = schema["type_counts"].get("object", 0)
+    for child in schema["properties"].values():
+        seen = sum(child["type_counts"].values())
+        child["presence"] = round(seen / objects, 4) if objects else 0.0
+        annotate_presence(child)
+    if schema["items"] is not None:
+        annotate_presence(schema["items"])
+    return schema
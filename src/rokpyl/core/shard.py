@@ -0,0 +1,138 @@
+"""Deterministic sharding of sources across nodes, and merging shard outputs.
+
+``--shard i/N`` keeps the sources whose stable key hashes to shard ``i``
+(1-based). The key is the input's index plus the source path relative to the
+input, so nodes may mount the archive at different paths as long as they see
+the same files. Outputs get a ``.shard-i-of-N`` suffix.
+
+Every discovered source has an ordinal in the unsharded source order, and
+each shard JSONL output is written with a ``.order`` sidecar holding the
+``[ordinal, index]`` position of every line. Id/url dedup depends on order and
+is transitive (a record dropped for its id still claims its url), so it
+cannot be applied per shard: shard runs keep every record (``ShardNormalizer``)
+and ``merge_shards`` merges shard outputs by position and runs one
+``Normalizer`` pass in the global order, which reproduces the single-node
+output exactly.
+"""
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from rokpyl.core.config import ConfigError
+from rokpyl.core.normalize import Normalizer
+from rokpyl.models.canonical import ConversationRecord, record_from_dict
+
+Position = Tuple[int, int]
+ORDER_SUFFIX = ".order"
+
+
+class ShardNormalizer(Normalizer):
+    """Fills defaults but keeps duplicates; ``merge_shards`` dedupes globally."""
+
+    def admit(self, record: ConversationRecord) -> bool:
+        return True
+
+
+def parse_shard(value: Any) -> Optional[Tuple[int, int]]:
+    """Parse ``"i/N"`` into ``(i, N)``; ``None`` when sharding is off."""
+    if value in (None, ""):
+        return None
+    try:
+        index_text, count_text = str(value).split("/")
+        index, count = int(index_text), int(count_text)
+    except ValueError as exc:
+        raise ConfigError(f"Invalid shard {value!r}; expected i/N") from exc
+    if count < 1 or not 1 <= index <= count:
+        raise ConfigError(f"Invalid shard {value!r}; need 1 <= i <= N")
+    return index, count
+
+
+def shard_key(input_index: int, root: Path, source: Path) -> str:
+    try:
+        relative = source.relative_to(root).as_posix() if root != source else source.name
+    except ValueError:
+        relative = source.as_posix()
+    return f"{input_index}:{relative}"
+
+
+def shard_of(key: str, count: int) -> int:
+    """1-based shard for ``key``; stable across processes and machines."""
+    digest = hashlib.sha1(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def tagged_path(path: str, tag: str) -> str:
+    """Insert ``tag`` before a file suffix, or append it to a directory name."""
+    target = Path(path)
+    if target.suffix:
+        return str(target.with_name(f"{target.stem}{tag}{target.suffix}"))
+    return str(target.with_name(target.name + tag))
+
+
+def shard_path(path: str, shard: Tuple[int, int]) -> str:
+    index, count = shard
+    return tagged_path(path, f".shard-{index}-of-{count}")
+
+
+def shard_outputs(
+    outputs: List[Dict[str, Any]], shard: Optional[Tuple[int, int]]
+) -> List[Dict[str, Any]]:
+    if shard is None:
+        return outputs
+    sharded = []
+    for output in outputs:
+        output = dict(output)
+        for key in ("path", "dir", "raw_jsonl"):
+            if output.get(key):
+                output[key] = shard_path(output[key], shard)
+        sharded.append(output)
+    return sharded
+
+
+def order_path(path: str | Path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + ORDER_SUFFIX)
+
+
+def write_order(path: str | Path, positions: Sequence[Position]) -> None:
+    lines = [json.dumps(list(position)) for position in positions]
+    order_path(path).write_text("\n".join(lines), encoding="utf-8")
+
+
+def _iter_shard(path: Path) -> Iterator[Tuple[Position, str]]:
+    order = order_path(path)
+    if not order.exists():
+        raise ValueError(f"Missing shard order file: {order}")
+    with path.open("r", encoding="utf-8") as lines, order.open("r", encoding="utf-8") as positions:
+        for line, position in zip(lines, positions):
+            ordinal, index = json.loads(position)
+            yield (ordinal, index), line.rstrip("\n")
+
+
+def merge_shards(paths: Sequence[str | Path], out: str | Path) -> int:
+    """Merge shard JSONL outputs into ``out``; returns the records written.
+
+    Shard files are already in position order, so this is a streaming k-way
+    merge holding one line per shard plus the dedup keys.
+    """
+    normalizer = Normalizer()
+    merged = heapq.merge(*(_iter_shard(Path(path)) for path in paths), key=lambda item: item[0])
+    out_path = Path(out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    with out_path.open("w", encoding="utf-8") as handle:
+        for _, line in merged:
+            if not line.strip():
+                continue
+            if normalizer.process(record_from_dict(json.loads(line))) is None:
+                continue
+            # Match JsonlExporter: newline-separated, no trailing newline.
+            if written:
+                handle.write("\n")
+            handle.write(line)
+            written += 1
+    return written
@@ -0,0 +1,219 @@
+"""Memory-budgeted record storage for a run.
+
+Both engines keep every normalized record of a run (the sequential engine to
+summarize and export them, the async engine to return them). With
+``runtime.max_memory`` set they collect into a ``RecordStore`` instead of a
+list: once the estimated size of the records it holds passes the budget, they
+are pickled to a temporary file and dropped from memory, and reading the store
+streams them back in insertion order. Dedup state (seen ids and urls) stays in
+memory, so normalization behaves exactly as without a budget.
+
+Sizes are estimated from string lengths plus fixed per-object overheads, like
+``rokpyl.core.merge``; lazy records count their raw payload and are spilled
+without being decoded.
+"""
+from __future__ import annotations
+
+import pickle
+import tempfile
+import threading
+from array import array
+from itertools import islice
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+)
+
+from rokpyl.core.config import as_size
+from rokpyl.models.canonical import ConversationRecord, LazyConversationRecord
+
+# Rough per-object cost beyond string contents: instance, dicts, lists, fields.
+_RECORD_OVERHEAD = 1000
+_MESSAGE_OVERHEAD = 400
+_ATTACHMENT_OVERHEAD = 300
+_READ_BLOCK = 1 << 20
+
+
+def _text_size(value: Any) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(_text_size(item) for item in value)
+    if isinstance(value, dict):
+        return sum(len(str(key)) + _text_size(item) for key, item in value.items())
+    return 32
+
+
+def estimate_size(record: ConversationRecord) -> int:
+    """Approximate bytes a record keeps alive, without decoding lazy records."""
+    size = _RECORD_OVERHEAD + sum(
+        _text_size(value)
+        for value in (record.id, record.title, record.project, record.date, record.summary)
+    )
+    size += _text_size(record.url) + _text_size(record.metadata)
+    if isinstance(record, LazyConversationRecord) and not record.decoded:
+        return size + _text_size(record.pending)
+    size += len(record.transcript or "")
+    for message in record.messages:
+        size += _MESSAGE_OVERHEAD + _text_size(message.content)
+        size += _ATTACHMENT_OVERHEAD * len(message.attachments)
+    return size
+
+
+class RecordStore(Sequence[ConversationRecord]):
+    """An append-only sequence of records that spills to disk past ``max_bytes``.
+
+    Appending is single-threaded; reads may run in several threads at once
+    (exporters fanned out), each streaming from its own file position.
+    """
+
+    def __init__(self, max_bytes: int, *, tmp_dir: Optional[str] = None) -> None:
+        self.max_bytes = max(0, max_bytes)
+        self.tmp_dir = tmp_dir
+        self.memory_bytes = 0
+        self.spills = 0
+        self._memory: List[ConversationRecord] = []
+        self._file: Optional[BinaryIO] = None
+        # Offset of every spilled record, plus the end of the last one.
+        self._offsets = array("q", [0])
+        self._lock = threading.Lock()
+        self._transform: Optional[Callable[[ConversationRecord], ConversationRecord]] = None
+
+    @classmethod
+    def from_config(cls, runtime: Dict[str, Any]) -> Optional["RecordStore"]:
+        """A store for ``runtime.max_memory``, or ``None`` when no budget is set."""
+        max_bytes = as_size(runtime.get("max_memory"))
+        if max_bytes is None:
+            return None
+        return cls(max_bytes, tmp_dir=runtime.get("spill_dir"))
+
+    @property
+    def spilled(self) -> int:
+        return len(self._offsets) - 1
+
+    @property
+    def spilled_bytes(self) -> int:
+        return self._offsets[-1]
+
+    def append(self, record: ConversationRecord) -> None:
+        self._memory.append(record)
+        self.memory_bytes += estimate_size(record)
+        if self.memory_bytes > self.max_bytes:
+            self.spill()
+
+    def extend(self, records: Iterable[ConversationRecord]) -> None:
+        for record in records:
+            self.append(record)
+
+    def spill(self) -> None:
+        """Move the records held in memory to the spill file."""
+        if not self._memory:
+            return
+        with self._lock:
+            if self._file is None:
+                self._file = tempfile.TemporaryFile(prefix="rokpyl-spill-", dir=self.tmp_dir)
+            self._file.seek(self._offsets[-1])
+            for record in self._memory:
+                self._file.write(pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL))
+                self._offsets.append(self._file.tell())
+            self._file.flush()
+        self._memory = []
+        self.memory_bytes = 0
+        self.spills += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_bytes": self.max_bytes,
+            "records": len(self),
+            "spilled_records": self.spilled,
+            "spilled_bytes": self.spilled_bytes,
+            "spills": self.spills,
+        }
+
+    def mapped(self, func: Callable[[ConversationRecord], ConversationRecord]) -> "RecordStore":
+        """A read-only view applying ``func`` to each record as it is read."""
+        view = RecordStore.__new__(RecordStore)
+        view.__dict__.update(self.__dict__)
+        previous = self._transform
+        view._transform = func if previous is None else (lambda record: func(previous(record)))
+        return view
+
+    def close(self) -> None:
+        """Delete the spill file; spilled records can no longer be read."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self) -> "RecordStore":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.spilled + len(self._memory)
+
+    def __iter__(self) -> Iterator[ConversationRecord]:
+        spilled = self.spilled
+        memory = list(self._memory)
+        for record in self._read(0, spilled):
+            yield self._apply(record)
+        for record in memory:
+            yield self._apply(record)
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[position] for position in range(start, stop, step)]
+            return list(islice(iter(self), start, max(start, stop)))
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("record index out of range")
+        if index >= self.spilled:
+            return self._apply(self._memory[index - self.spilled])
+        return self._apply(next(self._read(index, index + 1)))
+
+    def _apply(self, record: ConversationRecord) -> ConversationRecord:
+        return record if self._transform is None else self._transform(record)
+
+    def _read(self, first: int, last: int) -> Iterator[ConversationRecord]:
+        """Unpickle spilled records ``first`` to ``last - 1``, a block at a time."""
+        offsets = self._offsets
+        index = first
+        while index < last:
+            start = offsets[index]
+            end = index + 1
+            while end < last and offsets[end + 1] - start <= _READ_BLOCK:
+                end += 1
+            with self._lock:
+                assert self._file is not None
+                self._file.seek(start)
+                block = self._file.read(offsets[end] - start)
+            view = memoryview(block)
+            for position in range(index, end):
+                yield pickle.loads(view[offsets[position] - start : offsets[position + 1] - start])
+            index = end
+
+
+def iter_batches(
+    records: Iterable[ConversationRecord], size: int
+) -> Iterator[List[ConversationRecord]]:
+    iterator = iter(records)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
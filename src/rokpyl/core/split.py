@@ -0,0 +1,243 @@
+"""Parallel parsing of one large JSON array export.
+
+A multi-GB ``conversations.json`` is a single top-level array, so one process
+normally decodes all of it. With ``runtime.split_workers`` set, sources of at
+least ``runtime.split_min_mb`` whose importer supports it are memory-mapped
+and cut into element-aligned byte ranges. Each worker maps the file itself,
+decodes its range straight from the mapped pages and builds records with the
+importer's ``parse_items``; results are concatenated in range order, so the
+output equals a sequential parse.
+
+Finding every element boundary exactly takes a scan that tracks string,
+escape and bracket depth over the whole file, which in Python costs more
+than ``json.loads``. Only the first element is scanned that way
+(``_element_end``), to learn the bytes that close one top-level element and
+open the next (``},{"title":`` in a compact export). That signature is then
+searched for near each cut point. A match can sit inside a string or a
+nested object, so the cuts are speculative and decoding verifies them: the
+first range starts on a real element, and a range that decodes from a real
+element start ends on a real element end, so when every range decodes every
+cut was a boundary. Otherwise the caller falls back to a sequential parse.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Pattern, Tuple, Type
+
+from rokpyl.importers.base import Importer
+from rokpyl.models.canonical import ConversationRecord
+
+DEFAULT_MIN_BYTES = 64 * 1024 * 1024
+
+_BOM = b"\xef\xbb\xbf"
+_WS = b" \t\r\n"
+_STRUCTURE = re.compile(rb'["\[\]{}]')
+_STRING_TAIL = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_SCALAR = rb'(?:"[^"\\]*(?:\\.[^"\\]*)*"|-?[0-9][0-9.eE+-]*|true|false|null)'
+_TEXT_WS = re.compile(r"[ \t\r\n]*")
+_DECODER = json.JSONDecoder()
+
+Range = Tuple[int, int]
+
+
+def _skip_ws(data: Any, pos: int) -> int:
+    end = len(data)
+    while pos < end and data[pos] in _WS:
+        pos += 1
+    return pos
+
+
+def _string_end(data: Any, pos: int) -> int:
+    """End of the JSON string whose opening quote is at ``pos``."""
+    match = _STRING_TAIL.match(data, pos + 1)
+    if match is None:
+        raise ValueError(f"Unterminated string at byte {pos}")
+    return match.end()
+
+
+def _element_end(data: Any, start: int) -> int:
+    """End of the object or array at ``start``, tracking strings and depth."""
+    depth = 0
+    pos = start
+    while True:
+        match = _STRUCTURE.search(data, pos)
+        if match is None:
+            raise ValueError(f"Unterminated value at byte {start}")
+        char = match.group()
+        if char == b'"':
+            pos = _string_end(data, match.start())
+            continue
+        pos = match.end()
+        if char in (b"[", b"{"):
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return pos
+
+
+def _signature(data: Any, first_end: int, limit: int) -> Optional[Tuple[Pattern[bytes], int]]:
+    """Pattern for "end of one element, start of the next", learned from the
+    first two elements, and the offset of the next element's ``{`` in a match.
+
+    The pattern covers the next element's first key and, when its value is a
+    scalar, that value and the second key, which keeps nested objects with the
+    same first key (messages inside a conversation) from matching.
+    """
+    comma = _skip_ws(data, first_end)
+    if comma >= limit or data[comma : comma + 1] != b",":
+        return None
+    start = _skip_ws(data, comma + 1)
+    key = _skip_ws(data, start + 1)
+    if data[start : start + 1] != b"{" or data[key : key + 1] != b'"':
+        return None
+    colon = _skip_ws(data, _string_end(data, key))
+    if data[colon : colon + 1] != b":":
+        return None
+    value = _skip_ws(data, colon + 1)
+    head = bytes(data[first_end - 1 : value])
+    offset = start - (first_end - 1)
+    scalar = re.compile(_SCALAR).match(data, value)
+    if scalar is not None:
+        after = _skip_ws(data, scalar.end())
+        second = _skip_ws(data, after + 1)
+        if data[after : after + 1] == b"," and data[second : second + 1] == b'"':
+            tail = bytes(data[scalar.end() : _string_end(data, second)])
+            return re.compile(re.escape(head) + _SCALAR + re.escape(tail)), offset
+    return re.compile(re.escape(head)), offset
+
+
+def element_ranges(data: Any, parts: int) -> Optional[List[Range]]:
+    """Up to ``parts`` byte ranges of a top-level JSON array of objects.
+
+    Each range spans whole elements and their separating commas, without the
+    brackets. ``None`` when ``data`` is not such an array or holds fewer than
+    two elements. The cuts are speculative; see the module docstring.
+    """
+    pos = _skip_ws(data, 3 if data[:3] == _BOM else 0)
+    if data[pos : pos + 1] != b"[":
+        return None
+    first = _skip_ws(data, pos + 1)
+    close = len(data) - 1
+    while close > first and data[close] in _WS:
+        close -= 1
+    if data[close : close + 1] != b"]" or data[first : first + 1] != b"{":
+        return None
+    end = close
+    while end > first and data[end - 1] in _WS:
+        end -= 1
+    try:
+        first_end = _element_end(data, first)
+        signature = _signature(data, first_end, end)
+    except ValueError:
+        return None
+    if signature is None:
+        return None
+    pattern, offset = signature
+
+    ranges: List[Range] = []
+    start = first
+    span = end - first
+    for index in range(1, max(1, parts)):
+        target = max(first + span * index // parts, start + 1)
+        match = pattern.search(data, target, end)
+        if match is None:
+            break
+        ranges.append((start, match.start() + 1))
+        start = match.start() + offset
+    ranges.append((start, end))
+    return ranges
+
+
+def decode_items(text: str) -> List[Any]:
+    """Decode comma-separated JSON values (the inside of an array slice)."""
+    items: List[Any] = []
+    pos = 0
+    while True:
+        item, pos = _DECODER.raw_decode(text, pos)
+        items.append(item)
+        pos = _TEXT_WS.match(text, pos).end()
+        if pos == len(text):
+            return items
+        if text[pos] != ",":
+            raise ValueError(f"Expected ',' at character {pos}")
+        pos = _TEXT_WS.match(text, pos + 1).end()
+
+
+def _map(handle: Any) -> mmap.mmap:
+    return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _parse_range(
+    importer_cls: Type[Importer], path: Path, start: int, end: int, options: Dict[str, Any]
+) -> Optional[List[ConversationRecord]]:
+    """Worker: records of one range, or ``None`` when it is not element-aligned."""
+    with path.open("rb") as handle, _map(handle) as data:
+        with memoryview(data)[start:end] as view:
+            text = str(view, "utf-8")
+    try:
+        items = decode_items(text)
+    except ValueError:
+        return None
+    del text
+    return importer_cls().parse_items(items, options)
+
+
+def usable_cpus() -> int:
+    """CPUs this process may run on (its affinity mask where the OS has one)."""
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return os.cpu_count() or 1
+
+
+def can_split() -> bool:
+    """Splitting starts a process pool, so only the main process does it."""
+    import multiprocessing  # deferred: keeps ``rokpyl.cli`` startup light
+
+    return multiprocessing.parent_process() is None
+
+
+def parse_split(
+    importer: Importer,
+    source: Path,
+    options: Dict[str, Any],
+    workers: int,
+    *,
+    min_bytes: int = DEFAULT_MIN_BYTES,
+) -> Optional[List[ConversationRecord]]:
+    """Records of ``source`` parsed by ``workers`` processes.
+
+    ``None`` when the source is smaller than ``min_bytes``, is not a JSON
+    array the importer can split, or a cut turned out not to be a boundary;
+    the caller then parses it sequentially.
+    """
+    if workers < 2 or not importer.splittable(source, options):
+        return None
+    with source.open("rb") as handle:
+        size = source.stat().st_size
+        if size < max(1, min_bytes):
+            return None
+        with _map(handle) as data:
+            ranges = element_ranges(data, workers)
+    if ranges is None or len(ranges) < 2:
+        return None
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+        futures = [
+            pool.submit(_parse_range, type(importer), source, start, end, options)
+            for start, end in ranges
+        ]
+        errors = [future.exception() for future in futures]
+    parts = [future.result() for future, error in zip(futures, errors) if error is None]
+    if any(part is None for part in parts):
+        # A bad cut; errors from ranges after it come from misparsed slices.
+        return None
+    for error in errors:
+        if error is not None:
+            raise error
+    return [record for part in parts for record in part]
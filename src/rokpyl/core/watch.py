@@ -0,0 +1,329 @@
+"""Watch mode: poll input roots and ingest new or changed sources.
+
+Change detection is portable polling: every ``interval_s`` the input roots
+are walked and each file's ``(size, mtime_ns)`` is compared with the last
+processed signature. A new or changed file is only processed once its
+signature has stayed the same for ``settle_s`` seconds, so exports that are
+still being copied in are left alone. Temporary download names
+(``.part``, ``.tmp``, ``.crdownload``, dotfiles) are ignored.
+
+Each ready source is ingested by its own run of the same ``Pipeline``, so
+registries and the fingerprint index stay warm and one corrupt file cannot
+take down the watcher: the failure is reported, its signature recorded, and
+it is retried only once the file changes again. A source whose export failed
+(an exporter raised, e.g. a remote API was down) is not recorded as processed
+and its records are forgotten by the dedup, so the next poll retries it
+(outputs that did succeed get those records again). Records whose id or url was
+already exported in this session are skipped, except that a changed source
+re-exports the conversations whose content changed (JSONL outputs then hold
+the updated copy on a later line). Outputs that cannot accumulate across runs
+get a per-run suffix (see ``batch_outputs``). With ``state_path`` the
+processed signatures, failures and dedup state survive restarts.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from rokpyl.core.normalize import Normalizer
+from rokpyl.core.pipeline import Pipeline
+from rokpyl.core.shard import tagged_path
+from rokpyl.models.canonical import ConversationRecord, LazyConversationRecord
+
+IGNORED_SUFFIXES = {".part", ".partial", ".tmp", ".crdownload", ".download"}
+
+Signature = Tuple[int, int]
+
+
+def _ignored(path: Path) -> bool:
+    return path.name.startswith(".") or path.suffix.lower() in IGNORED_SUFFIXES
+
+
+def scan(roots: Iterable[Path]) -> Dict[Path, Signature]:
+    """Current ``(size, mtime_ns)`` of every candidate file under ``roots``."""
+    found: Dict[Path, Signature] = {}
+    for root in roots:
+        if root.is_file():
+            paths: Iterable[Path] = [root]
+        elif root.is_dir():
+            paths = (path for path in root.rglob("*") if path.is_file())
+        else:
+            continue
+        for path in paths:
+            if _ignored(path):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # removed between listing and stat
+            found[path] = (stat.st_size, stat.st_mtime_ns)
+    return found
+
+
+class SourceWatcher:
+    def __init__(
+        self,
+        roots: Sequence[Path],
+        *,
+        settle_s: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+        processed: Optional[Dict[Path, Signature]] = None,
+    ) -> None:
+        self.roots = list(roots)
+        self.settle_s = settle_s
+        self.clock = clock
+        self.processed: Dict[Path, Signature] = dict(processed or {})
+        self._pending: Dict[Path, Tuple[Signature, float]] = {}
+
+    def poll(self) -> Dict[Path, Signature]:
+        """New or changed files whose signature has settled."""
+        now = self.clock()
+        current = scan(self.roots)
+        ready: Dict[Path, Signature] = {}
+        for path, signature in current.items():
+            if self.processed.get(path) == signature:
+                self._pending.pop(path, None)
+                continue
+            pending = self._pending.get(path)
+            if pending is None or pending[0] != signature:
+                self._pending[path] = (signature, now)
+                if self.settle_s > 0:
+                    continue
+            elif now - pending[1] < self.settle_s:
+                continue
+            ready[path] = signature
+        for path in list(self._pending):
+            if path not in current:
+                del self._pending[path]
+        return ready
+
+    def mark_processed(self, batch: Dict[Path, Signature]) -> None:
+        for path, signature in batch.items():
+            self.processed[path] = signature
+            self._pending.pop(path, None)
+
+
+def batch_outputs(
+    outputs: List[Dict[str, Any]], pipeline: Pipeline, batch_id: str
+) -> List[Dict[str, Any]]:
+    """Outputs for one batch.
+
+    JSONL outputs are appended to, incremental exporters (markdown, notion)
+    are reused as is, and every other output gets a ``.batch-<id>`` suffix.
+    """
+    result = []
+    for output in outputs:
+        output = dict(output)
+        exporter_type = output.get("type")
+        if exporter_type == "jsonl":
+            output["append"] = True
+        elif exporter_type and not pipeline.exporter_registry.get(exporter_type).incremental:
+            for key in ("path", "dir"):
+                if output.get(key):
+                    output[key] = tagged_path(output[key], f".batch-{batch_id}")
+        result.append(output)
+    return result
+
+
+def record_digest(record: ConversationRecord) -> str:
+    """Content digest telling an updated conversation from a repeat of it."""
+    if isinstance(record, LazyConversationRecord) and not record.decoded:
+        content: Any = record.pending
+    else:
+        content = [record.transcript, [asdict(message) for message in record.messages]]
+    payload = json.dumps(
+        [record.title, record.date, record.url, record.project, record.metadata, content],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class SessionDedup:
+    """Every id and url exported in a watch session.
+
+    ``ids`` maps each id to the source that exported it and its digest;
+    ``urls`` maps each url to its id.
+    """
+
+    def __init__(
+        self,
+        ids: Optional[Dict[str, Tuple[str, str]]] = None,
+        urls: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.ids: Dict[str, Tuple[str, str]] = dict(ids or {})
+        self.urls: Dict[str, str] = dict(urls or {})
+
+    def normalizer(self, source: Path) -> "SourceNormalizer":
+        return SourceNormalizer(self, str(source))
+
+
+class SourceNormalizer(Normalizer):
+    """Dedup for the run of one source against the session.
+
+    Within the run the usual rules apply. A record whose id or url was
+    exported earlier in the session is dropped, unless that copy came from
+    this same source and its content changed since.
+    """
+
+    def __init__(self, session: SessionDedup, source: str) -> None:
+        super().__init__()
+        self.session = session
+        self.source = source
+        self._undo: List[Tuple[Dict[str, Any], str, Any]] = []
+
+    def admit(self, record: ConversationRecord) -> bool:
+        if not super().admit(record):
+            return False
+        session = self.session
+        previous = session.ids.get(record.id)
+        digest = record_digest(record)
+        if previous is not None and (previous[0] != self.source or previous[1] == digest):
+            return False
+        owner = session.urls.get(record.url) if record.url else None
+        if owner is not None and owner != record.id:
+            if session.ids.get(owner, ("", ""))[0] != self.source:
+                return False
+        self._set(session.ids, record.id, (self.source, digest))
+        if record.url:
+            self._set(session.urls, record.url, record.id)
+        return True
+
+    def _set(self, mapping: Dict[str, Any], key: str, value: Any) -> None:
+        self._undo.append((mapping, key, mapping.get(key)))
+        mapping[key] = value
+
+    def rollback(self) -> None:
+        """Forget what this run admitted, when it failed before exporting."""
+        for mapping, key, value in reversed(self._undo):
+            if value is None:
+                mapping.pop(key, None)
+            else:
+                mapping[key] = value
+        self._undo = []
+
+
+@dataclass
+class WatchState:
+    processed: Dict[Path, Signature] = field(default_factory=dict)
+    # Sources whose last run failed: signature and error.
+    failed: Dict[Path, Tuple[Signature, str]] = field(default_factory=dict)
+    dedup: SessionDedup = field(default_factory=SessionDedup)
+
+    @classmethod
+    def load(cls, path: Optional[Path]) -> "WatchState":
+        if path is None or not path.exists():
+            return cls()
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        if "processed" not in payload:  # processed signatures only
+            payload = {"processed": payload}
+        processed = payload["processed"]
+        return cls(
+            processed={Path(key): (value[0], value[1]) for key, value in processed.items()},
+            failed={
+                Path(key): ((value["signature"][0], value["signature"][1]), value["error"])
+                for key, value in (payload.get("failed") or {}).items()
+            },
+            dedup=SessionDedup(
+                {key: (value[0], value[1]) for key, value in (payload.get("ids") or {}).items()},
+                payload.get("urls") or {},
+            ),
+        )
+
+    def save(self, path: Optional[Path]) -> None:
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "processed": {str(key): list(value) for key, value in sorted(self.processed.items())},
+            "failed": {
+                str(key): {"signature": list(signature), "error": error}
+                for key, (signature, error) in sorted(self.failed.items())
+            },
+            "ids": {key: list(value) for key, value in self.dedup.ids.items()},
+            "urls": self.dedup.urls,
+        }
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(payload), encoding="utf-8")
+        tmp.replace(path)
+
+
+def watch(
+    pipeline: Pipeline,
+    config: Dict[str, Any],
+    *,
+    interval_s: float = 5.0,
+    settle_s: float = 2.0,
+    state_path: Optional[Path] = None,
+    max_batches: Optional[int] = None,
+    on_batch: Optional[Callable[[int, Dict[Path, Signature], int], None]] = None,
+    on_error: Optional[Callable[[Path, str], None]] = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> int:
+    """Poll until interrupted (or ``max_batches`` ran); returns batches run.
+
+    ``on_error`` is called with each source that failed (or could not be
+    identified); the watcher carries on with the others.
+    """
+    roots = [Path(entry["path"]) for entry in config.get("inputs", [])]
+    state = WatchState.load(state_path)
+    watcher = SourceWatcher(roots, settle_s=settle_s, processed=state.processed)
+    state.processed = watcher.processed
+    batches = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            ready = watcher.poll()
+            if not ready:
+                sleep(interval_s)
+                continue
+            batches += 1
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+            total = 0
+            for number, (source, signature) in enumerate(sorted(ready.items()), start=1):
+                batch_config = dict(config)
+                batch_config["outputs"] = batch_outputs(
+                    config.get("outputs", []), pipeline, f"{stamp}-{batches}-{number}"
+                )
+                pipeline.source_filter = {source}.__contains__
+                normalizer = pipeline.normalizer = state.dedup.normalizer(source)
+                error: Optional[str] = None
+                retry = False
+                try:
+                    count = len(pipeline.run(batch_config))
+                except Exception as exc:  # keep watching the other sources
+                    normalizer.rollback()
+                    error = f"{type(exc).__name__}: {exc}"
+                else:
+                    problems = [reason for _, reason in pipeline.skipped]
+                    if pipeline.export_failures:
+                        # Nothing of this source is known to be delivered:
+                        # forget its records and try it again on the next poll.
+                        normalizer.rollback()
+                        retry = True
+                        problems += [
+                            f"exporter {result.name} failed: {result.error}"
+                            for result in pipeline.export_failures
+                        ]
+                    else:
+                        total += count
+                    error = "; ".join(problems) or None
+                if error is None:
+                    state.failed.pop(source, None)
+                else:
+                    state.failed[source] = (signature, error)
+                    if on_error is not None:
+                        on_error(source, error)
+                if not retry:
+                    watcher.mark_processed({source: signature})
+            state.save(state_path)
+            if on_batch is not None:
+                on_batch(batches, ready, total)
+    finally:
+        pipeline.source_filter = None
+        pipeline.normalizer = None
+    return batches
@@ -2,14 +2,20 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Iterable
 
 from rokpyl.models.canonical import ConversationRecord
 
 
 class Exporter(ABC):
     name: str
+    # True when repeated writes accumulate (one file or upsert per record),
+    # so watch mode can reuse the same output for every batch.
+    incremental: bool = False
+    # True when writes go over the network: fan-out then gives the exporter a
+    # spill-backed queue, so it never holds up local outputs.
+    remote: bool = False
 
     @abstractmethod
-    def write(self, records: List[ConversationRecord], options: dict | None = None) -> None:
+    def write(self, records: Iterable[ConversationRecord], options: dict | None = None) -> None:
         raise NotImplementedError
@@ -0,0 +1,266 @@
+"""Columnar exporter (Parquet with a NumPy-friendly fallback).
+
+Writes two tables into ``dir``:
+
+- ``conversations``: one row per ``ConversationRecord``.
+- ``messages``: one row per ``Message``, keyed by ``conversation_id`` and
+  ``position``.
+
+When ``pyarrow`` is installed the tables are written as ``.parquet`` files with
+one row group per batch, dictionary-encoded ``role``/``platform``/``project``
+columns and ``timestamp[us, UTC]`` dates. Without ``pyarrow`` (or with
+``format: columns``) each table is written as ``<table>.columns.jsonl``: one
+JSON object per row group mapping column name to a list of values.
+Dictionary columns are stored as ``{"dictionary": [...], "indices": [...]}``
+(index ``-1`` if missing) and timestamps as integer microseconds since the
+epoch (``-2**63``, NumPy's ``NaT``, if missing), so index and timestamp
+columns load directly as ``int64`` with ``numpy.asarray`` (or as
+``datetime64[us]`` with ``dtype="datetime64[us]"``).
+
+Records are consumed batch by batch; at most ``row_group_size`` conversations
+are buffered at a time.
+"""
+from __future__ import annotations
+
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from rokpyl.exporters.base import Exporter
+from rokpyl.models.canonical import ConversationRecord
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Missing values in the fallback format, chosen so the columns stay integer.
+_MISSING_INDEX = -1
+_NAT = -(2**63)
+
+# (column, kind) where kind is one of: string, dictionary, timestamp, int32.
+CONVERSATION_COLUMNS: List[Tuple[str, str]] = [
+    ("id", "string"),
+    ("title", "string"),
+    ("platform", "dictionary"),
+    ("project", "dictionary"),
+    ("date", "timestamp"),
+    ("summary", "string"),
+    ("url", "string"),
+    ("transcript", "string"),
+    ("message_count", "int32"),
+    ("metadata", "string"),
+]
+
+MESSAGE_COLUMNS: List[Tuple[str, str]] = [
+    ("conversation_id", "string"),
+    ("position", "int32"),
+    ("role", "dictionary"),
+    ("created_at", "timestamp"),
+    ("content", "string"),
+    ("attachment_count", "int32"),
+]
+
+
+def _parse_timestamp(value: object) -> Optional[datetime]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            return datetime.fromtimestamp(value, tz=timezone.utc)
+        except (OverflowError, OSError, ValueError):  # e.g. milliseconds, NaN
+            return None
+    if not isinstance(value, str):
+        return None
+    text = value.strip()
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _to_micros(value: Optional[datetime]) -> int:
+    if value is None:
+        return _NAT
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _content_text(content: object) -> Optional[str]:
+    if content is None:
+        return None
+    if isinstance(content, str):
+        return content
+    return json.dumps(content, ensure_ascii=True, default=str)
+
+
+class _Batch:
+    def __init__(self, columns: List[Tuple[str, str]]) -> None:
+        self.columns = columns
+        self.values: Dict[str, List[Any]] = {name: [] for name, _ in columns}
+
+    def __len__(self) -> int:
+        first = self.columns[0][0]
+        return len(self.values[first])
+
+    def append(self, row: Dict[str, Any]) -> None:
+        for name, _ in self.columns:
+            self.values[name].append(row.get(name))
+
+    def clear(self) -> None:
+        for values in self.values.values():
+            values.clear()
+
+
+class _ColumnsWriter:
+    """Fallback writer producing one JSON object per row group."""
+
+    suffix = ".columns.jsonl"
+
+    def __init__(self, path: Path, columns: List[Tuple[str, str]]) -> None:
+        self.columns = columns
+        self._handle = path.open("w", encoding="utf-8")
+
+    def write_batch(self, batch: _Batch) -> None:
+        payload: Dict[str, Any] = {}
+        for name, kind in self.columns:
+            values = batch.values[name]
+            if kind == "dictionary":
+                dictionary: List[str] = []
+                codes: Dict[str, int] = {}
+                indices: List[int] = []
+                for value in values:
+                    if value is None:
+                        indices.append(_MISSING_INDEX)
+                        continue
+                    if value not in codes:
+                        codes[value] = len(dictionary)
+                        dictionary.append(value)
+                    indices.append(codes[value])
+                payload[name] = {"dictionary": dictionary, "indices": indices}
+            elif kind == "timestamp":
+                payload[name] = [_to_micros(value) for value in values]
+            else:
+                payload[name] = list(values)
+        self._handle.write(json.dumps(payload, ensure_ascii=True))
+        self._handle.write("\n")
+
+    def close(self) -> None:
+        self._handle.close()
+
+
+class _ParquetWriter:
+    suffix = ".parquet"
+
+    def __init__(self, path: Path, columns: List[Tuple[str, str]]) -> None:
+        import pyarrow as pa  # type: ignore
+        import pyarrow.parquet as pq  # type: ignore
+
+        self._pa = pa
+        types = {
+            "string": pa.string(),
+            "dictionary": pa.dictionary(pa.int32(), pa.string()),
+            "timestamp": pa.timestamp("us", tz="UTC"),
+            "int32": pa.int32(),
+        }
+        self.schema = pa.schema([(name, types[kind]) for name, kind in columns])
+        self._writer = pq.ParquetWriter(str(path), self.schema, use_dictionary=True)
+
+    def write_batch(self, batch: _Batch) -> None:
+        pa = self._pa
+        arrays = [
+            pa.array(batch.values[field.name], type=field.type) for field in self.schema
+        ]
+        table = pa.Table.from_arrays(arrays, schema=self.schema)
+        self._writer.write_table(table, row_group_size=len(batch))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def _have_pyarrow() -> bool:
+    try:
+        import pyarrow  # type: ignore  # noqa: F401
+        import pyarrow.parquet  # type: ignore  # noqa: F401
+    except Exception:
+        return False
+    return True
+
+
+class ColumnarExporter(Exporter):
+    name = "columnar"
+
+    def write(self, records: Iterable[ConversationRecord], options: dict | None = None) -> None:
+        options = options or {}
+        directory = options.get("dir")
+        if not directory:
+            raise ValueError("columnar exporter requires 'dir'")
+        output_dir = Path(directory)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        row_group_size = int(options.get("row_group_size") or 10000)
+        if row_group_size <= 0:
+            raise ValueError("columnar exporter requires a positive 'row_group_size'")
+
+        fmt = options.get("format", "auto")
+        if fmt == "auto":
+            fmt = "parquet" if _have_pyarrow() else "columns"
+        if fmt == "parquet":
+            if not _have_pyarrow():
+                raise ValueError("columnar format 'parquet' requires pyarrow")
+            writer_cls = _ParquetWriter
+        elif fmt == "columns":
+            writer_cls = _ColumnsWriter
+        else:
+            raise ValueError(f"Unknown columnar format: {fmt}")
+
+        conversations = writer_cls(
+            output_dir / f"conversations{writer_cls.suffix}", CONVERSATION_COLUMNS
+        )
+        messages = writer_cls(output_dir / f"messages{writer_cls.suffix}", MESSAGE_COLUMNS)
+        convo_batch = _Batch(CONVERSATION_COLUMNS)
+        message_batch = _Batch(MESSAGE_COLUMNS)
+
+        def flush() -> None:
+            if len(convo_batch):
+                conversations.write_batch(convo_batch)
+                convo_batch.clear()
+            if len(message_batch):
+                messages.write_batch(message_batch)
+                message_batch.clear()
+
+        try:
+            for record in records:
+                convo_batch.append(
+                    {
+                        "id": record.id,
+                        "title": record.title,
+                        "platform": record.platform,
+                        "project": record.project,
+                        "date": _parse_timestamp(record.date),
+                        "summary": record.summary,
+                        "url": record.url,
+                        "transcript": record.transcript,
+                        "message_count": len(record.messages),
+                        "metadata": json.dumps(record.metadata, ensure_ascii=True, default=str),
+                    }
+                )
+                for position, message in enumerate(record.messages):
+                    message_batch.append(
+                        {
+                            "conversation_id": record.id,
+                            "position": position,
+                            "role": message.role,
+                            "created_at": _parse_timestamp(message.created_at),
+                            "content": _content_text(message.content),
+                            "attachment_count": len(message.attachments),
+                        }
+                    )
+                if len(convo_batch) >= row_group_size:
+                    flush()
+            flush()
+        finally:
+            conversations.close()
+            messages.close()
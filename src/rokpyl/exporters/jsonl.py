@@ -4,8 +4,10 @@ from __future__ import annotations
 import json
 from dataclasses import asdict
 from pathlib import Path
-from typing import List
+from typing import Iterable
 
+from rokpyl.core.config import as_bool
+from rokpyl.core.jsonl_index import IndexBuilder, index_path
 from rokpyl.exporters.base import Exporter
 from rokpyl.models.canonical import ConversationRecord
 
@@ -13,7 +15,7 @@ from rokpyl.models.canonical import ConversationRecord
 class JsonlExporter(Exporter):
     name = "jsonl"
 
-    def write(self, records: List[ConversationRecord], options: dict | None = None) -> None:
+    def write(self, records: Iterable[ConversationRecord], options: dict | None = None) -> None:
         options = options or {}
         path = options.get("path")
         if not path:
@@ -21,5 +23,29 @@ class JsonlExporter(Exporter):
         output_path = Path(path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
 
-        lines = [json.dumps(asdict(record), ensure_ascii=True) for record in records]
-        output_path.write_text("\n".join(lines), encoding="utf-8")
+        # Streamed, one line at a time: records may come from a spilled store.
+        append = bool(
+            options.get("append") and output_path.exists() and output_path.stat().st_size
+        )
+        index = None
+        if as_bool(options.get("index"), False):
+            index = IndexBuilder.resume(output_path) if append else IndexBuilder()
+        # Any existing index is stale once the file changes; a failed run leaves none.
+        index_path(output_path).unlink(missing_ok=True)
+
+        # Lines are ASCII (ensure_ascii) and written untranslated, so the byte
+        # offset of each line is the running character count.
+        offset = output_path.stat().st_size if append else 0
+        with output_path.open("a" if append else "w", encoding="utf-8", newline="\n") as handle:
+            separator = "\n" if append else ""
+            for record in records:
+                data = asdict(record)
+                line = json.dumps(data, ensure_ascii=True)
+                handle.write(separator + line)
+                offset += len(separator)
+                if index is not None:
+                    index.add(data, offset, len(line))
+                offset += len(line)
+                separator = "\n"
+        if index is not None:
+            index.write(output_path, offset)
@@ -3,10 +3,12 @@ from __future__ import annotations
 
 import ast
 import json
+import os
 import re
+import shlex
 from dataclasses import asdict
 from pathlib import Path
-from typing import List
+from typing import Iterable, List
 
 from rokpyl.exporters.base import Exporter
 from rokpyl.models.canonical import ConversationRecord
@@ -63,11 +65,46 @@ def _format_key_value(label: str, value: object) -> List[str]:
     return [f"- {label}: {value}"]
 
 
+def _format_attachment(attachment) -> str:
+    """One list item; stored files are referenced by their blob hash."""
+    details = [
+        value
+        for value in (
+            attachment.mime_type,
+            f"{attachment.size_bytes} bytes" if attachment.size_bytes is not None else None,
+        )
+        if value
+    ]
+    line = f"  - {attachment.name or 'unnamed'}"
+    if details:
+        line += f" ({', '.join(details)})"
+    digest = attachment.extra.get("sha256")
+    if digest:
+        line += f" sha256:{digest}"
+    return line
+
+
+def _format_raw(record: ConversationRecord, raw_jsonl: str | None, link: str) -> List[str]:
+    """The full record, or with ``raw_jsonl`` a pointer to its line in that output."""
+    key = record.id or record.url
+    if not raw_jsonl or not key:
+        payload = json.dumps(asdict(record), indent=2, ensure_ascii=True)
+        return ["## Raw JSON", "", "```json", payload, "```", ""]
+    return [
+        "## Raw JSON",
+        "",
+        f"- Record: [{Path(raw_jsonl).name}]({link}) (`{key}`)",
+        f"- Fetch: `rokpyl get {shlex.quote(key)} --jsonl {shlex.quote(raw_jsonl)}`",
+        "",
+    ]
+
+
 def _format_message(message) -> List[str]:
     lines: List[str] = []
     lines.extend(_format_key_value("Time", getattr(message, "created_at", None)))
     if getattr(message, "attachments", None):
         lines.extend(_format_key_value("Attachments", len(message.attachments)))
+        lines.extend(_format_attachment(attachment) for attachment in message.attachments)
 
     content = message.content
     parsed = None
@@ -137,14 +174,21 @@ def _format_message(message) -> List[str]:
 
 class MarkdownExporter(Exporter):
     name = "markdown"
+    incremental = True
 
-    def write(self, records: List[ConversationRecord], options: dict | None = None) -> None:
+    def write(self, records: Iterable[ConversationRecord], options: dict | None = None) -> None:
         options = options or {}
         directory = options.get("dir")
         if not directory:
             raise ValueError("markdown exporter requires 'dir'")
         output_dir = Path(directory)
         output_dir.mkdir(parents=True, exist_ok=True)
+        # Link each file to its line in an (indexed) JSONL output instead of
+        # embedding the whole record again.
+        raw_jsonl = options.get("raw_jsonl")
+        link = ""
+        if raw_jsonl:
+            link = Path(os.path.relpath(Path(raw_jsonl).resolve(), output_dir.resolve())).as_posix()
 
         for idx, record in enumerate(records, start=1):
             base = record.id or record.title or f"conversation_{idx}"
@@ -172,14 +216,5 @@ class MarkdownExporter(Exporter):
                     contents.append("")
             elif record.transcript:
                 contents.extend(["## Contents", "", record.transcript, ""])
-            contents.extend(
-                [
-                    "## Raw JSON",
-                    "",
-                    "```json",
-                    json.dumps(asdict(record), indent=2, ensure_ascii=True),
-                    "```",
-                    "",
-                ]
-            )
+            contents.extend(_format_raw(record, raw_jsonl, link))
             path.write_text("\n".join(contents), encoding="utf-8")
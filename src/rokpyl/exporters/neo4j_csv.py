@@ -0,0 +1,192 @@
+"""Neo4j bulk-import CSV exporter.
+
+Streams records once and writes node and relationship files with
+``neo4j-admin database import`` headers into ``dir``:
+
+Nodes: ``conversations.csv``, ``messages.csv``, ``projects.csv``,
+``platforms.csv``, ``attachments.csv``.
+
+Relationships: ``has_message.csv`` (Conversation->Message),
+``next.csv`` (Message->Message), ``in_project.csv`` (Conversation->Project),
+``on_platform.csv`` (Conversation->Platform) and ``has_attachment.csv``
+(Message->Attachment).
+
+IDs come from the normalized records: conversations use ``record.id``,
+messages ``<conversation id>:<position>`` and attachments
+``sha256:<hash>`` once stored in the attachment store (a shared file is one
+node) or ``<message id>:<index>``. Projects and platforms are keyed by name.
+Message content may contain newlines, so import with
+``--multiline-fields=true``.
+"""
+from __future__ import annotations
+
+import csv
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Set
+
+from rokpyl.exporters.base import Exporter
+from rokpyl.models.canonical import ConversationRecord
+
+NODE_FILES: Dict[str, List[str]] = {
+    "conversations.csv": [
+        "conversationId:ID(Conversation)",
+        "title",
+        "date",
+        "summary",
+        "url",
+        "metadata",
+        ":LABEL",
+    ],
+    "messages.csv": [
+        "messageId:ID(Message)",
+        "role",
+        "content",
+        "createdAt",
+        "position:int",
+        ":LABEL",
+    ],
+    "projects.csv": ["name:ID(Project)", ":LABEL"],
+    "platforms.csv": ["name:ID(Platform)", ":LABEL"],
+    "attachments.csv": [
+        "attachmentId:ID(Attachment)",
+        "name",
+        "mimeType",
+        "sizeBytes:long",
+        "url",
+        "sha256",
+        ":LABEL",
+    ],
+}
+
+RELATIONSHIP_FILES: Dict[str, List[str]] = {
+    "has_message.csv": [":START_ID(Conversation)", ":END_ID(Message)", ":TYPE"],
+    "next.csv": [":START_ID(Message)", ":END_ID(Message)", ":TYPE"],
+    "in_project.csv": [":START_ID(Conversation)", ":END_ID(Project)", ":TYPE"],
+    "on_platform.csv": [":START_ID(Conversation)", ":END_ID(Platform)", ":TYPE"],
+    "has_attachment.csv": [":START_ID(Message)", ":END_ID(Attachment)", ":TYPE"],
+}
+
+
+def _cell(value: object) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return json.dumps(value, ensure_ascii=True, default=str)
+
+
+def import_args(directory: str | Path) -> List[str]:
+    """Return ``neo4j-admin database import`` arguments for an export dir."""
+    root = Path(directory)
+    labels = {
+        "conversations.csv": "Conversation",
+        "messages.csv": "Message",
+        "projects.csv": "Project",
+        "platforms.csv": "Platform",
+        "attachments.csv": "Attachment",
+    }
+    args = [f"--nodes={labels[name]}={root / name}" for name in NODE_FILES]
+    args.extend(f"--relationships={root / name}" for name in RELATIONSHIP_FILES)
+    args.append("--multiline-fields=true")
+    return args
+
+
+class Neo4jCsvExporter(Exporter):
+    name = "neo4j"
+
+    def write(self, records: Iterable[ConversationRecord], options: dict | None = None) -> None:
+        options = options or {}
+        directory = options.get("dir")
+        if not directory:
+            raise ValueError("neo4j exporter requires 'dir'")
+        output_dir = Path(directory)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        handles = []
+        writers = {}
+        try:
+            for filename, header in {**NODE_FILES, **RELATIONSHIP_FILES}.items():
+                handle = (output_dir / filename).open("w", encoding="utf-8", newline="")
+                handles.append(handle)
+                writer = csv.writer(handle)
+                writer.writerow(header)
+                writers[filename] = writer
+            self._write_records(records, writers)
+        finally:
+            for handle in handles:
+                handle.close()
+
+    def _write_records(self, records: Iterable[ConversationRecord], writers: dict) -> None:
+        seen_conversations: Set[str] = set()
+        seen_projects: Set[str] = set()
+        seen_platforms: Set[str] = set()
+        seen_attachments: Set[str] = set()
+
+        for record in records:
+            if not record.id or record.id in seen_conversations:
+                continue
+            seen_conversations.add(record.id)
+            writers["conversations.csv"].writerow(
+                [
+                    record.id,
+                    record.title,
+                    _cell(record.date),
+                    _cell(record.summary),
+                    _cell(record.url),
+                    _cell(record.metadata) if record.metadata else "",
+                    "Conversation",
+                ]
+            )
+
+            if record.project:
+                if record.project not in seen_projects:
+                    seen_projects.add(record.project)
+                    writers["projects.csv"].writerow([record.project, "Project"])
+                writers["in_project.csv"].writerow([record.id, record.project, "IN_PROJECT"])
+            if record.platform:
+                if record.platform not in seen_platforms:
+                    seen_platforms.add(record.platform)
+                    writers["platforms.csv"].writerow([record.platform, "Platform"])
+                writers["on_platform.csv"].writerow([record.id, record.platform, "ON_PLATFORM"])
+
+            previous_id = None
+            for position, message in enumerate(record.messages):
+                message_id = f"{record.id}:{position}"
+                writers["messages.csv"].writerow(
+                    [
+                        message_id,
+                        message.role,
+                        _cell(message.content),
+                        _cell(message.created_at),
+                        position,
+                        "Message",
+                    ]
+                )
+                writers["has_message.csv"].writerow([record.id, message_id, "HAS_MESSAGE"])
+                if previous_id is not None:
+                    writers["next.csv"].writerow([previous_id, message_id, "NEXT"])
+                previous_id = message_id
+
+                for index, attachment in enumerate(message.attachments):
+                    digest = attachment.extra.get("sha256")
+                    # Stored blobs are one node however many messages share them.
+                    attachment_id = f"sha256:{digest}" if digest else f"{message_id}:{index}"
+                    if attachment_id not in seen_attachments:
+                        seen_attachments.add(attachment_id)
+                        writers["attachments.csv"].writerow(
+                            [
+                                attachment_id,
+                                _cell(attachment.name),
+                                _cell(attachment.mime_type),
+                                _cell(attachment.size_bytes),
+                                _cell(attachment.url),
+                                _cell(digest),
+                                "Attachment",
+                            ]
+                        )
+                    writers["has_attachment.csv"].writerow(
+                        [message_id, attachment_id, "HAS_ATTACHMENT"]
+                    )
@@ -1,7 +1,7 @@
 """Notion exporter stub (no network calls yet)."""
 from __future__ import annotations
 2
-from typing import List
+from typing import Iterable
 
 from rokpyl.exporters.base import Exporter
 from rokpyl.models.canonical import ConversationRecord
@@ -9,8 +9,10 @@ from rokpyl.models.canonical import ConversationRecord
 
 class NotionExporter(Exporter):
     name = "notion"
+    incremental = True
+    remote = True
 
-    def write(self, records: List[ConversationRecord], options: dict | None = None) -> None:
+    def write(self, records: Iterable[ConversationRecord], options: dict | None = None) -> None:
         options = options or {}
         dry_run = options.get("dry_run", True)
         if dry_run:
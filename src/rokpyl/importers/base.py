@@ -2,14 +2,29 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List
+from typing import Any, Iterable, List, Sequence, Tuple
 
 from rokpyl.models.canonical import ConversationRecord
 
 
+@dataclass(frozen=True)
+class Fingerprint:
+    """Structural signature of one export layout.
+
+    ``required`` holds key paths relative to a conversation record, optionally
+    suffixed with a type (``"chat_messages:array"``). Nested keys are joined
+    with ``.`` and array items are written as ``[]`` (``"messages[].role"``).
+    """
+
+    name: str
+    required: Tuple[str, ...]
+
+
 class Importer(ABC):
     name: str
+    fingerprints: Sequence[Fingerprint] = ()
 
     @abstractmethod
     def discover_sources(self, export_path: Path) -> List[Path]:
@@ -25,3 +40,17 @@ class Importer(ABC):
 
     def iter_sources(self, export_path: Path) -> Iterable[Path]:
         return self.discover_sources(export_path)
+
+    def splittable(self, source_path: Path, options: dict | None = None) -> bool:
+        """Whether ``parse_items`` can parse slices of this source's top-level array.
+
+        Sources that are split are parsed by several processes (see
+        ``rokpyl.core.split``); the default keeps every source whole.
+        """
+        return False
+
+    def parse_items(
+        self, items: List[Any], options: dict | None = None
+    ) -> List[ConversationRecord]:
+        """Records for conversations decoded from one slice of a split source."""
+        raise NotImplementedError
@@ -1,13 +1,41 @@
-"""ChatGPT exporter parser (minimal)."""
+"""ChatGPT exporter parser (minimal).
+
+A conversation's ``mapping`` is a tree of message nodes linked by
+``parent``/``children``; edits and regenerations fork it. By default only
+the branch ending at ``current_node`` (what the ChatGPT UI shows) becomes the
+transcript, found by walking parent links, so parsing is linear in the
+number of nodes. With the ``branches: all`` option every other branch is
+kept in ``metadata["branches"]`` as the messages after the point where it
+forks from an earlier branch, so shared prefixes are stored once.
+
+A ``query`` option (see ``rokpyl.core.query``) is checked against each
+conversation's title and create time before its mapping is walked.
+
+With ``lazy_messages: true`` (current branch only) the export is streamed
+and each conversation keeps its ``mapping`` as raw JSON text in a
+``LazyConversationRecord``; the tree is decoded and walked only when the
+record's messages or transcript are read.
+"""
 from __future__ import annotations
 
+import io
 import json
+from dataclasses import asdict
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
-from rokpyl.importers.base import Importer
-from rokpyl.models.canonical import ConversationRecord, Message
+from rokpyl.core.archive import iter_payloads
+from rokpyl.core.compression import open_text, plain_suffix, read_text
+from rokpyl.core.config import as_bool
+from rokpyl.core.jsonstream import iter_objects
+from rokpyl.importers.base import Fingerprint, Importer
+from rokpyl.models.canonical import (
+    Attachment,
+    ConversationRecord,
+    LazyConversationRecord,
+    Message,
+)
 
 
 def _to_iso(value) -> str | None:
@@ -20,8 +48,253 @@ def _to_iso(value) -> str | None:
     return None
 
 
+BRANCH_MODES = ("current", "all")
+# Kept as raw JSON text by the lazy parser.
+RAW_KEYS = ("mapping",)
+
+
+def _message(node: Any) -> Optional[Message]:
+    message = node.get("message") if isinstance(node, dict) else None
+    if not message:
+        return None
+    author = message.get("author") or {}
+    role = author.get("role") or "unknown"
+    content = message.get("content") or {}
+    parts = content.get("parts") or []
+    text = "\n".join(str(part) for part in parts if part is not None)
+    if not text:
+        return None
+    return Message(
+        role=role,
+        content=text,
+        created_at=_to_iso(message.get("create_time")),
+        attachments=_attachments(message, parts),
+    )
+
+
+def _attachments(message: Dict[str, Any], parts: List[Any]) -> List[Attachment]:
+    """Uploads from ``metadata.attachments`` and images referenced by asset pointer."""
+    found: List[Attachment] = []
+    seen = set()
+    metadata = message.get("metadata") or {}
+    for item in metadata.get("attachments") or []:
+        if not isinstance(item, dict):
+            continue
+        file_id = item.get("id")
+        seen.add(file_id)
+        size = item.get("size")
+        found.append(
+            Attachment(
+                name=item.get("name"),
+                mime_type=item.get("mime_type") or item.get("mimeType"),
+                size_bytes=size if isinstance(size, int) and not isinstance(size, bool) else None,
+                extra={"id": file_id} if file_id else {},
+            )
+        )
+    for part in parts:
+        pointer = part.get("asset_pointer") if isinstance(part, dict) else None
+        if not isinstance(pointer, str) or "://" not in pointer:
+            continue
+        file_id = pointer.split("://", 1)[1]
+        if file_id in seen:
+            continue
+        seen.add(file_id)
+        size = part.get("size_bytes")
+        found.append(
+            Attachment(
+                size_bytes=size if isinstance(size, int) and not isinstance(size, bool) else None,
+                extra={"id": file_id},
+            )
+        )
+    return found
+
+
+def _message_dict(message: Message) -> Dict[str, Any]:
+    # Same shape as dataclasses.asdict, without its deep copies.
+    return {
+        "role": message.role,
+        "content": message.content,
+        "created_at": message.created_at,
+        "attachments": [asdict(attachment) for attachment in message.attachments],
+        "extra": {},
+    }
+
+
+def _node_messages(mapping: Dict[str, Any], path: Iterable[str]) -> List[Message]:
+    messages = []
+    for node_id in path:
+        message = _message(mapping[node_id])
+        if message is not None:
+            messages.append(message)
+    return messages
+
+
+def _is_tree(mapping: Dict[str, Any]) -> bool:
+    return any(
+        isinstance(node, dict) and ("parent" in node or "children" in node)
+        for node in mapping.values()
+    )
+
+
+def _parent(mapping: Dict[str, Any], node_id: str) -> Optional[str]:
+    node = mapping.get(node_id)
+    parent = node.get("parent") if isinstance(node, dict) else None
+    return parent if parent in mapping else None
+
+
+def _children(mapping: Dict[str, Any], node_id: str) -> List[str]:
+    node = mapping.get(node_id)
+    children = (node.get("children") if isinstance(node, dict) else None) or []
+    return [child for child in children if child in mapping]
+
+
+def _roots(mapping: Dict[str, Any]) -> List[str]:
+    return [node_id for node_id in mapping if _parent(mapping, node_id) is None]
+
+
+def _current_path(mapping: Dict[str, Any], current_node: Any) -> List[str]:
+    """Node ids from the root to ``current_node`` (or to the newest leaf)."""
+    if current_node not in mapping:
+        # No usable pointer: follow the most recent child from the first root.
+        roots = _roots(mapping)
+        if not roots:
+            return []
+        current_node = roots[0]
+        seen = {current_node}
+        while True:
+            children = [child for child in _children(mapping, current_node) if child not in seen]
+            if not children:
+                break
+            current_node = children[-1]
+            seen.add(current_node)
+    path: List[str] = []
+    seen = set()
+    node_id: Optional[str] = current_node
+    while node_id is not None and node_id not in seen:
+        seen.add(node_id)
+        path.append(node_id)
+        node_id = _parent(mapping, node_id)
+    path.reverse()
+    return path
+
+
+def _all_branches(
+    mapping: Dict[str, Any], current_node: Any
+) -> Tuple[List[Message], List[Dict[str, Any]]]:
+    """Messages of the current branch plus every other branch as a suffix.
+
+    Each alternate is ``{"leaf", "parent", "fork", "messages"}``: the branch
+    equals the first ``fork`` messages of branch ``parent`` (0 is the current
+    branch, ``n`` is ``alternates[n - 1]``) followed by ``messages``.
+    """
+    current = _current_path(mapping, current_node)
+    on_current = set(current)
+    roots = _roots(mapping)
+    if current:
+        roots.sort(key=lambda node_id: node_id != current[0])
+
+    # Branch tables; the message lists are built by one depth-first walk.
+    leaves: List[str] = []
+    parents: List[Optional[int]] = []
+    forks: List[int] = []
+    branch_messages: List[List[Message]] = []
+    # (node, branch it continues or None to start one, parent branch, fork)
+    stack: List[Tuple[str, Optional[int], Optional[int], int]] = [
+        (root, None, None, 0) for root in reversed(roots)
+    ]
+    visited = set()
+    while stack:
+        node_id, branch, parent_branch, fork = stack.pop()
+        if node_id in visited:
+            continue
+        visited.add(node_id)
+        if branch is None:
+            branch = len(leaves)
+            leaves.append(node_id)
+            parents.append(parent_branch)
+            forks.append(fork)
+            branch_messages.append([])
+        messages = branch_messages[branch]
+        message = _message(mapping[node_id])
+        if message is not None:
+            messages.append(message)
+        leaves[branch] = node_id
+        depth = forks[branch] + len(messages)
+        children = [child for child in _children(mapping, node_id) if child not in visited]
+        # The child on the current path continues this branch; the current
+        # branch ends at current_node even if that node has children.
+        children = [child for child in children if child in on_current] + [
+            child for child in children if child not in on_current
+        ]
+        continued = 0 if current and node_id == current[-1] else 1
+        for position in range(len(children) - 1, -1, -1):
+            if position < continued:
+                stack.append((children[position], branch, None, 0))
+            else:
+                stack.append((children[position], None, branch, depth))
+
+    # Drop branches without messages of their own (hidden system nodes); a
+    # prefix of such a branch is the same prefix of its own parent.
+    alternates: List[Dict[str, Any]] = []
+    numbers: List[Optional[int]] = [0]
+    for index in range(1, len(leaves)):
+        parent = parents[index]
+        parent_number = numbers[parent] if parent is not None else None
+        if not branch_messages[index]:
+            numbers.append(parent_number)
+            continue
+        alternates.append(
+            {
+                "leaf": leaves[index],
+                "parent": parent_number,
+                "fork": forks[index],
+                "messages": [_message_dict(message) for message in branch_messages[index]],
+            }
+        )
+        numbers.append(len(alternates))
+    main = branch_messages[0] if branch_messages else []
+    return main, alternates
+
+
+def _flat_messages(mapping: Dict[str, Any]) -> List[Message]:
+    """Mappings without tree links: mapping order, stably sorted by create time."""
+    timed: List[Tuple[float, Message]] = []
+    previous = float("-inf")
+    for node in mapping.values():
+        message = _message(node)
+        if message is None:
+            continue
+        value = node["message"].get("create_time")
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            previous = float(value)
+        # A message without a time stays right after its predecessor.
+        timed.append((previous, message))
+    timed.sort(key=lambda item: item[0])
+    return [message for _, message in timed]
+
+
+def _transcript(messages: List[Message]) -> str:
+    return "\n".join(f"{msg.role}: {msg.content}" for msg in messages)
+
+
+def _current_messages(mapping: Any, current_node: Any) -> List[Message]:
+    if not isinstance(mapping, dict):
+        return []
+    if not _is_tree(mapping):
+        return _flat_messages(mapping)
+    return _node_messages(mapping, _current_path(mapping, current_node))
+
+
+def _decode_current(raw: Tuple[str, Any]) -> Tuple[List[Message], str]:
+    """Decoder of lazy records: (mapping JSON text, current_node)."""
+    text, current_node = raw
+    messages = _current_messages(json.loads(text) or {}, current_node)
+    return messages, _transcript(messages)
+
+
 class ChatGptImporter(Importer):
     name = "chatgpt"
+    fingerprints = (Fingerprint("chatgpt-mapping", ("mapping:object", "title")),)
 
     def discover_sources(self, export_path: Path) -> List[Path]:
         if export_path.is_file():
@@ -32,42 +305,86 @@ class ChatGptImporter(Importer):
             path
             for path in export_path.rglob("*")
             if path.is_file()
-            and path.suffix.lower() in {".json", ".jsonl", ".zip"}
+            and plain_suffix(path) in {".json", ".jsonl", ".zip"}
         ]
 
     def can_parse(self, source_path: Path) -> float:
         name = source_path.name.lower()
+        suffix = plain_suffix(source_path)
+        if suffix in {".html", ".htm", ".csv"}:
+            return 0.0  # not parsed by this importer
         if "conversations" in name or "chatgpt" in name:
             return 0.7
-        if source_path.suffix.lower() in {".json", ".jsonl"}:
+        if suffix in {".json", ".jsonl"}:
             return 0.2
         return 0.0
 
     def parse(self, source_path: Path, options: dict | None = None) -> List[ConversationRecord]:
         options = options or {}
-        suffix = source_path.suffix.lower()
-        if suffix not in {".json", ".jsonl"}:
+        suffix = plain_suffix(source_path)
+        if suffix not in {".json", ".jsonl", ".zip"}:
             return []
 
         platform = options.get("platform") or "ChatGPT"
         project = options.get("project")
+        query = options.get("query")
+        if query is not None and not query.accepts_platform(platform):
+            return []
+        if suffix == ".zip":
+            records: List[ConversationRecord] = []
+            for payload in iter_payloads(source_path):
+                records.extend(
+                    self._parse_payload(
+                        payload, platform=platform, project=project, options=options
+                    )
+                )
+            return records
+        branches = options.get("branches") or "current"
+        if as_bool(options.get("lazy_messages"), False) and branches == "current":
+            return self._parse_lazy(
+                source_path, platform=platform, project=project, options=options
+            )
 
         if suffix == ".jsonl":
-            records: List[ConversationRecord] = []
-            for line in source_path.read_text(encoding="utf-8").splitlines():
+            records = []
+            for line in read_text(source_path).splitlines():
                 stripped = line.strip()
                 if not stripped or stripped.startswith("#"):
                     continue
                 payload = json.loads(stripped)
-                records.extend(self._parse_payload(payload, platform=platform, project=project))
+                records.extend(
+                    self._parse_payload(
+                        payload, platform=platform, project=project, options=options
+                    )
+                )
             return records
 
-        payload = json.loads(source_path.read_text(encoding="utf-8"))
-        return self._parse_payload(payload, platform=platform, project=project)
+        payload = json.loads(read_text(source_path))
+        return self._parse_payload(payload, platform=platform, project=project, options=options)
+
+    def splittable(self, source_path: Path, options: dict | None = None) -> bool:
+        options = options or {}
+        lazy = as_bool(options.get("lazy_messages"), False)
+        return source_path.suffix.lower() == ".json" and not (
+            lazy and (options.get("branches") or "current") == "current"
+        )
+
+    def parse_items(
+        self, items: List[Any], options: dict | None = None
+    ) -> List[ConversationRecord]:
+        options = options or {}
+        platform = options.get("platform") or "ChatGPT"
+        query = options.get("query")
+        if query is not None and not query.accepts_platform(platform):
+            return []
+        return self._parse_payload(
+            items, platform=platform, project=options.get("project"), options=options
+        )
 
     def _parse_payload(
-        self, payload, *, platform: str, project: str | None
+        self, payload, *, platform: str, project: str | None, options: dict | None = None
     ) -> List[ConversationRecord]:
+        options = options or {}
         conversations = payload
         if isinstance(payload, dict):
             conversations = payload.get("conversations", payload.get("items", payload))
@@ -76,38 +393,87 @@ class ChatGptImporter(Importer):
         if not isinstance(conversations, list):
             return []
 
+        branches = options.get("branches") or "current"
+        if branches not in BRANCH_MODES:
+            raise ValueError(f"Unknown branches option: {branches}")
+
+        query = options.get("query")
         records: List[ConversationRecord] = []
         for convo in conversations:
+            title = str(convo.get("title") or "Untitled conversation")
+            date = _to_iso(convo.get("create_time") or convo.get("update_time"))
+            if query is not None and not query.accepts(title=title, date=date):
+                continue
             mapping = convo.get("mapping") or {}
-            messages: List[Message] = []
-
-            for node in mapping.values():
-                message = node.get("message") if isinstance(node, dict) else None
-                if not message:
-                    continue
-                author = message.get("author") or {}
-                role = author.get("role") or "unknown"
-                content = message.get("content") or {}
-                parts = content.get("parts") or []
-                text = "\n".join(str(part) for part in parts if part is not None)
-                created_at = _to_iso(message.get("create_time"))
-                if text:
-                    messages.append(Message(role=role, content=text, created_at=created_at))
-
-            messages.sort(key=lambda msg: msg.created_at or "")
-            transcript_lines = [f"{msg.role}: {msg.content}" for msg in messages]
+            if not isinstance(mapping, dict):
+                mapping = {}
+            metadata: Dict[str, Any] = {}
+            if query is not None and not query.needs_messages(has_id=bool(convo.get("id"))):
+                messages = []
+            elif branches == "all" and _is_tree(mapping):
+                messages, alternates = _all_branches(mapping, convo.get("current_node"))
+                if alternates:
+                    metadata["branches"] = alternates
+            else:
+                messages = _current_messages(mapping, convo.get("current_node"))
 
             records.append(
                 ConversationRecord(
                     id=str(convo.get("id") or ""),
-                    title=str(convo.get("title") or "Untitled conversation"),
+                    title=title,
                     platform=platform,
                     project=project,
-                    date=_to_iso(convo.get("create_time") or convo.get("update_time")),
-                    transcript="\n".join(transcript_lines),
+                    date=date,
+                    transcript=_transcript(messages),
                     messages=messages,
-                    metadata={},
+                    metadata=metadata,
                 )
             )
 
         return records
+
+    def _parse_lazy(
+        self, source_path: Path, *, platform: str, project: str | None, options: dict
+    ) -> List[ConversationRecord]:
+        """Stream the export, keeping each mapping as text until it is read."""
+        query = options.get("query")
+        records: List[ConversationRecord] = []
+        with open_text(source_path) as handle:
+            if plain_suffix(source_path) == ".jsonl":
+                items = (
+                    item
+                    for line in handle
+                    if line.strip() and not line.strip().startswith("#")
+                    for item in iter_objects(io.StringIO(line), RAW_KEYS)
+                )
+            else:
+                items = iter_objects(handle, RAW_KEYS)
+            for convo, raw in items:
+                if "mapping" not in raw:
+                    # Not a conversation object (a wrapper, or no mapping).
+                    records.extend(
+                        self._parse_payload(
+                            convo, platform=platform, project=project, options=options
+                        )
+                    )
+                    continue
+                title = str(convo.get("title") or "Untitled conversation")
+                date = _to_iso(convo.get("create_time") or convo.get("update_time"))
+                if query is not None and not query.accepts(title=title, date=date):
+                    continue
+                fields = {
+                    "id": str(convo.get("id") or ""),
+                    "title": title,
+                    "platform": platform,
+                    "project": project,
+                    "date": date,
+                }
+                if query is not None and not query.needs_messages(has_id=bool(convo.get("id"))):
+                    records.append(ConversationRecord(**fields))
+                    continue
+                records.append(
+                    LazyConversationRecord.deferred(
+                        (raw["mapping"], convo.get("current_node")), _decode_current, **fields
+                    )
+                )
+        return records
@@ -1,12 +1,37 @@
-"""Claude importer skeleton."""
+"""Claude importer skeleton.
+
+A ``query`` option (see ``rokpyl.core.query``) is checked against each
+conversation's name and creation date before its messages are decoded; the
+streaming HTML and CSV parsers skip the text of rejected conversations.
+
+With ``lazy_messages: true`` JSON and JSONL exports are streamed and each
+conversation keeps its messages as raw JSON text in a
+``LazyConversationRecord``, decoded only when they are read.
+"""
 from __future__ import annotations
 
 from pathlib import Path
+import io
 import json
-from typing import List
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from rokpyl.core.archive import iter_payloads
+from rokpyl.core.compression import open_text, plain_suffix, read_text
+from rokpyl.core.config import as_bool
+from rokpyl.core.jsonstream import iter_objects
+from rokpyl.importers.base import Fingerprint, Importer
+from rokpyl.models.canonical import (
+    Attachment,
+    ConversationRecord,
+    LazyConversationRecord,
+    Message,
+)
 
-from rokpyl.importers.base import Importer
-from rokpyl.models.canonical import ConversationRecord, Message
+
+HTML_SUFFIXES = {".html", ".htm"}
+CSV_SUFFIXES = {".csv"}
+# Kept as raw JSON text by the lazy parser.
+RAW_KEYS = ("chat_messages", "messages")
 
 
 def _coerce_text(value: object) -> str:
@@ -24,8 +49,90 @@ def _coerce_text(value: object) -> str:
     return str(value)
 
 
+def _size(value: object) -> int | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+
+def _attachments(message: dict) -> List[Attachment]:
+    """Uploads (``attachments``, with extracted text) and ``files`` of a message."""
+    found: List[Attachment] = []
+    for item in message.get("attachments") or []:
+        if not isinstance(item, dict):
+            continue
+        extra = {}
+        if item.get("id"):
+            extra["id"] = item["id"]
+        if item.get("extracted_content"):
+            extra["extracted_content"] = item["extracted_content"]
+        found.append(
+            Attachment(
+                name=item.get("file_name"),
+                mime_type=item.get("file_type") or None,
+                size_bytes=_size(item.get("file_size")),
+                extra=extra,
+            )
+        )
+    for item in message.get("files") or []:
+        if not isinstance(item, dict):
+            continue
+        extra = {"file_uuid": item["file_uuid"]} if item.get("file_uuid") else {}
+        found.append(Attachment(name=item.get("file_name"), extra=extra))
+    return found
+
+
+def _title(convo: dict) -> str:
+    return str(convo.get("name") or convo.get("title") or "Untitled conversation")
+
+
+def _date(convo: dict) -> Any:
+    return convo.get("created_at") or convo.get("date") or convo.get("updated_at")
+
+
+def _decode_messages(raw_messages: Any) -> Tuple[List[Message], str]:
+    messages: List[Message] = []
+    transcript_lines: List[str] = []
+    for message in raw_messages or []:
+        role = message.get("role") or message.get("sender") or "unknown"
+        if role == "human":
+            role = "user"
+        content = message.get("content")
+        if isinstance(content, dict):
+            content = content.get("text") or content.get("value") or content
+        if content is None:
+            content = message.get("text") or message.get("content") or ""
+        messages.append(
+            Message(
+                role=role,
+                content=content,
+                created_at=message.get("created_at"),
+                attachments=_attachments(message),
+            )
+        )
+        transcript_lines.append(f"{role}: {_coerce_text(content)}")
+    return messages, "\n".join(transcript_lines)
+
+
+def _decode_raw(raw: Tuple[Optional[str], Optional[str]]) -> Tuple[List[Message], str]:
+    """Decoder of lazy records: JSON text of (chat_messages, messages)."""
+    chat_messages, messages = raw
+    raw_messages = json.loads(chat_messages) if chat_messages is not None else None
+    if raw_messages is None:
+        raw_messages = json.loads(messages) if messages is not None else []
+    return _decode_messages(raw_messages)
+
+
 class ClaudeImporter(Importer):
     name = "claude"
+    fingerprints = (
+        Fingerprint("claude-export", ("uuid:string", "chat_messages:array")),
+        Fingerprint("claude-messages", ("messages:array", "messages[].role")),
+    )
 
     def discover_sources(self, export_path: Path) -> List[Path]:
         if export_path.is_file():
@@ -36,14 +143,25 @@ class ClaudeImporter(Importer):
             path
             for path in export_path.rglob("*")
             if path.is_file()
-            and path.suffix.lower() in {".json", ".jsonl", ".html", ".csv", ".zip"}
+            and plain_suffix(path) in {".json", ".jsonl", ".zip"} | HTML_SUFFIXES | CSV_SUFFIXES
         ]
 
     def can_parse(self, source_path: Path) -> float:
         name = source_path.name.lower()
+        suffix = plain_suffix(source_path)
+        if suffix in HTML_SUFFIXES or suffix in CSV_SUFFIXES:
+            # Any page or spreadsheet could sit in an export folder: claim
+            # only those whose first chunk has the expected markup or columns.
+            if suffix in HTML_SUFFIXES:
+                from rokpyl.importers.claude_html import looks_like_export
+            else:
+                from rokpyl.importers.claude_csv import looks_like_export
+            if not looks_like_export(source_path):
+                return 0.0
+            return 0.6 if "claude" in name else 0.3
         if "claude" in name:
             return 0.6
-        if source_path.suffix.lower() in {".json", ".jsonl"}:
+        if suffix in {".json", ".jsonl"}:
             return 0.2
         return 0.0
 
@@ -51,30 +169,95 @@ class ClaudeImporter(Importer):
         self, source_path: Path, options: dict | None = None
     ) -> List[ConversationRecord]:
         options = options or {}
-        suffix = source_path.suffix.lower()
-        if suffix not in {".json", ".jsonl"}:
+        suffix = plain_suffix(source_path)
+        if suffix not in {".json", ".jsonl", ".zip"} | HTML_SUFFIXES | CSV_SUFFIXES:
             return []
 
         records: List[ConversationRecord] = []
         platform = options.get("platform") or "Claude"
         project = options.get("project")
+        query = options.get("query")
+        if query is not None and not query.accepts_platform(platform):
+            return []
+
+        if suffix == ".zip":
+            for payload in iter_payloads(source_path):
+                records.extend(
+                    self._parse_payload(payload, platform=platform, project=project, query=query)
+                )
+            return records
+
+        if suffix in HTML_SUFFIXES or suffix in CSV_SUFFIXES:
+            # Streamed: only one conversation is held besides the records.
+            if suffix in HTML_SUFFIXES:
+                from rokpyl.importers.claude_html import iter_conversations
+            else:
+                from rokpyl.importers.claude_csv import iter_conversations
+            accept = None
+            if query is not None:
+
+                def accept(convo: dict) -> bool:
+                    return query.accepts(title=_title(convo), date=_date(convo))
+
+            for convo in iter_conversations(source_path, accept=accept):
+                records.extend(
+                    self._parse_payload(convo, platform=platform, project=project, query=query)
+                )
+            return records
+
+        if as_bool(options.get("lazy_messages"), False):
+            with open_text(source_path) as handle:
+                if suffix == ".jsonl":
+                    items: Iterable[Tuple[Any, Dict[str, str]]] = (
+                        item
+                        for line in handle
+                        if line.strip() and not line.strip().startswith("#")
+                        for item in iter_objects(io.StringIO(line), RAW_KEYS)
+                    )
+                else:
+                    items = iter_objects(handle, RAW_KEYS)
+                for convo, raw in items:
+                    records.extend(
+                        self._parse_lazy(
+                            convo, raw, platform=platform, project=project, query=query
+                        )
+                    )
+            return records
 
         if suffix == ".jsonl":
-            for line in source_path.read_text(encoding="utf-8").splitlines():
+            for line in read_text(source_path).splitlines():
                 stripped = line.strip()
                 if not stripped or stripped.startswith("#"):
                     continue
                 payload = json.loads(stripped)
                 records.extend(
-                    self._parse_payload(payload, platform=platform, project=project)
+                    self._parse_payload(payload, platform=platform, project=project, query=query)
                 )
             return records
 
-        payload = json.loads(source_path.read_text(encoding="utf-8"))
-        return self._parse_payload(payload, platform=platform, project=project)
+        payload = json.loads(read_text(source_path))
+        return self._parse_payload(payload, platform=platform, project=project, query=query)
+
+    def splittable(self, source_path: Path, options: dict | None = None) -> bool:
+        options = options or {}
+        return source_path.suffix.lower() == ".json" and not as_bool(
+            options.get("lazy_messages"), False
+        )
+
+    def parse_items(
+        self, items: List[Any], options: dict | None = None
+    ) -> List[ConversationRecord]:
+        options = options or {}
+        platform = options.get("platform") or "Claude"
+        query = options.get("query")
+        if query is not None and not query.accepts_platform(platform):
+            return []
+        return self._parse_payload(
+            items, platform=platform, project=options.get("project"), query=query
+        )
 
     def _parse_payload(
-        self, payload: dict, *, platform: str, project: str | None
+        self, payload: dict, *, platform: str, project: str | None, query: Any = None
     ) -> List[ConversationRecord]:
         conversations = payload
         if isinstance(payload, dict):
@@ -86,44 +269,59 @@ class ClaudeImporter(Importer):
 
         records: List[ConversationRecord] = []
         for convo in conversations:
-            messages: List[Message] = []
-            transcript_lines: List[str] = []
+            title = _title(convo)
+            date = _date(convo)
+            if query is not None and not query.accepts(title=title, date=date):
+                continue
             raw_messages = convo.get("chat_messages")
             if raw_messages is None:
                 raw_messages = convo.get("messages", [])
-            for message in raw_messages or []:
-                role = message.get("role") or message.get("sender") or "unknown"
-                if role == "human":
-                    role = "user"
-                content = message.get("content")
-                if isinstance(content, dict):
-                    content = content.get("text") or content.get("value") or content
-                if content is None:
-                    content = message.get("text") or message.get("content") or ""
-                messages.append(
-                    Message(
-                        role=role,
-                        content=content,
-                        created_at=message.get("created_at"),
-                    )
-                )
-                transcript_lines.append(f"{role}: {_coerce_text(content)}")
+            if query is not None and not query.needs_messages(
+                has_id=bool(convo.get("uuid") or convo.get("id"))
+            ):
+                raw_messages = []
+            messages, transcript = _decode_messages(raw_messages)
 
             records.append(
                 ConversationRecord(
                     id=str(convo.get("uuid") or convo.get("id") or ""),
-                    title=str(
-                        convo.get("name")
-                        or convo.get("title")
-                        or "Untitled conversation"
-                    ),
+                    title=title,
                     platform=platform,
                     project=project,
-                    date=convo.get("created_at") or convo.get("date") or convo.get("updated_at"),
+                    date=date,
                     summary=convo.get("summary"),
-                    transcript="\n".join(transcript_lines),
+                    transcript=transcript,
                     messages=messages,
                 )
             )
 
         return records
+
+    def _parse_lazy(
+        self,
+        convo: Any,
+        raw: Dict[str, str],
+        *,
+        platform: str,
+        project: str | None,
+        query: Any = None,
+    ) -> List[ConversationRecord]:
+        if not raw or "conversations" in convo:
+            # Not a conversation object with messages (e.g. a wrapper).
+            return self._parse_payload(convo, platform=platform, project=project, query=query)
+        title = _title(convo)
+        date = _date(convo)
+        if query is not None and not query.accepts(title=title, date=date):
+            return []
+        fields = {
+            "id": str(convo.get("uuid") or convo.get("id") or ""),
+            "title": title,
+            "platform": platform,
+            "project": project,
+            "date": date,
+            "summary": convo.get("summary"),
+        }
+        if query is not None and not query.needs_messages(has_id=bool(fields["id"])):
+            return [ConversationRecord(**fields)]
+        payload = (raw.get("chat_messages"), raw.get("messages"))
+        return [LazyConversationRecord.deferred(payload, _decode_raw, **fields)]
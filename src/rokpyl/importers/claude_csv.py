@@ -0,0 +1,117 @@
+"""Streaming parser for Claude CSV exports.
+
+One row per message, read with the ``csv`` module so only the current
+conversation is held in memory. Column names are matched case-insensitively:
+
+- conversation: ``conversation_uuid`` / ``conversation_id``, ``conversation_name``
+  / ``title``, ``conversation_created_at``
+- message: ``sender`` / ``role``, ``text`` / ``content``, ``created_at``
+
+Rows of one conversation must be consecutive; a conversation ends when the
+conversation id (or, without an id column, name and creation time) changes.
+Conversations are yielded in the dict shape of the JSON export. An
+``accept`` predicate sees each conversation before its messages are read;
+rows of rejected conversations are skipped.
+"""
+from __future__ import annotations
+
+import csv
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence
+
+from rokpyl.core.compression import open_text
+
+# Long messages exceed the csv module's 128 KiB default field limit.
+FIELD_LIMIT = 1 << 30
+
+_COLUMNS = {
+    "uuid": ("conversation_uuid", "conversation_id"),
+    "name": ("conversation_name", "title"),
+    "conversation_created_at": ("conversation_created_at",),
+    "sender": ("sender", "role"),
+    "text": ("text", "content"),
+    "created_at": ("created_at", "message_created_at"),
+}
+
+
+def _resolve(header: Sequence[str]) -> Dict[str, Optional[int]]:
+    lowered = [name.strip().lower() for name in header]
+    columns: Dict[str, Optional[int]] = {}
+    for key, names in _COLUMNS.items():
+        columns[key] = next((lowered.index(name) for name in names if name in lowered), None)
+    if columns["text"] is None:
+        raise ValueError("Claude CSV export needs a text or content column")
+    return columns
+
+
+def looks_like_export(path: Path) -> bool:
+    """Whether the header of ``path`` has a text column and a sender or conversation column."""
+    try:
+        with open_text(path, encoding="utf-8-sig", errors="replace", newline="") as handle:
+            header = next(csv.reader([handle.readline()]), None)
+    except OSError:
+        return False
+    except ValueError:
+        return True  # compressed with a missing codec: let parsing report it
+    if not header:
+        return False
+    try:
+        columns = _resolve(header)
+    except ValueError:
+        return False
+    return any(columns[key] is not None for key in ("sender", "uuid", "name"))
+
+
+def iter_conversations(
+    path: Path, *, accept: Optional[Callable[[Dict[str, Any]], bool]] = None
+) -> Iterator[Dict[str, Any]]:
+    """Yield conversations from a CSV export as each one is complete."""
+    if csv.field_size_limit() < FIELD_LIMIT:
+        csv.field_size_limit(FIELD_LIMIT)
+    with open_text(path, encoding="utf-8-sig", newline="") as handle:
+        reader = csv.reader(handle)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = _resolve(header)
+
+        def cell(row: Sequence[str], key: str) -> Optional[str]:
+            index = columns[key]
+            if index is None or index >= len(row):
+                return None
+            return row[index] or None
+
+        current: Optional[Dict[str, Any]] = None
+        current_key: Any = None
+        skipping = False
+        for row in reader:
+            if not any(row):
+                continue
+            uuid = cell(row, "uuid")
+            name = cell(row, "name")
+            created = cell(row, "conversation_created_at")
+            key = uuid if columns["uuid"] is not None else (name, created)
+            if (current is None and not skipping) or key != current_key:
+                if current is not None:
+                    yield current
+                current = {
+                    "uuid": uuid or "",
+                    "name": name,
+                    "created_at": created or cell(row, "created_at"),
+                    "chat_messages": [],
+                }
+                current_key = key
+                skipping = accept is not None and not accept(current)
+                if skipping:
+                    current = None
+            if skipping:
+                continue
+            current["chat_messages"].append(
+                {
+                    "sender": cell(row, "sender") or "unknown",
+                    "text": cell(row, "text") or "",
+                    "created_at": cell(row, "created_at"),
+                }
+            )
+        if current is not None:
+            yield current
@@ -0,0 +1,238 @@
+"""Streaming parser for Claude HTML exports.
+
+The page is fed to ``html.parser`` in chunks and conversations are yielded
+as soon as their element closes, so no DOM is built and the file is never
+held in memory. Expected markup (class names and data attributes may sit on
+any element)::
+
+    <article class="conversation" data-uuid="..." data-created-at="...">
+      <h2>Title</h2>
+      <div class="message" data-sender="human" data-created-at="...">
+        <p>Hello</p>
+      </div>
+    </article>
+
+A conversation is an element with ``data-uuid`` (or
+``data-conversation-id``) or the ``conversation`` class; inside it, a
+message is an element with ``data-sender``/``data-role`` or the ``message``
+class (the role then comes from a ``human``/``user``/``assistant`` class),
+and the title is the first ``h1``-``h3`` or ``title`` element outside a
+message. Conversations are yielded in the dict shape of the JSON export.
+
+An ``accept`` predicate is evaluated once the conversation header is known
+(at its first message, or when it closes without one); the text of
+rejected conversations is never collected.
+"""
+from __future__ import annotations
+
+import re
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from rokpyl.core.compression import open_text
+
+CHUNK_SIZE = 1 << 16
+
+_VOID = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+    "param", "source", "track", "wbr",
+}
+_BLOCK = {
+    "address", "article", "blockquote", "dd", "div", "dl", "dt", "figure", "footer",
+    "h1", "h2", "h3", "h4", "h5", "h6", "header", "li", "ol", "p", "pre", "section",
+    "table", "tr", "ul",
+}
+_HEADINGS = {"h1", "h2", "h3"}
+_ROLES = ("human", "user", "assistant", "system")
+_SPACE = re.compile(r"\s+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+# An attribute or class that marks a conversation element (see above).
+_MARKUP = re.compile(
+    r"""data-(?:uuid|conversation-id)\s*=|class\s*=\s*["'][^"']*(?<![\w-])conversation(?![\w-])""",
+    re.IGNORECASE,
+)
+
+Attrs = Dict[str, str]
+Accept = Callable[[Dict[str, Any]], bool]
+
+
+def looks_like_export(path: Path) -> bool:
+    """Whether the first chunk of ``path`` holds a conversation element."""
+    try:
+        with open_text(path, errors="replace") as handle:
+            head = handle.read(CHUNK_SIZE)
+    except OSError:
+        return False
+    except ValueError:
+        return True  # compressed with a missing codec: let parsing report it
+    return _MARKUP.search(head) is not None
+
+
+def _classes(attrs: Attrs) -> List[str]:
+    return (attrs.get("class") or "").split()
+
+
+def _clean(chunks: List[str]) -> str:
+    text = "".join(chunks)
+    lines = [line.rstrip() for line in text.split("\n")]
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip("\n")
+
+
+class _ConversationParser(HTMLParser):
+    def __init__(self, accept: Optional[Accept] = None) -> None:
+        super().__init__(convert_charrefs=True)
+        self.completed: List[Dict[str, Any]] = []
+        self._accept = accept
+        self._accepted: Optional[bool] = None
+        self._stack: List[str] = []
+        self._pre = 0
+        self._conversation: Optional[Dict[str, Any]] = None
+        self._conversation_depth = 0
+        self._message: Optional[Dict[str, Any]] = None
+        self._message_depth = 0
+        self._text: List[str] = []
+        self._title: Optional[List[str]] = None
+        self._title_depth = 0
+
+    # Element bookkeeping -------------------------------------------------
+
+    def handle_starttag(self, tag: str, attr_list: List[Tuple[str, Optional[str]]]) -> None:
+        attrs: Attrs = {key: value or "" for key, value in attr_list}
+        if tag in _VOID:
+            if tag == "br":
+                self._append("\n")
+            return
+        if tag in _BLOCK:
+            self._append("\n")
+        self._stack.append(tag)
+        depth = len(self._stack)
+        if tag == "pre":
+            self._pre += 1
+        classes = _classes(attrs)
+
+        if self._conversation is None:
+            uuid = attrs.get("data-uuid") or attrs.get("data-conversation-id")
+            if uuid or "conversation" in classes:
+                self._conversation = {
+                    "uuid": uuid or attrs.get("id") or "",
+                    "name": attrs.get("data-title") or None,
+                    "created_at": attrs.get("data-created-at") or None,
+                    "updated_at": attrs.get("data-updated-at") or None,
+                    "chat_messages": [],
+                }
+                self._conversation_depth = depth
+                self._accepted = None
+            return
+
+        if self._message is None and self._accepted is not False:
+            role = attrs.get("data-sender") or attrs.get("data-role")
+            if role is None and "message" in classes:
+                role = next((name for name in _ROLES if name in classes), "unknown")
+            if role is not None and not self._is_accepted():
+                return
+            if role is not None:
+                self._message = {
+                    "sender": role,
+                    "created_at": attrs.get("data-created-at") or None,
+                }
+                self._message_depth = depth
+                self._text = []
+            elif self._title is None and self._conversation["name"] is None and (
+                tag in _HEADINGS or "title" in classes or "conversation-title" in classes
+            ):
+                self._title = []
+                self._title_depth = depth
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag in _VOID:
+            self.handle_starttag(tag, attrs)
+        else:
+            self.handle_starttag(tag, attrs)
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag not in self._stack:
+            return  # stray end tag
+        while self._stack:
+            depth = len(self._stack)
+            closed = self._stack.pop()
+            if closed == "pre":
+                self._pre -= 1
+            if closed in _BLOCK:
+                self._append("\n")
+            self._close(depth)
+            if closed == tag:
+                break
+
+    def _close(self, depth: int) -> None:
+        if self._title is not None and depth == self._title_depth:
+            self._conversation["name"] = _SPACE.sub(" ", "".join(self._title)).strip() or None
+            self._title = None
+        if self._message is not None and depth == self._message_depth:
+            self._message["text"] = _clean(self._text)
+            self._conversation["chat_messages"].append(self._message)
+            self._message = None
+        if self._conversation is not None and depth == self._conversation_depth:
+            if self._is_accepted():
+                self.completed.append(self._conversation)
+            self._conversation = None
+
+    def _is_accepted(self) -> bool:
+        if self._accepted is None:
+            self._title = None  # the header ends at the first message
+            self._accepted = self._accept is None or self._accept(self._conversation)
+        return self._accepted
+
+    # Text ----------------------------------------------------------------
+
+    def handle_data(self, data: str) -> None:
+        if self._message is None and self._title is None:
+            return
+        if not self._pre:
+            data = _SPACE.sub(" ", data)
+        self._append(data)
+
+    def _append(self, text: str) -> None:
+        if self._message is not None:
+            chunks = self._text
+        elif self._title is not None:
+            chunks = self._title
+        else:
+            return
+        if text == "\n":
+            if chunks and not chunks[-1].endswith("\n"):
+                chunks.append("\n")
+            return
+        if not self._pre and chunks and chunks[-1].endswith((" ", "\n")):
+            text = text.lstrip(" ")
+        if not self._pre and not chunks:
+            text = text.lstrip(" ")
+        if text:
+            chunks.append(text)
+
+    def finish(self) -> None:
+        self.close()
+        while self._stack:
+            depth = len(self._stack)
+            self._stack.pop()
+            self._close(depth)
+
+
+def iter_conversations(
+    path: Path, *, chunk_size: int = CHUNK_SIZE, accept: Optional[Accept] = None
+) -> Iterator[Dict[str, Any]]:
+    """Yield conversations from an HTML export as each one is complete."""
+    parser = _ConversationParser(accept)
+    with open_text(path, errors="replace") as handle:
+        while True:
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            if parser.completed:
+                yield from parser.completed
+                parser.completed = []
+    parser.finish()
+    yield from parser.completed
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 
 @dataclass
@@ -34,3 +34,94 @@ class ConversationRecord:
     transcript: str = ""
     messages: List[Message] = field(default_factory=list)
     metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+# Turns an importer's raw payload into (messages, transcript).
+MessageDecoder = Callable[[Any], Tuple[List[Message], str]]
+
+
+def _deferred(name: str) -> property:
+    key = f"_{name}"
+
+    def get(self: "LazyConversationRecord") -> Any:
+        values = self.__dict__
+        if key not in values:
+            self._decode()
+        return values[key]
+
+    def set(self: "LazyConversationRecord", value: Any) -> None:
+        values = self.__dict__
+        values[key] = value
+        if "_messages" in values and "_transcript" in values:
+            values.pop("_pending", None)
+
+    return property(get, set)
+
+
+class LazyConversationRecord(ConversationRecord):
+    """A record whose ``messages`` and ``transcript`` are decoded on first access.
+
+    Importers keep the raw JSON text of a conversation's messages and a
+    module-level decoder; the other fields are plain values. Reading either
+    field decodes both, exactly as the eager importer would have built them,
+    so consumers (exporters, ``asdict``, pickling) see the same record.
+    Assigning a field (e.g. a projection clearing it) never decodes.
+    Concurrent readers (exporters fanned out to threads) may both decode;
+    the first result is kept.
+    """
+
+    messages = _deferred("messages")  # type: ignore[assignment]
+    transcript = _deferred("transcript")  # type: ignore[assignment]
+
+    @classmethod
+    def deferred(
+        cls, raw: Any, decoder: MessageDecoder, **fields: Any
+    ) -> "LazyConversationRecord":
+        record = cls(**fields)
+        values = record.__dict__
+        del values["_messages"], values["_transcript"]
+        values["_pending"] = (raw, decoder)
+        return record
+
+    def __eq__(self, other: object) -> bool:
+        # Equal to the eagerly built record with the same field values.
+        if not isinstance(other, ConversationRecord):
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name) for name in self.__dataclass_fields__
+        )
+
+    @property
+    def decoded(self) -> bool:
+        return "_pending" not in self.__dict__
+
+    @property
+    def pending(self) -> Any:
+        """The raw payload still to be decoded, or ``None`` once decoded."""
+        pending = self.__dict__.get("_pending")
+        return None if pending is None else pending[0]
+
+    def _decode(self) -> None:
+        values = self.__dict__
+        pending = values.get("_pending")
+        if pending is None:
+            return  # decoded by another thread
+        raw, decoder = pending
+        messages, transcript = decoder(raw)
+        values.setdefault("_messages", messages)
+        values.setdefault("_transcript", transcript)
+        values.pop("_pending", None)
+
+
+def messages_decoded(record: ConversationRecord) -> bool:
+    """False for a lazy record whose messages have not been decoded yet."""
+    return not isinstance(record, LazyConversationRecord) or record.decoded
+
+
+def record_from_dict(data: Dict[str, Any]) -> ConversationRecord:
+    """Rebuild a record from ``dataclasses.asdict`` output (e.g. a JSONL line)."""
+    messages = []
+    for item in data.get("messages") or []:
+        attachments = [Attachment(**attachment) for attachment in item.get("attachments") or []]
+        messages.append(Message(**{**item, "attachments": attachments}))
+    return ConversationRecord(**{**data, "messages": messages})
@@ -0,0 +1,412 @@
+"""Local conversion service with a warm worker pool.
+
+``rokpyl serve`` starts an HTTP server on localhost (or a Unix socket) backed
+by a pool whose workers import rokpyl and build the registries once, so a
+job only pays for its own work instead of interpreter startup, imports and
+registry construction.
+
+A TCP listener requires a token, sent as ``Authorization: Bearer <token>``:
+any local user can reach a localhost port. A Unix socket is created
+owner-only, so its token is optional.
+
+Endpoints:
+
+- ``GET /health``: ``{"status": "ok", "workers": N}``
+- ``POST /jobs``: the body is a config dict as produced by ``build_config``.
+  The response streams newline-delimited JSON events: ``accepted``, then
+  ``done`` (records, export failures, run report) or ``error``. With
+  ``?records=1`` every record is streamed as a ``record`` event while it is
+  exported, before ``done``.
+"""
+from __future__ import annotations
+
+import hmac
+import http.client
+import json
+import multiprocessing
+import os
+import queue
+import socket
+import socketserver
+import stat
+import threading
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from rokpyl.core.async_pipeline import AsyncPipeline
+from rokpyl.core.config import ConfigError
+from rokpyl.core.pipeline import Pipeline
+from rokpyl.core.plugins import resolve_plugins_dir
+from rokpyl.core.registry import ExporterRegistry, ImporterRegistry
+
+EXECUTORS = ("process", "thread")
+
+_local = threading.local()
+
+Registries = Tuple[ImporterRegistry, ExporterRegistry]
+
+
+def _registries(plugins_dir: Optional[Path]) -> Registries:
+    from rokpyl.cli import build_exporter_registry, build_registry
+
+    importers = build_registry(plugins_dir)
+    exporters = build_exporter_registry(plugins_dir)
+    # Registries load lazily; a warm worker imports everything up front.
+    importers.all()
+    exporters.all()
+    return importers, exporters
+
+
+def _plugins_dir(plugins_dir: Optional[str]) -> Optional[Path]:
+    """The server's ``plugins_dir``, else ``./plugins`` if present."""
+    return resolve_plugins_dir({"plugins_dir": plugins_dir})
+
+
+def init_worker(plugins_dir: Optional[str] = None) -> None:
+    """Pool initializer: build and import registries before the first job arrives."""
+    _local.registries = {}
+    _local.pipelines = {}
+    _worker_registries(_plugins_dir(plugins_dir))
+
+
+def _worker_registries(plugins_dir: Optional[Path]) -> Registries:
+    if not hasattr(_local, "registries"):
+        _local.registries = {}
+        _local.pipelines = {}
+    key = str(plugins_dir) if plugins_dir else None
+    registries = _local.registries.get(key)
+    if registries is None:
+        registries = _local.registries[key] = _registries(plugins_dir)
+    return registries
+
+
+def _ready() -> bool:
+    return True
+
+
+def _pipeline(engine: str, plugins_dir: Optional[Path] = None) -> Pipeline:
+    registries = _worker_registries(plugins_dir)
+    key = (str(plugins_dir) if plugins_dir else None, engine)
+    pipeline = _local.pipelines.get(key)
+    if pipeline is None:
+        if engine not in {"sequential", "async"}:
+            raise ConfigError(f"Unknown engine: {engine}")
+        pipeline_cls = AsyncPipeline if engine == "async" else Pipeline
+        # Reused across jobs on this worker, keeping the detection index warm.
+        pipeline = _local.pipelines[key] = pipeline_cls(*registries)
+    return pipeline
+
+
+def _error_event(exc: BaseException) -> Dict[str, Any]:
+    return {"status": "error", "error": f"{type(exc).__name__}: {exc}"}
+
+
+def run_job(
+    config: Dict[str, Any],
+    events: Optional["queue.Queue[Dict[str, Any]]"] = None,
+    plugins_dir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Run one conversion job; always returns a ``done`` or ``error`` event.
+
+    With ``events`` set, a ``record`` event is put there for every record as
+    it is exported. Plugins come from the server's ``plugins_dir`` only: a
+    job naming its own would have the worker import code from any path the
+    server can read, so such a job is rejected.
+    """
+    try:
+        if not config.get("inputs"):
+            raise ConfigError("No inputs provided")
+        if config.get("plugins_dir"):
+            raise ConfigError("plugins_dir is set by the server (--plugins-dir), not per job")
+        engine = (config.get("runtime") or {}).get("engine") or "sequential"
+        pipeline = _pipeline(engine, _plugins_dir(plugins_dir))
+        if events is not None:
+            put = events.put
+            pipeline.record_sink = lambda record: put(
+                {"status": "record", "record": asdict(record)}
+            )
+        try:
+            records = pipeline.run(config)
+        finally:
+            pipeline.record_sink = None
+    except Exception as exc:  # reported to the client
+        return _error_event(exc)
+    event: Dict[str, Any] = {
+        "status": "done",
+        "records": len(records),
+        "export_failures": [
+            {"type": result.name, "error": str(result.error)}
+            for result in pipeline.export_failures
+        ],
+        "report": pipeline.report(),
+    }
+    # The pipeline stays warm for the next job; its records are not needed.
+    pipeline.close()
+    return event
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_ServerMixin"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def address_string(self) -> str:
+        # Unix socket clients have no (host, port) address.
+        client = self.client_address
+        return client[0] if isinstance(client, tuple) and client else "unix"
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _event(self, payload: Dict[str, Any]) -> None:
+        self.wfile.write(json.dumps(payload, ensure_ascii=True).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+    def _authorized(self) -> bool:
+        token = self.server.token
+        if token is None:
+            return True
+        given = self.headers.get("Authorization") or ""
+        if hmac.compare_digest(given.encode("utf-8"), f"Bearer {token}".encode("utf-8")):
+            return True
+        self._send_json(401, {"status": "error", "error": "missing or invalid token"})
+        return False
+
+    def do_GET(self) -> None:
+        if not self._authorized():
+            return
+        if urlsplit(self.path).path == "/health":
+            self._send_json(200, {"status": "ok", "workers": self.server.workers})
+        else:
+            self._send_json(404, {"status": "error", "error": "not found"})
+
+    def do_POST(self) -> None:
+        if not self._authorized():
+            return
+        url = urlsplit(self.path)
+        if url.path != "/jobs":
+            self._send_json(404, {"status": "error", "error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            config = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(config, dict):
+                raise ValueError("job body must be a JSON object")
+        except ValueError as exc:
+            self._send_json(400, {"status": "error", "error": str(exc)})
+            return
+        return_records = parse_qs(url.query).get("records", ["0"])[0] not in {"0", ""}
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        self._event({"status": "accepted"})
+        events = self.server.event_queue() if return_records else None
+        try:
+            future = self.server.pool.submit(run_job, config, events, self.server.plugins_dir)
+            for event in _stream(future, events):
+                self._event(event)
+            result = future.result()
+        except Exception as exc:  # a broken pool, not a failed job
+            if isinstance(exc, BrokenProcessPool):
+                self.server.replace_pool()
+            result = _error_event(exc)
+        self._event(result)
+
+
+def _stream(
+    future: "Future[Dict[str, Any]]", events: Optional["queue.Queue[Dict[str, Any]]"]
+) -> Iterator[Dict[str, Any]]:
+    """Events put by a running job, until it finishes and they are drained."""
+    if events is None:
+        wait([future])
+        return
+    while True:
+        finished = future.done()
+        try:
+            event = events.get_nowait() if finished else events.get(timeout=0.05)
+        except queue.Empty:
+            if finished:
+                return
+            continue
+        yield event
+
+
+class _ServerMixin:
+    pool: Executor
+    workers: int
+    executor: str = "process"
+    plugins_dir: Optional[str] = None
+    token: Optional[str] = None
+    verbose: bool = False
+    manager: Any = None
+    _pool_lock: threading.Lock
+
+    def event_queue(self) -> "queue.Queue[Dict[str, Any]]":
+        """A queue a worker can put events on: shared across processes if need be."""
+        if self.executor != "process":
+            return queue.Queue()
+        with self._pool_lock:
+            if self.manager is None:
+                self.manager = multiprocessing.Manager()
+            return self.manager.Queue()
+
+    def replace_pool(self) -> None:
+        """Start a fresh pool after a worker process died and broke this one."""
+        with self._pool_lock:
+            broken, self.pool = self.pool, make_pool(self.workers, self.executor, self.plugins_dir)
+        broken.shutdown(wait=False)
+
+
+class _TcpServer(_ServerMixin, ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _UnixServer(_ServerMixin, socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self) -> None:
+        # Create the socket owner-only rather than narrowing it after bind,
+        # which would leave it connectable by anyone in between.
+        previous = os.umask(0o077)
+        try:
+            socketserver.UnixStreamServer.server_bind(self)
+        finally:
+            os.umask(previous)
+        os.chmod(self.server_address, 0o600)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+def make_pool(
+    workers: int, executor: str = "process", plugins_dir: Optional[str] = None
+) -> Executor:
+    initargs = (plugins_dir,)
+    if executor == "process":
+        pool: Executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=init_worker, initargs=initargs
+        )
+    elif executor == "thread":
+        pool = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="rokpyl-job",
+            initializer=init_worker,
+            initargs=initargs,
+        )
+    else:
+        raise ConfigError(f"Unknown executor: {executor}")
+    # Warm every worker now rather than on the first jobs.
+    try:
+        for future in [pool.submit(_ready) for _ in range(workers)]:
+            future.result()
+    except Exception as exc:  # e.g. a plugin that fails to import
+        pool.shutdown(wait=False)
+        raise ConfigError(f"Could not start {executor} workers: {exc}") from exc
+    return pool
+
+
+def create_server(
+    *,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    socket_path: Optional[str] = None,
+    workers: int = 2,
+    executor: str = "process",
+    plugins_dir: Optional[str] = None,
+    token: Optional[str] = None,
+    verbose: bool = False,
+) -> socketserver.BaseServer:
+    """Build a server (not yet serving); call ``serve_forever`` and ``shutdown``.
+
+    A TCP server needs ``token``; a Unix socket server checks it when given.
+    """
+    if not socket_path and not token:
+        raise ConfigError("A TCP listener requires a token; or listen on a Unix socket")
+    if socket_path:
+        # Replace a stale socket from a previous server, never a regular file.
+        if os.path.exists(socket_path) and stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            os.unlink(socket_path)
+        server: Any = _UnixServer(socket_path, _Handler)
+    else:
+        server = _TcpServer((host, port), _Handler)
+    server.pool = make_pool(workers, executor, plugins_dir)
+    server.workers = workers
+    server.executor = executor
+    server.plugins_dir = plugins_dir
+    server.token = token
+    server.verbose = verbose
+    server._pool_lock = threading.Lock()
+    return server
+
+
+def close_server(server: socketserver.BaseServer) -> None:
+    server.server_close()
+    server.pool.shutdown(wait=True)  # type: ignore[attr-defined]
+    if server.manager is not None:  # type: ignore[attr-defined]
+        server.manager.shutdown()  # type: ignore[attr-defined]
+    address = server.server_address
+    if isinstance(address, str) and os.path.exists(address):
+        os.unlink(address)
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: Optional[float] = None) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self._socket_path = path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self._socket_path)
+        self.sock = sock
+
+
+def submit_job(
+    config: Dict[str, Any],
+    *,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    socket_path: Optional[str | Path] = None,
+    records: bool = False,
+    token: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Send a job to a running service and yield its events as they arrive."""
+    if socket_path:
+        connection: http.client.HTTPConnection = _UnixConnection(str(socket_path), timeout)
+    else:
+        connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        body = json.dumps(config).encode("utf-8")
+        path = "/jobs?records=1" if records else "/jobs"
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        connection.request("POST", path, body, headers)
+        response = connection.getresponse()
+        if response.status != 200:
+            yield json.loads(response.read() or b"{}")
+            return
+        for line in response:
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        connection.close()
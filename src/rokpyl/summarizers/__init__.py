@@ -0,0 +1 @@
+"""Summarizer package."""
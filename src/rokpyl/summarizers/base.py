@@ -0,0 +1,23 @@
+"""Summarizer base types."""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import List
+
+from rokpyl.models.canonical import ConversationRecord
+
+
+class Summarizer(ABC):
+    name: str
+
+    @abstractmethod
+    def summarize(
+        self, records: List[ConversationRecord], options: dict | None = None
+    ) -> List[ConversationRecord]:
+        """Summarize ``records``, a batch of a run rather than all of it.
+
+        The sequential engine passes every record at once, or 256 at a time
+        under ``runtime.max_memory``; the async engine passes up to 256 and may
+        call from several threads (``runtime.summarize_concurrency``).
+        """
+        raise NotImplementedError
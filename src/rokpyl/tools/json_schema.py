@@ -1,125 +1,256 @@
 """Infer a lightweight JSON schema from large files.
 
-Supports JSON and JSONL inputs. Designed for large, unformatted exports.
+Supports JSON and JSONL inputs, plain or gzip/zstd compressed. Designed for
+large, unformatted exports: inputs are streamed and reading stops once
+``max_items`` values are sampled.
 """
 from __future__ import annotations
 
 import argparse
 import json
+import random
 from pathlib import Path
-from typing import Any, Dict, Iterable
-
-
-def _type_name(value: Any) -> str:
-    if value is None:
-        return "null"
-    if isinstance(value, bool):
-        return "bool"
-    if isinstance(value, int) and not isinstance(value, bool):
-        return "int"
-    if isinstance(value, float):
-        return "float"
-    if isinstance(value, str):
-        return "string"
-    if isinstance(value, list):
-        return "array"
-    if isinstance(value, dict):
-        return "object"
-    return "unknown"
-
-
-def _empty_schema() -> Dict[str, Any]:
-    return {
-        "type_counts": {},
-        "properties": {},
-        "items": None,
-        "examples": [],
-    }
-
-
-def _add_example(schema: Dict[str, Any], value: Any, max_examples: int) -> None:
-    if len(schema["examples"]) >= max_examples:
-        return
-    if isinstance(value, (dict, list)):
-        return
-    schema["examples"].append(value)
-
-
-def merge_schema(target: Dict[str, Any], source: Dict[str, Any]) -> Dict[str, Any]:
-    for name, count in source["type_counts"].items():
-        target["type_counts"][name] = target["type_counts"].get(name, 0) + count
-
-    for key, child in source["properties"].items():
-        if key not in target["properties"]:
-            target["properties"][key] = _empty_schema()
-        merge_schema(target["properties"][key], child)
-
-    if source["items"] is not None:
-        if target["items"] is None:
-            target["items"] = _empty_schema()
-        merge_schema(target["items"], source["items"])
-
-    for example in source["examples"]:
-        _add_example(target, example, max_examples=5)
-
-    return target
-
-
-def infer_schema(value: Any, *, max_examples: int = 5) -> Dict[str, Any]:
-    schema = _empty_schema()
-    type_name = _type_name(value)
-    schema["type_counts"][type_name] = 1
-    _add_example(schema, value, max_examples)
-
-    if isinstance(value, dict):
-        for key, item in value.items():
-            schema["properties"][key] = infer_schema(item, max_examples=max_examples)
-    elif isinstance(value, list):
-        items_schema = _empty_schema()
-        for item in value:
-            merge_schema(items_schema, infer_schema(item, max_examples=max_examples))
-        schema["items"] = items_schema
-
-    return schema
-
-
-def infer_from_iter(values: Iterable[Any], *, max_items: int, max_examples: int) -> Dict[str, Any]:
-    schema = _empty_schema()
-    for idx, value in enumerate(values, start=1):
-        merge_schema(schema, infer_schema(value, max_examples=max_examples))
-        if idx >= max_items:
-            break
-    return schema
+from typing import Any, BinaryIO, Dict, Iterable, List, Sequence, TextIO, Tuple
+
+from rokpyl.core.compression import compression, open_text, plain_suffix
+from rokpyl.core.jsonstream import JsonStreamReader, parse_json_path
+from rokpyl.core.schema import (  # noqa: F401 (re-exported for callers of the tool)
+    SchemaAccumulator,
+    annotate_presence,
+    infer_from_iter,
+    infer_schema,
+    merge_schema,
+)
 
 
-def _iter_jsonl(path: Path) -> Iterable[Any]:
-    for line in path.read_text(encoding="utf-8").splitlines():
+def _iter_jsonl(handle: TextIO) -> Iterable[Any]:
+    for line in handle:
         stripped = line.strip()
         if not stripped or stripped.startswith("#"):
             continue
         yield json.loads(stripped)
 
 
-def extract_schema(path: Path, *, max_items: int, max_examples: int) -> Dict[str, Any]:
-    suffix = path.suffix.lower()
-    if suffix == ".jsonl":
-        return infer_from_iter(_iter_jsonl(path), max_items=max_items, max_examples=max_examples)
+SAMPLE_MODES = ("head", "reservoir", "offsets")
+
+
+def reservoir_sample(values: Iterable[Any], size: int, rng: random.Random) -> List[Any]:
+    """Uniformly sample ``size`` values from a stream (Algorithm R)."""
+    sample: List[Any] = []
+    for idx, value in enumerate(values):
+        if idx < size:
+            sample.append(value)
+            continue
+        slot = rng.randint(0, idx)
+        if slot < size:
+            sample[slot] = value
+    return sample
+
+
+def sample_jsonl_offsets(
+    handle: BinaryIO, size: int, count: int, rng: random.Random
+) -> List[Any]:
+    """Sample JSONL records by seeking to random byte offsets.
+
+    Each offset is advanced to the next record boundary, so only the sampled
+    lines are read. Lines after long lines are slightly favoured; the sample
+    is meant for schema discovery, not statistics.
+    """
+    starts: Dict[int, Any] = {}
+    attempts = 0
+    while len(starts) < count and attempts < count * 4 and size:
+        attempts += 1
+        offset = rng.randrange(size)
+        if offset == 0:
+            handle.seek(0)
+        else:
+            handle.seek(offset - 1)
+            handle.readline()
+        start = handle.tell()
+        if start in starts:
+            continue
+        line = handle.readline()
+        stripped = line.strip()
+        if not stripped or stripped.startswith(b"#"):
+            continue
+        starts[start] = json.loads(stripped)
+    return [starts[start] for start in sorted(starts)]
+
+
+def extract_schema(
+    path: Path,
+    *,
+    max_items: int,
+    max_examples: int,
+    json_path: Sequence[str] = (),
+    sample: str = "head",
+    seed: int | None = None,
+) -> Dict[str, Any]:
+    if sample not in SAMPLE_MODES:
+        raise ValueError(f"Unknown sample mode: {sample}")
+    rng = random.Random(seed)
+    suffix = plain_suffix(path)
+
+    if sample == "offsets":
+        if suffix != ".jsonl" or compression(path) is not None:
+            raise ValueError("offset sampling requires an uncompressed JSONL input")
+        with path.open("rb") as binary:
+            values = sample_jsonl_offsets(binary, path.stat().st_size, max_items, rng)
+        return infer_from_iter(values, max_items=max_items, max_examples=max_examples)
+
+    with open_text(path) as handle:
+        if suffix == ".jsonl":
+            items: Iterable[Any] = _iter_jsonl(handle)
+        else:
+            reader = JsonStreamReader(handle)
+            reader.descend(json_path)
+            if reader.peek() != "[":
+                return infer_schema(reader.decode_value(), max_examples=max_examples)
+            items = reader.iter_array()
+        if sample == "reservoir":
+            items = reservoir_sample(items, max_items, rng)
+        return infer_from_iter(items, max_items=max_items, max_examples=max_examples)
+
+
+def split_ranges(path: Path, parts: int) -> List[Tuple[int, int]]:
+    """Split a file into ``parts`` contiguous byte ranges."""
+    size = path.stat().st_size
+    if size == 0:
+        return [(0, 0)]
+    parts = max(1, min(parts, size))
+    step = -(-size // parts)
+    return [(start, min(start + step, size)) for start in range(0, size, step)]
+
+
+def _iter_jsonl_range(handle: BinaryIO, start: int, end: int) -> Iterable[Any]:
+    """Yield JSONL values whose line starts inside ``[start, end)``."""
+    if start > 0:
+        handle.seek(start - 1)
+        handle.readline()
+    else:
+        handle.seek(0)
+    position = handle.tell()
+    while position < end:
+        line = handle.readline()
+        if not line:
+            break
+        position += len(line)
+        stripped = line.strip()
+        if not stripped or stripped.startswith(b"#"):
+            continue
+        yield json.loads(stripped)
+
+
+def _extract_range(
+    path: Path, start: int, end: int, max_items: int, max_examples: int
+) -> Dict[str, Any]:
+    with path.open("rb") as handle:
+        return infer_from_iter(
+            _iter_jsonl_range(handle, start, end),
+            max_items=max_items,
+            max_examples=max_examples,
+        )
+
+
+def _extract_whole(
+    path: Path,
+    max_items: int,
+    max_examples: int,
+    json_path: Sequence[str],
+    sample: str,
+    seed: int | None,
+) -> Dict[str, Any]:
+    return extract_schema(
+        path,
+        max_items=max_items,
+        max_examples=max_examples,
+        json_path=json_path,
+        sample=sample,
+        seed=seed,
+    )
+
+
+def extract_schema_parallel(
+    paths: Sequence[Path],
+    *,
+    max_items: int,
+    max_examples: int,
+    workers: int,
+    json_path: Sequence[str] = (),
+    sample: str = "head",
+    seed: int | None = None,
+) -> Dict[str, Any]:
+    """Infer schemas for files (and JSONL byte ranges) in worker processes.
+
+    Each task samples up to ``max_items`` values; results are merged in task
+    order so the output does not depend on scheduling. Only ``head`` sampling
+    splits (uncompressed) JSONL files into byte ranges.
+    """
+    tasks: List[Tuple[Any, ...]] = []
+    for path in paths:
+        if (
+            path.suffix.lower() == ".jsonl"
+            and workers > 1
+            and sample == "head"
+            and compression(path) is None
+        ):
+            ranges = split_ranges(path, workers)
+            budget = max(1, -(-max_items // len(ranges)))
+            for start, end in ranges:
+                tasks.append((_extract_range, path, start, end, budget, max_examples))
+        else:
+            tasks.append(
+                (_extract_whole, path, max_items, max_examples, json_path, sample, seed)
+            )
+
+    accumulator = SchemaAccumulator(max_examples=max_examples)
+    if workers <= 1 or len(tasks) == 1:
+        for func, *args in tasks:
+            accumulator.merge(func(*args))
+        return accumulator.to_dict()
+
+    from concurrent.futures import ProcessPoolExecutor
 
-    payload = json.loads(path.read_text(encoding="utf-8"))
-    if isinstance(payload, list):
-        return infer_from_iter(payload, max_items=max_items, max_examples=max_examples)
-    return infer_schema(payload, max_examples=max_examples)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(func, *args) for func, *args in tasks]
+        for future in futures:
+            accumulator.merge(future.result())
+    return accumulator.to_dict()
 
 
 def main(argv: list[str] | None = None) -> int:
     parser = argparse.ArgumentParser(description="Infer a JSON schema from a file")
-    parser.add_argument("path", help="Path to JSON or JSONL file")
+    parser.add_argument(
+        "paths", nargs="+", help="Paths to JSON or JSONL files (optionally .gz or .zst)"
+    )
     parser.add_argument("--out", help="Write schema to a file")
     parser.add_argument("--max-items", type=int, default=200, help="Max items to sample")
     parser.add_argument("--max-examples", type=int, default=5, help="Max scalar examples per node")
+    parser.add_argument(
+        "--json-path", help="Dotted key path to the array to sample (e.g. conversations)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Worker processes (splits JSONL into byte ranges)"
+    )
+    parser.add_argument(
+        "--sample",
+        choices=SAMPLE_MODES,
+        default="head",
+        help="head: first items; reservoir: uniform over the file; offsets: random JSONL seeks",
+    )
+    parser.add_argument("--seed", type=int, help="Random seed for reservoir/offsets sampling")
     args = parser.parse_args(argv)
 
-    schema = extract_schema(Path(args.path), max_items=args.max_items, max_examples=args.max_examples)
+    schema = extract_schema_parallel(
+        [Path(path) for path in args.paths],
+        max_items=args.max_items,
+        max_examples=args.max_examples,
+        workers=args.workers,
+        json_path=parse_json_path(args.json_path),
+        sample=args.sample,
+        seed=args.seed,
+    )
+    annotate_presence(schema)
     output = json.dumps(schema, indent=2, ensure_ascii=True)
 
     if args.out:
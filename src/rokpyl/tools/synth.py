@@ -0,0 +1,258 @@
+"""Generate deterministic synthetic chat exports for tests and benchmarks.
+
+ChatGPT exports use ``mapping`` trees with a root node, regenerated branches
+and float ``create_time`` values; Claude exports use ``chat_messages`` with
+block ``content`` and can also be written as HTML or CSV (one row per
+message). Output is streamed, so large counts (1M conversations) never need
+to fit in memory.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import html
+import json
+import random
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+PLATFORMS = ("chatgpt", "claude")
+TABULAR_SUFFIXES = {".html", ".htm", ".csv"}
+
+_EPOCH = 1704067200.0  # 2024-01-01T00:00:00Z
+_WORDS = (
+    "archive export message graph notion schema record stream parse token "
+    "branch summary project model prompt answer index batch queue cache"
+).split()
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _text(rng: random.Random, low: int = 5, high: int = 60) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(low, high)))
+
+
+def _iso(timestamp: float) -> str:
+    moment = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+    return moment.isoformat().replace("+00:00", "Z")
+
+
+def chatgpt_conversation(
+    rng: random.Random, index: int, *, messages: int, branch_rate: float
+) -> Dict[str, Any]:
+    created = _EPOCH + index * 3600.0 + rng.random()
+    root_id = _uuid(rng)
+    mapping: Dict[str, Dict[str, Any]] = {
+        root_id: {"id": root_id, "message": None, "parent": None, "children": []}
+    }
+    parent = root_id
+    timestamp = created
+    for position in range(messages):
+        role = "user" if position % 2 == 0 else "assistant"
+        siblings = 2 if role == "assistant" and rng.random() < branch_rate else 1
+        chosen = None
+        for _ in range(siblings):
+            timestamp += rng.uniform(1.0, 30.0)
+            node_id = _uuid(rng)
+            mapping[node_id] = {
+                "id": node_id,
+                "message": {
+                    "id": node_id,
+                    "author": {"role": role},
+                    "create_time": timestamp,
+                    "content": {"content_type": "text", "parts": [_text(rng)]},
+                },
+                "parent": parent,
+                "children": [],
+            }
+            mapping[parent]["children"].append(node_id)
+            chosen = node_id
+        parent = chosen
+    return {
+        "id": _uuid(rng),
+        "title": _text(rng, 2, 6).title(),
+        "create_time": created,
+        "update_time": timestamp,
+        "current_node": parent,
+        "mapping": mapping,
+    }
+
+
+def claude_conversation(rng: random.Random, index: int, *, messages: int) -> Dict[str, Any]:
+    created = _EPOCH + index * 3600.0
+    timestamp = created
+    chat_messages: List[Dict[str, Any]] = []
+    for position in range(messages):
+        timestamp += rng.uniform(1.0, 30.0)
+        sender = "human" if position % 2 == 0 else "assistant"
+        text = _text(rng)
+        content: List[Dict[str, Any]] = [{"type": "text", "text": text, "citations": []}]
+        if sender == "assistant" and rng.random() < 0.2:
+            content.insert(
+                0, {"type": "thinking", "thinking": _text(rng), "summaries": [], "cut_off": False}
+            )
+        chat_messages.append(
+            {
+                "uuid": _uuid(rng),
+                "text": text,
+                "content": content,
+                "sender": sender,
+                "created_at": _iso(timestamp),
+                "updated_at": _iso(timestamp),
+                "attachments": [],
+                "files": [],
+            }
+        )
+    return {
+        "uuid": _uuid(rng),
+        "name": _text(rng, 2, 6).title(),
+        "summary": "",
+        "created_at": _iso(created),
+        "updated_at": _iso(timestamp),
+        "account": {"uuid": _uuid(rng)},
+        "chat_messages": chat_messages,
+    }
+
+
+def iter_conversations(
+    platform: str,
+    count: int,
+    *,
+    seed: int = 0,
+    messages: int = 8,
+    branch_rate: float = 0.2,
+) -> Iterator[Dict[str, Any]]:
+    if platform not in PLATFORMS:
+        raise ValueError(f"Unknown platform: {platform}")
+    rng = random.Random(seed)
+    for index in range(count):
+        length = max(1, messages + rng.randint(-messages // 2, messages // 2))
+        if platform == "chatgpt":
+            yield chatgpt_conversation(rng, index, messages=length, branch_rate=branch_rate)
+        else:
+            yield claude_conversation(rng, index, messages=length)
+
+
+def _write_claude_html(handle: Any, conversations: Iterator[Dict[str, Any]]) -> None:
+    handle.write('<!DOCTYPE html>\n<html><head><meta charset="utf-8">')
+    handle.write("<title>Claude export</title></head><body>\n")
+    for conversation in conversations:
+        handle.write(
+            '<article class="conversation" data-uuid="{uuid}" data-created-at="{created}"'
+            ' data-updated-at="{updated}">\n<h2>{name}</h2>\n'.format(
+                uuid=conversation["uuid"],
+                created=conversation["created_at"],
+                updated=conversation["updated_at"],
+                name=html.escape(conversation["name"]),
+            )
+        )
+        for message in conversation["chat_messages"]:
+            handle.write(
+                '<div class="message" data-sender="{sender}" data-created-at="{created}">'
+                "<p>{text}</p></div>\n".format(
+                    sender=message["sender"],
+                    created=message["created_at"],
+                    text=html.escape(message["text"]),
+                )
+            )
+        handle.write("</article>\n")
+    handle.write("</body></html>\n")
+
+
+def _write_claude_csv(handle: Any, conversations: Iterator[Dict[str, Any]]) -> None:
+    writer = csv.writer(handle)
+    writer.writerow(
+        [
+            "conversation_uuid",
+            "conversation_name",
+            "conversation_created_at",
+            "sender",
+            "created_at",
+            "text",
+        ]
+    )
+    for conversation in conversations:
+        for message in conversation["chat_messages"]:
+            writer.writerow(
+                [
+                    conversation["uuid"],
+                    conversation["name"],
+                    conversation["created_at"],
+                    message["sender"],
+                    message["created_at"],
+                    message["text"],
+                ]
+            )
+
+
+def write_export(
+    path: Path,
+    platform: str,
+    count: int,
+    *,
+    seed: int = 0,
+    messages: int = 8,
+    branch_rate: float = 0.2,
+) -> Path:
+    """Write ``count`` conversations as a JSON array, JSONL, HTML or CSV (by suffix).
+
+    HTML and CSV are only available for Claude exports.
+    """
+    suffix = path.suffix.lower()
+    if suffix in TABULAR_SUFFIXES and platform != "claude":
+        raise ValueError(f"{suffix} exports are only generated for claude")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conversations = iter_conversations(
+        platform, count, seed=seed, messages=messages, branch_rate=branch_rate
+    )
+    if suffix in TABULAR_SUFFIXES:
+        with path.open("w", encoding="utf-8", newline="") as handle:
+            if suffix == ".csv":
+                _write_claude_csv(handle, conversations)
+            else:
+                _write_claude_html(handle, conversations)
+        return path
+    jsonl = suffix == ".jsonl"
+    with path.open("w", encoding="utf-8") as handle:
+        if not jsonl:
+            handle.write("[")
+        for index, conversation in enumerate(conversations):
+            if jsonl:
+                handle.write(json.dumps(conversation, ensure_ascii=True))
+                handle.write("\n")
+            else:
+                if index:
+                    handle.write(",")
+                handle.write(json.dumps(conversation, ensure_ascii=True))
+        if not jsonl:
+            handle.write("]")
+    return path
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic chat export")
+    parser.add_argument("out", help="Output path (.json, .jsonl; .html or .csv for claude)")
+    parser.add_argument("--platform", choices=PLATFORMS, default="chatgpt")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--messages", type=int, default=8, help="Mean messages per conversation")
+    parser.add_argument("--branch-rate", type=float, default=0.2, help="ChatGPT regeneration rate")
+    args = parser.parse_args(argv)
+
+    write_export(
+        Path(args.out),
+        args.platform,
+        args.count,
+        seed=args.seed,
+        messages=args.messages,
+        branch_rate=args.branch_rate,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,122 @@
+import json
+import time
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from rokpyl.core.async_pipeline import AsyncPipeline
+from rokpyl.core.pipeline import Pipeline
+from rokpyl.core.registry import ExporterRegistry, ImporterRegistry
+from rokpyl.exporters.jsonl import JsonlExporter
+from rokpyl.importers.base import Importer
+from rokpyl.models.canonical import ConversationRecord
+from rokpyl.summarizers.base import Summarizer
+
+
+class SlowFakeImporter(Importer):
+    name = "slowfake"
+
+    def discover_sources(self, export_path: Path):
+        return [export_path / f"{idx}.json" for idx in range(8)]
+
+    def can_parse(self, source_path: Path):
+        return 1.0
+
+    def parse(self, source_path: Path, options=None):
+        idx = int(source_path.stem)
+        # Later sources finish first to exercise ordering.
+        time.sleep(0.002 * (8 - idx))
+        return [
+            ConversationRecord(id=f"{idx}", title="t", platform="p"),
+            ConversationRecord(id=f"{idx % 3}", title="dup", platform="p"),
+        ]
+
+
+class BrokenImporter(SlowFakeImporter):
+    name = "broken"
+
+    def parse(self, source_path: Path, options=None):
+        raise RuntimeError("bad source")
+
+
+class UpperSummarizer(Summarizer):
+    name = "upper"
+
+    def summarize(self, records, options=None):
+        for record in records:
+            record.summary = record.title.upper()
+        return records
+
+
+def _registries():
+    registry = ImporterRegistry()
+    registry.register(SlowFakeImporter)
+    registry.register(BrokenImporter)
+    exporters = ExporterRegistry()
+    exporters.register(JsonlExporter)
+    return registry, exporters
+
+
+class AsyncPipelineTests(unittest.TestCase):
+    def test_matches_sequential_pipeline(self):
+        with TemporaryDirectory() as tmpdir:
+            outputs = {}
+            for engine, pipeline_cls in [("sequential", Pipeline), ("async", AsyncPipeline)]:
+                out_path = Path(tmpdir) / f"{engine}.jsonl"
+                config = {
+                    "inputs": [{"path": tmpdir, "mode": "explicit", "parser": "slowfake"}],
+                    "outputs": [{"type": "jsonl", "path": str(out_path)}],
+                    "runtime": {"queue_depth": 2, "parse_concurrency": 4},
+                }
+                records = pipeline_cls(*_registries()).run(config)
+                outputs[engine] = (
+                    [record.id for record in records],
+                    out_path.read_text(encoding="utf-8"),
+                )
+
+            self.assertEqual(outputs["async"], outputs["sequential"])
+            self.assertEqual(outputs["async"][0], [str(idx) for idx in range(8)])
+
+    def test_summarizer_stage(self):
+        with TemporaryDirectory() as tmpdir:
+            pipeline = AsyncPipeline(*_registries(), summarizer=UpperSummarizer())
+            records = pipeline.run(
+                {
+                    "inputs": [{"path": tmpdir, "mode": "explicit", "parser": "slowfake"}],
+                    "runtime": {"summarize_concurrency": 3},
+                }
+            )
+            self.assertEqual([record.summary for record in records], ["T"] * 8)
+
+    def test_summarizer_gets_batches(self):
+        class Counting(UpperSummarizer):
+            def summarize(self, records, options=None):
+                batches.append(len(records))
+                return super().summarize(records, options)
+
+        batches = []
+        with TemporaryDirectory() as tmpdir:
+            with patch("rokpyl.core.async_pipeline.SUMMARIZE_BATCH", 3):
+                records = AsyncPipeline(*_registries(), summarizer=Counting()).run(
+                    {"inputs": [{"path": tmpdir, "mode": "explicit", "parser": "slowfake"}]}
+                )
+            self.assertEqual(batches, [3, 3, 2])
+            self.assertEqual([record.id for record in records], [str(idx) for idx in range(8)])
+
+    def test_parse_errors_propagate(self):
+        with TemporaryDirectory() as tmpdir:
+            out_path = Path(tmpdir) / "out.jsonl"
+            pipeline = AsyncPipeline(*_registries())
+            with self.assertRaises(RuntimeError):
+                pipeline.run(
+                    {
+                        "inputs": [{"path": tmpdir, "mode": "explicit", "parser": "broken"}],
+                        "outputs": [{"type": "jsonl", "path": str(out_path)}],
+                        "runtime": {"queue_depth": 1},
+                    }
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
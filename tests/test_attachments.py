@@ -0,0 +1,221 @@
+import json
+import os
+import unittest
+import zipfile
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from rokpyl.cli import build_exporter_registry, build_registry
+from rokpyl.core.attachments import AttachmentStore, blob_path
+from rokpyl.core.config import ConfigError
+from rokpyl.core.pipeline import Pipeline
+from rokpyl.models.canonical import Attachment, ConversationRecord, Message
+
+PHOTO = b"\x89PNG fake image bytes"
+REPORT = b"%PDF zipped report"
+
+
+def _chatgpt_message(node_id, parent, role, text, attachments=None):
+    message = {
+        "author": {"role": role},
+        "content": {"parts": [text]},
+        "create_time": 1704067200,
+    }
+    if attachments:
+        message["metadata"] = {"attachments": attachments}
+    return {"id": node_id, "parent": parent, "children": [], "message": message}
+
+
+def _chatgpt_export(root: Path) -> None:
+    conversations = []
+    for index, attachments in enumerate(
+        [
+            [{"id": "file-AAA", "name": "photo.png", "mimeType": "image/png"}],
+            [
+                {"id": "file-AAA", "name": "photo.png", "mimeType": "image/png"},
+                {"id": "file-BBB", "name": "report.pdf", "size": len(REPORT)},
+                {"id": "file-missing", "name": "gone.txt"},
+            ],
+        ]
+    ):
+        mapping = {"u": _chatgpt_message("u", None, "user", f"look {index}", attachments)}
+        conversations.append(
+            {"id": f"g{index}", "title": f"T{index}", "current_node": "u", "mapping": mapping}
+        )
+    (root / "conversations.json").write_text(json.dumps(conversations), encoding="utf-8")
+    (root / "file-AAA-photo.png").write_bytes(PHOTO)
+    with zipfile.ZipFile(root / "uploads.zip", "w") as archive:
+        archive.writestr("files/file-BBB-report.pdf", REPORT)
+
+
+def _record(attachments):
+    message = Message(role="user", content="see attached", attachments=attachments)
+    return ConversationRecord(id="r", title="R", platform="P", messages=[message])
+
+
+class AttachmentStoreTests(unittest.TestCase):
+    def test_put_file_stores_each_content_once(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            first = root / "a.bin"
+            second = root / "b.bin"
+            first.write_bytes(PHOTO)
+            second.write_bytes(PHOTO)
+            store = AttachmentStore(root / "store")
+
+            digest, size = store.put_file(first)
+            self.assertEqual(store.put_file(second), (digest, size))
+            self.assertEqual(size, len(PHOTO))
+            self.assertEqual(store.path(digest).read_bytes(), PHOTO)
+            self.assertEqual(store.stats.stored, 1)
+            self.assertEqual(store.stats.deduplicated, 1)
+            # Same filesystem: cloned or linked, not copied.
+            self.assertEqual(store.stats.linked, 1)
+            self.assertEqual(store.stats.bytes_written, 0)
+
+    def test_copy_mode_never_links(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            source = root / "a.bin"
+            source.write_bytes(PHOTO)
+            store = AttachmentStore(root / "store", link="copy")
+            digest, _ = store.put_file(source)
+            self.assertNotEqual(os.stat(store.path(digest)).st_ino, os.stat(source).st_ino)
+            self.assertEqual(store.stats.bytes_written, len(PHOTO))
+
+    def test_archives_are_opened_once_per_run(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            with zipfile.ZipFile(root / "uploads.zip", "w") as archive:
+                for index in range(3):
+                    archive.writestr(f"file-{index}-a.txt", f"content {index}")
+            record = _record(
+                [Attachment(name="a.txt", extra={"id": f"file-{index}"}) for index in range(3)]
+            )
+            store = AttachmentStore(root / "store")
+            with mock.patch.object(zipfile, "ZipFile", wraps=zipfile.ZipFile) as opened:
+                store.ingest([record], root)
+            self.assertEqual(opened.call_count, 1)
+            self.assertEqual(store.stats.stored, 3)
+            handle = next(iter(store._indexes.values()))._archives[root / "uploads.zip"]
+            store.close()
+            self.assertIsNone(handle.fp)
+
+    def test_extracted_text_beats_a_name_only_match(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / "notes.txt").write_text("someone else's notes", encoding="utf-8")
+            (root / "file-X-report.txt").write_text("by id", encoding="utf-8")
+            notes = Attachment(name="notes.txt", extra={"extracted_content": "mine"})
+            by_id = Attachment(
+                name="report.txt", extra={"id": "file-X", "extracted_content": "text"}
+            )
+            by_name = Attachment(name="notes.txt")
+            store = AttachmentStore(root / "store")
+            store.ingest([_record([notes, by_id, by_name])], root)
+            for attachment, content in ((notes, "mine"), (by_id, "by id")):
+                blob = store.path(attachment.extra["sha256"])
+                self.assertEqual(blob.read_text(encoding="utf-8"), content)
+            blob = store.path(by_name.extra["sha256"])
+            self.assertEqual(blob.read_text(encoding="utf-8"), "someone else's notes")
+
+    def test_config(self):
+        self.assertIsNone(AttachmentStore.from_config(None))
+        self.assertEqual(AttachmentStore.from_config("blobs").directory, Path("blobs"))
+        with self.assertRaises(ConfigError):
+            AttachmentStore.from_config({"dir": "x", "link": "symlink"})
+        with self.assertRaises(ConfigError):
+            AttachmentStore.from_config({"link": "copy"})
+
+
+class AttachmentPipelineTests(unittest.TestCase):
+    def test_pipeline_stores_files_and_zip_members_by_hash(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            export = root / "export"
+            export.mkdir()
+            _chatgpt_export(export)
+            claude = root / "claude"
+            claude.mkdir()
+            (claude / "claude.json").write_text(
+                json.dumps(
+                    {
+                        "uuid": "c1",
+                        "name": "Notes",
+                        "chat_messages": [
+                            {
+                                "sender": "human",
+                                "text": "see attached",
+                                "attachments": [
+                                    {
+                                        "file_name": "notes.txt",
+                                        "file_size": 5,
+                                        "file_type": "txt",
+                                        "extracted_content": "hello",
+                                    }
+                                ],
+                            }
+                        ],
+                    }
+                ),
+                encoding="utf-8",
+            )
+            store_dir = root / "blobs"
+            config = {
+                "inputs": [
+                    {"path": str(export), "mode": "explicit", "parser": "chatgpt"},
+                    {"path": str(claude), "mode": "explicit", "parser": "claude"},
+                ],
+                "attachments": {"dir": str(store_dir)},
+                "outputs": [{"type": "neo4j", "dir": str(root / "graph")}],
+            }
+            pipeline = Pipeline(build_registry(), build_exporter_registry())
+            records = pipeline.run(config)
+
+            attachments = {
+                (record.id, attachment.name): attachment
+                for record in records
+                for message in record.messages
+                for attachment in message.attachments
+            }
+            photo = attachments[("g0", "photo.png")].extra["sha256"]
+            self.assertEqual(attachments[("g1", "photo.png")].extra["sha256"], photo)
+            self.assertEqual(attachments[("g0", "photo.png")].size_bytes, len(PHOTO))
+            report = attachments[("g1", "report.pdf")].extra["sha256"]
+            self.assertEqual((store_dir / blob_path(report)).read_bytes(), REPORT)
+            self.assertNotIn("sha256", attachments[("g1", "gone.txt")].extra)
+            notes = attachments[("c1", "notes.txt")]
+            self.assertNotIn("extracted_content", notes.extra)
+            self.assertEqual((store_dir / blob_path(notes.extra["sha256"])).read_text(), "hello")
+
+            stats = pipeline.report()["attachments"]
+            self.assertEqual(stats["stored"], 3)
+            self.assertEqual(stats["deduplicated"], 1)
+            self.assertEqual(stats["missing"], 1)
+            blobs = [path for path in (store_dir / "sha256").rglob("*") if path.is_file()]
+            self.assertEqual(len(blobs), 3)
+
+            graph = (root / "graph" / "attachments.csv").read_text(encoding="utf-8")
+            self.assertEqual(graph.count(f"sha256:{photo}"), 1)
+
+    def test_file_inputs_do_not_search_subdirectories(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            _chatgpt_export(root)
+            (root / "uploads.zip").unlink()
+            (root / "elsewhere").mkdir()
+            (root / "elsewhere" / "file-BBB-report.pdf").write_bytes(REPORT)
+            pipeline = Pipeline(build_registry(), build_exporter_registry())
+            # photo.png twice (stored, then deduplicated); report.pdf only for the directory.
+            for path, found in ((root / "conversations.json", 2), (root, 3)):
+                config = {
+                    "inputs": [{"path": str(path), "mode": "explicit", "parser": "chatgpt"}],
+                    "attachments": {"dir": str(root / f"blobs-{found}")},
+                }
+                pipeline.run(config)
+                stats = pipeline.report()["attachments"]
+                self.assertEqual(stats["stored"] + stats["deduplicated"], found)
+
+if __name__ == "__main__":
+    unittest.main()
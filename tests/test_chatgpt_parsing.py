@@ -1,9 +1,12 @@
 import json
+import random
 import unittest
 from dataclasses import asdict
 from pathlib import Path
+from tempfile import TemporaryDirectory
 
 from rokpyl.importers.chatgpt import ChatGptImporter
+from rokpyl.tools.synth import chatgpt_conversation
 
 
 class ChatGptParsingTests(unittest.TestCase):
@@ -20,5 +23,107 @@ class ChatGptParsingTests(unittest.TestCase):
         self.assertEqual(actual, expected)
 
 
+def _node(node_id, parent, children, role=None, text=None, created=None):
+    node = {"id": node_id, "parent": parent, "children": children, "message": None}
+    if role:
+        node["message"] = {
+            "author": {"role": role},
+            "content": {"parts": [text]},
+            "create_time": created,
+        }
+    return node
+
+
+def _branched_conversation(current_node="a2"):
+    # root -> u1 -> {a1, a1b}; a1 -> u2 -> a2; a1b -> u2b. Listed out of
+    # order, with a missing create_time, to show neither is relied on.
+    nodes = [
+        _node("u2b", "a1b", [], "user", "Second question (edited)", 40),
+        _node("a2", "u2", [], "assistant", "Second answer", None),
+        _node("root", None, ["u1"]),
+        _node("a1b", "u1", ["u2b"], "assistant", "First answer (regenerated)", 30),
+        _node("u1", "root", ["a1", "a1b"], "user", "First question", 10),
+        _node("u2", "a1", ["a2"], "user", "Second question", 50),
+        _node("a1", "u1", ["u2"], "assistant", "First answer", 20),
+    ]
+    return {
+        "id": "g2",
+        "title": "Branched",
+        "create_time": 10,
+        "current_node": current_node,
+        "mapping": {node["id"]: node for node in nodes},
+    }
+
+
+class ChatGptBranchTests(unittest.TestCase):
+    def parse(self, convo, **options):
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "conversations.json"
+            path.write_text(json.dumps([convo]), encoding="utf-8")
+            return ChatGptImporter().parse(path, options)[0]
+
+    def test_current_branch_follows_parent_links(self):
+        record = self.parse(_branched_conversation())
+        self.assertEqual(
+            [message.content for message in record.messages],
+            ["First question", "First answer", "Second question", "Second answer"],
+        )
+        self.assertIsNone(record.messages[-1].created_at)
+        self.assertEqual(record.metadata, {})
+
+    def test_other_current_node_selects_that_branch(self):
+        record = self.parse(_branched_conversation("u2b"))
+        self.assertEqual(
+            [message.content for message in record.messages],
+            ["First question", "First answer (regenerated)", "Second question (edited)"],
+        )
+
+    def test_missing_current_node_uses_newest_children(self):
+        record = self.parse(_branched_conversation(None))
+        self.assertEqual(record.messages[-1].content, "Second question (edited)")
+
+    def test_all_branches_share_prefix(self):
+        record = self.parse(_branched_conversation(), branches="all")
+        self.assertEqual(len(record.messages), 4)
+        (alternate,) = record.metadata["branches"]
+        self.assertEqual(alternate["leaf"], "u2b")
+        self.assertEqual(alternate["parent"], 0)
+        self.assertEqual(alternate["fork"], 1)
+        self.assertEqual(
+            [message["content"] for message in alternate["messages"]],
+            ["First answer (regenerated)", "Second question (edited)"],
+        )
+
+    def test_all_branches_reconstruct_every_leaf(self):
+        convo = chatgpt_conversation(random.Random(3), 0, messages=40, branch_rate=0.5)
+        record = self.parse(convo, branches="all")
+        mapping = convo["mapping"]
+        branches = [[message.content for message in record.messages]]
+        for alternate in record.metadata["branches"]:
+            prefix = branches[alternate["parent"]][: alternate["fork"]]
+            branches.append(prefix + [message["content"] for message in alternate["messages"]])
+        leaves = [node_id for node_id, node in mapping.items() if not node["children"]]
+        expected = []
+        for leaf in leaves:
+            path = []
+            node_id = leaf
+            while node_id is not None:
+                message = mapping[node_id]["message"]
+                if message:
+                    path.append(message["content"]["parts"][0])
+                node_id = mapping[node_id]["parent"]
+            expected.append(path[::-1])
+        self.assertEqual(sorted(branches), sorted(expected))
+        # Shared prefixes are stored once.
+        stored = len(record.messages) + sum(
+            len(alternate["messages"]) for alternate in record.metadata["branches"]
+        )
+        self.assertEqual(stored, sum(1 for node in mapping.values() if node["message"]))
+
+    def test_unknown_branches_option_raises(self):
+        with self.assertRaises(ValueError):
+            self.parse(_branched_conversation(), branches="some")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,152 @@
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rokpyl.core.async_pipeline import AsyncPipeline
+from rokpyl.core.checkpoint import MANIFEST_NAME, Checkpoint
+from rokpyl.core.config import ConfigError
+from rokpyl.core.pipeline import Pipeline
+from rokpyl.core.registry import ExporterRegistry, ImporterRegistry
+from rokpyl.exporters.base import Exporter
+from rokpyl.exporters.jsonl import JsonlExporter
+from rokpyl.importers.chatgpt import ChatGptImporter
+from rokpyl.tools.synth import write_export
+
+
+class CountingImporter(ChatGptImporter):
+    name = "counting"
+    parsed = []
+
+    def parse(self, source_path, options=None):
+        CountingImporter.parsed.append(source_path.name)
+        return super().parse(source_path, options)
+
+
+class CrashingExporter(Exporter):
+    name = "crash"
+    fail = True
+
+    def write(self, records, options=None):
+        for _ in records:
+            pass
+        if CrashingExporter.fail:
+            raise RuntimeError("boom")
+
+
+def _registries():
+    importers = ImporterRegistry()
+    importers.register(CountingImporter)
+    exporters = ExporterRegistry()
+    exporters.register(JsonlExporter)
+    exporters.register(CrashingExporter)
+    return importers, exporters
+
+
+class CheckpointTests(unittest.TestCase):
+    def setUp(self) -> None:
+        CountingImporter.parsed = []
+        CrashingExporter.fail = True
+
+    def _config(self, root: Path, outputs):
+        return {
+            "inputs": [{"path": str(root / "in"), "mode": "explicit", "parser": "counting"}],
+            "outputs": outputs,
+            "runtime": {"checkpoint_dir": str(root / "ckpt"), "checkpoint_interval": 0},
+        }
+
+    def _write_inputs(self, root: Path) -> None:
+        for index in range(3):
+            write_export(root / "in" / f"part{index}.json", "chatgpt", 4, seed=index)
+        # Overlaps part0, so dedup state matters across the resume.
+        write_export(root / "in" / "part3.json", "chatgpt", 2, seed=0)
+
+    def test_resume_skips_parsing_and_matches_uninterrupted_run(self) -> None:
+        for pipeline_cls in (Pipeline, AsyncPipeline):
+            with self.subTest(engine=pipeline_cls.engine), TemporaryDirectory() as tmpdir:
+                CountingImporter.parsed = []
+                CrashingExporter.fail = True
+                root = Path(tmpdir)
+                self._write_inputs(root)
+                expected_path = root / "expected.jsonl"
+                Pipeline(*_registries()).run(
+                    {
+                        "inputs": self._config(root, [])["inputs"],
+                        "outputs": [{"type": "jsonl", "path": str(expected_path)}],
+                    }
+                )
+                CountingImporter.parsed = []
+
+                outputs = [
+                    {"type": "jsonl", "path": str(root / "out.jsonl")},
+                    {"type": "crash"},
+                ]
+                config = self._config(root, outputs)
+                first = pipeline_cls(*_registries())
+                first.run(config)
+                self.assertEqual(len(first.export_failures), 1)
+                self.assertEqual(len(CountingImporter.parsed), 4)
+                self.assertTrue((root / "ckpt" / MANIFEST_NAME).exists())
+                (root / "out.jsonl").unlink()
+
+                CountingImporter.parsed = []
+                CrashingExporter.fail = False
+                config["runtime"]["resume"] = True
+                second = pipeline_cls(*_registries())
+                records = second.run(config)
+
+                self.assertEqual(CountingImporter.parsed, [])
+                self.assertEqual(len(records), 12)
+                # The jsonl output finished in the first run and is not rewritten.
+                self.assertFalse((root / "out.jsonl").exists())
+                self.assertEqual([result.name for result in second.export_results], ["crash"])
+                self.assertEqual(second.instrumentation.stats("checkpoint").sources, 4)
+                self.assertFalse((root / "ckpt").exists())
+
+                third = pipeline_cls(*_registries())
+                config["runtime"]["resume"] = False
+                third.run(config)
+                self.assertEqual(
+                    (root / "out.jsonl").read_text(encoding="utf-8"),
+                    expected_path.read_text(encoding="utf-8"),
+                )
+
+    def test_changed_source_is_parsed_again(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            self._write_inputs(root)
+            config = self._config(root, [{"type": "crash"}])
+            Pipeline(*_registries()).run(config)
+
+            write_export(root / "in" / "part1.json", "chatgpt", 5, seed=9)
+            CountingImporter.parsed = []
+            config["runtime"]["resume"] = True
+            records = Pipeline(*_registries()).run(config)
+            self.assertEqual(CountingImporter.parsed, ["part1.json"])
+            self.assertEqual(len(records), 13)
+
+    def test_resume_rejects_different_configuration(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            self._write_inputs(root)
+            config = self._config(root, [{"type": "crash"}])
+            Pipeline(*_registries()).run(config)
+
+            config["project"] = "other"
+            config["runtime"]["resume"] = True
+            with self.assertRaises(ConfigError):
+                Pipeline(*_registries()).run(config)
+
+    def test_clear_only_removes_checkpoint_files(self) -> None:
+        with TemporaryDirectory() as tmpdir:
+            directory = Path(tmpdir)
+            (directory / "keep.txt").write_text("x", encoding="utf-8")
+            checkpoint = Checkpoint.open(directory, {}, resume=False)
+            checkpoint.sources["k"] = {"file": "a.pickle"}
+            (directory / "a.pickle").write_text("", encoding="utf-8")
+            checkpoint.clear()
+            self.assertEqual([path.name for path in directory.iterdir()], ["keep.txt"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,6 +12,36 @@ class ClaudeImporterTests(unittest.TestCase):
         self.assertGreater(importer.can_parse(Path("export.json")), 0.1)
         self.assertEqual(importer.can_parse(Path("notes.txt")), 0.0)
 
+    def test_html_and_csv_need_the_expected_markup(self):
+        importer = ClaudeImporter()
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            files = {
+                "export.html": '<article class="conversation" data-uuid="c1"><h2>T</h2>',
+                "claude.html": "<div data-conversation-id='c1'></div>",
+                "page.html": '<html><div class="conversation-list">saved page</div></html>',
+                "claude-notes.html": "<html><body>notes</body></html>",
+                "export.csv": "conversation_uuid,sender,text\nc1,human,hi\n",
+                "budget.csv": "month,text\njan,rent\n",
+                "prices.csv": "sku,price\na,1\n",
+            }
+            for name, content in files.items():
+                (root / name).write_text(content, encoding="utf-8")
+            scores = {name: importer.can_parse(root / name) for name in files}
+            self.assertEqual(
+                scores,
+                {
+                    "export.html": 0.3,
+                    "claude.html": 0.6,
+                    "page.html": 0.0,
+                    "claude-notes.html": 0.0,
+                    "export.csv": 0.3,
+                    "budget.csv": 0.0,
+                    "prices.csv": 0.0,
+                },
+            )
+            self.assertEqual(importer.can_parse(root / "missing.html"), 0.0)
+
     def test_discover_sources(self):
         importer = ClaudeImporter()
         with TemporaryDirectory() as tmpdir:
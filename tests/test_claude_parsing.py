@@ -2,7 +2,9 @@ import json
 import unittest
 from dataclasses import asdict
 from pathlib import Path
+from tempfile import TemporaryDirectory
 
+from rokpyl.importers import claude_html
 from rokpyl.importers.claude import ClaudeImporter
 
 
@@ -43,6 +45,81 @@ class ClaudeParsingTests(unittest.TestCase):
         actual = asdict(records[0])
         self.assertEqual(actual, expected)
 
+    def test_parse_minimal_html_and_csv_fixtures(self):
+        root = Path(__file__).parent / "fixtures"
+        expected = json.loads((root / "claude_minimal.jsonl").read_text(encoding="utf-8"))
+
+        importer = ClaudeImporter()
+        for name in ("claude_minimal.html", "claude_minimal.csv"):
+            with self.subTest(name=name):
+                records = importer.parse(
+                    root / name, options={"project": None, "platform": "Claude"}
+                )
+                self.assertEqual([asdict(record) for record in records], [expected])
+
+    def test_html_streams_across_chunks(self):
+        page = (
+            "<html><body>"
+            '<section data-uuid="a" data-created-at="2024-01-01T00:00:00Z">'
+            '<h1 class="title">First &amp; <em>best</em></h1>'
+            '<div data-sender="human" data-created-at="2024-01-01T00:00:01Z">'
+            "<p>Line one<br>line   two</p><p>Next paragraph</p></div>"
+            '<div data-role="assistant"><pre>def f():\n    return 1</pre>'
+            "<ul><li>item</li></ul></div>"
+            "</section>"
+            '<section data-uuid="b"><h2>Second</h2>'
+            '<div class="message user">unclosed <b>tags'
+            "</section></body></html>"
+        )
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "export.html"
+            path.write_text(page, encoding="utf-8")
+            whole = list(claude_html.iter_conversations(path))
+            chunked = list(claude_html.iter_conversations(path, chunk_size=7))
+
+        self.assertEqual(whole, chunked)
+        first, second = whole
+        self.assertEqual(first["uuid"], "a")
+        self.assertEqual(first["name"], "First & best")
+        self.assertEqual(
+            [(message["sender"], message["text"]) for message in first["chat_messages"]],
+            [
+                ("human", "Line one\nline two\nNext paragraph"),
+                ("assistant", "def f():\n    return 1\nitem"),
+            ],
+        )
+        self.assertEqual(first["chat_messages"][0]["created_at"], "2024-01-01T00:00:01Z")
+        self.assertEqual(second["name"], "Second")
+        self.assertEqual(
+            second["chat_messages"],
+            [{"sender": "user", "created_at": None, "text": "unclosed tags"}],
+        )
+
+    def test_csv_groups_consecutive_rows(self):
+        text = (
+            "Conversation_UUID,Title,Role,Content,Created_At\n"
+            'a,First,human,"multi\nline",2024-01-01T00:00:00Z\n'
+            "a,First,assistant,answer,2024-01-01T00:00:05Z\n"
+            "\n"
+            "b,Second,human,hello,2024-02-01T00:00:00Z\n"
+        )
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "export.csv"
+            path.write_text(text, encoding="utf-8")
+            records = ClaudeImporter().parse(path)
+
+        self.assertEqual([record.id for record in records], ["a", "b"])
+        self.assertEqual(records[0].date, "2024-01-01T00:00:00Z")
+        self.assertEqual(records[0].transcript, "user: multi\nline\nassistant: answer")
+        self.assertEqual(records[1].title, "Second")
+
+    def test_csv_without_text_column_raises(self):
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "export.csv"
+            path.write_text("id,name\n1,x\n", encoding="utf-8")
+            with self.assertRaises(ValueError):
+                ClaudeImporter().parse(path)
+
 
 if __name__ == "__main__":
     unittest.main()
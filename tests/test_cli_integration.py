@@ -4,7 +4,7 @@ import unittest
 from io import StringIO
 from pathlib import Path
 from tempfile import TemporaryDirectory
-from contextlib import redirect_stdout
+from contextlib import redirect_stderr, redirect_stdout
 
 from rokpyl.cli import main
 
@@ -34,6 +34,51 @@ class CliIntegrationTests(unittest.TestCase):
             payload = json.loads(lines[0])
             self.assertEqual(payload["id"], "c1")
 
+    def test_cli_async_engine(self):
+        fixture = Path(__file__).parent / "fixtures" / "claude_minimal.json"
+        with TemporaryDirectory() as tmpdir:
+            out_path = Path(tmpdir) / "out.jsonl"
+            buffer = StringIO()
+            with redirect_stdout(buffer):
+                result = main(
+                    [
+                        "--export-path",
+                        str(fixture),
+                        "--parser",
+                        "claude",
+                        "--engine",
+                        "async",
+                        "--out-jsonl",
+                        str(out_path),
+                    ]
+                )
+
+            self.assertEqual(result, 0)
+            payload = json.loads(out_path.read_text(encoding="utf-8"))
+            self.assertEqual(payload["id"], "c1")
+            self.assertIn("records=1", buffer.getvalue())
+
+    def test_cli_checkpoint_resume(self):
+        fixture = Path(__file__).parent / "fixtures" / "claude_minimal.json"
+        with TemporaryDirectory() as tmpdir:
+            out_path = Path(tmpdir) / "out.jsonl"
+            checkpoint_dir = Path(tmpdir) / "ckpt"
+            args = [
+                "--export-path",
+                str(fixture),
+                "--parser",
+                "claude",
+                "--out-jsonl",
+                str(out_path),
+                "--checkpoint-dir",
+                str(checkpoint_dir),
+            ]
+            with redirect_stdout(StringIO()):
+                self.assertEqual(main(args + ["--resume"]), 0)
+
+            self.assertEqual(json.loads(out_path.read_text(encoding="utf-8"))["id"], "c1")
+            self.assertFalse(checkpoint_dir.exists())
+
     def test_cli_auto_detect(self):
         fixture = Path(__file__).parent / "fixtures" / "claude_minimal.json"
         with TemporaryDirectory() as tmpdir:
@@ -99,6 +144,32 @@ class CliIntegrationTests(unittest.TestCase):
 
             self.assertEqual(result, 0)
 
+    def test_cli_reports_exporter_failures(self):
+        fixture = Path(__file__).parent / "fixtures" / "claude_minimal.json"
+        with TemporaryDirectory() as tmpdir:
+            out_path = Path(tmpdir) / "out.jsonl"
+            config_path = Path(tmpdir) / "config.json"
+            config_path.write_text(
+                json.dumps(
+                    {
+                        "inputs": [{"path": str(fixture), "mode": "explicit", "parser": "claude"}],
+                        "outputs": [
+                            {"type": "notion", "dry_run": False},
+                            {"type": "jsonl", "path": str(out_path)},
+                        ],
+                    }
+                ),
+                encoding="utf-8",
+            )
+            buffer = StringIO()
+            errors = StringIO()
+            with redirect_stdout(buffer), redirect_stderr(errors):
+                result = main(["--config", str(config_path)])
+
+            self.assertEqual(result, 1)
+            self.assertTrue(out_path.exists())
+            self.assertIn("Exporter failed: notion", errors.getvalue())
+
     def test_cli_env_overrides(self):
         fixture = Path(__file__).parent / "fixtures" / "claude_minimal.json"
         with TemporaryDirectory() as tmpdir:
@@ -0,0 +1,167 @@
+import json
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rokpyl.exporters.columnar import ColumnarExporter
+from rokpyl.models.canonical import ConversationRecord, Message
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except ImportError:  # optional dependency
+    pa = pq = None
+
+
+def _records():
+    return [
+        ConversationRecord(
+            id="1",
+            title="One",
+            platform="Claude",
+            project="Research",
+            date="2024-01-01T00:00:00Z",
+            messages=[
+                Message(role="user", content="Hi", created_at="2024-01-01T00:00:01Z"),
+                Message(role="assistant", content=[{"text": "Hello"}]),
+            ],
+        ),
+        ConversationRecord(id="2", title="Two", platform="Claude", date="not a date"),
+        ConversationRecord(
+            id="3",
+            title="Three",
+            platform="ChatGPT",
+            messages=[Message(role="user", content="Yo")],
+        ),
+    ]
+
+
+class ColumnarExporterTests(unittest.TestCase):
+    def test_columns_fallback_writes_row_groups(self):
+        with TemporaryDirectory() as tmpdir:
+            exporter = ColumnarExporter()
+            exporter.write(
+                iter(_records()),
+                {"dir": tmpdir, "format": "columns", "row_group_size": 2},
+            )
+
+            groups = [
+                json.loads(line)
+                for line in (Path(tmpdir) / "conversations.columns.jsonl")
+                .read_text(encoding="utf-8")
+                .splitlines()
+            ]
+            self.assertEqual([group["id"] for group in groups], [["1", "2"], ["3"]])
+            self.assertEqual(groups[0]["platform"], {"dictionary": ["Claude"], "indices": [0, 0]})
+            self.assertEqual(
+                groups[0]["project"], {"dictionary": ["Research"], "indices": [0, -1]}
+            )
+            self.assertEqual(groups[0]["date"], [1704067200000000, -(2**63)])
+            self.assertEqual(groups[0]["message_count"], [2, 0])
+
+            message_groups = [
+                json.loads(line)
+                for line in (Path(tmpdir) / "messages.columns.jsonl")
+                .read_text(encoding="utf-8")
+                .splitlines()
+            ]
+            self.assertEqual(message_groups[0]["conversation_id"], ["1", "1"])
+            self.assertEqual(message_groups[0]["position"], [0, 1])
+            self.assertEqual(
+                message_groups[0]["role"],
+                {"dictionary": ["user", "assistant"], "indices": [0, 1]},
+            )
+            self.assertEqual(message_groups[0]["content"][1], '[{"text": "Hello"}]')
+            self.assertEqual(message_groups[1]["conversation_id"], ["3"])
+
+    def test_missing_values_keep_columns_integer(self):
+        record = ConversationRecord(
+            id="1",
+            title="One",
+            platform="Claude",
+            metadata={"exported": datetime(2024, 1, 1), "tags": {"a"}},
+            messages=[Message(role="user", content=[{"at": datetime(2024, 1, 2)}])],
+        )
+        with TemporaryDirectory() as tmpdir:
+            ColumnarExporter().write([record], {"dir": tmpdir, "format": "columns"})
+            group = json.loads(
+                (Path(tmpdir) / "conversations.columns.jsonl").read_text(encoding="utf-8")
+            )
+            self.assertEqual(group["project"]["indices"], [-1])
+            self.assertTrue(all(isinstance(value, int) for value in group["date"]))
+            self.assertEqual(
+                json.loads(group["metadata"][0]),
+                {"exported": "2024-01-01 00:00:00", "tags": "{'a'}"},
+            )
+            messages = json.loads(
+                (Path(tmpdir) / "messages.columns.jsonl").read_text(encoding="utf-8")
+            )
+            self.assertEqual(messages["content"], ['[{"at": "2024-01-02 00:00:00"}]'])
+
+    def test_out_of_range_epoch_timestamps_are_missing(self):
+        record = ConversationRecord(
+            id="1",
+            title="One",
+            platform="Claude",
+            messages=[
+                Message(role="user", content="ms", created_at=1704067200000),
+                Message(role="user", content="nan", created_at=float("nan")),
+                Message(role="user", content="s", created_at=1704067200),
+            ],
+        )
+        with TemporaryDirectory() as tmpdir:
+            ColumnarExporter().write([record], {"dir": tmpdir, "format": "columns"})
+            group = json.loads(
+                (Path(tmpdir) / "messages.columns.jsonl").read_text(encoding="utf-8")
+            )
+            self.assertEqual(group["created_at"], [-(2**63), -(2**63), 1704067200000000])
+
+    @unittest.skipUnless(pq is not None, "pyarrow is not installed")
+    def test_parquet_round_trip(self):
+        with TemporaryDirectory() as tmpdir:
+            ColumnarExporter().write(
+                iter(_records()), {"dir": tmpdir, "format": "parquet", "row_group_size": 2}
+            )
+            conversations = pq.ParquetFile(str(Path(tmpdir) / "conversations.parquet"))
+            row_groups = conversations.metadata
+            self.assertEqual(
+                [row_groups.row_group(i).num_rows for i in range(row_groups.num_row_groups)],
+                [2, 1],
+            )
+            table = conversations.read()
+            for name in ("platform", "project"):
+                self.assertTrue(pa.types.is_dictionary(table.schema.field(name).type), name)
+            self.assertEqual(table.schema.field("date").type, pa.timestamp("us", tz="UTC"))
+            self.assertEqual(table.column("id").to_pylist(), ["1", "2", "3"])
+            self.assertEqual(
+                table.column("platform").to_pylist(), ["Claude", "Claude", "ChatGPT"]
+            )
+            self.assertEqual(table.column("project").to_pylist(), ["Research", None, None])
+            self.assertEqual(
+                table.column("date").to_pylist(),
+                [datetime(2024, 1, 1, tzinfo=timezone.utc), None, None],
+            )
+
+            messages = pq.ParquetFile(str(Path(tmpdir) / "messages.parquet"))
+            self.assertEqual(messages.metadata.num_row_groups, 2)
+            table = messages.read()
+            self.assertTrue(pa.types.is_dictionary(table.schema.field("role").type))
+            self.assertEqual(
+                table.schema.field("created_at").type, pa.timestamp("us", tz="UTC")
+            )
+            self.assertEqual(table.column("role").to_pylist(), ["user", "assistant", "user"])
+            self.assertEqual(table.column("position").to_pylist(), [0, 1, 0])
+
+    def test_requires_dir(self):
+        with self.assertRaises(ValueError):
+            ColumnarExporter().write([], {})
+
+    def test_unknown_format_raises(self):
+        with TemporaryDirectory() as tmpdir:
+            with self.assertRaises(ValueError):
+                ColumnarExporter().write([], {"dir": tmpdir, "format": "orc"})
+
+
+if __name__ == "__main__":
+    unittest.main()
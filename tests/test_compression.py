@@ -0,0 +1,144 @@
+import gzip
+import json
+import threading
+import unittest
+from dataclasses import asdict
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rokpyl.cli import build_exporter_registry, build_registry
+from rokpyl.core.compression import compression, open_binary, open_text, plain_suffix
+from rokpyl.core.detection import detect_importers
+from rokpyl.core.pipeline import Pipeline
+from rokpyl.importers.chatgpt import ChatGptImporter
+from rokpyl.importers.claude import ClaudeImporter
+from rokpyl.tools.json_schema import extract_schema
+from rokpyl.tools.synth import write_export
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+
+def _gzip(path: Path, target: Path) -> Path:
+    target.write_bytes(gzip.compress(path.read_bytes()))
+    return target
+
+
+def _zstd(path: Path, target: Path) -> Path:
+    target.write_bytes(zstandard.ZstdCompressor().compress(path.read_bytes()))
+    return target
+
+
+class CompressionTests(unittest.TestCase):
+    def test_suffixes_and_magic(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            plain = root / "a.json"
+            plain.write_text('{"a": 1}', encoding="utf-8")
+            disguised = _gzip(plain, root / "b.json")
+            self.assertIsNone(compression(plain))
+            self.assertEqual(compression(disguised), "gzip")
+            self.assertEqual(compression(root / "missing.jsonl.zst"), "zstd")
+            self.assertEqual(plain_suffix(Path("x/conversations.json.gz")), ".json")
+            self.assertEqual(plain_suffix(Path("claude.JSONL.ZST")), ".jsonl")
+            self.assertEqual(plain_suffix(Path("export.zip")), ".zip")
+            with open_text(disguised) as handle:
+                self.assertEqual(json.load(handle), {"a": 1})
+
+    def test_concatenated_members_and_large_streams(self):
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "lines.jsonl.gz"
+            lines = [json.dumps({"n": index, "pad": "x" * 100}) + "\n" for index in range(20000)]
+            half = len(lines) // 2
+            path.write_bytes(
+                gzip.compress("".join(lines[:half]).encode())
+                + gzip.compress("".join(lines[half:]).encode())
+            )
+            with open_text(path) as handle:
+                self.assertEqual(handle.readlines(), lines)
+
+    def test_truncated_stream_raises(self):
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "cut.json.gz"
+            data = gzip.compress(b"[" + b"1," * 50000 + b"1]")
+            path.write_bytes(data[: len(data) // 2])
+            with self.assertRaises(EOFError), open_binary(path) as handle:
+                handle.read()
+
+    def test_closing_early_stops_the_reader_thread(self):
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "big.jsonl.gz"
+            path.write_bytes(gzip.compress(b'{"a": 1}\n' * 500000))
+            before = threading.active_count()
+            with open_text(path) as handle:
+                handle.readline()
+            for thread in threading.enumerate():
+                if thread.name == "rokpyl-decompress":
+                    thread.join(timeout=5)
+            self.assertLessEqual(threading.active_count(), before)
+
+
+class CompressedSourceTests(unittest.TestCase):
+    def _codecs(self):
+        codecs = [(".gz", _gzip)]
+        if zstandard is not None:
+            codecs.append((".zst", _zstd))
+        return codecs
+
+    def test_importers_match_uncompressed(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            for platform, name, importer, options in (
+                ("chatgpt", "conversations.json", ChatGptImporter(), {}),
+                ("chatgpt", "conversations.jsonl", ChatGptImporter(), {}),
+                ("chatgpt", "lazy.json", ChatGptImporter(), {"lazy_messages": True}),
+                ("claude", "claude.json", ClaudeImporter(), {}),
+                ("claude", "claude.jsonl", ClaudeImporter(), {"lazy_messages": True}),
+                ("claude", "claude.html", ClaudeImporter(), {}),
+                ("claude", "claude.csv", ClaudeImporter(), {}),
+            ):
+                plain = write_export(root / name, platform, 12, seed=2)
+                expected = [asdict(record) for record in importer.parse(plain, options)]
+                for suffix, compress in self._codecs():
+                    path = compress(plain, root / f"{name}{suffix}")
+                    with self.subTest(name=path.name):
+                        self.assertIn(path, importer.discover_sources(root))
+                        records = importer.parse(path, options)
+                        self.assertEqual([asdict(record) for record in records], expected)
+
+    def test_detection_and_pipeline(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir) / "exports"
+            root.mkdir()
+            plain = write_export(Path(tmpdir) / "chatgpt.json", "chatgpt", 5)
+            claude = write_export(Path(tmpdir) / "claude.jsonl", "claude", 5)
+            _gzip(plain, root / "chatgpt.json.gz")
+            _gzip(claude, root / "history.jsonl.gz")
+            importers = [ChatGptImporter, ClaudeImporter]
+            self.assertEqual(
+                detect_importers(importers, root / "history.jsonl.gz"), [ClaudeImporter]
+            )
+            records = Pipeline(build_registry(), build_exporter_registry()).run(
+                {"inputs": [{"path": str(root)}], "outputs": []}
+            )
+            self.assertEqual(len(records), 10)
+
+    def test_schema_tool(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            plain = write_export(root / "claude.jsonl", "claude", 10)
+            for suffix, compress in self._codecs():
+                path = compress(plain, root / f"claude.jsonl{suffix}")
+                with self.subTest(suffix=suffix):
+                    self.assertEqual(
+                        extract_schema(path, max_items=10, max_examples=0),
+                        extract_schema(plain, max_items=10, max_examples=0),
+                    )
+                    with self.assertRaises(ValueError):
+                        extract_schema(path, max_items=5, max_examples=0, sample="offsets")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,21 @@
+import json
 import unittest
+import zipfile
 from pathlib import Path
-
-from rokpyl.core.detection import select_importers
+from tempfile import TemporaryDirectory
+
+from rokpyl.core.detection import (
+    FingerprintIndex,
+    UnknownFormatError,
+    detect_importers,
+    sample_records,
+    select_importers,
+)
 from rokpyl.importers.base import Importer
+from rokpyl.importers.chatgpt import ChatGptImporter
+from rokpyl.importers.claude import ClaudeImporter
+
+FIXTURES = Path(__file__).parent / "fixtures"
 
 
 class HighScoreImporter(Importer):
@@ -63,6 +76,65 @@ class DetectionTests(unittest.TestCase):
         )
         self.assertEqual(selected, [])
 
+    def test_detect_importers_by_fingerprint(self):
+        importers = [ClaudeImporter, ChatGptImporter]
+        index = FingerprintIndex(importers)
+        for name, expected in [
+            ("claude_minimal.json", ClaudeImporter),
+            ("claude_minimal_input.jsonl", ClaudeImporter),
+            ("chatgpt_minimal.json", ChatGptImporter),
+        ]:
+            selected = detect_importers(importers, FIXTURES / name, index=index)
+            self.assertEqual(selected, [expected], name)
+
+    def test_detect_importers_unknown_format_lists_closest(self):
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "export.json"
+            path.write_text(json.dumps([{"title": "x", "mapping": []}]), encoding="utf-8")
+
+            with self.assertRaises(UnknownFormatError) as ctx:
+                detect_importers([ClaudeImporter, ChatGptImporter], path)
+
+            self.assertEqual(ctx.exception.closest[0][:2], ("chatgpt", "chatgpt-mapping"))
+            self.assertIn("chatgpt/chatgpt-mapping (50%)", str(ctx.exception))
+
+    def test_detect_importers_falls_back_to_scores_without_fingerprints(self):
+        selected = detect_importers([HighScoreImporter], FIXTURES / "claude_minimal.json")
+        self.assertEqual(selected, [HighScoreImporter])
+
+    def test_sample_records_stops_at_limit(self):
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "conversations.json"
+            path.write_text(
+                '{"conversations": [{"id": 1}, {"id": 2}, {"id": 3}' + "x" * 1000,
+                encoding="utf-8",
+            )
+            self.assertEqual(sample_records(path, limit=2), [{"id": 1}, {"id": 2}])
+
+    def test_detect_importers_samples_export_zips(self):
+        importers = [ClaudeImporter, ChatGptImporter]
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            for name, expected in [
+                ("claude_minimal.json", ClaudeImporter),
+                ("chatgpt_minimal.json", ChatGptImporter),
+            ]:
+                archive_path = root / f"{name}.zip"
+                with zipfile.ZipFile(archive_path, "w") as archive:
+                    archive.writestr("users.json", "[]")
+                    archive.write(FIXTURES / name, "export/conversations.json")
+                self.assertEqual(detect_importers(importers, archive_path), [expected], name)
+                self.assertTrue(expected().parse(archive_path))
+
+            empty = root / "photos.zip"
+            with zipfile.ZipFile(empty, "w") as archive:
+                archive.writestr("photo.txt", "x")
+            with self.assertRaises(UnknownFormatError):
+                detect_importers(importers, empty)
+            (root / "broken.zip").write_bytes(b"not a zip")
+            with self.assertRaises(UnknownFormatError):
+                detect_importers(importers, root / "broken.zip")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,196 @@
+import threading
+import time
+import unittest
+
+from rokpyl.core.fanout import fan_out, run_sequential
+from rokpyl.exporters.base import Exporter
+from rokpyl.models.canonical import ConversationRecord
+
+
+class CollectingExporter(Exporter):
+    name = "collect"
+
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.ids = []
+
+    def write(self, records, options=None):
+        for record in records:
+            if self.delay:
+                time.sleep(self.delay)
+            self.ids.append(record.id)
+
+
+class FailingExporter(Exporter):
+    name = "fail"
+
+    def write(self, records, options=None):
+        for record in records:
+            if record.id == "3":
+                raise RuntimeError("boom")
+
+
+class IgnoringExporter(Exporter):
+    name = "ignore"
+
+    def write(self, records, options=None):
+        return None
+
+
+class GatedExporter(Exporter):
+    name = "gated"
+    ids = None
+
+    def __init__(self, gate: threading.Event) -> None:
+        self.gate = gate
+
+    def write(self, records, options=None):
+        self.gate.wait(5)
+        self.ids = [record.id for record in records]
+
+
+class RemoteExporter(GatedExporter):
+    name = "remote"
+    remote = True
+
+
+def _records(count):
+    return [ConversationRecord(id=str(idx), title="t", platform="p") for idx in range(count)]
+
+
+class FanOutTests(unittest.TestCase):
+    def test_all_exporters_receive_every_record_in_order(self):
+        first = CollectingExporter()
+        second = CollectingExporter(delay=0.001)
+        results = fan_out(
+            iter(_records(20)),
+            [(first, {"type": "a"}), (second, {"type": "b"})],
+            queue_size=2,
+        )
+        expected = [str(idx) for idx in range(20)]
+        self.assertEqual(first.ids, expected)
+        self.assertEqual(second.ids, expected)
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual([result.records for result in results], [20, 20])
+
+    def test_failures_are_isolated(self):
+        collector = CollectingExporter()
+        results = fan_out(
+            _records(10),
+            [(FailingExporter(), {"type": "fail"}), (collector, {"type": "collect"})],
+            queue_size=1,
+        )
+        self.assertEqual(len(collector.ids), 10)
+        self.assertIsInstance(results[0].error, RuntimeError)
+        self.assertTrue(results[1].ok)
+
+    def test_exporter_that_stops_reading_does_not_block(self):
+        collector = CollectingExporter()
+        results = fan_out(
+            _records(50),
+            [(IgnoringExporter(), {"type": "ignore"}), (collector, {"type": "collect"})],
+            queue_size=1,
+        )
+        self.assertEqual(len(collector.ids), 50)
+        self.assertEqual(results[0].records, 0)
+
+    def test_deep_queue_keeps_slow_sink_from_holding_up_others(self):
+        gate = threading.Event()
+        collector = CollectingExporter()
+        done = threading.Event()
+
+        def run():
+            fan_out(
+                _records(30),
+                [
+                    (GatedExporter(gate), {"type": "gated", "queue_size": 100}),
+                    (collector, {"type": "collect"}),
+                ],
+                queue_size=1,
+            )
+            done.set()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        deadline = time.time() + 5
+        while len(collector.ids) < 30 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(collector.ids), 30)
+        self.assertFalse(done.is_set())
+        gate.set()
+        thread.join(5)
+        self.assertTrue(done.is_set())
+
+    def _run_until_local_done(self, slow, slow_output):
+        gate = threading.Event()
+        slow.gate = gate
+        collector = CollectingExporter()
+        finished = []
+
+        def run():
+            finished.append(
+                fan_out(
+                    _records(30),
+                    [(slow, slow_output), (collector, {"type": "collect"})],
+                    queue_size=1,
+                )
+            )
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        deadline = time.time() + 5
+        while len(collector.ids) < 30 and time.time() < deadline:
+            time.sleep(0.01)
+        local_done = len(collector.ids)
+        gate.set()
+        thread.join(5)
+        return local_done, finished[0]
+
+    def test_remote_sinks_spill_instead_of_blocking(self):
+        expected = [str(idx) for idx in range(30)]
+        for slow, output in [
+            (RemoteExporter(None), {"type": "remote"}),
+            (GatedExporter(None), {"type": "gated", "spill": True}),
+        ]:
+            with self.subTest(output=output):
+                local_done, results = self._run_until_local_done(slow, output)
+                self.assertEqual(local_done, 30)
+                self.assertEqual(slow.ids, expected)
+                self.assertEqual(results[0].records, 30)
+                self.assertGreater(results[0].spilled, 0)
+                self.assertEqual(results[1].spilled, 0)
+
+    def test_spill_feed_reuses_its_file_once_drained(self):
+        ids = []
+
+        class Reader(Exporter):
+            name = "reader"
+            remote = True
+
+            def write(self, records, options=None):
+                for record in records:
+                    ids.append(record.id)
+                    time.sleep(0.0005 if len(ids) % 10 else 0.02)
+
+        results = fan_out(_records(100), [(Reader(), {"type": "reader"})], queue_size=3)
+        self.assertEqual(ids, [str(idx) for idx in range(100)])
+        self.assertTrue(results[0].ok)
+
+    def test_run_sequential_isolates_failures(self):
+        collector = CollectingExporter()
+        results = run_sequential(
+            iter(_records(5)),
+            [
+                (FailingExporter(), {"type": "fail"}),
+                (collector, {"type": "collect"}),
+                (IgnoringExporter(), {"type": "ignore"}),
+            ],
+        )
+        self.assertFalse(results[0].ok)
+        self.assertEqual(len(collector.ids), 5)
+        # Counted up to the failing record, like fan_out.
+        self.assertEqual([result.records for result in results], [4, 5, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+import json
+import pstats
+import threading
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rokpyl.cli import main
+from rokpyl.core.instrument import Instrumentation, output_bytes, output_snapshot
+
+
+class InstrumentationTests(unittest.TestCase):
+    def test_stage_accumulates_and_reports(self):
+        instrumentation = Instrumentation(trace_memory=True)
+        instrumentation.start()
+        for _ in range(2):
+            with instrumentation.stage("work") as stats:
+                data = [0] * 100000
+                stats.records += 1
+        del data
+        instrumentation.stop()
+
+        report = instrumentation.report(records=2)
+        stage = report["stages"][0]
+        self.assertEqual(stage["name"], "work")
+        self.assertEqual(stage["calls"], 2)
+        self.assertEqual(stage["records"], 2)
+        self.assertGreater(stage["peak_memory_bytes"], 100000)
+        self.assertEqual(report["records"], 2)
+
+    def test_profilers_write_files(self):
+        with TemporaryDirectory() as tmpdir:
+            for mode, suffix in [("cprofile", ".prof"), ("sample", ".folded")]:
+                instrumentation = Instrumentation(
+                    profile_stages=["parse:x"], profile_mode=mode, profile_dir=tmpdir
+                )
+                with instrumentation.stage("parse:x"):
+                    sum(range(10000))
+                self.assertFalse((Path(tmpdir) / f"parse_x{suffix}").exists())
+                instrumentation.stop()
+                self.assertTrue((Path(tmpdir) / f"parse_x{suffix}").exists())
+
+    def test_profile_spans_every_call_and_skips_nested_stages(self):
+        def work():
+            return sum(range(1000))
+
+        with TemporaryDirectory() as tmpdir:
+            instrumentation = Instrumentation(
+                profile_stages=["parse", "parse:x"], profile_dir=tmpdir
+            )
+            instrumentation.start()
+            for _ in range(3):
+                with instrumentation.stage("parse"), instrumentation.stage("parse:x"):
+                    work()
+            with instrumentation.stage("parse:x"):
+                work()
+            instrumentation.stop()
+
+            def calls(name):
+                stats = pstats.Stats(str(Path(tmpdir) / name)).stats  # type: ignore[attr-defined]
+                return sum(
+                    entry[1] for key, entry in stats.items() if key[2] == work.__name__
+                )
+
+            self.assertEqual(calls("parse.prof"), 3)
+            self.assertEqual(calls("parse_x.prof"), 1)
+            self.assertEqual(instrumentation.stats("parse:x").calls, 4)
+
+    def test_stage_from_several_threads(self):
+        instrumentation = Instrumentation()
+
+        def work():
+            for _ in range(200):
+                with instrumentation.stage("outer"):
+                    with instrumentation.stage("inner"):
+                        pass
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(instrumentation.stats("outer").calls, 800)
+        self.assertEqual(instrumentation.stats("inner").calls, 800)
+        self.assertEqual(instrumentation._depth, 0)
+
+    def test_output_bytes_counts_only_this_run(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / "old.md").write_text("x" * 500, encoding="utf-8")
+            (root / "log.jsonl").write_text("a" * 10, encoding="utf-8")
+            output = {"dir": str(root)}
+            before = output_snapshot(output)
+            (root / "new.md").write_text("y" * 30, encoding="utf-8")
+            self.assertEqual(output_bytes(output, before), 30)
+
+            appended = {"path": str(root / "log.jsonl"), "append": True}
+            before = output_snapshot(appended)
+            self.assertEqual(output_bytes(appended, before), 0)
+            with (root / "log.jsonl").open("a", encoding="utf-8") as handle:
+                handle.write("b" * 7)
+            self.assertEqual(output_bytes(appended, before), 7)
+            self.assertEqual(output_bytes(appended), 17)
+
+    def test_async_engine_refuses_per_stage_profiling(self):
+        fixture = Path(__file__).parent / "fixtures" / "claude_minimal.json"
+        for flag in (["--trace-memory"], ["--profile", "parse"]):
+            with TemporaryDirectory() as tmpdir, redirect_stdout(StringIO()):
+                with self.assertRaises(SystemExit):
+                    main(
+                        [
+                            "--export-path", str(fixture),
+                            "--parser", "claude",
+                            "--engine", "async",
+                            "--out-jsonl", str(Path(tmpdir) / "out.jsonl"),
+                            *flag,
+                        ]
+                    )
+
+    def test_cli_profiles_exporters_and_times_parsing_alone(self):
+        fixture = Path(__file__).parent / "fixtures" / "claude_minimal.json"
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            with redirect_stdout(StringIO()):
+                main(
+                    [
+                        "--export-path", str(fixture),
+                        "--parser", "claude",
+                        "--out-jsonl", str(root / "out.jsonl"),
+                        "--out-md-dir", str(root / "md"),
+                        "--max-memory", "1GB",
+                        "--profile", "export:jsonl",
+                        "--profile", "parse",
+                        "--profile-dir", str(root / "profiles"),
+                        "--report", str(root / "report.json"),
+                    ]
+                )
+            self.assertEqual(
+                sorted(path.name for path in (root / "profiles").iterdir()),
+                ["export_jsonl.prof", "parse.prof"],
+            )
+            stages = {
+                stage["name"]: stage
+                for stage in json.loads((root / "report.json").read_text("utf-8"))["stages"]
+            }
+            # "parse" times the same calls as "parse:<importer>", nothing around them.
+            self.assertEqual(stages["parse"]["calls"], stages["parse:claude"]["calls"])
+            self.assertEqual(stages["normalize"]["calls"], 1)
+
+    def test_cli_writes_run_report(self):
+        fixture = Path(__file__).parent / "fixtures" / "claude_minimal.json"
+        for engine in ("sequential", "async"):
+            with TemporaryDirectory() as tmpdir:
+                out_path = Path(tmpdir) / "out.jsonl"
+                report_path = Path(tmpdir) / "report.json"
+                with redirect_stdout(StringIO()):
+                    result = main(
+                        [
+                            "--export-path",
+                            str(fixture),
+                            "--parser",
+                            "claude",
+                            "--engine",
+                            engine,
+                            "--out-jsonl",
+                            str(out_path),
+                            "--report",
+                            str(report_path),
+                        ]
+                    )
+
+                self.assertEqual(result, 0)
+                report = json.loads(report_path.read_text(encoding="utf-8"))
+                stages = {stage["name"]: stage for stage in report["stages"]}
+                self.assertEqual(report["engine"], engine)
+                self.assertEqual(report["records"], 1)
+                self.assertEqual(stages["parse:claude"]["bytes_read"], fixture.stat().st_size)
+                self.assertEqual(stages["parse:claude"]["messages"], 2)
+                self.assertEqual(stages["export:jsonl"]["records"], 1)
+                self.assertEqual(
+                    stages["export:jsonl"]["bytes_written"], out_path.stat().st_size
+                )
+                self.assertIn("normalize", stages)
+
+
+if __name__ == "__main__":
+    unittest.main()
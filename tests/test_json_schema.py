@@ -0,0 +1,130 @@
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rokpyl.tools.json_schema import (
+    SchemaAccumulator,
+    annotate_presence,
+    extract_schema,
+    extract_schema_parallel,
+    infer_from_iter,
+    split_ranges,
+)
+
+
+class JsonSchemaTests(unittest.TestCase):
+    def test_extract_schema_samples_prefix_of_truncated_file(self):
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "conversations.json"
+            items = [{"id": str(idx), "n": idx} for idx in range(3)]
+            # Everything after the sampled prefix is unreadable on purpose.
+            path.write_text(json.dumps(items)[:-1] + ", {" + "x" * 100000, encoding="utf-8")
+
+            schema = extract_schema(path, max_items=3, max_examples=5)
+
+            self.assertEqual(schema["type_counts"], {"object": 3})
+            self.assertEqual(schema["properties"]["n"]["type_counts"], {"int": 3})
+            self.assertEqual(schema["properties"]["id"]["examples"], ["0", "1", "2"])
+
+    def test_extract_schema_json_path(self):
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "export.json"
+            path.write_text(
+                json.dumps({"meta": {"v": 1}, "conversations": [{"a": 1}, {"a": None}]}),
+                encoding="utf-8",
+            )
+
+            schema = extract_schema(
+                path, max_items=10, max_examples=5, json_path=("conversations",)
+            )
+
+            self.assertEqual(schema["type_counts"], {"object": 2})
+            self.assertEqual(schema["properties"]["a"]["type_counts"], {"int": 1, "null": 1})
+
+    def test_extract_schema_jsonl(self):
+        fixture = Path(__file__).parent / "fixtures" / "claude_minimal_with_blanks.jsonl"
+        schema = extract_schema(fixture, max_items=10, max_examples=5)
+        self.assertEqual(schema["type_counts"], {"object": 1})
+
+    def test_accumulator_merge_matches_single_pass(self):
+        values = [{"a": [1, "x", {"b": None}]}, {"a": [], "c": 1.5}, [True, {"d": "y"}], "s"]
+        whole = infer_from_iter(values, max_items=10, max_examples=3)
+
+        left = SchemaAccumulator(max_examples=3)
+        right = SchemaAccumulator(max_examples=3)
+        for value in values[:2]:
+            left.add(value)
+        for value in values[2:]:
+            right.add(value)
+
+        self.assertEqual(left.merge(right).to_dict(), whole)
+        self.assertEqual(
+            whole["properties"]["a"]["items"]["type_counts"],
+            {"int": 1, "string": 1, "object": 1},
+        )
+
+    def test_parallel_ranges_match_sequential(self):
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "export.jsonl"
+            lines = [json.dumps({"id": idx, "text": "t" * (idx % 7)}) for idx in range(50)]
+            path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+            ranges = split_ranges(path, 4)
+            self.assertEqual(ranges[0][0], 0)
+            self.assertEqual(ranges[-1][1], path.stat().st_size)
+
+            sequential = extract_schema(path, max_items=1000, max_examples=5)
+            parallel = extract_schema_parallel(
+                [path], max_items=1000, max_examples=5, workers=4
+            )
+
+            self.assertEqual(parallel["type_counts"], sequential["type_counts"])
+            self.assertEqual(parallel["properties"]["id"]["type_counts"], {"int": 50})
+
+    def test_reservoir_sampling_sees_late_items_and_is_seeded(self):
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "conversations.json"
+            items = [{"id": idx} for idx in range(200)] + [{"id": 200, "late": True}]
+            path.write_text(json.dumps(items), encoding="utf-8")
+
+            head = extract_schema(path, max_items=200, max_examples=5)
+            self.assertNotIn("late", head["properties"])
+
+            first = extract_schema(path, max_items=200, max_examples=5, sample="reservoir", seed=3)
+            second = extract_schema(path, max_items=200, max_examples=5, sample="reservoir", seed=3)
+            self.assertEqual(first, second)
+            self.assertEqual(first["type_counts"], {"object": 200})
+
+    def test_offset_sampling_reads_whole_records(self):
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "export.jsonl"
+            lines = [json.dumps({"id": idx, "pad": "p" * idx}) for idx in range(100)]
+            path.write_text("\n".join(lines), encoding="utf-8")
+
+            schema = extract_schema(path, max_items=10, max_examples=5, sample="offsets", seed=1)
+
+            self.assertEqual(schema["type_counts"], {"object": 10})
+            self.assertEqual(schema["properties"]["pad"]["type_counts"], {"string": 10})
+            with self.assertRaises(ValueError):
+                extract_schema(
+                    Path(__file__).parent / "fixtures" / "claude_minimal.json",
+                    max_items=1,
+                    max_examples=1,
+                    sample="offsets",
+                )
+
+    def test_annotate_presence(self):
+        schema = infer_from_iter(
+            [{"a": 1, "b": {"c": 1}}, {"a": 2, "b": {}}, {"a": None}, {"a": 3}],
+            max_items=10,
+            max_examples=5,
+        )
+        annotate_presence(schema)
+        self.assertEqual(schema["properties"]["a"]["presence"], 1.0)
+        self.assertEqual(schema["properties"]["b"]["presence"], 0.5)
+        self.assertEqual(schema["properties"]["b"]["properties"]["c"]["presence"], 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
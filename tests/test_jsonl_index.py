@@ -0,0 +1,158 @@
+import json
+import unittest
+from contextlib import redirect_stdout
+from dataclasses import asdict
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from rokpyl.cli import build_config, build_exporter_registry, build_registry, main, parse_args
+from rokpyl.core import jsonl_index
+from rokpyl.core.jsonl_index import JsonlIndex, build_index, index_path
+from rokpyl.core.pipeline import Pipeline
+from rokpyl.exporters.jsonl import JsonlExporter
+from rokpyl.exporters.markdown import MarkdownExporter
+from rokpyl.models.canonical import ConversationRecord, Message
+from rokpyl.tools.synth import write_export
+
+
+def _record(index: int, url=None) -> ConversationRecord:
+    return ConversationRecord(
+        id=f"c{index}",
+        title=f"T{index} é",
+        platform="P",
+        url=url,
+        messages=[Message(role="user", content=f"message {index}")],
+        transcript=f"user: message {index}",
+    )
+
+
+class JsonlIndexTests(unittest.TestCase):
+    def test_exporter_index_finds_every_record(self):
+        records = [
+            _record(index, url=f"https://x/{index}" if index % 2 else None)
+            for index in range(300)
+        ]
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "out.jsonl"
+            JsonlExporter().write(records, {"path": str(path), "index": True})
+            with JsonlIndex.open(path) as index:
+                self.assertEqual(index.entry_count, 450)
+                for record in records:
+                    self.assertEqual(index.get(record.id), asdict(record))
+                    self.assertEqual(index.record(record.id), record)
+                self.assertEqual(index.get("https://x/7")["id"], "c7")
+                self.assertIsNone(index.get("missing"))
+                self.assertIn("c0", index)
+                line = path.read_text(encoding="utf-8").splitlines()[5].encode("utf-8")
+                self.assertEqual(index.raw("c5"), line)
+            plain = Path(tmpdir) / "plain.jsonl"
+            JsonlExporter().write(records, {"path": str(plain)})
+            self.assertEqual(path.read_bytes(), plain.read_bytes())
+
+    def test_hash_collisions_are_resolved_by_the_record(self):
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "out.jsonl"
+            with mock.patch.object(jsonl_index, "key_hash", lambda key: 42):
+                JsonlExporter().write(
+                    [_record(index) for index in range(20)], {"path": str(path), "index": True}
+                )
+                with JsonlIndex.open(path) as index:
+                    ids = [f"c{i}" for i in range(20)]
+                    self.assertEqual([index.get(key)["id"] for key in ids], ids)
+                    self.assertIsNone(index.get("c99"))
+
+    def test_append_extends_the_index(self):
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "out.jsonl"
+            options = {"path": str(path), "index": True, "append": True}
+            JsonlExporter().write([_record(0), _record(1)], options)
+            JsonlExporter().write([_record(2), _record(0)], options)
+            index_path(path).unlink()
+            JsonlExporter().write([_record(3)], options)  # no index left: scans the file
+            with JsonlIndex.open(path) as index:
+                self.assertEqual(index.get("c3")["id"], "c3")
+                self.assertEqual(index.get("c2")["id"], "c2")
+                lines = path.read_text(encoding="utf-8").splitlines()
+                self.assertEqual(len(lines), 5)
+                # The appended copy wins.
+                self.assertEqual(index.raw("c0"), lines[3].encode("utf-8"))
+
+    def test_stale_or_missing_index_is_refused(self):
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "out.jsonl"
+            JsonlExporter().write([_record(0)], {"path": str(path), "index": True})
+            with path.open("a", encoding="utf-8") as handle:
+                handle.write("\n" + json.dumps(asdict(_record(1))))
+            with self.assertRaises(ValueError):
+                JsonlIndex.open(path)
+            build_index(path)
+            with JsonlIndex.open(path) as index:
+                self.assertEqual(index.get("c1")["id"], "c1")
+            JsonlExporter().write([_record(2)], {"path": str(path)})
+            self.assertFalse(index_path(path).exists())
+            with self.assertRaises(ValueError):
+                JsonlIndex.open(path)
+
+    def test_empty_output(self):
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "out.jsonl"
+            JsonlExporter().write([], {"path": str(path), "index": True})
+            with JsonlIndex.open(path) as index:
+                self.assertIsNone(index.get("c0"))
+
+
+class MarkdownLinkTests(unittest.TestCase):
+    def test_markdown_links_to_the_jsonl_record(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            jsonl = root / "out" / "all.jsonl"
+            MarkdownExporter().write(
+                [_record(1)], {"dir": str(root / "md"), "raw_jsonl": str(jsonl)}
+            )
+            contents = (root / "md" / "c1.md").read_text(encoding="utf-8")
+            self.assertIn("[all.jsonl](../out/all.jsonl) (`c1`)", contents)
+            self.assertIn(f"rokpyl get c1 --jsonl {jsonl}", contents)
+            self.assertNotIn("```json", contents)
+
+
+class GetCommandTests(unittest.TestCase):
+    def test_pipeline_and_get(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            source = write_export(root / "conversations.json", "chatgpt", 10)
+            args = parse_args(
+                [
+                    "--input", str(source),
+                    "--out-jsonl", str(root / "out.jsonl"),
+                    "--out-md-dir", str(root / "md"),
+                    "--jsonl-index",
+                ]
+            )
+            config = build_config(args)
+            records = Pipeline(build_registry(), build_exporter_registry()).run(config)
+            target = records[3]
+            self.assertIn("rokpyl get", (root / "md" / f"{target.id}.md").read_text("utf-8"))
+
+            stdout = StringIO()
+            with redirect_stdout(stdout):
+                self.assertEqual(main(["get", target.id, "--jsonl", str(root / "out.jsonl")]), 0)
+            self.assertEqual(json.loads(stdout.getvalue()), asdict(target))
+            with self.assertRaises(SystemExit):
+                main(["get", "nope", "--jsonl", str(root / "out.jsonl")])
+
+    def test_reindex(self):
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "merged.jsonl"
+            JsonlExporter().write([_record(0), _record(1)], {"path": str(path)})
+            with self.assertRaises(SystemExit):
+                main(["get", "c1", "--jsonl", str(path)])
+            stdout = StringIO()
+            with redirect_stdout(stdout):
+                main(["get", "c1", "--jsonl", str(path), "--reindex", "--pretty"])
+            self.assertEqual(json.loads(stdout.getvalue())["id"], "c1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import io
+import json
+import unittest
+
+from rokpyl.core.jsonstream import (
+    JsonStreamError,
+    iter_array_items,
+    iter_objects,
+    parse_json_path,
+)
+
+
+class JsonStreamTests(unittest.TestCase):
+    def test_iter_top_level_array_with_small_chunks(self):
+        items = [{"a": "x\\\"]}", "n": 12345}, [1, [2, {"b": None}]], "s", 3.5, True]
+        text = json.dumps(items)
+        for chunk_size in (1, 2, 3, 7, 64):
+            result = list(iter_array_items(io.StringIO(text), chunk_size=chunk_size))
+            self.assertEqual(result, items)
+
+    def test_iter_nested_path_skips_siblings(self):
+        payload = {
+            "meta": {"note": "has \\\\ and \" and ] }", "list": [{"x": [1, 2]}]},
+            "count": 10,
+            "data": {"skip": "y", "conversations": [{"id": 1}, {"id": 2}]},
+        }
+        text = json.dumps(payload)
+        for chunk_size in (1, 5, 64):
+            result = list(
+                iter_array_items(
+                    io.StringIO(text), ("data", "conversations"), chunk_size=chunk_size
+                )
+            )
+            self.assertEqual(result, [{"id": 1}, {"id": 2}])
+
+    def test_stops_reading_after_consumed_items(self):
+        text = '[{"id": 1}, {"id": 2}, ' + "garbage" * 1000
+        items = iter_array_items(io.StringIO(text), chunk_size=16)
+        self.assertEqual(next(items), {"id": 1})
+        self.assertEqual(next(items), {"id": 2})
+
+    def test_empty_array_and_missing_key(self):
+        self.assertEqual(list(iter_array_items(io.StringIO(" [ ] "))), [])
+        with self.assertRaises(JsonStreamError):
+            list(iter_array_items(io.StringIO('{"a": []}'), ("b",)))
+        with self.assertRaises(JsonStreamError):
+            list(iter_array_items(io.StringIO('{"a": 1}'), ("a",)))
+
+    def test_numbers_split_across_chunks(self):
+        items = [12.5, -3e10, 1.25e-3, 7]
+        text = json.dumps(items).replace(" ", "")
+        for chunk_size in (1, 2, 3, 4):
+            result = list(iter_array_items(io.StringIO(text), chunk_size=chunk_size))
+            self.assertEqual(result, items)
+
+    def test_iter_objects_keeps_raw_values(self):
+        items = [
+            {"id": 1, "mapping": {"n": ["]", {"t": "x\\\"}"}]}, "title": "a"},
+            {"id": 2, "title": "b"},
+            [1, 2],
+        ]
+        text = json.dumps(items, indent=1)
+        for chunk_size in (1, 3, 64):
+            result = list(iter_objects(io.StringIO(text), ("mapping",), chunk_size=chunk_size))
+            self.assertEqual(result[0][0], {"id": 1, "title": "a"})
+            self.assertEqual(json.loads(result[0][1]["mapping"]), items[0]["mapping"])
+            self.assertEqual(result[1], ({"id": 2, "title": "b"}, {}))
+            self.assertEqual(result[2], ([1, 2], {}))
+        single = list(iter_objects(io.StringIO('{"mapping": null, "id": 3}'), ("mapping",)))
+        self.assertEqual(single, [({"id": 3}, {"mapping": "null"})])
+
+    def test_parse_json_path(self):
+        self.assertEqual(parse_json_path("data.conversations"), ("data", "conversations"))
+        self.assertEqual(parse_json_path(None), ())
+
+
+if __name__ == "__main__":
+    unittest.main()
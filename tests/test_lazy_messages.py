@@ -0,0 +1,134 @@
+import json
+import pickle
+import unittest
+from dataclasses import asdict
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rokpyl.cli import build_exporter_registry, build_registry
+from rokpyl.core.pipeline import Pipeline
+from rokpyl.core.query import Query
+from rokpyl.importers.chatgpt import ChatGptImporter
+from rokpyl.importers.claude import ClaudeImporter
+from rokpyl.models.canonical import LazyConversationRecord, Message, messages_decoded
+from rokpyl.tools.synth import write_export
+
+LAZY = {"lazy_messages": True}
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def _decode(raw):
+    return [Message(role="user", content=raw)], f"user: {raw}"
+
+
+class LazyRecordTests(unittest.TestCase):
+    def test_decodes_once_on_first_read(self):
+        record = LazyConversationRecord.deferred("hi", _decode, id="1", title="T", platform="P")
+        self.assertFalse(messages_decoded(record))
+        self.assertEqual(record.transcript, "user: hi")
+        self.assertTrue(record.decoded)
+        self.assertEqual(record.messages, [Message(role="user", content="hi")])
+
+    def test_assignment_and_pickle_do_not_decode(self):
+        record = LazyConversationRecord.deferred("hi", _decode, id="1", title="T", platform="P")
+        restored = pickle.loads(pickle.dumps(record))
+        self.assertFalse(restored.decoded)
+        self.assertEqual(restored.transcript, "user: hi")
+
+        record.messages = []
+        self.assertFalse(record.decoded)
+        self.assertEqual(record.transcript, "user: hi")
+        self.assertEqual(record.messages, [])
+
+
+class LazyImporterTests(unittest.TestCase):
+    def assertSameRecords(self, eager, lazy):
+        self.assertEqual([asdict(record) for record in lazy], [asdict(record) for record in eager])
+
+    def test_synthetic_exports_match_eager_parse(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            for platform, name, importer in (
+                ("chatgpt", "conversations.json", ChatGptImporter()),
+                ("chatgpt", "conversations.jsonl", ChatGptImporter()),
+                ("claude", "claude.json", ClaudeImporter()),
+                ("claude", "claude.jsonl", ClaudeImporter()),
+            ):
+                path = write_export(root / name, platform, 40, seed=3)
+                with self.subTest(name=name):
+                    lazy = importer.parse(path, LAZY)
+                    self.assertTrue(all(isinstance(r, LazyConversationRecord) for r in lazy))
+                    self.assertSameRecords(importer.parse(path), lazy)
+
+    def test_fixtures_match_eager_parse(self):
+        for importer, name in (
+            (ChatGptImporter(), "chatgpt_minimal.json"),
+            (ClaudeImporter(), "claude_minimal.json"),
+            (ClaudeImporter(), "claude_minimal_with_blanks.jsonl"),
+        ):
+            with self.subTest(name=name):
+                path = FIXTURES / name
+                self.assertSameRecords(importer.parse(path), importer.parse(path, LAZY))
+
+    def test_wrapped_conversations_fall_back_to_eager_parse(self):
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "claude.json"
+            path.write_text(
+                json.dumps({"conversations": [{"uuid": "c1", "chat_messages": []}]}),
+                encoding="utf-8",
+            )
+            records = ClaudeImporter().parse(path, LAZY)
+            self.assertEqual([record.id for record in records], ["c1"])
+
+    def test_query_projection_keeps_records_eager_and_empty(self):
+        with TemporaryDirectory() as tmpdir:
+            path = write_export(Path(tmpdir) / "conversations.json", "chatgpt", 5)
+            query = Query.from_config({"fields": ["date"]})
+            records = ChatGptImporter().parse(path, {**LAZY, "query": query})
+            self.assertEqual(len(records), 5)
+            self.assertTrue(all(not isinstance(r, LazyConversationRecord) for r in records))
+
+
+class LazyPipelineTests(unittest.TestCase):
+    def _config(self, root: Path, lazy: bool, outputs):
+        options = LAZY if lazy else {}
+        return {
+            "inputs": [
+                {
+                    "path": str(write_export(root / "conversations.json", "chatgpt", 20)),
+                    "mode": "explicit",
+                    "parser": "chatgpt",
+                    "options": options,
+                },
+                {
+                    "path": str(write_export(root / "claude.json", "claude", 20)),
+                    "mode": "explicit",
+                    "parser": "claude",
+                    "options": options,
+                },
+            ],
+            "outputs": outputs,
+        }
+
+    def test_metadata_only_run_never_decodes(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            pipeline = Pipeline(build_registry(), build_exporter_registry())
+            records = pipeline.run(self._config(root, True, []))
+            self.assertEqual(len(records), 40)
+            self.assertFalse(any(messages_decoded(record) for record in records))
+
+    def test_exported_output_is_identical(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            outputs = {}
+            for lazy in (False, True):
+                out = root / f"{lazy}.jsonl"
+                config = self._config(root, lazy, [{"type": "jsonl", "path": str(out)}])
+                Pipeline(build_registry(), build_exporter_registry()).run(config)
+                outputs[lazy] = out.read_text(encoding="utf-8")
+            self.assertEqual(outputs[True], outputs[False])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import json
+import random
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rokpyl.cli import main
+from rokpyl.core.merge import external_sort, merge_jsonl
+
+
+def _write(path: Path, records) -> Path:
+    path.write_text("\n".join(json.dumps(record) for record in records), encoding="utf-8")
+    return path
+
+
+def _ids(path: Path):
+    return [json.loads(line)["id"] for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def _record(record_id, date=None, url=None, title="t"):
+    return {"id": record_id, "title": title, "platform": "p", "date": date, "url": url}
+
+
+class ExternalSortTests(unittest.TestCase):
+    def test_spills_and_merges_in_order(self):
+        rng = random.Random(3)
+        items = [([rng.randint(0, 1000), index], f"v{index}") for index in range(500)]
+        runs = []
+        with TemporaryDirectory() as tmpdir:
+            result = list(
+                external_sort(
+                    iter(items),
+                    memory_bytes=2000,
+                    tmp_dir=tmpdir,
+                    fan_in=4,
+                    on_run=lambda: runs.append(1),
+                )
+            )
+            self.assertEqual(list(Path(tmpdir).iterdir()), [])
+        self.assertGreater(len(runs), 4)
+        self.assertEqual(result, sorted(items))
+
+
+class MergeJsonlTests(unittest.TestCase):
+    def test_first_precedence_dedupes_by_id_then_url(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            a = _write(root / "a.jsonl", [_record("1", title="a1"), _record("2", url="u")])
+            b = _write(
+                root / "b.jsonl",
+                [_record("1", title="b1"), _record("3", url="u"), _record("4")],
+            )
+            result = merge_jsonl([a, b], root / "out.jsonl", order="input")
+
+            self.assertEqual(_ids(root / "out.jsonl"), ["1", "2", "4"])
+            self.assertEqual(result.records_in, 5)
+            self.assertEqual(result.duplicates, 2)
+            first = json.loads((root / "out.jsonl").read_text(encoding="utf-8").splitlines()[0])
+            self.assertEqual(first["title"], "a1")
+
+    def test_newest_precedence_and_date_order(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            a = _write(
+                root / "a.jsonl",
+                [_record("1", "2024-03-01T00:00:00Z", title="old"), _record("2")],
+            )
+            b = _write(
+                root / "b.jsonl",
+                [_record("1", "2024-05-01T00:00:00Z", title="new"), _record("3", "2024-01-01")],
+            )
+            merge_jsonl([a, b], root / "out.jsonl", prefer="newest", order="date")
+
+            lines = [json.loads(line) for line in (root / "out.jsonl").read_text().splitlines()]
+            self.assertEqual([line["id"] for line in lines], ["3", "1", "2"])
+            self.assertEqual(lines[1]["title"], "new")
+
+    def test_small_budget_matches_in_memory_result(self):
+        rng = random.Random(7)
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            inputs = []
+            for part in range(4):
+                records = [
+                    _record(
+                        str(rng.randint(0, 150)),
+                        f"2024-01-{rng.randint(1, 28):02d}T00:00:00Z",
+                        url=f"u{rng.randint(0, 150)}" if rng.random() < 0.3 else None,
+                    )
+                    for _ in range(100)
+                ]
+                inputs.append(_write(root / f"p{part}.jsonl", records))
+
+            for order in ("date", "id", "input"):
+                for prefer in ("first", "newest"):
+                    with self.subTest(order=order, prefer=prefer):
+                        big = merge_jsonl(inputs, root / "big.jsonl", order=order, prefer=prefer)
+                        small = merge_jsonl(
+                            inputs,
+                            root / "small.jsonl",
+                            order=order,
+                            prefer=prefer,
+                            memory_bytes=4096,
+                            tmp_dir=root,
+                        )
+                        self.assertEqual(big.runs, 0)
+                        self.assertGreater(small.runs, 0)
+                        self.assertEqual(
+                            (root / "big.jsonl").read_text(encoding="utf-8"),
+                            (root / "small.jsonl").read_text(encoding="utf-8"),
+                        )
+            self.assertEqual(sorted(path.name for path in root.iterdir() if path.is_dir()), [])
+
+    def test_cli_merge(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            a = _write(root / "a.jsonl", [_record("2"), _record("1")])
+            b = _write(root / "b.jsonl", [_record("1"), _record("3")])
+            buffer = StringIO()
+            with redirect_stdout(buffer):
+                result = main(
+                    ["merge", str(a), str(b), "--out", str(root / "out.jsonl"), "--order", "id"]
+                )
+            self.assertEqual(result, 0)
+            self.assertIn("records=3", buffer.getvalue())
+            self.assertEqual(_ids(root / "out.jsonl"), ["1", "2", "3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
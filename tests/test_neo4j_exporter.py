@@ -0,0 +1,102 @@
+import csv
+import json
+import unittest
+from datetime import datetime
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rokpyl.exporters.neo4j_csv import (
+    NODE_FILES,
+    RELATIONSHIP_FILES,
+    Neo4jCsvExporter,
+    import_args,
+)
+from rokpyl.models.canonical import Attachment, ConversationRecord, Message
+
+
+def _read(root: Path, name: str):
+    with (root / name).open(encoding="utf-8", newline="") as handle:
+        return list(csv.reader(handle))
+
+
+def _node_ids(root: Path, name: str):
+    return {row[0] for row in _read(root, name)[1:]}
+
+
+class Neo4jCsvExporterTests(unittest.TestCase):
+    def test_writes_headers_and_referentially_consistent_files(self):
+        records = [
+            ConversationRecord(
+                id="c1",
+                title="One",
+                platform="Claude",
+                project="Research",
+                messages=[
+                    Message(role="user", content="Hi\nthere"),
+                    Message(
+                        role="assistant",
+                        content="Hello",
+                        attachments=[Attachment(name="a.txt", size_bytes=3)],
+                    ),
+                ],
+            ),
+            ConversationRecord(
+                id="c2",
+                title="Two",
+                platform="Claude",
+                messages=[Message(role="user", content="Yo")],
+            ),
+        ]
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            Neo4jCsvExporter().write(iter(records), {"dir": tmpdir})
+
+            for name, header in {**NODE_FILES, **RELATIONSHIP_FILES}.items():
+                self.assertEqual(_read(root, name)[0], header)
+
+            ids = {
+                "Conversation": _node_ids(root, "conversations.csv"),
+                "Message": _node_ids(root, "messages.csv"),
+                "Project": _node_ids(root, "projects.csv"),
+                "Platform": _node_ids(root, "platforms.csv"),
+                "Attachment": _node_ids(root, "attachments.csv"),
+            }
+            self.assertEqual(ids["Conversation"], {"c1", "c2"})
+            self.assertEqual(ids["Message"], {"c1:0", "c1:1", "c2:0"})
+            self.assertEqual(ids["Platform"], {"Claude"})
+            self.assertEqual(ids["Attachment"], {"c1:1:0"})
+
+            for name, header in RELATIONSHIP_FILES.items():
+                start_label = header[0].split("(")[1].rstrip(")")
+                end_label = header[1].split("(")[1].rstrip(")")
+                for start, end, _ in _read(root, name)[1:]:
+                    self.assertIn(start, ids[start_label])
+                    self.assertIn(end, ids[end_label])
+
+            self.assertEqual(_read(root, "next.csv")[1:], [["c1:0", "c1:1", "NEXT"]])
+            self.assertEqual(_read(root, "messages.csv")[1][2], "Hi\nthere")
+
+    def test_metadata_that_json_cannot_encode_is_stringified(self):
+        record = ConversationRecord(
+            id="c1",
+            title="One",
+            platform="Claude",
+            metadata={"when": datetime(2024, 1, 1, 12, 0)},
+            messages=[Message(role="user", content=[{"at": datetime(2024, 1, 2)}])],
+        )
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            Neo4jCsvExporter().write([record], {"dir": tmpdir})
+            header, row = _read(root, "conversations.csv")
+            metadata = json.loads(row[header.index("metadata")])
+            self.assertEqual(metadata, {"when": "2024-01-01 12:00:00"})
+            self.assertIn("2024-01-02 00:00:00", _read(root, "messages.csv")[1][2])
+
+    def test_import_args_cover_every_file(self):
+        args = import_args("/out")
+        self.assertEqual(len(args), len(NODE_FILES) + len(RELATIONSHIP_FILES) + 1)
+        self.assertIn("--nodes=Message=/out/messages.csv", args)
+
+
+if __name__ == "__main__":
+    unittest.main()
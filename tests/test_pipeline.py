@@ -1,9 +1,14 @@
+import json
+import shutil
 import unittest
 from pathlib import Path
+from tempfile import TemporaryDirectory
 
 from rokpyl.core.pipeline import Pipeline
 from rokpyl.core.registry import ExporterRegistry, ImporterRegistry
 from rokpyl.importers.base import Importer
+from rokpyl.importers.chatgpt import ChatGptImporter
+from rokpyl.importers.claude import ClaudeImporter
 from rokpyl.models.canonical import ConversationRecord
 
 
@@ -38,6 +43,24 @@ class PipelineTests(unittest.TestCase):
         self.assertEqual(len(records), 1)
         self.assertEqual(records[0].id, "1")
 
+    def test_pipeline_auto_detects_files_in_directory(self):
+        registry = ImporterRegistry()
+        registry.register(ClaudeImporter)
+        registry.register(ChatGptImporter)
+        pipeline = Pipeline(registry, ExporterRegistry())
+        fixtures = Path(__file__).parent / "fixtures"
+
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            shutil.copy(fixtures / "claude_minimal.json", root / "a.json")
+            shutil.copy(fixtures / "chatgpt_minimal.json", root / "b.json")
+            (root / "user.json").write_text(json.dumps({"email": "x"}), encoding="utf-8")
+
+            records = pipeline.run({"inputs": [{"path": tmpdir, "mode": "auto"}]})
+
+            self.assertEqual([record.id for record in records], ["c1", "g1"])
+            self.assertEqual([path.name for path, _ in pipeline.skipped], ["user.json"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,172 @@
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from rokpyl.cli import build_config, build_exporter_registry, build_registry, parse_args
+from rokpyl.core.async_pipeline import AsyncPipeline
+from rokpyl.core.config import ConfigError
+from rokpyl.core.pipeline import Pipeline
+from rokpyl.core.query import Query
+from rokpyl.importers import chatgpt
+from rokpyl.importers.claude import ClaudeImporter
+from rokpyl.summarizers.base import Summarizer
+from rokpyl.tools.synth import write_export
+
+# Synthetic conversation i is created at 2024-01-01T00:00Z + i hours.
+DAY_TWO = {"since": "2024-01-02", "until": "2024-01-03"}
+
+
+class QueryConfigTests(unittest.TestCase):
+    def test_empty_config_has_no_query(self):
+        self.assertIsNone(Query.from_config({}))
+        self.assertIsNone(Query.from_config({"filter": {}, "fields": []}))
+
+    def test_invalid_values(self):
+        for config in (
+            {"filter": {"after": "2024-01-01"}},
+            {"filter": {"since": "yesterday"}},
+            {"filter": {"title_match": "("}},
+            {"fields": ["id", "body"]},
+            {"filter": ["since"]},
+        ):
+            with self.subTest(config=config), self.assertRaises(ConfigError):
+                Query.from_config(config)
+
+    def test_accepts(self):
+        query = Query.from_config(
+            {"filter": {**DAY_TWO, "platform": "chatgpt", "title_match": "^plan"}}
+        )
+        self.assertTrue(
+            query.accepts(title="Plan B", date="2024-01-02T05:00:00Z", platform="ChatGPT")
+        )
+        self.assertFalse(query.accepts(title="Plan B", date="2024-01-03T00:00:00Z"))
+        self.assertFalse(query.accepts(title="Plan B", date=None))
+        self.assertFalse(query.accepts(title="A plan", date="2024-01-02"))
+        self.assertFalse(query.accepts(title="Plan B", date="2024-01-02", platform="Claude"))
+
+    def test_fields_keep_identity(self):
+        query = Query.from_config({"fields": "date"})
+        self.assertEqual(query.fields, frozenset({"id", "platform", "title", "date"}))
+        self.assertFalse(query.needs_messages())
+        self.assertTrue(query.needs_messages(has_id=False))
+
+    def test_cli_flags(self):
+        args = parse_args(
+            ["--input", "x.json", "--since", "2024-01-02", "--title-match", "^a"]
+            + ["--fields", "date,summary"]
+        )
+        config = build_config(args)
+        self.assertEqual(config["filter"], {"since": "2024-01-02", "title_match": "^a"})
+        self.assertEqual(config["fields"], "date,summary")
+
+
+class QueryPushdownTests(unittest.TestCase):
+    def test_chatgpt_skips_messages_of_rejected_conversations(self):
+        with TemporaryDirectory() as tmpdir:
+            path = write_export(Path(tmpdir) / "conversations.json", "chatgpt", 48, messages=4)
+            query = Query.from_config({"filter": DAY_TWO})
+            with mock.patch.object(chatgpt, "_message", wraps=chatgpt._message) as decode:
+                records = chatgpt.ChatGptImporter().parse(path, {"query": query})
+            self.assertEqual(len(records), 24)
+            self.assertTrue(all(record.date.startswith("2024-01-02") for record in records))
+            # Only the accepted conversations' nodes are decoded (4 to 6 per tree).
+            self.assertLessEqual(decode.call_count, 24 * 7)
+
+    def test_projection_skips_message_decoding(self):
+        with TemporaryDirectory() as tmpdir:
+            path = write_export(Path(tmpdir) / "conversations.json", "chatgpt", 10)
+            query = Query.from_config({"fields": ["date"]})
+            with mock.patch.object(chatgpt, "_message") as decode:
+                records = chatgpt.ChatGptImporter().parse(path, {"query": query})
+            decode.assert_not_called()
+            self.assertEqual(len(records), 10)
+            self.assertEqual(records[0].messages, [])
+
+    def test_claude_streaming_formats_filter_before_reading_messages(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            query = Query.from_config({"filter": DAY_TWO})
+            for suffix in (".json", ".html", ".csv"):
+                path = write_export(root / f"claude{suffix}", "claude", 48, messages=2)
+                with self.subTest(suffix=suffix):
+                    records = ClaudeImporter().parse(path, {"query": query})
+                    self.assertEqual(len(records), 24)
+                    self.assertTrue(all(record.messages for record in records))
+
+    def test_platform_filter_skips_whole_sources(self):
+        with TemporaryDirectory() as tmpdir:
+            path = write_export(Path(tmpdir) / "claude.json", "claude", 3)
+            query = Query.from_config({"filter": {"platform": "chatgpt"}})
+            with mock.patch("json.loads") as loads:
+                self.assertEqual(ClaudeImporter().parse(path, {"query": query}), [])
+            loads.assert_not_called()
+
+
+class QueryPipelineTests(unittest.TestCase):
+    def test_pipeline_filters_and_projects(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            chatgpt_path = write_export(root / "conversations.json", "chatgpt", 30)
+            claude_path = write_export(root / "claude.json", "claude", 30)
+            out = root / "out.jsonl"
+            config = {
+                "inputs": [
+                    {"path": str(chatgpt_path), "mode": "explicit", "parser": "chatgpt"},
+                    {"path": str(claude_path), "mode": "explicit", "parser": "claude"},
+                ],
+                "filter": {"since": "2024-01-02", "platform": "Claude"},
+                "fields": ["date", "summary"],
+                "outputs": [{"type": "jsonl", "path": str(out)}],
+            }
+            for engine in (Pipeline, AsyncPipeline):
+                with self.subTest(engine=engine.engine):
+                    records = engine(build_registry(), build_exporter_registry()).run(config)
+
+                    self.assertEqual(len(records), 6)
+                    self.assertEqual({record.platform for record in records}, {"Claude"})
+                    lines = [
+                        json.loads(line)
+                        for line in out.read_text(encoding="utf-8").splitlines()
+                    ]
+                    self.assertEqual(len(lines), 6)
+                    self.assertEqual(lines[0]["messages"], [])
+                    self.assertEqual(lines[0]["transcript"], "")
+                    self.assertTrue(lines[0]["date"].startswith("2024-01-02"))
+    def test_summarizer_gets_transcripts_despite_projection(self):
+        class Lengths(Summarizer):
+            name = "lengths"
+
+            def summarize(self, records, options=None):
+                for record in records:
+                    record.summary = str(len(record.transcript))
+                return records
+
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            config = {
+                "inputs": [
+                    {
+                        "path": str(write_export(root / f"{platform}.json", platform, 5)),
+                        "mode": "explicit",
+                        "parser": platform,
+                    }
+                    for platform in ("chatgpt", "claude")
+                ],
+                "fields": ["summary"],
+            }
+            for engine in (Pipeline, AsyncPipeline):
+                with self.subTest(engine=engine.engine):
+                    pipeline = engine(
+                        build_registry(), build_exporter_registry(), summarizer=Lengths()
+                    )
+                    records = pipeline.run(config)
+                    self.assertEqual(len(records), 10)
+                    for record in records:
+                        self.assertGreater(int(record.summary), 0)
+                        self.assertEqual(record.transcript, "")
+
+
+if __name__ == "__main__":
+    unittest.main()
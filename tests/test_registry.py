@@ -1,5 +1,13 @@
+import os
+import subprocess
+import sys
+import tempfile
 import unittest
+from unittest import mock
+from pathlib import Path
 
+from rokpyl.cli import build_exporter_registry, build_registry
+from rokpyl.core.plugins import MANIFEST_NAME, discover
 from rokpyl.core.registry import ImporterRegistry
 from rokpyl.importers.base import Importer
 
@@ -37,6 +45,91 @@ class RegistryTests(unittest.TestCase):
         with self.assertRaises(ValueError):
             registry.register(NamelessImporter)
 
+    def test_lazy_entry_imported_on_first_get(self):
+        registry = ImporterRegistry()
+        registry.register_lazy("fake", f"{__name__}:FakeImporter")
+        self.assertEqual(registry.list_names(), ["fake"])
+        self.assertIs(registry.get("fake"), FakeImporter)
+        with self.assertRaises(ValueError):
+            registry.register(FakeImporter)
+
+    def test_lazy_entry_name_mismatch_raises(self):
+        registry = ImporterRegistry()
+        registry.register_lazy("other", f"{__name__}:FakeImporter")
+        with self.assertRaises(ValueError):
+            registry.get("other")
+
+    def test_all_keeps_registration_order(self):
+        registry = build_registry()
+        self.assertEqual([cls.name for cls in registry.all()], ["claude", "chatgpt"])
+        with self.assertRaises(KeyError):
+            registry.get("missing")
+
+
+PLUGIN_SOURCE = """
+from rokpyl.exporters.base import Exporter
+
+
+class UpperExporter(Exporter):
+    name = "upper"
+
+    def write(self, records, options=None):
+        return None
+
+
+class Helper:
+    pass
+"""
+
+
+class PluginTests(unittest.TestCase):
+    def test_discovery_caches_manifest_and_loads_lazily(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / "local_exporters").mkdir()
+            plugin = root / "local_exporters" / "upper.py"
+            plugin.write_text(PLUGIN_SOURCE, encoding="utf-8")
+
+            found = discover(root)
+            self.assertEqual(found["local_exporters"], [("upper", f"{plugin}:UpperExporter")])
+            self.assertEqual(found["local_importers"], [])
+            manifest = (root / MANIFEST_NAME).read_text(encoding="utf-8")
+            self.assertIn("UpperExporter", manifest)
+
+            # Unchanged files come from the manifest without being re-read.
+            with mock.patch("rokpyl.core.plugins._scan_file", side_effect=AssertionError):
+                self.assertEqual(discover(root), found)
+
+            registry = build_exporter_registry(root)
+            self.assertIn("upper", registry.list_names())
+            self.assertEqual(registry.get("upper").__name__, "UpperExporter")
+
+    def test_plugin_cannot_shadow_builtin(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / "local_exporters").mkdir()
+            source = PLUGIN_SOURCE.replace('"upper"', '"jsonl"')
+            (root / "local_exporters" / "jsonl.py").write_text(source, encoding="utf-8")
+            with self.assertRaises(ValueError):
+                build_exporter_registry(root)
+
+
+class StartupTests(unittest.TestCase):
+    def test_cli_import_does_not_load_plugins_or_heavy_modules(self):
+        src = str(Path(__file__).resolve().parents[1] / "src")
+        env = dict(os.environ, PYTHONPATH=src)
+        code = (
+            "import sys, rokpyl.cli; "
+            "heavy = ('asyncio', 'multiprocessing', 'rokpyl.importers.claude', "
+            "'rokpyl.importers.chatgpt', 'rokpyl.exporters.markdown', 'rokpyl.core.merge', "
+            "'rokpyl.core.pipeline', 'rokpyl.core.detection', 'zipfile', 'pickle'); "
+            "print(','.join(name for name in heavy if name in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True
+        )
+        self.assertEqual(result.stdout.strip(), "")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,155 @@
+import os
+import socket
+import threading
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rokpyl.core.config import ConfigError
+from rokpyl.service import close_server, create_server, submit_job
+
+FIXTURE = Path(__file__).parent / "fixtures" / "claude_minimal.json"
+TOKEN = "test-token"
+
+# Holds the export open until the client has seen a streamed record.
+GATE_EXPORTER = """
+import time
+from pathlib import Path
+
+from rokpyl.exporters.base import Exporter
+
+
+class GateExporter(Exporter):
+    name = "gate"
+
+    def write(self, records, options=None):
+        list(records)
+        gate = Path(options["gate"])
+        deadline = time.monotonic() + 10
+        while not gate.exists() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        Path(options["path"]).write_text("released" if gate.exists() else "timed out")
+"""
+
+
+class ServiceTests(unittest.TestCase):
+    def _serve(self, **kwargs):
+        kwargs.setdefault("token", TOKEN)
+        server = create_server(port=0, workers=1, **kwargs)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            server.shutdown()
+            thread.join()
+            close_server(server)
+
+        self.addCleanup(stop)
+        return server
+
+    def _config(self, out_path: Path):
+        return {
+            "inputs": [{"path": str(FIXTURE), "mode": "explicit", "parser": "claude"}],
+            "outputs": [{"type": "jsonl", "path": str(out_path)}],
+        }
+
+    def test_jobs_stream_status_and_records(self):
+        server = self._serve(executor="thread")
+        port = server.server_address[1]
+        with TemporaryDirectory() as tmpdir:
+            out_path = Path(tmpdir) / "out.jsonl"
+            for _ in range(2):
+                events = list(submit_job(self._config(out_path), port=port, records=True, token=TOKEN))
+                self.assertEqual(
+                    [event["status"] for event in events], ["accepted", "record", "done"]
+                )
+                self.assertEqual(events[1]["record"]["id"], "c1")
+                self.assertEqual(events[-1]["records"], 1)
+                self.assertTrue(out_path.exists())
+
+            errors = list(submit_job({"inputs": []}, port=port, token=TOKEN))
+            self.assertEqual(errors[-1]["status"], "error")
+            self.assertIn("No inputs", errors[-1]["error"])
+
+    def test_process_pool(self):
+        server = self._serve(executor="process")
+        with TemporaryDirectory() as tmpdir:
+            out_path = Path(tmpdir) / "out.jsonl"
+            events = list(
+                submit_job(self._config(out_path), port=server.server_address[1], token=TOKEN)
+            )
+            self.assertEqual(events[-1]["status"], "done")
+            self.assertEqual(events[-1]["report"]["records"], 1)
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "Unix sockets not available")
+    def test_unix_socket(self):
+        with TemporaryDirectory() as tmpdir:
+            socket_path = str(Path(tmpdir) / "rokpyl.sock")
+            self._serve(executor="thread", socket_path=socket_path, token=None)
+            out_path = Path(tmpdir) / "out.jsonl"
+            events = list(submit_job(self._config(out_path), socket_path=socket_path))
+            self.assertEqual(events[-1]["status"], "done")
+
+            self.assertEqual(os.stat(socket_path).st_mode & 0o777, 0o600)
+
+    def test_tcp_requires_a_token(self):
+        with self.assertRaises(ConfigError):
+            create_server(port=0, workers=1, executor="thread")
+        server = self._serve(executor="thread")
+        with TemporaryDirectory() as tmpdir:
+            config = self._config(Path(tmpdir) / "out.jsonl")
+            for token in (None, "wrong"):
+                events = list(submit_job(config, port=server.server_address[1], token=token))
+                self.assertEqual(events[0]["error"], "missing or invalid token")
+                self.assertEqual(len(events), 1)
+            self.assertFalse((Path(tmpdir) / "out.jsonl").exists())
+
+    def test_records_stream_during_export_with_server_plugins(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / "local_exporters").mkdir()
+            (root / "local_exporters" / "gate.py").write_text(GATE_EXPORTER, encoding="utf-8")
+            server = self._serve(executor="thread", plugins_dir=str(root))
+            gate = root / "gate"
+            config = {
+                "inputs": [{"path": str(FIXTURE), "mode": "explicit", "parser": "claude"}],
+                "outputs": [{"type": "gate", "path": str(root / "out.txt"), "gate": str(gate)}],
+            }
+            statuses = []
+            for event in submit_job(
+                config, port=server.server_address[1], records=True, token=TOKEN
+            ):
+                statuses.append(event["status"])
+                if event["status"] == "record":
+                    gate.touch()
+            self.assertEqual(statuses, ["accepted", "record", "done"])
+            self.assertEqual((root / "out.txt").read_text(), "released")
+
+    def test_job_plugins_dir_is_rejected(self):
+        server = self._serve(executor="thread")
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / "local_exporters").mkdir()
+            marker = root / "imported"
+            (root / "local_exporters" / "evil.py").write_text(
+                f"open({str(marker)!r}, 'w').close()\n", encoding="utf-8"
+            )
+            config = dict(self._config(root / "out.jsonl"), plugins_dir=str(root))
+            events = list(submit_job(config, port=server.server_address[1], token=TOKEN))
+            self.assertEqual(events[-1]["status"], "error")
+            self.assertIn("plugins_dir", events[-1]["error"])
+            self.assertFalse(marker.exists())
+            self.assertFalse((root / "out.jsonl").exists())
+
+    def test_pool_failure_is_reported(self):
+        server = self._serve(executor="thread")
+        server.pool.shutdown()
+        with TemporaryDirectory() as tmpdir:
+            config = self._config(Path(tmpdir) / "out.jsonl")
+            events = list(submit_job(config, port=server.server_address[1], token=TOKEN))
+        self.assertEqual([event["status"] for event in events], ["accepted", "error"])
+        self.assertIn("RuntimeError", events[-1]["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,207 @@
+import json
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rokpyl.cli import main
+from rokpyl.core.async_pipeline import AsyncPipeline
+from rokpyl.core.config import ConfigError
+from rokpyl.core.pipeline import Pipeline
+from rokpyl.core.registry import ExporterRegistry, ImporterRegistry
+from rokpyl.core.shard import (
+    merge_shards,
+    order_path,
+    parse_shard,
+    shard_key,
+    shard_of,
+    shard_path,
+)
+from rokpyl.exporters.jsonl import JsonlExporter
+from rokpyl.importers.base import Importer
+from rokpyl.importers.chatgpt import ChatGptImporter
+from rokpyl.importers.claude import ClaudeImporter
+from rokpyl.models.canonical import record_from_dict
+from rokpyl.tools.synth import write_export
+
+
+def _pipeline(pipeline_cls=Pipeline):
+    importers = ImporterRegistry()
+    importers.register(ClaudeImporter)
+    importers.register(ChatGptImporter)
+    exporters = ExporterRegistry()
+    exporters.register(JsonlExporter)
+    return pipeline_cls(importers, exporters)
+
+
+def _write_archive(root: Path) -> None:
+    for index in range(6):
+        write_export(root / "archive" / f"chatgpt{index}.json", "chatgpt", 3, seed=index)
+        write_export(root / "archive" / f"claude{index}.json", "claude", 2, seed=index)
+    # Duplicates of earlier sources end up on other shards.
+    write_export(root / "archive" / "zz_dupes.json", "chatgpt", 2, seed=1)
+
+
+class RecordsImporter(Importer):
+    """Record dicts, one per line, in ``*.records`` files."""
+
+    name = "records"
+
+    def discover_sources(self, export_path):
+        return sorted(export_path.glob("*.records"))
+
+    def can_parse(self, source_path):
+        return 1.0
+
+    def parse(self, source_path, options=None):
+        lines = source_path.read_text(encoding="utf-8").splitlines()
+        return [record_from_dict(json.loads(line)) for line in lines]
+
+
+class ShardTests(unittest.TestCase):
+    def test_parse_shard(self):
+        self.assertIsNone(parse_shard(None))
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for bad in ("0/4", "5/4", "x", "1/0"):
+            with self.assertRaises(ConfigError):
+                parse_shard(bad)
+
+    def test_shard_of_is_stable_and_in_range(self):
+        self.assertEqual(shard_of("0:a/b.json", 5), shard_of("0:a/b.json", 5))
+        self.assertTrue(all(1 <= shard_of(f"0:{i}", 3) <= 3 for i in range(50)))
+
+    def test_shard_path(self):
+        self.assertEqual(shard_path("out/a.jsonl", (1, 3)), str(Path("out/a.shard-1-of-3.jsonl")))
+        self.assertEqual(shard_path("out/md", (2, 3)), str(Path("out/md.shard-2-of-3")))
+
+    def test_merged_shards_match_single_node_run(self):
+        for pipeline_cls in (Pipeline, AsyncPipeline):
+            with self.subTest(engine=pipeline_cls.engine), TemporaryDirectory() as tmpdir:
+                root = Path(tmpdir)
+                _write_archive(root)
+                inputs = [{"path": str(root / "archive"), "mode": "auto"}]
+                single = root / "single.jsonl"
+                _pipeline().run(
+                    {"inputs": inputs, "outputs": [{"type": "jsonl", "path": str(single)}]}
+                )
+
+                shard_files = []
+                sources = 0
+                for index in range(1, 4):
+                    pipeline = _pipeline(pipeline_cls)
+                    pipeline.run(
+                        {
+                            "inputs": inputs,
+                            "outputs": [{"type": "jsonl", "path": str(root / "out.jsonl")}],
+                            "runtime": {"shard": f"{index}/3"},
+                        }
+                    )
+                    sources += pipeline.instrumentation.stats("discover").sources
+                    shard_file = root / f"out.shard-{index}-of-3.jsonl"
+                    self.assertTrue(order_path(shard_file).exists())
+                    shard_files.append(shard_file)
+                self.assertEqual(sources, 13)
+
+                merged = root / "merged.jsonl"
+                written = merge_shards(shard_files, merged)
+                expected = single.read_text(encoding="utf-8")
+                self.assertEqual(written, len(expected.splitlines()))
+                self.assertEqual(merged.read_text(encoding="utf-8"), expected)
+
+    def test_transitive_dedup_across_shards(self):
+        # A(id1, u) on one shard; B(id2, u) then C(id2, v) in one source on the
+        # other. A single node keeps A (B loses on url) and C (its id is free).
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            names = sorted(f"s{index:02d}.records" for index in range(20))
+            shards = {name: shard_of(shard_key(0, root, root / name), 2) for name in names}
+            first = next(name for name in names if shards[name] == 1)
+            second = next(name for name in names if shards[name] == 2 and name > first)
+
+            def write(name, *records):
+                lines = [json.dumps({"title": "t", "platform": "p", **r}) for r in records]
+                (root / name).write_text("\n".join(lines), encoding="utf-8")
+
+            write(first, {"id": "id1", "url": "u"})
+            write(second, {"id": "id2", "url": "u"}, {"id": "id2", "url": "v", "title": "C"})
+
+            def run(output, runtime=None):
+                importers = ImporterRegistry()
+                importers.register(RecordsImporter)
+                exporters = ExporterRegistry()
+                exporters.register(JsonlExporter)
+                Pipeline(importers, exporters).run(
+                    {
+                        "inputs": [{"path": str(root), "mode": "explicit", "parser": "records"}],
+                        "outputs": [{"type": "jsonl", "path": str(root / output)}],
+                        "runtime": runtime or {},
+                    }
+                )
+
+            run("single.jsonl")
+            for index in (1, 2):
+                run("out.jsonl", {"shard": f"{index}/2"})
+            merged = root / "merged.jsonl"
+            merge_shards(
+                [root / "out.shard-1-of-2.jsonl", root / "out.shard-2-of-2.jsonl"], merged
+            )
+            single = (root / "single.jsonl").read_text(encoding="utf-8")
+            self.assertEqual(
+                [(r["id"], r["url"]) for r in map(json.loads, single.splitlines())],
+                [("id1", "u"), ("id2", "v")],
+            )
+            self.assertEqual(merged.read_text(encoding="utf-8"), single)
+
+    def test_sources_of_other_shards_are_not_detected(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            _write_archive(root)
+            detected = []
+            pipeline = _pipeline()
+            select = pipeline._select_importers
+
+            def spy(path):
+                detected.append(path)
+                return select(path)
+
+            pipeline._select_importers = spy
+            inputs = [{"path": str(root / "archive"), "mode": "auto"}]
+            tasks = list(pipeline.iter_tasks({"inputs": inputs, "runtime": {"shard": "1/3"}}))
+            self.assertEqual(sorted(detected), sorted({task.source for task in tasks}))
+            self.assertLess(len(detected), 13)
+
+    def test_cli_shard_and_merge(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            _write_archive(root)
+            with redirect_stdout(StringIO()):
+                for index in (1, 2):
+                    args = [
+                        "--export-path",
+                        str(root / "archive"),
+                        "--auto-detect",
+                        "--out-jsonl",
+                        str(root / "out.jsonl"),
+                        "--shard",
+                        f"{index}/2",
+                    ]
+                    self.assertEqual(main(args), 0)
+                buffer = StringIO()
+                with redirect_stdout(buffer):
+                    result = main(
+                        [
+                            "merge",
+                            "--shards",
+                            str(root / "out.shard-1-of-2.jsonl"),
+                            str(root / "out.shard-2-of-2.jsonl"),
+                            "--out",
+                            str(root / "merged.jsonl"),
+                        ]
+                    )
+            self.assertEqual(result, 0)
+            self.assertIn("records=30", buffer.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,218 @@
+import json
+import threading
+import unittest
+from dataclasses import asdict
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rokpyl.cli import build_config, build_exporter_registry, build_registry, parse_args
+from rokpyl.core.async_pipeline import AsyncPipeline
+from rokpyl.core.config import ConfigError, as_size
+from rokpyl.core.pipeline import Pipeline
+from rokpyl.core.spill import RecordStore, estimate_size
+from rokpyl.models.canonical import (
+    ConversationRecord,
+    LazyConversationRecord,
+    Message,
+    messages_decoded,
+)
+from rokpyl.summarizers.base import Summarizer
+from rokpyl.tools.synth import write_export
+
+
+def _record(index: int) -> ConversationRecord:
+    messages = [Message(role="user", content=f"message {index}")]
+    return ConversationRecord(
+        id=f"c{index}", title=f"T{index}", platform="P", transcript="x", messages=messages
+    )
+
+
+def _decode(raw):
+    return [Message(role="user", content=raw)], f"user: {raw}"
+
+
+class SizeTests(unittest.TestCase):
+    def test_as_size(self):
+        self.assertIsNone(as_size(None))
+        self.assertEqual(as_size(4096), 4096)
+        self.assertEqual(as_size("512MB"), 512 * 2**20)
+        self.assertEqual(as_size("2 GiB"), 2 * 2**30)
+        self.assertEqual(as_size("1.5k"), 1536)
+        for value in ("lots", "5q", "MB"):
+            with self.subTest(value=value), self.assertRaises(ConfigError):
+                as_size(value)
+
+    def test_estimate_grows_with_content(self):
+        small = estimate_size(_record(1))
+        large = _record(1)
+        large.messages[0].content = "x" * 10000
+        self.assertGreater(estimate_size(large), small + 9000)
+
+    def test_lazy_records_are_measured_without_decoding(self):
+        record = LazyConversationRecord.deferred(
+            "y" * 5000, _decode, id="1", title="T", platform="P"
+        )
+        self.assertGreater(estimate_size(record), 5000)
+        self.assertFalse(messages_decoded(record))
+
+
+class RecordStoreTests(unittest.TestCase):
+    def test_in_memory_under_budget(self):
+        store = RecordStore(10**9)
+        self.addCleanup(store.close)
+        store.extend(_record(index) for index in range(10))
+        self.assertEqual(store.spilled, 0)
+        self.assertEqual([record.id for record in store], [f"c{i}" for i in range(10)])
+
+    def test_spills_and_reads_back_in_order(self):
+        store = RecordStore(5 * estimate_size(_record(0)))
+        self.addCleanup(store.close)
+        records = [_record(index) for index in range(23)]
+        store.extend(records)
+        self.assertGreater(store.spills, 1)
+        self.assertGreater(store.spilled, 0)
+        self.assertLess(len(store._memory), 23)
+        self.assertEqual(len(store), 23)
+        self.assertEqual(list(store), records)
+        self.assertEqual(store[3], records[3])
+        self.assertEqual(store[-1], records[-1])
+        self.assertEqual(store[5:8], records[5:8])
+        with self.assertRaises(IndexError):
+            store[23]
+        self.assertEqual(store.stats()["records"], 23)
+
+    def test_concurrent_readers(self):
+        store = RecordStore(0)
+        self.addCleanup(store.close)
+        store.extend(_record(index) for index in range(200))
+        results = []
+
+        def read():
+            results.append([record.id for record in store])
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [[f"c{i}" for i in range(200)]] * 4)
+
+    def test_lazy_records_spill_undecoded(self):
+        store = RecordStore(0)
+        self.addCleanup(store.close)
+        store.append(
+            LazyConversationRecord.deferred("hi", _decode, id="1", title="T", platform="P")
+        )
+        restored = store[0]
+        self.assertFalse(restored.decoded)
+        self.assertEqual(restored.transcript, "user: hi")
+
+    def test_mapped_view(self):
+        store = RecordStore(0)
+        self.addCleanup(store.close)
+        store.extend(_record(index) for index in range(3))
+
+        def clear(record):
+            record.messages = []
+            return record
+
+        self.assertEqual([r.messages for r in store.mapped(clear)], [[], [], []])
+        self.assertTrue(all(record.messages for record in store))
+
+
+class SpillPipelineTests(unittest.TestCase):
+    def _config(self, root: Path, runtime):
+        chatgpt = write_export(root / "conversations.json", "chatgpt", 25)
+        inputs = [
+            {"path": str(path), "mode": "explicit", "parser": parser}
+            for path, parser in (
+                (chatgpt, "chatgpt"),
+                (write_export(root / "claude.json", "claude", 25), "claude"),
+                (chatgpt, "chatgpt"),  # every record is a duplicate
+            )
+        ]
+        return {
+            "inputs": inputs,
+            "outputs": [
+                {"type": "jsonl", "path": str(root / "out.jsonl")},
+                {"type": "markdown", "path": str(root / "md")},
+            ],
+            "fields": ["date", "messages"],
+            "runtime": runtime,
+        }
+
+    def test_output_matches_unbounded_run(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            for engine in (Pipeline, AsyncPipeline):
+                results = {}
+                for budget in (None, "16KB"):
+                    runtime = {"max_memory": budget, "concurrent_exports": budget is None}
+                    pipeline = engine(build_registry(), build_exporter_registry())
+                    self.addCleanup(pipeline.close)
+                    records = pipeline.run(self._config(root, runtime))
+                    lines = (root / "out.jsonl").read_text(encoding="utf-8")
+                    results[budget] = ([asdict(record) for record in records], lines)
+                    if budget is not None:
+                        self.assertIsInstance(records, RecordStore)
+                        self.assertGreater(pipeline.report()["spill"]["spilled_records"], 0)
+                with self.subTest(engine=engine.engine):
+                    self.assertEqual(len(results[None][0]), 50)
+                    self.assertEqual(results["16KB"], results[None])
+                    first = json.loads(results[None][1].splitlines()[0])
+                    self.assertEqual(first["transcript"], "")
+
+    def test_summarizer_sees_batches(self):
+        class Titles(Summarizer):
+            def summarize(self, records, options=None):
+                batches.append(len(records))
+                for record in records:
+                    record.summary = record.title
+                return records
+
+        batches = []
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            pipeline = Pipeline(build_registry(), build_exporter_registry(), summarizer=Titles())
+            self.addCleanup(pipeline.close)
+            config = self._config(root, {"max_memory": "1KB"})
+            del config["fields"]
+            records = pipeline.run(config)
+            self.assertEqual(sum(batches), 50)
+            self.assertTrue(all(record.summary == record.title for record in records))
+
+    def test_shard_positions(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            config = self._config(root, {"max_memory": 0, "shard": "1/1"})
+            pipeline = Pipeline(build_registry(), build_exporter_registry())
+            self.addCleanup(pipeline.close)
+            records = pipeline.run(config)
+            # Shard runs leave dedup to the merge, so the repeated source is kept.
+            self.assertEqual(len(records), 75)
+            self.assertEqual(sum(map(len, pipeline.positions.values())), len(records))
+            self.assertEqual(list(pipeline.positions[records[0].id]), [(0, 0), (2, 0)])
+
+    def test_next_run_closes_previous_store(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            config = self._config(root, {"max_memory": 0})
+            pipeline = Pipeline(build_registry(), build_exporter_registry())
+            self.addCleanup(pipeline.close)
+            pipeline.run(config)
+            first = pipeline.spill._file
+            pipeline.run(config)
+            second = pipeline.spill._file
+            self.assertTrue(first.closed)
+            self.assertFalse(second.closed)
+            pipeline.close()
+            self.assertTrue(second.closed)
+            self.assertEqual(pipeline.report()["spill"]["records"], 50)
+
+    def test_cli_flag(self):
+        config = build_config(parse_args(["--input", "x.json", "--max-memory", "1GB"]))
+        self.assertEqual(config["runtime"]["max_memory"], "1GB")
+
+
+if __name__ == "__main__":
+    unittest.main()
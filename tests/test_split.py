@@ -0,0 +1,139 @@
+import json
+import unittest
+from dataclasses import asdict
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from rokpyl.cli import build_exporter_registry, build_registry
+from rokpyl.core.pipeline import Pipeline
+from rokpyl.core.split import decode_items, element_ranges, parse_split
+from rokpyl.importers.chatgpt import ChatGptImporter
+from rokpyl.importers.claude import ClaudeImporter
+from rokpyl.tools.synth import write_export
+
+
+def _claude(index: int, messages: int) -> dict:
+    return {
+        "uuid": f"c{index}",
+        "name": f"Conversation {index}",
+        "chat_messages": [
+            {"uuid": f"m{index}-{n}", "name": "x", "sender": "human", "text": "hi"}
+            for n in range(messages)
+        ],
+    }
+
+
+class ElementRangeTests(unittest.TestCase):
+    def test_ranges_cover_every_element(self):
+        items = [{"id": index, "title": "}, {\"id\": 1, \"title\":"} for index in range(50)]
+        for separators in ((", ", ": "), (",", ":")):
+            data = json.dumps(items, separators=separators).encode("utf-8")
+            with self.subTest(separators=separators):
+                ranges = element_ranges(data, 4)
+                self.assertEqual(len(ranges), 4)
+                decoded = [
+                    item
+                    for start, end in ranges
+                    for item in decode_items(data[start:end].decode("utf-8"))
+                ]
+                self.assertEqual(decoded, items)
+
+    def test_pretty_printed_array(self):
+        items = [{"id": index, "body": {"id": index}} for index in range(20)]
+        data = json.dumps(items, indent=2).encode("utf-8")
+        ranges = element_ranges(data, 3)
+        self.assertEqual(len(ranges), 3)
+        self.assertEqual(sum(len(decode_items(data[s:e].decode())) for s, e in ranges), 20)
+
+    def test_unsplittable_documents(self):
+        for data in (b"", b"{}", b"[]", b"[1, 2, 3]", b'[{"a": 1}]', b'{"conversations": []}'):
+            with self.subTest(data=data):
+                self.assertIsNone(element_ranges(data, 4))
+
+    def test_decode_items_rejects_partial_values(self):
+        for text in ('{"a": 1}, {"b"', '{"a": 1} {"b": 2}', '1, 2]'):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                decode_items(text)
+
+
+class ParseSplitTests(unittest.TestCase):
+    def assertSameRecords(self, expected, actual):
+        self.assertIsNotNone(actual)
+        self.assertEqual([asdict(record) for record in actual], [asdict(r) for r in expected])
+
+    def test_synthetic_exports_match_sequential_parse(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            for platform, importer in (
+                ("chatgpt", ChatGptImporter()),
+                ("claude", ClaudeImporter()),
+            ):
+                path = write_export(root / f"{platform}.json", platform, 60, seed=4)
+                with self.subTest(platform=platform):
+                    split = parse_split(importer, path, {}, 3, min_bytes=0)
+                    self.assertSameRecords(importer.parse(path), split)
+
+    def test_bad_cut_falls_back(self):
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "claude.json"
+            # Messages look like conversations, so some cuts land inside one.
+            items = [_claude(index, 40) for index in range(4)]
+            path.write_text(json.dumps(items, separators=(",", ":")), encoding="utf-8")
+            self.assertIsNone(parse_split(ClaudeImporter(), path, {}, 8, min_bytes=0))
+
+    def test_skips_small_lazy_and_wrapped_sources(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            path = write_export(root / "conversations.json", "chatgpt", 10)
+            wrapped = root / "wrapped.json"
+            wrapped.write_text(json.dumps({"conversations": [_claude(1, 1)]}), encoding="utf-8")
+            importer = ChatGptImporter()
+            self.assertIsNone(parse_split(importer, path, {}, 2))
+            self.assertIsNone(parse_split(importer, path, {"lazy_messages": True}, 2, min_bytes=0))
+            self.assertIsNone(parse_split(ClaudeImporter(), wrapped, {}, 2, min_bytes=0))
+
+    def test_pipeline_output_is_identical(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            inputs = [
+                {
+                    "path": str(write_export(root / f"{platform}.json", platform, 30)),
+                    "mode": "explicit",
+                    "parser": platform,
+                }
+                for platform in ("chatgpt", "claude")
+            ]
+            outputs = {}
+            for workers in (0, 2):
+                out = root / f"{workers}.jsonl"
+                config = {
+                    "inputs": inputs,
+                    "outputs": [{"type": "jsonl", "path": str(out)}],
+                    "runtime": {"split_workers": workers, "split_min_mb": 0},
+                }
+                pipeline = Pipeline(build_registry(), build_exporter_registry())
+                with mock.patch("rokpyl.core.split.usable_cpus", return_value=2), mock.patch(
+                    "rokpyl.core.split.parse_split", wraps=parse_split
+                ) as split:
+                    pipeline.run(config)
+                self.assertEqual(split.call_count, 2 if workers else 0)
+                outputs[workers] = out.read_text(encoding="utf-8")
+            self.assertEqual(outputs[2], outputs[0])
+
+    def test_split_workers_are_capped_at_usable_cpus(self):
+        with TemporaryDirectory() as tmpdir:
+            path = write_export(Path(tmpdir) / "chatgpt.json", "chatgpt", 5)
+            config = {
+                "inputs": [{"path": str(path), "mode": "explicit", "parser": "chatgpt"}],
+                "runtime": {"split_workers": 8, "split_min_mb": 0},
+            }
+            pipeline = Pipeline(build_registry(), build_exporter_registry())
+            for cpus, workers in ((1, 1), (4, 4)):
+                with mock.patch("rokpyl.core.split.usable_cpus", return_value=cpus):
+                    tasks = list(pipeline.iter_tasks(config))
+                self.assertEqual([task.split_workers for task in tasks], [workers])
+
+
+if __name__ == "__main__":
+    unittest.main()
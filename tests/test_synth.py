@@ -0,0 +1,94 @@
+import importlib.util
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rokpyl.core.detection import detect_importers
+from rokpyl.importers.chatgpt import ChatGptImporter
+from rokpyl.importers.claude import ClaudeImporter
+from rokpyl.tools.synth import iter_conversations, write_export
+
+BENCHMARKS = Path(__file__).resolve().parents[1] / "benchmarks" / "run_benchmarks.py"
+
+
+def _load_benchmarks():
+    spec = importlib.util.spec_from_file_location("run_benchmarks", BENCHMARKS)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class SynthTests(unittest.TestCase):
+    def test_same_seed_is_deterministic(self) -> None:
+        first = list(iter_conversations("chatgpt", 5, seed=7))
+        second = list(iter_conversations("chatgpt", 5, seed=7))
+        other = list(iter_conversations("chatgpt", 5, seed=8))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+
+    def test_unknown_platform_raises(self) -> None:
+        with self.assertRaises(ValueError):
+            list(iter_conversations("gemini", 1))
+
+    def test_chatgpt_mapping_has_branches_and_current_node(self) -> None:
+        convo = next(iter_conversations("chatgpt", 1, seed=1, messages=20, branch_rate=1.0))
+        mapping = convo["mapping"]
+        self.assertIn(convo["current_node"], mapping)
+        self.assertTrue(any(len(node["children"]) > 1 for node in mapping.values()))
+
+    def test_generated_exports_parse_and_detect(self) -> None:
+        importers = [ClaudeImporter, ChatGptImporter]
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            chatgpt = write_export(root / "a.json", "chatgpt", 3, seed=2)
+            claude = write_export(root / "b.jsonl", "claude", 3, seed=2)
+
+            self.assertEqual(len(json.loads(chatgpt.read_text(encoding="utf-8"))), 3)
+            self.assertEqual(detect_importers(importers, chatgpt), [ChatGptImporter])
+            self.assertEqual(detect_importers(importers, claude), [ClaudeImporter])
+
+            chatgpt_records = ChatGptImporter().parse(chatgpt)
+            claude_records = ClaudeImporter().parse(claude)
+            self.assertEqual(len(chatgpt_records), 3)
+            self.assertEqual(len(claude_records), 3)
+            self.assertTrue(all(record.messages for record in chatgpt_records + claude_records))
+
+    def test_claude_html_and_csv_match_json(self) -> None:
+        importers = [ClaudeImporter, ChatGptImporter]
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            html = write_export(root / "c.html", "claude", 4, seed=3)
+            table = write_export(root / "c.csv", "claude", 4, seed=3)
+            expected = [
+                (convo["uuid"], [message["text"] for message in convo["chat_messages"]])
+                for convo in iter_conversations("claude", 4, seed=3)
+            ]
+            for path in (html, table):
+                self.assertEqual(detect_importers(importers, path), [ClaudeImporter])
+                records = ClaudeImporter().parse(path)
+                actual = [(record.id, [m.content for m in record.messages]) for record in records]
+                self.assertEqual(actual, expected)
+            with self.assertRaises(ValueError):
+                write_export(root / "g.csv", "chatgpt", 1)
+
+
+class BenchmarkGateTests(unittest.TestCase):
+    def test_compare_flags_drops_beyond_threshold(self) -> None:
+        bench = _load_benchmarks()
+        baseline = {
+            "normalize": {"items_per_s": 1000.0},
+            "exporter:jsonl": {"items_per_s": 1000.0},
+        }
+        results = {
+            "normalize": {"items_per_s": 800.0},
+            "exporter:jsonl": {"items_per_s": 700.0},
+            "exporter:new": {"items_per_s": 1.0},
+        }
+        regressions = bench.compare(results, baseline, 0.25)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("exporter:jsonl"))
+
+
+if __name__ == "__main__":
+    unittest.main()
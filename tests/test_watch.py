@@ -0,0 +1,290 @@
+import json
+import os
+import unittest
+import zipfile
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from rokpyl.cli import build_exporter_registry, build_registry
+from rokpyl.core.pipeline import Pipeline
+from rokpyl.core.watch import SourceWatcher, batch_outputs, watch
+from rokpyl.exporters.base import Exporter
+from rokpyl.tools.synth import write_export
+
+
+class _Stop(Exception):
+    pass
+
+
+class FlakyExporter(Exporter):
+    """Fails while ``failures`` is positive, then collects record ids."""
+
+    name = "flaky"
+    failures = 0
+    received: list = []
+
+    def write(self, records, options=None):
+        ids = [record.id for record in records]
+        if FlakyExporter.failures > 0:
+            FlakyExporter.failures -= 1
+            raise ConnectionError("service unavailable")
+        FlakyExporter.received.extend(ids)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class SourceWatcherTests(unittest.TestCase):
+    def test_waits_for_files_to_settle(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            clock = FakeClock()
+            watcher = SourceWatcher([root], settle_s=2.0, clock=clock)
+            path = root / "a.json"
+            path.write_text("[", encoding="utf-8")
+            (root / "b.json.part").write_text("[", encoding="utf-8")
+
+            self.assertEqual(watcher.poll(), {})
+            clock.now = 1.0
+            path.write_text("[]", encoding="utf-8")
+            self.assertEqual(watcher.poll(), {})
+            clock.now = 2.5
+            self.assertEqual(watcher.poll(), {})
+            clock.now = 3.5
+            ready = watcher.poll()
+            self.assertEqual(list(ready), [path])
+
+            watcher.mark_processed(ready)
+            clock.now = 10.0
+            self.assertEqual(watcher.poll(), {})
+            path.write_text("[ ]", encoding="utf-8")
+            os.utime(path, ns=(0, 10**9))
+            self.assertEqual(watcher.poll(), {})
+            clock.now = 13.0
+            self.assertEqual(list(watcher.poll()), [path])
+
+
+class WatchTests(unittest.TestCase):
+    def _pipeline(self) -> Pipeline:
+        return Pipeline(build_registry(), build_exporter_registry())
+
+    def test_batch_outputs(self):
+        outputs = batch_outputs(
+            [
+                {"type": "jsonl", "path": "out/a.jsonl"},
+                {"type": "markdown", "dir": "out/md"},
+                {"type": "columnar", "dir": "out/cols"},
+            ],
+            self._pipeline(),
+            "7",
+        )
+        self.assertTrue(outputs[0]["append"])
+        self.assertEqual(outputs[1]["dir"], "out/md")
+        self.assertEqual(outputs[2]["dir"], str(Path("out/cols.batch-7")))
+
+    def test_ingests_only_new_sources_and_dedupes_across_batches(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            inbox = root / "inbox"
+            write_export(inbox / "first.json", "chatgpt", 3, seed=1)
+            out = root / "out.jsonl"
+            config = {
+                "inputs": [{"path": str(inbox), "mode": "auto"}],
+                "outputs": [{"type": "jsonl", "path": str(out)}],
+            }
+            pipeline = self._pipeline()
+            seen = []
+
+            def drop_second(_interval):
+                if (inbox / "second.json").exists():
+                    raise _Stop()
+                # Two new conversations plus three repeats of the first batch.
+                write_export(inbox / "second.json", "chatgpt", 5, seed=1)
+
+            with self.assertRaises(_Stop):
+                watch(
+                    pipeline,
+                    config,
+                    settle_s=0,
+                    state_path=root / "state.json",
+                    on_batch=lambda batch, sources, records: seen.append(
+                        (batch, sorted(path.name for path in sources), records)
+                    ),
+                    sleep=drop_second,
+                )
+
+            self.assertEqual(seen, [(1, ["first.json"], 3), (2, ["second.json"], 2)])
+            lines = out.read_text(encoding="utf-8").splitlines()
+            self.assertEqual(len(lines), 5)
+            self.assertEqual(len({json.loads(line)["id"] for line in lines}), 5)
+            self.assertIsNone(pipeline.source_filter)
+
+            def stop(_interval):
+                raise _Stop()
+
+            restarted = []
+
+            def record(batch, sources, records):
+                restarted.append((list(sources), records))
+
+            with self.assertRaises(_Stop):
+                watch(
+                    self._pipeline(),
+                    config,
+                    settle_s=0,
+                    state_path=root / "state.json",
+                    on_batch=record,
+                    sleep=stop,
+                )
+            self.assertEqual(restarted, [])
+
+            # After a restart the dedup state still holds the exported ids.
+            write_export(inbox / "third.json", "chatgpt", 6, seed=1)
+            with self.assertRaises(_Stop):
+                watch(
+                    self._pipeline(),
+                    config,
+                    settle_s=0,
+                    state_path=root / "state.json",
+                    on_batch=record,
+                    sleep=stop,
+                )
+            self.assertEqual(restarted, [([inbox / "third.json"], 1)])
+            self.assertEqual(len(out.read_text(encoding="utf-8").splitlines()), 6)
+
+    def test_changed_source_re_exports_updated_conversations(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            source = write_export(root / "inbox" / "conversations.json", "chatgpt", 3, seed=2)
+            out = root / "out.jsonl"
+            config = {
+                "inputs": [{"path": str(source.parent), "mode": "auto"}],
+                "outputs": [{"type": "jsonl", "path": str(out)}],
+            }
+            seen = []
+
+            def edit(_interval):
+                if len(seen) == 2:
+                    raise _Stop()
+                payload = json.loads(source.read_text(encoding="utf-8"))
+                payload[1]["title"] = "Renamed"
+                source.write_text(json.dumps(payload), encoding="utf-8")
+                os.utime(source, ns=(0, 10**9))
+
+            with self.assertRaises(_Stop):
+                watch(
+                    self._pipeline(),
+                    config,
+                    settle_s=0,
+                    on_batch=lambda batch, sources, records: seen.append(records),
+                    sleep=edit,
+                )
+            self.assertEqual(seen, [3, 1])
+            lines = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+            self.assertEqual(len(lines), 4)
+            self.assertEqual(lines[-1]["title"], "Renamed")
+            self.assertEqual(lines[-1]["id"], lines[1]["id"])
+
+    def test_failed_source_is_reported_and_not_retried(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            inbox = root / "inbox"
+            write_export(inbox / "good.json", "chatgpt", 2)
+            (inbox / "bad.json").write_text('[{"title": "cut', encoding="utf-8")
+            config = {
+                "inputs": [{"path": str(inbox), "mode": "explicit", "parser": "chatgpt"}],
+                "outputs": [{"type": "jsonl", "path": str(root / "out.jsonl")}],
+            }
+            state = root / "state.json"
+            errors, seen = [], []
+
+            def stop(_interval):
+                raise _Stop()
+
+            for _ in range(2):
+                with self.assertRaises(_Stop):
+                    watch(
+                        self._pipeline(),
+                        config,
+                        settle_s=0,
+                        state_path=state,
+                        on_batch=lambda batch, sources, records: seen.append(records),
+                        on_error=lambda path, error: errors.append(path.name),
+                        sleep=stop,
+                    )
+            self.assertEqual(seen, [2])
+            self.assertEqual(errors, ["bad.json"])
+            self.assertIn(str(inbox / "bad.json"), json.loads(state.read_text())["failed"])
+
+    def test_export_zip_is_ingested(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            source = write_export(root / "conversations.json", "chatgpt", 3, seed=3)
+            inbox = root / "inbox"
+            inbox.mkdir()
+            with zipfile.ZipFile(inbox / "export-2024.zip", "w") as archive:
+                archive.write(source, "conversations.json")
+                archive.writestr("user.json", "{}")
+            out = root / "out.jsonl"
+            config = {
+                "inputs": [{"path": str(inbox), "mode": "auto"}],
+                "outputs": [{"type": "jsonl", "path": str(out)}],
+            }
+            seen, errors = [], []
+
+            def stop(_interval):
+                raise _Stop()
+
+            with self.assertRaises(_Stop):
+                watch(
+                    self._pipeline(),
+                    config,
+                    settle_s=0,
+                    on_batch=lambda batch, sources, records: seen.append(records),
+                    on_error=lambda path, error: errors.append(error),
+                    sleep=stop,
+                )
+            self.assertEqual((seen, errors), ([3], []))
+            self.assertEqual(len(out.read_text(encoding="utf-8").splitlines()), 3)
+
+    def test_failed_export_is_retried_on_the_next_poll(self):
+        with TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            inbox = root / "inbox"
+            write_export(inbox / "conversations.json", "chatgpt", 2, seed=4)
+            pipeline = self._pipeline()
+            pipeline.exporter_registry.register(FlakyExporter)
+            FlakyExporter.failures = 1
+            FlakyExporter.received = []
+            config = {
+                "inputs": [{"path": str(inbox), "mode": "auto"}],
+                "outputs": [{"type": "flaky", "path": str(root / "remote")}],
+            }
+            state = root / "state.json"
+            errors, seen = [], []
+            watch(
+                pipeline,
+                config,
+                settle_s=0,
+                state_path=state,
+                max_batches=2,
+                on_batch=lambda batch, sources, records: seen.append(records),
+                on_error=lambda path, error: errors.append(error),
+                sleep=lambda _interval: None,
+            )
+            self.assertEqual(seen, [0, 2])
+            self.assertEqual(len(errors), 1)
+            self.assertIn("service unavailable", errors[0])
+            self.assertEqual(len(FlakyExporter.received), 2)
+            payload = json.loads(state.read_text(encoding="utf-8"))
+            self.assertEqual(payload["failed"], {})
+            self.assertIn(str(inbox / "conversations.json"), payload["processed"])
+
+
+if __name__ == "__main__":
+    unittest.main()